@@ -3,7 +3,7 @@ Configuración de la aplicación
 """
 
 from pydantic_settings import BaseSettings
-from typing import List, Union
+from typing import Dict, List, Union
 from pydantic import field_validator
 
 
@@ -15,6 +15,11 @@ class Settings(BaseSettings):
     SUPABASE_KEY: str
     SUPABASE_SERVICE_KEY: str = ""  # Opcional, para operaciones admin
     
+    # Backend de datos: "supabase", "postgrest" (PostgREST local) o "memory"
+    DATABASE_BACKEND: str = "supabase"
+    POSTGREST_URL: str = "http://localhost:3000"  # Solo para DATABASE_BACKEND=postgrest
+    MEMORY_LATENCY_MS: float = 0.0  # Latencia simulada para DATABASE_BACKEND=memory
+    
     # CORS (parseado desde string separado por comas)
     CORS_ORIGINS: Union[str, List[str]] = "http://localhost:3000,http://localhost:5173"
     
@@ -22,6 +27,104 @@ class Settings(BaseSettings):
     ENVIRONMENT: str = "development"
     DEBUG: bool = True
     
+    # Observabilidad de consultas
+    SLOW_QUERY_THRESHOLD_MS: float = 200.0  # Umbral para registrar consultas lentas
+    QUERY_STATS_SUMMARY_INTERVAL: int = 300  # Segundos entre resúmenes (0 = desactivado)
+    QUERY_STATS_TOP_N: int = 10  # Huellas incluidas en el resumen
+    
+    # Coalescencia de lecturas costosas (single-flight)
+    SINGLE_FLIGHT_ENABLED: bool = True
+    SINGLE_FLIGHT_CACHE_TTL: float = 2.0  # Segundos de micro-caché (0 = desactivado)
+    
+    # Pools de hilos por clase de carga (bulkheads): hilos y peticiones en cola
+    BULKHEAD_TIMER_WORKERS: int = 8
+    BULKHEAD_TIMER_QUEUE: int = 32
+    BULKHEAD_ANALYTICS_WORKERS: int = 2
+    BULKHEAD_ANALYTICS_QUEUE: int = 8
+    BULKHEAD_DEFAULT_WORKERS: int = 16
+    BULKHEAD_DEFAULT_QUEUE: int = 64
+    
+    # Límite adaptativo (AIMD) de llamadas concurrentes a Supabase
+    ADAPTIVE_LIMIT_ENABLED: bool = True
+    ADAPTIVE_LIMIT_INITIAL: int = 20
+    ADAPTIVE_LIMIT_MIN: int = 2
+    ADAPTIVE_LIMIT_MAX: int = 100
+    ADAPTIVE_LIMIT_LATENCY_TARGET_MS: float = 250.0  # Por encima, la llamada cuenta como sobrecarga
+    ADAPTIVE_LIMIT_BACKOFF: float = 0.9  # Factor de reducción multiplicativa
+    ADAPTIVE_LIMIT_QUEUE_TIMEOUT_MS: float = 500.0  # Espera máxima por un hueco antes del 503
+    ADAPTIVE_LIMIT_MAX_QUEUE: int = 50
+    
+    # Circuit breaker hacia Supabase y caché de respuestas para servir datos obsoletos
+    CIRCUIT_BREAKER_ENABLED: bool = True
+    CIRCUIT_FAILURE_THRESHOLD: int = 5  # Fallos de red consecutivos para abrir el circuito
+    CIRCUIT_RESET_TIMEOUT: float = 30.0  # Segundos abierto antes de la llamada de prueba
+    STALE_CACHE_ENABLED: bool = True
+    STALE_CACHE_MAX_ENTRIES: int = 1000  # Última respuesta correcta por endpoint y parámetros
+    
+    # Presupuesto de tiempo por petición en segundos (0 = sin plazo).
+    # REQUEST_DEADLINES asigna presupuestos por prefijo de ruta (JSON en el .env)
+    REQUEST_DEADLINE_DEFAULT: float = 10.0
+    REQUEST_DEADLINES: Dict[str, float] = {
+        "/api/v1/statistics": 5.0,
+        "/api/v1/pomodoros": 3.0,
+        "/api/v1/distractions": 3.0,
+        "/api/v1/events": 0.0,  # Conexiones de larga duración (SSE)
+    }
+    
+    # Lecturas con cobertura (hedging) para get_task_by_id y get_pomodoro_by_id
+    HEDGING_ENABLED: bool = False
+    HEDGE_PERCENTILE: float = 95.0  # Percentil de latencia tras el que se lanza el duplicado
+    HEDGE_MIN_DELAY_MS: float = 5.0
+    HEDGE_MIN_SAMPLES: int = 20  # Muestras por huella antes de empezar a cubrir
+    HEDGE_MAX_RATE: float = 0.05  # Fracción máxima de peticiones duplicadas
+    HEDGE_WORKERS: int = 32
+    
+    # Máximo de peticiones en un lote (POST /api/v1/batch)
+    BATCH_MAX_REQUESTS: int = 20
+    
+    # Sincronización incremental (GET /api/v1/sync)
+    SYNC_WATERMARK_LAG_SECONDS: float = 5.0  # Margen para transacciones en curso y desfase de reloj
+    SYNC_TOMBSTONE_RETENTION_DAYS: int = 30  # Marcas más antiguas reciben una copia completa
+    SYNC_PAGE_SIZE: int = 1000  # Filas por página al leer los cambios (máximo de PostgREST)
+    
+    # Analítica de foco (GET /api/v1/statistics/insights)
+    INSIGHTS_PAGE_SIZE: int = 1000  # Filas por página al cargar el historial (máximo de PostgREST)
+    
+    # Caché en memoria del historial de foco por usuario (analítica sin consultas)
+    HISTORY_CACHE_ENABLED: bool = True
+    HISTORY_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # Presupuesto global; se expulsan los usuarios menos recientes
+    
+    # Comprobación de referencias al crear (solo id/user_id, con consultas IN)
+    REFERENCE_CACHE_ENABLED: bool = True
+    REFERENCE_CACHE_TTL: float = 30.0  # Segundos que se recuerda que un ID existe
+    REFERENCE_CACHE_MAX_ENTRIES: int = 10000
+    
+    # Conciliación de los totales de las tareas (time_spent y conteos de subtareas)
+    TASK_TOTALS_RECONCILE_INTERVAL: float = 0  # Segundos entre conciliaciones (0 = solo manual/cron)
+    TASK_TOTALS_RECONCILE_CHUNK: int = 500  # Tareas por llamada a reconcile_task_totals
+    
+    # Registro diferido de distracciones (POST /api/v1/distractions/deferred)
+    DISTRACTION_BATCH_SIZE: int = 100  # Filas por insert
+    DISTRACTION_FLUSH_INTERVAL: float = 1.0  # Segundos máximos que un registro espera en cola
+    DISTRACTION_QUEUE_MAX: int = 10000  # Registros pendientes; por encima se responde 503
+    DISTRACTION_MAX_RETRIES: int = 3  # Reintentos seguidos de un lote (después espera a la siguiente escritura)
+    DISTRACTION_RETRY_BACKOFF: float = 0.5  # Segundos antes del primer reintento (se duplica)
+    DISTRACTION_WAL_PATH: str = ""  # Fichero para no perder la cola al reiniciar ("" = solo memoria)
+    
+    # Trabajos en segundo plano (informes de POST /api/v1/reports)
+    JOB_WORKERS: int = 2
+    JOB_MAX_QUEUED: int = 50  # Trabajos en cola; por encima se responde 503
+    JOB_RESULT_TTL: float = 300.0  # Segundos que un informe terminado se reutiliza
+    JOB_MAX_RETAINED: int = 500  # Trabajos terminados que se conservan para consultarlos
+    REPORT_MAX_RANGE_DAYS: int = 366  # Rango máximo de una exportación
+    
+    # Bus de eventos de cambio (invalidación entre workers y /api/v1/events)
+    EVENT_BUS_BACKEND: str = "local"  # local | postgres (LISTEN/NOTIFY)
+    EVENT_BUS_DATABASE_URL: str = ""  # DSN de Postgres para EVENT_BUS_BACKEND=postgres
+    EVENT_BUS_CHANNEL: str = "mypomodoro_changes"
+    EVENT_BUS_MAX_QUEUE: int = 100  # Eventos pendientes por cliente conectado
+    EVENT_STREAM_KEEPALIVE: float = 15.0  # Segundos entre keep-alives del stream SSE
+    
     @field_validator('CORS_ORIGINS', mode='before')
     @classmethod
     def parse_cors_origins(cls, v):
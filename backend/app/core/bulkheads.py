@@ -0,0 +1,155 @@
+"""
+Pools de ejecución acotados (bulkheads) para las llamadas bloqueantes a servicios
+
+Los servicios son síncronos (el cliente de Supabase es bloqueante), así que cada
+endpoint ejecuta su cuerpo fuera del event loop en el pool de su clase de carga:
+
+- ``timer``: escrituras del temporizador (crear/actualizar/completar pomodoros,
+  registrar distracciones). Nunca deben esperar detrás de lecturas pesadas.
+- ``analytics``: lecturas pesadas (estadísticas, exportaciones, informes).
+- ``default``: el resto de endpoints CRUD.
+
+Cada pool tiene un número fijo de hilos y una cola acotada. Cuando ambos están
+llenos la petición se rechaza de inmediato con 503 en lugar de acumularse.
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from fastapi import HTTPException, status
+
+from app.config import settings
+from app.core.deadlines import check_deadline
+
+TIMER = "timer"
+ANALYTICS = "analytics"
+DEFAULT = "default"
+
+WORKLOADS = (TIMER, ANALYTICS, DEFAULT)
+
+
+class Bulkhead:
+    """Pool de hilos de tamaño fijo con cola acotada y rechazo inmediato"""
+
+    def __init__(self, name: str, max_workers: int, queue_depth: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.queue_depth = queue_depth
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=f"bulkhead-{name}"
+        )
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.stats = {"completed": 0, "rejected": 0, "max_pending": 0}
+
+    @property
+    def capacity(self) -> int:
+        """Peticiones admitidas a la vez (en ejecución + en cola)"""
+        return self.max_workers + self.queue_depth
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """
+        Encolar una llamada en el pool o rechazarla con 503 si está saturado.
+        El contexto (contextvars) de la petición se propaga al hilo.
+        """
+        with self._lock:
+            if self._pending >= self.capacity:
+                self.stats["rejected"] += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail=f"Servicio saturado ({self.name}), reintenta en unos segundos",
+                    headers={"Retry-After": "1"}
+                )
+            self._pending += 1
+            self.stats["max_pending"] = max(self.stats["max_pending"], self._pending)
+
+        context = contextvars.copy_context()
+        future = self._executor.submit(context.run, _run_checked, func, *args, **kwargs)
+        # El hueco se libera cuando el hilo termina, aunque el cliente ya no espere
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Ejecutar ``func`` en el pool y esperar su resultado sin bloquear el loop"""
+        return await asyncio.wrap_future(self.submit(func, *args, **kwargs))
+
+    def _release(self, _future: Future):
+        with self._lock:
+            self._pending -= 1
+            self.stats["completed"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Estado actual del pool para /metrics"""
+        with self._lock:
+            pending = self._pending
+            stats = dict(self.stats)
+        return {
+            "workers": self.max_workers,
+            "queue_depth": self.queue_depth,
+            "active": min(pending, self.max_workers),
+            "queued": max(0, pending - self.max_workers),
+            **stats,
+        }
+
+    def shutdown(self):
+        """Cerrar el pool esperando las llamadas en curso"""
+        self._executor.shutdown(wait=True)
+
+
+def _run_checked(func: Callable, *args, **kwargs) -> Any:
+    """No empezar trabajo cuyo plazo venció o cuyo cliente ya se fue mientras esperaba en cola"""
+    check_deadline()
+    return func(*args, **kwargs)
+
+
+_bulkheads: Dict[str, Bulkhead] = {}
+_registry_lock = threading.Lock()
+
+
+def get_bulkhead(name: str) -> Bulkhead:
+    """Obtener (o crear según Settings) el pool de una clase de carga"""
+    with _registry_lock:
+        if name not in _bulkheads:
+            prefix = f"BULKHEAD_{name.upper()}"
+            _bulkheads[name] = Bulkhead(
+                name,
+                max_workers=getattr(settings, f"{prefix}_WORKERS"),
+                queue_depth=getattr(settings, f"{prefix}_QUEUE"),
+            )
+        return _bulkheads[name]
+
+
+def bulkhead_stats() -> Dict[str, Dict[str, Any]]:
+    """Estado de todos los pools creados"""
+    with _registry_lock:
+        pools = dict(_bulkheads)
+    return {name: pool.snapshot() for name, pool in pools.items()}
+
+
+def shutdown_bulkheads():
+    """Cerrar todos los pools (al apagar la aplicación)"""
+    with _registry_lock:
+        pools = list(_bulkheads.values())
+        _bulkheads.clear()
+    for pool in pools:
+        pool.shutdown()
+
+
+def bulkhead(name: str):
+    """
+    Decorador para endpoints síncronos: el cuerpo se ejecuta en el pool
+    ``name`` y el endpoint resultante es async.
+    """
+    if name not in WORKLOADS:
+        raise ValueError(f"Clase de carga desconocida: {name}")
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(**kwargs):
+            return await get_bulkhead(name).run(func, **kwargs)
+        return wrapper
+    return decorator
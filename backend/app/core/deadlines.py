@@ -0,0 +1,237 @@
+"""
+Plazos por petición y cancelación cuando el cliente se desconecta
+
+Cada petición HTTP recibe un presupuesto de tiempo según su ruta
+(``REQUEST_DEADLINES``, o ``REQUEST_DEADLINE_DEFAULT``). El plazo viaja en una
+``ContextVar`` hasta los hilos de los bulkheads y cada llamada a Supabase:
+
+- comprueba antes de ejecutarse que queda tiempo y que el cliente sigue ahí,
+- recibe el tiempo restante como timeout de la propia llamada.
+
+Si el presupuesto se agota antes de empezar la respuesta se devuelve 504. Si
+el cliente se desconecta, la petición se cancela y las llamadas pendientes no
+llegan a ejecutarse.
+
+Las escrituras que deshacen una escritura a medias se ejecutan dentro de
+``shielded()``: sin plazo ni cancelación, para que un 504 no deje filas
+huérfanas que el reintento del cliente duplicaría.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import json
+import logging
+import threading
+import time
+from typing import Iterator, Optional
+
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+
+from app.config import settings
+
+logger = logging.getLogger("mypomodoro.requests")
+
+# 499: código de nginx para "el cliente cerró la conexión"
+HTTP_499_CLIENT_CLOSED_REQUEST = 499
+
+stats = {"deadline_exceeded": 0, "cancelled": 0}
+
+
+class DeadlineExceeded(HTTPException):
+    """Se agotó el presupuesto de tiempo de la petición"""
+
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Tiempo de respuesta agotado"
+        )
+
+
+class RequestCancelled(HTTPException):
+    """El cliente se desconectó antes de recibir la respuesta"""
+
+    def __init__(self):
+        super().__init__(
+            status_code=HTTP_499_CLIENT_CLOSED_REQUEST,
+            detail="Petición cancelada por el cliente"
+        )
+
+
+class RequestDeadline:
+    """Plazo absoluto de una petición y su señal de cancelación (thread-safe)"""
+
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+        self._cancelled = threading.Event()
+
+    def remaining(self) -> float:
+        """Segundos que quedan de presupuesto (nunca negativo)"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """Marcar la petición como cancelada"""
+        self._cancelled.set()
+
+    def check(self):
+        """Lanzar ``RequestCancelled`` o ``DeadlineExceeded`` si no debe seguir"""
+        if self.cancelled:
+            raise RequestCancelled()
+        if self.expired:
+            raise DeadlineExceeded()
+
+
+_current: contextvars.ContextVar[Optional[RequestDeadline]] = contextvars.ContextVar(
+    "request_deadline", default=None
+)
+
+
+def current_deadline() -> Optional[RequestDeadline]:
+    """Plazo de la petición en curso (None fuera de una petición)"""
+    return _current.get()
+
+
+def check_deadline():
+    """Comprobar el plazo de la petición en curso, si la hay"""
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.check()
+
+
+@contextlib.contextmanager
+def shielded() -> Iterator[None]:
+    """
+    Ejecutar sin el plazo de la petición: las llamadas no comprueban el plazo
+    ni la cancelación y no reciben timeout. Solo para deshacer escrituras.
+    """
+    token = _current.set(None)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def budget_for(path: str) -> float:
+    """Presupuesto de la ruta: el prefijo más largo de ``REQUEST_DEADLINES``"""
+    matches = [prefix for prefix in settings.REQUEST_DEADLINES if path.startswith(prefix)]
+    if matches:
+        return settings.REQUEST_DEADLINES[max(matches, key=len)]
+    return settings.REQUEST_DEADLINE_DEFAULT
+
+
+class DeadlineMiddleware:
+    """
+    Middleware ASGI que fija el plazo de cada petición, responde 504 cuando se
+    agota y cancela el trabajo si el cliente se desconecta.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        budget = budget_for(scope["path"])
+        if budget <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        deadline = RequestDeadline(budget)
+        token = _current.set(deadline)
+        # Una vez leído el cuerpo, solo el vigilante lee de ``receive``
+        body_read = asyncio.Event()
+        disconnected = asyncio.Event()
+        body_delivered = False
+        response_started = False
+        if not _has_body(scope):
+            body_read.set()
+
+        async def app_receive():
+            nonlocal body_delivered
+            if body_read.is_set():
+                if not body_delivered:
+                    body_delivered = True
+                    return {"type": "http.request", "body": b"", "more_body": False}
+                await disconnected.wait()
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request" and not message.get("more_body", False):
+                body_delivered = True
+                body_read.set()
+            elif message["type"] == "http.disconnect":
+                disconnected.set()
+            return message
+
+        async def app_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        app_task = asyncio.ensure_future(self.app(scope, app_receive, app_send))
+
+        async def watch_disconnect():
+            await body_read.wait()
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    break
+            disconnected.set()
+            if not app_task.done():
+                stats["cancelled"] += 1
+                deadline.cancel()
+                app_task.cancel()
+
+        watcher = asyncio.ensure_future(watch_disconnect())
+        try:
+            done, _ = await asyncio.wait({app_task}, timeout=deadline.remaining())
+            if app_task in done or response_started:
+                await app_task
+                return
+
+            # Presupuesto agotado sin respuesta: cancelar y responder 504
+            stats["deadline_exceeded"] += 1
+            deadline.cancel()
+            app_task.cancel()
+            try:
+                await app_task
+            except asyncio.CancelledError:
+                pass
+            logger.warning(json.dumps({
+                "event": "deadline_exceeded",
+                "method": scope["method"],
+                "path": scope["path"],
+                "budget_s": budget,
+            }))
+            if not response_started:
+                response = JSONResponse(
+                    status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                    content={"detail": "Tiempo de respuesta agotado"}
+                )
+                await response(scope, receive, send)
+        except asyncio.CancelledError:
+            if not disconnected.is_set():
+                raise
+        finally:
+            watcher.cancel()
+            _current.reset(token)
+
+
+def _has_body(scope) -> bool:
+    """Si la petición trae cuerpo (que leerá la aplicación)"""
+    headers = dict(scope.get("headers") or [])
+    if b"transfer-encoding" in headers:
+        return True
+    return headers.get(b"content-length", b"0") != b"0"
@@ -0,0 +1,341 @@
+"""
+Bus de eventos de cambio
+
+Los servicios publican un ``ChangeEvent`` tras cada creación, actualización o
+borrado. El bus lo entrega a los suscriptores del proceso y, a través de un
+transporte, a los demás workers:
+
+- ``local``: broker en memoria compartido por los buses del mismo proceso
+  (un worker, tests y desarrollo sin conexión).
+- ``postgres``: ``NOTIFY``/``LISTEN`` sobre ``EVENT_BUS_DATABASE_URL``, para
+  varios workers o instancias. Necesita ``psycopg`` (dependencia opcional).
+
+Cada evento lleva el origen (el bus que lo publicó), así los eventos propios que
+devuelve el transporte no se entregan dos veces. Con los eventos de otros
+workers se invalidan las cachés locales (single-flight e historial de foco), y los endpoints de
+``/api/v1/events`` los reenvían por SSE o WebSocket a los clientes del usuario.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set
+
+from app.config import settings
+
+logger = logging.getLogger("mypomodoro.events")
+
+CREATE = "create"
+UPDATE = "update"
+DELETE = "delete"
+
+
+@dataclass
+class ChangeEvent:
+    """Cambio en una fila. Solo IDs: el cliente relee lo que necesite"""
+    entity: str  # tabla: tasks, subtasks, pomodoros, distractions
+    action: str  # create | update | delete
+    id: int
+    user_id: Optional[str] = None  # None en filas sin usuario: solo se entrega a suscripciones sin usuario
+    task_id: Optional[int] = None
+    origin: str = ""
+    at: float = field(default_factory=time.time)
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def from_json(cls, payload: str) -> "ChangeEvent":
+        return cls(**json.loads(payload))
+
+
+Listener = Callable[[ChangeEvent], None]
+
+
+class Subscription:
+    """
+    Cola de eventos de un cliente conectado (SSE o WebSocket). Se alimenta desde
+    cualquier hilo y se consume desde el event loop en el que se creó.
+    """
+
+    def __init__(self, bus: "EventBus", user_id: Optional[str], max_queue: int):
+        self._bus = bus
+        self.user_id = user_id
+        self._loop = asyncio.get_running_loop()
+        self._queue: "asyncio.Queue[Optional[ChangeEvent]]" = asyncio.Queue(maxsize=max_queue)
+        # Si la cola se llena se descartan eventos: el cliente debe resincronizar
+        self.overflowed = False
+        # El bus se cerró (``EventBus.close``): no llegarán más eventos
+        self.closed = False
+
+    def wants(self, event: ChangeEvent) -> bool:
+        """Las suscripciones sin usuario (administración) reciben todo; el resto, solo lo de su usuario"""
+        return self.user_id is None or event.user_id == self.user_id
+
+    def _put(self, event: Optional[ChangeEvent]):
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    def deliver(self, event: Optional[ChangeEvent]):
+        try:
+            self._loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # El loop ya se cerró: el cliente se desconectó
+            self._bus.unsubscribe(self)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[ChangeEvent]:
+        """Siguiente evento, o None si vence ``timeout`` o se cierra el bus (``closed``)"""
+        if self.closed:
+            return None
+        try:
+            event = await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if event is None:
+            self.closed = True
+        return event
+
+    def close(self):
+        self._bus.unsubscribe(self)
+
+    def __aiter__(self) -> AsyncIterator[ChangeEvent]:
+        return self._iterate()
+
+    async def _iterate(self) -> AsyncIterator[ChangeEvent]:
+        while True:
+            event = await self._queue.get()
+            if event is None:
+                self.closed = True
+                return
+            yield event
+
+
+class LocalBroker:
+    """Transporte en memoria: reparte cada evento entre los buses conectados"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buses: List["EventBus"] = []
+
+    def attach(self, bus: "EventBus"):
+        with self._lock:
+            self._buses.append(bus)
+
+    def detach(self, bus: "EventBus"):
+        with self._lock:
+            if bus in self._buses:
+                self._buses.remove(bus)
+
+    def publish(self, event: ChangeEvent):
+        with self._lock:
+            buses = list(self._buses)
+        for bus in buses:
+            bus.receive(event)
+
+    def close(self):
+        pass
+
+
+class PostgresTransport:
+    """
+    Transporte con ``NOTIFY``/``LISTEN`` de Postgres. Un hilo escucha el canal y
+    entrega al bus los eventos de todos los workers (también los propios, que
+    el bus descarta por su origen).
+    """
+
+    def __init__(self, dsn: str, channel: str):
+        try:
+            import psycopg
+        except ImportError as e:
+            raise RuntimeError(
+                "EVENT_BUS_BACKEND=postgres necesita psycopg (pip install 'psycopg[binary]')"
+            ) from e
+        self._psycopg = psycopg
+        self._dsn = dsn
+        self._channel = channel
+        self._bus: Optional["EventBus"] = None
+        self._publisher = psycopg.connect(dsn, autocommit=True)
+        self._publish_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._listener = threading.Thread(target=self._listen, name="event-bus-listen", daemon=True)
+
+    def attach(self, bus: "EventBus"):
+        self._bus = bus
+        self._listener.start()
+
+    def detach(self, bus: "EventBus"):
+        self._bus = None
+
+    def publish(self, event: ChangeEvent):
+        with self._publish_lock:
+            self._publisher.execute("SELECT pg_notify(%s, %s)", (self._channel, event.to_json()))
+
+    def _listen(self):
+        while not self._stopped.is_set():
+            try:
+                with self._psycopg.connect(self._dsn, autocommit=True) as conn:
+                    conn.execute(f"LISTEN {self._channel}")
+                    while not self._stopped.is_set():
+                        for notify in conn.notifies(timeout=1.0):
+                            if self._bus is not None:
+                                self._bus.receive(ChangeEvent.from_json(notify.payload))
+            except Exception as e:
+                logger.warning("Conexión LISTEN perdida (%s); reintentando", e)
+                self._stopped.wait(1.0)
+
+    def close(self):
+        self._stopped.set()
+        self._publisher.close()
+
+
+class EventBus:
+    """Bus de eventos de cambio de un worker"""
+
+    def __init__(self, transport: Any = None, max_queue: int = 100):
+        self.origin = uuid.uuid4().hex
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._listeners: List[Listener] = []
+        self._subscriptions: Set[Subscription] = set()
+        self.stats = {"published": 0, "received": 0, "delivered": 0, "publish_errors": 0}
+        self._transport = transport
+        if transport is not None:
+            transport.attach(self)
+
+    def add_listener(self, listener: Listener):
+        """Registrar una función que recibe todos los eventos (propios y remotos)"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def subscribe(self, user_id: Optional[str] = None) -> Subscription:
+        """Suscribir a un cliente (desde el event loop) a los eventos de su usuario"""
+        subscription = Subscription(self, user_id, self.max_queue)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event: ChangeEvent):
+        """Entregar localmente y propagar al resto de workers"""
+        event.origin = self.origin
+        with self._lock:
+            self.stats["published"] += 1
+        self._dispatch(event)
+        if self._transport is not None:
+            try:
+                self._transport.publish(event)
+            except Exception as e:
+                # Un fallo del transporte no debe tumbar la escritura que ya se hizo
+                with self._lock:
+                    self.stats["publish_errors"] += 1
+                logger.warning("No se pudo propagar el evento %s: %s", event.to_json(), e)
+
+    def receive(self, event: ChangeEvent):
+        """Evento llegado por el transporte (los propios ya se entregaron)"""
+        if event.origin == self.origin:
+            return
+        with self._lock:
+            self.stats["received"] += 1
+        self._dispatch(event)
+
+    def _dispatch(self, event: ChangeEvent):
+        with self._lock:
+            listeners = list(self._listeners)
+            subscriptions = [s for s in self._subscriptions if s.wants(event)]
+            self.stats["delivered"] += len(subscriptions)
+        for listener in listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                logger.warning("Error en un listener de eventos: %s", e)
+        for subscription in subscriptions:
+            subscription.deliver(event)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Estadísticas para /metrics"""
+        with self._lock:
+            return {**self.stats, "subscribers": len(self._subscriptions)}
+
+    def close(self):
+        """Desconectar del transporte y terminar las suscripciones abiertas"""
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+            self._subscriptions.clear()
+        for subscription in subscriptions:
+            subscription.deliver(None)
+        if self._transport is not None:
+            self._transport.detach(self)
+            self._transport.close()
+
+
+_local_broker = LocalBroker()
+_bus: Optional[EventBus] = None
+_bus_lock = threading.Lock()
+
+
+def _invalidate_remote_changes(bus: EventBus) -> Listener:
+    """
+    Listener que invalida la caché single-flight y la del historial de foco con
+    los cambios de otros workers
+    """
+    from app.core.history_cache import affects_history, history_cache
+    from app.core.single_flight import single_flight
+
+    def listener(event: ChangeEvent):
+        if event.origin != bus.origin:
+            single_flight.invalidate(event.user_id)
+            if affects_history(event.entity, event.action):
+                history_cache.invalidate(event.user_id)
+    return listener
+
+
+def _forget_deleted_references(event: ChangeEvent):
+    """Listener que olvida las filas borradas (propias y remotas) de la caché de referencias"""
+    from app.database.references import reference_cache
+
+    if event.action == DELETE:
+        reference_cache.invalidate(event.entity, event.id)
+
+
+def get_event_bus() -> EventBus:
+    """Bus global según Settings"""
+    global _bus
+    with _bus_lock:
+        if _bus is None:
+            if settings.EVENT_BUS_BACKEND == "postgres":
+                transport = PostgresTransport(settings.EVENT_BUS_DATABASE_URL, settings.EVENT_BUS_CHANNEL)
+            else:
+                transport = _local_broker
+            _bus = EventBus(transport, max_queue=settings.EVENT_BUS_MAX_QUEUE)
+            _bus.add_listener(_invalidate_remote_changes(_bus))
+            _bus.add_listener(_forget_deleted_references)
+        return _bus
+
+
+def reset_event_bus():
+    """Cerrar y descartar el bus actual"""
+    global _bus
+    with _bus_lock:
+        bus, _bus = _bus, None
+    if bus is not None:
+        bus.close()
+
+
+def event_bus_stats() -> Dict[str, Any]:
+    """Estado del bus para /metrics"""
+    return get_event_bus().snapshot()
+
+
+def publish_change(entity: str, action: str, record_id: int,
+                   user_id: Optional[str] = None, task_id: Optional[int] = None):
+    """Publicar el cambio de una fila (llamar tras una escritura correcta)"""
+    get_event_bus().publish(ChangeEvent(entity, action, record_id, user_id, task_id))
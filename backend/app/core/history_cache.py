@@ -0,0 +1,152 @@
+"""
+Caché en memoria del historial de foco de los usuarios activos
+
+Guarda por usuario el historial en columnas (``FocusHistory``) que usa la
+analítica. La primera lectura lo carga de la base de datos; después las
+escrituras del propio worker lo mantienen al día añadiendo filas (un pomodoro
+completado, una distracción registrada) y las lecturas no consultan Supabase.
+Los cambios que no se pueden aplicar como un añadido (ediciones, borrados,
+cambios de otros workers) descartan la entrada y la siguiente lectura recarga.
+
+La caché es una LRU acotada por memoria (``HISTORY_CACHE_MAX_BYTES``): al
+superar el presupuesto se expulsan los usuarios usados hace más tiempo.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from app.config import settings
+from app.core.events import DELETE
+
+
+def affects_history(entity: str, action: str) -> bool:
+    """Si un cambio afecta al historial (borrar una tarea deja sus pomodoros sin tarea)"""
+    return entity in ("pomodoros", "distractions") or (entity == "tasks" and action == DELETE)
+
+
+class _Load:
+    """Cargas en curso de un usuario y si hubo cambios mientras tanto"""
+
+    def __init__(self):
+        self.loaders = 0
+        self.dirty = False
+
+
+class HistoryCache:
+    """LRU de historiales por usuario, acotada por bytes (thread-safe)"""
+
+    def __init__(self):
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._loads: Dict[Hashable, _Load] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "appends": 0, "invalidations": 0, "evictions": 0}
+
+    def get(self, user_id: Optional[str], loader: Callable[[], Any]) -> Any:
+        """
+        Historial del usuario, cargándolo con ``loader`` si no está. Sin
+        ``user_id`` (todos los usuarios) no se cachea.
+        """
+        if not settings.HISTORY_CACHE_ENABLED or user_id is None:
+            return loader()
+
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                self._entries.move_to_end(user_id)
+                self.stats["hits"] += 1
+                return entry
+            self.stats["misses"] += 1
+            load = self._loads.setdefault(user_id, _Load())
+            load.loaders += 1
+
+        try:
+            entry = loader()
+        finally:
+            with self._lock:
+                load.loaders -= 1
+                if load.loaders == 0:
+                    del self._loads[user_id]
+
+        with self._lock:
+            # Si hubo cambios durante la carga puede que la carga no los incluya
+            if not load.dirty and user_id not in self._entries:
+                self._entries[user_id] = entry
+                self._resize(user_id)
+        return entry
+
+    def update(self, user_id: Optional[str], apply: Callable[[Any], None]):
+        """
+        Aplicar un cambio (``apply`` añade filas al historial) si el usuario
+        está en caché. Si el cambio falla, se descarta la entrada.
+        """
+        if user_id is None:
+            return
+        with self._lock:
+            self._mark_loads(user_id)
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return
+            try:
+                apply(entry)
+            except Exception:
+                self._drop(user_id)
+                self.stats["invalidations"] += 1
+                return
+            self.stats["appends"] += 1
+            self._resize(user_id)
+
+    def invalidate(self, user_id: Optional[str]):
+        """Descartar el historial del usuario (la siguiente lectura recarga)"""
+        if user_id is None:
+            return
+        with self._lock:
+            self._mark_loads(user_id)
+            if user_id in self._entries:
+                self._drop(user_id)
+                self.stats["invalidations"] += 1
+
+    def _mark_loads(self, user_id: Hashable):
+        load = self._loads.get(user_id)
+        if load is not None:
+            load.dirty = True
+
+    def _drop(self, user_id: Hashable):
+        del self._entries[user_id]
+        self._bytes -= self._sizes.pop(user_id)
+
+    def _resize(self, user_id: Hashable):
+        """Recalcular el tamaño de la entrada y expulsar hasta volver al presupuesto"""
+        size = self._entries[user_id].nbytes
+        self._bytes += size - self._sizes.get(user_id, 0)
+        self._sizes[user_id] = size
+        while self._bytes > settings.HISTORY_CACHE_MAX_BYTES and self._entries:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.stats["evictions"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Estado actual para /metrics (bytes por usuario, del más reciente al más antiguo)"""
+        with self._lock:
+            return {
+                "users": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": settings.HISTORY_CACHE_MAX_BYTES,
+                **self.stats,
+                "per_user": {str(user_id): self._sizes[user_id] for user_id in reversed(self._entries)},
+            }
+
+    def clear(self):
+        """Vaciar la caché y las estadísticas (útil para testing)"""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._loads.clear()
+            self._bytes = 0
+            for name in self.stats:
+                self.stats[name] = 0
+
+
+history_cache = HistoryCache()
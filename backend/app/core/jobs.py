@@ -0,0 +1,251 @@
+"""
+Trabajos en segundo plano para tareas pesadas (informes, exportaciones)
+
+La petición que crea un trabajo solo lo encola y responde enseguida; un pool
+de hilos propio (``JOB_WORKERS``) lo ejecuta fuera de los pools de los
+endpoints y el cliente consulta el estado y el progreso hasta que termina.
+
+- Deduplicación: los trabajos se identifican por una clave (p. ej. usuario,
+  tipo y rango). Pedir uno igual a otro en cola, en curso o terminado hace
+  menos de ``JOB_RESULT_TTL`` segundos devuelve el existente.
+- Caché de resultados: los trabajos terminados se conservan (como máximo
+  ``JOB_MAX_RETAINED``) para consultarlos y reutilizarlos. ``invalidate``
+  descarta los de un ámbito (usuario) cuando cambian sus datos.
+- Cola: ``LocalJobQueue`` vive en el proceso y no necesita servicios externos.
+  Otra cola (Redis, Postgres) solo tiene que ofrecer ``put``/``get``.
+"""
+
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from fastapi import HTTPException, status
+
+from app.config import settings
+
+logger = logging.getLogger("mypomodoro.jobs")
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Función del trabajo: recibe un callback para informar del progreso (0 a 1)
+JobFunction = Callable[[Callable[[float], None]], Any]
+
+
+@dataclass
+class Job:
+    """Estado de un trabajo"""
+    id: str
+    key: Hashable
+    scope: Optional[Hashable] = None  # Ámbito de invalidación (user_id)
+    params: Dict[str, Any] = field(default_factory=dict)
+    status: str = QUEUED
+    progress: float = 0.0
+    result: Any = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    stale: bool = False  # Sus datos cambiaron: no se reutiliza
+    fn: Optional[JobFunction] = field(default=None, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+
+class LocalJobQueue:
+    """Cola en memoria del proceso"""
+
+    def __init__(self):
+        self._queue: "queue.Queue[Optional[Job]]" = queue.Queue()
+
+    def put(self, job: Optional[Job]):
+        self._queue.put(job)
+
+    def get(self) -> Optional[Job]:
+        return self._queue.get()
+
+
+class JobRunner:
+    """Registro de trabajos y pool de hilos que los ejecuta"""
+
+    def __init__(self, workers: int, max_queued: int, result_ttl: float, max_retained: int,
+                 job_queue: Any = None):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self.max_retained = max_retained
+        self._queue = job_queue or LocalJobQueue()
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._by_key: Dict[Hashable, Job] = {}
+        self._queued = 0
+        self._threads: List[threading.Thread] = []
+        self.stats = {"submitted": 0, "deduplicated": 0, "completed": 0, "failed": 0, "rejected": 0}
+
+    def submit(self, key: Hashable, fn: JobFunction, scope: Optional[Hashable] = None,
+               params: Optional[Dict[str, Any]] = None) -> Job:
+        """
+        Encolar un trabajo, o devolver el existente con la misma clave si sigue
+        en cola, en curso o terminó hace menos de ``result_ttl`` segundos.
+        Con la cola llena se rechaza con 503.
+        """
+        with self._lock:
+            existing = self._by_key.get(key)
+            if existing is not None and self._reusable(existing):
+                self.stats["deduplicated"] += 1
+                return existing
+            if self._queued >= self.max_queued:
+                self.stats["rejected"] += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Demasiados trabajos en cola, reintenta en unos segundos",
+                    headers={"Retry-After": "5"}
+                )
+            job = Job(id=uuid.uuid4().hex, key=key, scope=scope, params=params or {}, fn=fn)
+            self._jobs[job.id] = job
+            self._by_key[key] = job
+            self._queued += 1
+            self.stats["submitted"] += 1
+            self._evict()
+            self._start()
+        self._queue.put(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Trabajo por ID, o None si no existe o ya se descartó"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def invalidate(self, scope: Optional[Hashable]):
+        """Los trabajos del ámbito ya no se reutilizan (sus datos cambiaron)"""
+        with self._lock:
+            for key, job in list(self._by_key.items()):
+                if job.scope == scope or scope is None or job.scope is None:
+                    job.stale = True
+                    if job.finished:
+                        del self._by_key[key]
+
+    def _reusable(self, job: Job) -> bool:
+        if job.stale or job.status == FAILED:
+            return False
+        if job.status == DONE:
+            return time.time() - job.finished_at < self.result_ttl
+        return True
+
+    def _evict(self):
+        """Descartar los trabajos terminados más antiguos por encima de ``max_retained``"""
+        excess = len(self._jobs) - self.max_retained
+        for job_id in [j.id for j in self._jobs.values() if j.finished][:max(excess, 0)]:
+            job = self._jobs.pop(job_id)
+            if self._by_key.get(job.key) is job:
+                del self._by_key[job.key]
+
+    def _start(self):
+        """Arrancar los hilos con el primer trabajo"""
+        if self._threads:
+            return
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            self._run(job)
+
+    def _run(self, job: Job):
+        with self._lock:
+            self._queued -= 1
+            job.status = RUNNING
+            job.started_at = time.time()
+
+        def report_progress(fraction: float):
+            job.progress = round(min(max(fraction, 0.0), 1.0), 4)
+
+        try:
+            result = job.fn(report_progress)
+        except Exception as e:
+            error = e.detail if isinstance(e, HTTPException) else str(e)
+            logger.warning("El trabajo %s falló: %s", job.id, error)
+            with self._lock:
+                job.status, job.error = FAILED, str(error)
+                self.stats["failed"] += 1
+                self._finish(job)
+            return
+
+        with self._lock:
+            job.status, job.result, job.progress = DONE, result, 1.0
+            self.stats["completed"] += 1
+            self._finish(job)
+
+    def _finish(self, job: Job):
+        job.finished_at = time.time()
+        job.fn = None
+        # Un fallo o un cambio durante la ejecución no deja el trabajo para reutilizarlo
+        if (job.stale or job.status == FAILED) and self._by_key.get(job.key) is job:
+            del self._by_key[job.key]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Estado actual para /metrics"""
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job.status == RUNNING)
+            return {
+                "workers": self.workers,
+                "queued": self._queued,
+                "running": running,
+                "retained": len(self._jobs),
+                **self.stats,
+            }
+
+    def shutdown(self):
+        """Terminar los hilos tras los trabajos ya encolados (con un tiempo máximo de espera)"""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join(timeout=5)
+
+
+_runner: Optional[JobRunner] = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner() -> JobRunner:
+    """Ejecutor global según Settings"""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner(
+                workers=settings.JOB_WORKERS,
+                max_queued=settings.JOB_MAX_QUEUED,
+                result_ttl=settings.JOB_RESULT_TTL,
+                max_retained=settings.JOB_MAX_RETAINED,
+            )
+        return _runner
+
+
+def reset_job_runner():
+    """Detener y descartar el ejecutor actual"""
+    global _runner
+    with _runner_lock:
+        runner, _runner = _runner, None
+    if runner is not None:
+        runner.shutdown()
+
+
+def job_runner_stats() -> Dict[str, Any]:
+    """Estado del ejecutor para /metrics"""
+    return get_job_runner().snapshot()
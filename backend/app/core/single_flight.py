@@ -0,0 +1,183 @@
+"""
+Coalescencia de peticiones (single-flight) para endpoints de lectura costosos
+
+Las peticiones idénticas concurrentes (misma ruta y mismos parámetros
+normalizados) comparten una única ejecución y su resultado. Opcionalmente el
+resultado se guarda unos segundos (micro-caché, ``SINGLE_FLIGHT_CACHE_TTL``).
+
+Las escrituras invalidan por ámbito (``user_id``): una escritura incrementa la
+generación del ámbito, de modo que las peticiones posteriores nunca se unen a
+una ejecución iniciada antes de la escritura ni leen su resultado cacheado.
+
+Las ejecuciones en curso solo se tocan desde el event loop, pero las
+invalidaciones también llegan desde otros hilos (escritura diferida, LISTEN
+del bus de eventos, trabajos en segundo plano): las generaciones y la
+micro-caché se protegen con un lock.
+"""
+
+import asyncio
+import functools
+import threading
+import time
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+
+# Ámbito de las peticiones sin user_id (ven los datos de todos los usuarios)
+ALL_USERS = None
+
+
+class SingleFlight:
+    """Registro de ejecuciones en curso y micro-caché por clave"""
+
+    def __init__(self):
+        self._inflight: Dict[Tuple[Hashable, int], asyncio.Future] = {}
+        self._cache: Dict[Hashable, Tuple[float, int, Any]] = {}
+        self._generations: Dict[Hashable, int] = {}
+        self._global_generation = 0
+        self._lock = threading.Lock()
+        self.stats = {"executions": 0, "coalesced": 0, "cache_hits": 0, "invalidations": 0}
+
+    def generation(self, scope: Hashable) -> int:
+        """Generación actual del ámbito (cambia con cada escritura que le afecta)"""
+        with self._lock:
+            return self._generation(scope)
+
+    def _generation(self, scope: Hashable) -> int:
+        return self._global_generation + self._generations.get(scope, 0)
+
+    def invalidate(self, scope: Hashable = ALL_USERS):
+        """
+        Invalidar un ámbito. Las lecturas sin user_id también se invalidan,
+        porque incluyen los datos de cualquier usuario.
+        """
+        with self._lock:
+            self.stats["invalidations"] += 1
+            self._generations[scope] = self._generations.get(scope, 0) + 1
+            if scope is not ALL_USERS:
+                self._generations[ALL_USERS] = self._generations.get(ALL_USERS, 0) + 1
+            self._drop_cache(scope)
+
+    def invalidate_all(self):
+        """Invalidar todos los ámbitos"""
+        with self._lock:
+            self.stats["invalidations"] += 1
+            self._global_generation += 1
+            self._cache.clear()
+
+    def _drop_cache(self, scope: Hashable):
+        # Se llama con el lock tomado
+        for key in [k for k in self._cache if k[1] in (scope, ALL_USERS)]:
+            del self._cache[key]
+
+    async def do(self, key: Hashable, scope: Hashable, fn: Callable[[], Awaitable[Any]],
+                 ttl: Optional[float] = None) -> Any:
+        """Ejecutar ``fn`` o unirse a una ejecución idéntica en curso"""
+        ttl = settings.SINGLE_FLIGHT_CACHE_TTL if ttl is None else ttl
+        cache_key = (key, scope)
+        with self._lock:
+            generation = self._generation(scope)
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                expires_at, cached_generation, value = cached
+                if cached_generation == generation and time.monotonic() < expires_at:
+                    self.stats["cache_hits"] += 1
+                    return value
+                del self._cache[cache_key]
+
+        flight_key = (cache_key, generation)
+        flight = self._inflight.get(flight_key)
+        if flight is None:
+            self.stats["executions"] += 1
+            flight = asyncio.ensure_future(fn())
+            self._inflight[flight_key] = flight
+            flight.add_done_callback(
+                functools.partial(self._finish, flight_key, cache_key, generation, ttl)
+            )
+        else:
+            self.stats["coalesced"] += 1
+
+        # shield: si un cliente cancela, la ejecución compartida continúa para el resto
+        return await asyncio.shield(flight)
+
+    def _finish(self, flight_key, cache_key, generation: int, ttl: float, flight: asyncio.Future):
+        self._inflight.pop(flight_key, None)
+        if flight.cancelled() or flight.exception() is not None:
+            return
+        # Solo se cachea si no hubo escrituras durante la ejecución
+        with self._lock:
+            if ttl > 0 and self._generation(cache_key[1]) == generation:
+                self._cache[cache_key] = (time.monotonic() + ttl, generation, flight.result())
+
+    def clear(self):
+        """Vaciar estado y estadísticas (útil para testing)"""
+        self._inflight.clear()
+        with self._lock:
+            self._cache.clear()
+            self._generations.clear()
+            self._global_generation = 0
+            for name in self.stats:
+                self.stats[name] = 0
+
+
+single_flight = SingleFlight()
+
+
+def _normalize(value: Any) -> Hashable:
+    """Normalizar un parámetro para usarlo como parte de la clave"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (list, tuple, set)):
+        return tuple(sorted(_normalize(v) for v in value))
+    return value
+
+
+def request_key(route: str, kwargs: Dict[str, Any]) -> Hashable:
+    """Clave de una petición: ruta y parámetros normalizados"""
+    return (route, tuple(sorted((name, _normalize(v)) for name, v in kwargs.items())))
+
+
+async def _call(func: Callable, kwargs: Dict[str, Any]) -> Any:
+    """Llamar a un endpoint async directamente, o a uno síncrono en el threadpool"""
+    if asyncio.iscoroutinefunction(func):
+        return await func(**kwargs)
+    return await run_in_threadpool(func, **kwargs)
+
+
+def coalesce(route: str, scope_param: str = "user_id"):
+    """
+    Decorador para endpoints de lectura: las peticiones concurrentes con los
+    mismos parámetros comparten una ejecución. El ámbito de invalidación es el
+    parámetro ``scope_param``.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(**kwargs):
+            if not settings.SINGLE_FLIGHT_ENABLED:
+                return await _call(func, kwargs)
+            return await single_flight.do(
+                request_key(route, kwargs), kwargs.get(scope_param), lambda: _call(func, kwargs)
+            )
+        return wrapper
+    return decorator
+
+
+def invalidates(scope_attr: str = "user_id"):
+    """
+    Decorador para endpoints de escritura: tras una escritura correcta invalida
+    el ámbito del recurso devuelto (su ``user_id``), o todos si no se conoce.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(**kwargs):
+            result = await _call(func, kwargs)
+            if hasattr(result, scope_attr):
+                single_flight.invalidate(getattr(result, scope_attr))
+            else:
+                single_flight.invalidate_all()
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,104 @@
+"""
+Caché de la última respuesta correcta de los endpoints de lectura
+
+Cuando Supabase no está disponible (circuito abierto, limitador saturado o
+error de red) un endpoint de lectura responde con la última respuesta correcta
+que dio para los mismos parámetros, marcada con ``X-Cache: stale`` y una
+cabecera ``Warning``. Así la interfaz del temporizador sigue respondiendo
+durante caídas parciales. Las escrituras no usan esta caché y fallan rápido.
+"""
+
+import functools
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.config import settings
+from app.core.single_flight import request_key
+
+STALE_WARNING = '110 - "Response is Stale"'
+
+
+class StaleCache:
+    """LRU acotada de respuestas por clave de petición (thread-safe)"""
+
+    def __init__(self):
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"stored": 0, "served": 0, "misses": 0}
+
+    def store(self, key: Hashable, value: Any):
+        """Guardar la última respuesta correcta"""
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            self.stats["stored"] += 1
+            while len(self._entries) > settings.STALE_CACHE_MAX_ENTRIES:
+                self._entries.popitem(last=False)
+
+    def get(self, key: Hashable) -> Optional[Tuple[float, Any]]:
+        """Obtener (instante, respuesta) o None si no hay respuesta guardada"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["served"] += 1
+            return entry
+
+    def snapshot(self):
+        """Estado actual para /metrics"""
+        with self._lock:
+            return {"entries": len(self._entries), **self.stats}
+
+    def clear(self):
+        """Vaciar la caché y las estadísticas (útil para testing)"""
+        with self._lock:
+            self._entries.clear()
+            for name in self.stats:
+                self.stats[name] = 0
+
+
+stale_cache = StaleCache()
+
+
+def serve_stale(route: str):
+    """
+    Decorador para endpoints de lectura (async): guarda cada respuesta correcta
+    y, si la petición falla con un error 5xx, responde con la última guardada.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(**kwargs):
+            if not settings.STALE_CACHE_ENABLED:
+                return await func(**kwargs)
+
+            key = request_key(route, kwargs)
+            try:
+                result = await func(**kwargs)
+            except HTTPException as e:
+                if e.status_code < 500:
+                    raise
+                entry = stale_cache.get(key)
+                if entry is None:
+                    raise
+                stored_at, value = entry
+                return JSONResponse(
+                    content=jsonable_encoder(value),
+                    headers={
+                        "X-Cache": "stale",
+                        "Warning": STALE_WARNING,
+                        "Age": str(int(time.time() - stored_at)),
+                    }
+                )
+
+            stale_cache.store(key, result)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,226 @@
+"""
+Escrituras diferidas por lotes (write-behind)
+
+La petición deja el registro en una cola del proceso y responde enseguida; un
+hilo lo escribe junto con los demás pendientes en un insert de varias filas
+cuando se junta un lote (``batch_size``) o pasa ``interval`` segundos.
+
+- Reintentos acotados: un lote que falla se reintenta ``max_retries`` veces
+  con espera exponencial; si sigue fallando queda pendiente (sin confirmar
+  en el WAL) y se vuelve a intentar en la siguiente escritura, pasados
+  ``interval`` segundos. Mientras tanto la cola se llena hasta
+  ``max_pending`` y las peticiones nuevas reciben 503.
+- Durabilidad opcional: con ``wal_path`` cada registro se añade a un fichero
+  (una línea JSON) antes de aceptarlo, y los lotes escritos se marcan como
+  confirmados. Al arrancar se vuelven a encolar los no confirmados. Así un
+  reinicio no pierde registros, aunque un lote interrumpido a medias puede
+  escribirse dos veces (entrega al menos una vez).
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+logger = logging.getLogger("mypomodoro.write_behind")
+
+# Escribe un lote y devuelve cuántas filas se guardaron (el resto se descartó
+# por no ser válido). Debe lanzar una excepción ante errores transitorios.
+FlushFunction = Callable[[List[Dict[str, Any]]], int]
+
+
+class WriteAheadLog:
+    """Fichero de registros pendientes: una línea JSON por registro o confirmación"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def replay(self) -> List[Tuple[int, Dict[str, Any]]]:
+        """Registros no confirmados de una ejecución anterior, en orden"""
+        pending: Dict[int, Dict[str, Any]] = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as wal:
+                for line in wal:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Última línea a medio escribir
+                        continue
+                    if "ack" in entry:
+                        for seq in entry["ack"]:
+                            pending.pop(seq, None)
+                    else:
+                        pending[entry["seq"]] = entry["record"]
+        records = sorted(pending.items())
+        # Reescribir solo lo pendiente
+        self._file = open(self.path, "w", encoding="utf-8")
+        for seq, record in records:
+            self._write({"seq": seq, "record": record})
+        return records
+
+    def append(self, seq: int, record: Dict[str, Any]):
+        self._write({"seq": seq, "record": record})
+
+    def ack(self, seqs: List[int]):
+        self._write({"ack": seqs})
+
+    def truncate(self):
+        """Vaciar el fichero cuando no queda nada pendiente"""
+        self._file.seek(0)
+        self._file.truncate()
+        self._sync()
+
+    def _write(self, entry: Dict[str, Any]):
+        self._file.write(json.dumps(entry) + "\n")
+        self._sync()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+class WriteBehindQueue:
+    """Cola de registros pendientes y el hilo que los escribe por lotes (thread-safe)"""
+
+    def __init__(self, name: str, flush: FlushFunction, batch_size: int, interval: float,
+                 max_pending: int, max_retries: int, retry_backoff: float, wal_path: str = ""):
+        self.name = name
+        self._flush = flush
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        # Un único escritor a la vez: los lotes se escriben en orden
+        self._writing = threading.Lock()
+        self._pending: List[Tuple[int, Dict[str, Any]]] = []
+        self._seq = 0
+        self._stopped = threading.Event()
+        self.stats = {"enqueued": 0, "written": 0, "dropped": 0, "batches": 0, "retries": 0,
+                      "failed": 0, "rejected": 0, "replayed": 0}
+
+        self._wal: Optional[WriteAheadLog] = WriteAheadLog(wal_path) if wal_path else None
+        if self._wal is not None:
+            self._pending = self._wal.replay()
+            self._seq = self._pending[-1][0] if self._pending else 0
+            self.stats["replayed"] = len(self._pending)
+
+        self._thread = threading.Thread(target=self._run, name=f"write-behind-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, record: Dict[str, Any]) -> int:
+        """Encolar un registro (serializable a JSON). Devuelve los pendientes, o 503 si la cola está llena"""
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self.stats["rejected"] += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail=f"Cola de escritura llena ({self.name}), reintenta en unos segundos",
+                    headers={"Retry-After": "1"}
+                )
+            self._seq += 1
+            if self._wal is not None:
+                self._wal.append(self._seq, record)
+            self._pending.append((self._seq, record))
+            self.stats["enqueued"] += 1
+            if len(self._pending) >= self.batch_size:
+                self._ready.notify()
+            return len(self._pending)
+
+    def flush(self) -> bool:
+        """Escribir ya todo lo pendiente (apagado y testing); False si un lote falló y sigue pendiente"""
+        while True:
+            written = self._write_batch()
+            if written is None:
+                return True
+            if not written:
+                return False
+
+    def _run(self):
+        while not self._stopped.is_set():
+            with self._lock:
+                self._ready.wait_for(
+                    lambda: len(self._pending) >= self.batch_size or self._stopped.is_set(),
+                    timeout=self.interval
+                )
+            if not self.flush():
+                # El lote fallido se reintenta pasado el intervalo, no en bucle
+                self._stopped.wait(self.interval)
+
+    def _write_batch(self) -> Optional[bool]:
+        """
+        Escribir el siguiente lote: True si se escribió, False si falló (sigue
+        pendiente y sin confirmar) y None si no había nada pendiente
+        """
+        with self._writing:
+            with self._lock:
+                batch = self._pending[:self.batch_size]
+            if not batch:
+                return None
+
+            records = [record for _, record in batch]
+            written = self._write(records)
+
+            with self._lock:
+                self.stats["batches"] += 1
+                if written is None:
+                    self.stats["failed"] += len(batch)
+                    return False
+                # Las entradas nuevas se añaden al final: el lote sigue al principio
+                del self._pending[:len(batch)]
+                self.stats["written"] += written
+                self.stats["dropped"] += len(batch) - written
+                if self._wal is not None:
+                    if self._pending:
+                        self._wal.ack([seq for seq, _ in batch])
+                    else:
+                        self._wal.truncate()
+            return True
+
+    def _write(self, records: List[Dict[str, Any]]) -> Optional[int]:
+        """Escribir con reintentos; None si se agotaron"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self._flush(records)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.error("Lote de %d registros (%s) sin escribir tras %d intentos, queda pendiente: %s",
+                                 len(records), self.name, attempt + 1, e)
+                    return None
+                with self._lock:
+                    self.stats["retries"] += 1
+                logger.warning("Error al escribir un lote (%s), reintentando: %s", self.name, e)
+                time.sleep(self.retry_backoff * 2 ** attempt)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Estado actual para /metrics"""
+        with self._lock:
+            return {"pending": len(self._pending), "durable": self._wal is not None, **self.stats}
+
+    def close(self):
+        """Escribir lo pendiente y detener el hilo"""
+        self._stopped.set()
+        with self._lock:
+            self._ready.notify_all()
+        self._thread.join(timeout=5)
+        if not self.flush():
+            pending = self.snapshot()["pending"]
+            if self._wal is not None:
+                logger.error("%d registros (%s) sin escribir: quedan en el WAL para el próximo arranque",
+                             pending, self.name)
+            else:
+                logger.error("%d registros (%s) sin escribir se pierden al cerrar (sin WAL)",
+                             pending, self.name)
+        if self._wal is not None:
+            self._wal.close()
@@ -0,0 +1,143 @@
+"""
+Circuit breaker para las llamadas a Supabase
+
+Tras ``CIRCUIT_FAILURE_THRESHOLD`` fallos de red consecutivos el circuito se
+abre y las llamadas fallan al instante con 503, en lugar de esperar un timeout
+completo cada una. Pasados ``CIRCUIT_RESET_TIMEOUT`` segundos pasa a
+semiabierto y deja pasar una única llamada de prueba: si va bien se cierra, si
+falla vuelve a abrirse.
+
+Los errores lógicos de PostgREST (``APIError`` 4xx o de restricciones) son
+respuestas del servidor y no cuentan como fallos; los 5xx, ``statement_timeout``
+y los errores de conexión sí.
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, status
+
+from app.config import settings
+
+logger = logging.getLogger("mypomodoro.queries")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(HTTPException):
+    """Llamada rechazada porque el circuito está abierto"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Base de datos no disponible temporalmente",
+            headers={"Retry-After": str(max(1, int(retry_after)))}
+        )
+
+
+class CircuitBreaker:
+    """Circuito cerrado / abierto / semiabierto (thread-safe)"""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self.stats = {"opened": 0, "rejected": 0, "probes": 0}
+
+    @property
+    def state(self) -> str:
+        """Estado actual del circuito"""
+        with self._lock:
+            return self._state
+
+    def before_call(self):
+        """Admitir la llamada o rechazarla con ``CircuitOpenError``"""
+        with self._lock:
+            if self._state == CLOSED:
+                return
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if self._state == OPEN and remaining <= 0:
+                self._transition(HALF_OPEN)
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                # Única llamada de prueba
+                self._probe_in_flight = True
+                self.stats["probes"] += 1
+                return
+            self.stats["rejected"] += 1
+            raise CircuitOpenError(max(remaining, 1))
+
+    def cancel_call(self):
+        """La llamada admitida no llegó a ejecutarse (p. ej. la rechazó el limitador)"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record(self, success: bool):
+        """Registrar el resultado de una llamada admitida"""
+        with self._lock:
+            self._probe_in_flight = False
+            if success:
+                self._failures = 0
+                if self._state != CLOSED:
+                    self._transition(CLOSED)
+                return
+
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                if self._state != OPEN:
+                    self.stats["opened"] += 1
+                    self._transition(OPEN)
+
+    def _transition(self, state: str):
+        logger.warning(json.dumps({
+            "event": "circuit_state",
+            "from": self._state,
+            "to": state,
+            "failures": self._failures,
+        }))
+        self._state = state
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Estado actual para /metrics"""
+        with self._lock:
+            return {"state": self._state, "failures": self._failures, **self.stats}
+
+
+_breaker: Optional[CircuitBreaker] = None
+_breaker_lock = threading.Lock()
+
+
+def get_breaker() -> Optional[CircuitBreaker]:
+    """Circuit breaker global según Settings (None si está desactivado)"""
+    global _breaker
+    if not settings.CIRCUIT_BREAKER_ENABLED:
+        return None
+    with _breaker_lock:
+        if _breaker is None:
+            _breaker = CircuitBreaker(
+                failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+                reset_timeout=settings.CIRCUIT_RESET_TIMEOUT,
+            )
+        return _breaker
+
+
+def reset_breaker():
+    """Descartar el circuit breaker actual (útil para testing)"""
+    global _breaker
+    with _breaker_lock:
+        _breaker = None
+
+
+def breaker_stats() -> Optional[Dict[str, Any]]:
+    """Estado del circuito para /metrics"""
+    breaker = get_breaker()
+    return breaker.snapshot() if breaker else None
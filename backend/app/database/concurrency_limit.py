@@ -0,0 +1,159 @@
+"""
+Límite adaptativo de llamadas concurrentes a Supabase (AIMD)
+
+Cuando Supabase se ralentiza, seguir lanzando consultas desde todos los hilos
+solo alarga las colas del servidor y la latencia se dispara para todos. Este
+limitador aprende cuántas llamadas en vuelo soporta el backend a partir de la
+latencia observada:
+
+- Cada llamada por debajo de ``ADAPTIVE_LIMIT_LATENCY_TARGET_MS`` aumenta el
+  límite de forma aditiva (+1 por cada "límite" de llamadas correctas).
+- Una llamada lenta o fallida por la red lo reduce de forma multiplicativa
+  (``ADAPTIVE_LIMIT_BACKOFF``), como mucho una vez por ventana de llamadas.
+
+Las llamadas que exceden el límite esperan en cola hasta
+``ADAPTIVE_LIMIT_QUEUE_TIMEOUT_MS``; si la cola está llena o vence el plazo se
+rechazan con 503.
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, status
+
+from app.config import settings
+
+logger = logging.getLogger("mypomodoro.queries")
+
+
+class AdaptiveLimiter:
+    """Semáforo con límite variable ajustado por AIMD (thread-safe)"""
+
+    def __init__(self, initial: float, min_limit: int, max_limit: int,
+                 latency_target_ms: float, backoff: float = 0.9,
+                 queue_timeout_ms: float = 500.0, max_queue: int = 50):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target_ms = latency_target_ms
+        self.backoff = backoff
+        self.queue_timeout_ms = queue_timeout_ms
+        self.max_queue = max_queue
+        self._limit = float(min(max(initial, min_limit), max_limit))
+        self._inflight = 0
+        self._waiting = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+        self.stats = {"accepted": 0, "rejected": 0, "queue_timeouts": 0, "decreases": 0}
+
+    @property
+    def limit(self) -> int:
+        """Llamadas en vuelo permitidas ahora mismo"""
+        return max(self.min_limit, int(self._limit))
+
+    def acquire(self, timeout_ms: Optional[float] = None) -> float:
+        """
+        Reservar un hueco para una llamada. Devuelve el instante de inicio, que
+        se pasa a ``release``. Rechaza con 503 si no hay hueco a tiempo.
+        """
+        timeout_ms = self.queue_timeout_ms if timeout_ms is None else timeout_ms
+        with self._cond:
+            if self._inflight >= self.limit:
+                if self._waiting >= self.max_queue:
+                    self._reject("queue_full")
+                self._waiting += 1
+                deadline = time.monotonic() + timeout_ms / 1000
+                try:
+                    while self._inflight >= self.limit:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.stats["queue_timeouts"] += 1
+                            self._reject("queue_timeout")
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._inflight += 1
+            self.stats["accepted"] += 1
+            return time.monotonic()
+
+    def release(self, started_at: float, duration_ms: float, dropped: bool = False):
+        """
+        Liberar el hueco y ajustar el límite con la muestra. ``dropped`` indica
+        un fallo de red o timeout (señal de sobrecarga, no un error lógico).
+        """
+        with self._cond:
+            self._inflight -= 1
+            if dropped or duration_ms > self.latency_target_ms:
+                # Solo las llamadas iniciadas tras la última reducción pueden
+                # volver a reducir: una ráfaga lenta cuenta como una sola señal
+                if started_at >= self._last_decrease:
+                    self._limit = max(float(self.min_limit), self._limit * self.backoff)
+                    self._last_decrease = time.monotonic()
+                    self.stats["decreases"] += 1
+            elif self._inflight + 1 >= self.limit / 2:
+                # Crecer solo si el límite se está usando de verdad
+                self._limit = min(float(self.max_limit), self._limit + 1 / self._limit)
+            self._cond.notify()
+
+    def _reject(self, reason: str):
+        self.stats["rejected"] += 1
+        logger.warning(json.dumps({
+            "event": "query_shed",
+            "reason": reason,
+            "limit": self.limit,
+            "inflight": self._inflight,
+            "waiting": self._waiting,
+        }))
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Base de datos saturada, reintenta en unos segundos",
+            headers={"Retry-After": "1"}
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Estado actual para /metrics"""
+        with self._cond:
+            return {
+                "limit": self.limit,
+                "inflight": self._inflight,
+                "waiting": self._waiting,
+                **self.stats,
+            }
+
+
+_limiter: Optional[AdaptiveLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> Optional[AdaptiveLimiter]:
+    """Limitador global según Settings (None si está desactivado)"""
+    global _limiter
+    if not settings.ADAPTIVE_LIMIT_ENABLED:
+        return None
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = AdaptiveLimiter(
+                initial=settings.ADAPTIVE_LIMIT_INITIAL,
+                min_limit=settings.ADAPTIVE_LIMIT_MIN,
+                max_limit=settings.ADAPTIVE_LIMIT_MAX,
+                latency_target_ms=settings.ADAPTIVE_LIMIT_LATENCY_TARGET_MS,
+                backoff=settings.ADAPTIVE_LIMIT_BACKOFF,
+                queue_timeout_ms=settings.ADAPTIVE_LIMIT_QUEUE_TIMEOUT_MS,
+                max_queue=settings.ADAPTIVE_LIMIT_MAX_QUEUE,
+            )
+        return _limiter
+
+
+def reset_limiter():
+    """Descartar el limitador actual (útil para testing)"""
+    global _limiter
+    with _limiter_lock:
+        _limiter = None
+
+
+def limiter_stats() -> Optional[Dict[str, Any]]:
+    """Estado del limitador para /metrics"""
+    limiter = get_limiter()
+    return limiter.snapshot() if limiter else None
@@ -0,0 +1,184 @@
+"""
+Lecturas con cobertura (hedged requests) para recortar la latencia de cola
+
+Para lecturas idempotentes muy frecuentes (``get_task_by_id``,
+``get_pomodoro_by_id``) la p99 la dominan respuestas lentas ocasionales de
+PostgREST. Con ``HEDGING_ENABLED`` la consulta se lanza y, si no ha respondido
+tras el percentil ``HEDGE_PERCENTILE`` de la latencia observada para su huella,
+se lanza un duplicado y se usa la primera respuesta correcta.
+
+Los duplicados están limitados a una fracción de las peticiones
+(``HEDGE_MAX_RATE``) con un token bucket, para no duplicar la carga cuando
+Supabase está lento para todos.
+
+El duplicado se ejecuta sobre un builder nuevo (``build``): la ejecución le
+aplica al builder el timeout del plazo de la petición, y uno compartido con la
+primaria se lo cambiaría mientras está en curso.
+"""
+
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Optional
+
+from app.config import settings
+from app.database.query_log import ObservedQuery
+
+# Muestras de latencia que se conservan por huella
+WINDOW_SIZE = 200
+
+# Máximo de duplicados acumulables en el token bucket
+MAX_TOKENS = 10.0
+
+
+class Hedger:
+    """Lanza duplicados de lecturas lentas con un límite global de tasa"""
+
+    def __init__(self, percentile: float, min_delay_ms: float, min_samples: int,
+                 max_rate: float, workers: int):
+        self.percentile = percentile
+        self.min_delay_ms = min_delay_ms
+        self.min_samples = min_samples
+        self.max_rate = max_rate
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hedge")
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._tokens = 1.0
+        self.stats = {"requests": 0, "hedged": 0, "hedge_wins": 0, "rate_limited": 0}
+
+    def hedge_delay_ms(self, fingerprint: str) -> Optional[float]:
+        """Espera antes del duplicado, o None si aún no hay muestras suficientes"""
+        with self._lock:
+            samples = sorted(self._latencies.get(fingerprint, ()))
+        if len(samples) < self.min_samples:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * self.percentile / 100))
+        return max(self.min_delay_ms, samples[index])
+
+    def _observe(self, fingerprint: str, duration_ms: float):
+        with self._lock:
+            window = self._latencies.setdefault(fingerprint, deque(maxlen=WINDOW_SIZE))
+            window.append(duration_ms)
+
+    def _take_token(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            self.stats["rate_limited"] += 1
+            return False
+
+    def _submit(self, query: ObservedQuery, primary: bool) -> Future:
+        context = contextvars.copy_context()
+        start = time.perf_counter()
+        future = self._executor.submit(context.run, query.execute)
+        if primary:
+            fingerprint = query.fingerprint
+
+            def observe(done: Future):
+                # Solo las respuestas correctas alimentan el percentil
+                if done.exception() is None:
+                    self._observe(fingerprint, (time.perf_counter() - start) * 1000)
+
+            future.add_done_callback(observe)
+        return future
+
+    def execute(self, query: ObservedQuery, build: Callable[[], ObservedQuery]) -> Any:
+        """
+        Ejecutar la consulta, duplicándola si tarda más de lo habitual (el
+        duplicado con un builder nuevo de ``build``)
+        """
+        with self._lock:
+            self.stats["requests"] += 1
+            self._tokens = min(MAX_TOKENS, self._tokens + self.max_rate)
+
+        delay_ms = self.hedge_delay_ms(query.fingerprint)
+        primary = self._submit(query, primary=True)
+        if delay_ms is None:
+            return primary.result()
+
+        done, _ = wait([primary], timeout=delay_ms / 1000)
+        if done or not self._take_token():
+            return primary.result()
+
+        with self._lock:
+            self.stats["hedged"] += 1
+        hedge = self._submit(build(), primary=False)
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self._lock:
+                            self.stats["hedge_wins"] += 1
+                    return future.result()
+                error = future.exception()
+        # Ambas fallaron: propagar el último error
+        raise error
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Estadísticas y esperas actuales por huella para /metrics"""
+        with self._lock:
+            fingerprints = list(self._latencies)
+            stats = dict(self.stats)
+        return {
+            **stats,
+            "delays_ms": {fp: self.hedge_delay_ms(fp) for fp in fingerprints},
+        }
+
+    def shutdown(self):
+        """Cerrar el pool de duplicados"""
+        self._executor.shutdown(wait=True)
+
+
+_hedger: Optional[Hedger] = None
+_hedger_lock = threading.Lock()
+
+
+def get_hedger() -> Optional[Hedger]:
+    """Hedger global según Settings (None si está desactivado)"""
+    global _hedger
+    if not settings.HEDGING_ENABLED:
+        return None
+    with _hedger_lock:
+        if _hedger is None:
+            _hedger = Hedger(
+                percentile=settings.HEDGE_PERCENTILE,
+                min_delay_ms=settings.HEDGE_MIN_DELAY_MS,
+                min_samples=settings.HEDGE_MIN_SAMPLES,
+                max_rate=settings.HEDGE_MAX_RATE,
+                workers=settings.HEDGE_WORKERS,
+            )
+        return _hedger
+
+
+def reset_hedger():
+    """Cerrar y descartar el hedger actual"""
+    global _hedger
+    with _hedger_lock:
+        hedger, _hedger = _hedger, None
+    if hedger:
+        hedger.shutdown()
+
+
+def hedging_stats() -> Optional[Dict[str, Any]]:
+    """Estado del hedging para /metrics"""
+    hedger = get_hedger()
+    return hedger.snapshot() if hedger else None
+
+
+def execute_hedged(build: Callable[[], Any]) -> Any:
+    """
+    Ejecutar una lectura idempotente con hedging si está activado. ``build``
+    construye la consulta (una vez por intento). Solo se aplica a consultas del
+    cliente instrumentado; el resto se ejecutan tal cual.
+    """
+    hedger = get_hedger()
+    query = build()
+    if hedger is None or not isinstance(query, ObservedQuery):
+        return query.execute()
+    return hedger.execute(query, build)
@@ -0,0 +1,968 @@
+"""
+Backend en memoria compatible con el query builder de Supabase
+
+Implementa el subconjunto de supabase-py que usan los servicios
+(table/select/eq/ilike/order/limit/insert/update/delete/execute, con
+``count="exact"`` y recursos embebidos, también ``tabla!inner(...)`` con
+filtros ``tabla.columna``) sobre diccionarios en memoria. El esquema (columnas,
+valores por defecto, CHECK, NOT NULL, claves foráneas con CASCADE/SET NULL,
+índices y triggers) se lee de ``database/schema.sql``; las funciones de los
+triggers tienen su equivalente Python en ``TRIGGER_FUNCTIONS``.
+
+Cada llamada a ``execute()`` queda registrada en ``MemoryClient.calls`` para
+poder verificar en los tests cuántas consultas hace un endpoint y con qué
+filtros. La latencia es inyectable para simular el round trip a PostgREST
+(benchmarks y ``DATABASE_BACKEND=memory``).
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from enum import Enum
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from postgrest.exceptions import APIError
+
+SCHEMA_PATH = Path(__file__).resolve().parents[2] / "database" / "schema.sql"
+
+
+def utc_now() -> str:
+    """Timestamp actual en formato ISO (equivalente a NOW())"""
+    return datetime.now(timezone.utc).isoformat()
+
+
+def normalize_timestamp(value: Any) -> Any:
+    """Normalizar un timestamp a ISO en UTC, como lo devuelve PostgREST"""
+    if not isinstance(value, str):
+        return value
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return value
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat()
+
+
+# ---------------------------------------------------------------------------
+# Esquema
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Column:
+    """Definición de una columna según schema.sql"""
+    name: str
+    sql_type: str
+    default: Optional[str] = None
+    not_null: bool = False
+    check_values: Optional[Set[str]] = None
+    references: Optional[Tuple[str, str, str]] = None  # (tabla, columna, ON DELETE)
+
+    @property
+    def is_serial(self) -> bool:
+        return "SERIAL" in self.sql_type
+
+    @property
+    def is_timestamp(self) -> bool:
+        return self.sql_type.startswith("TIMESTAMP")
+
+    @property
+    def max_length(self) -> Optional[int]:
+        match = re.match(r"VARCHAR\((\d+)\)", self.sql_type)
+        return int(match.group(1)) if match else None
+
+    def default_value(self) -> Any:
+        """Evaluar la expresión DEFAULT"""
+        if self.default is None:
+            return None
+        expr = self.default.upper()
+        if expr == "NOW()":
+            return utc_now()
+        if expr in ("TRUE", "FALSE"):
+            return expr == "TRUE"
+        if expr == "NULL":
+            return None
+        if re.fullmatch(r"-?\d+", self.default):
+            return int(self.default)
+        return self.default.strip("'")
+
+
+@dataclass
+class Trigger:
+    """Trigger declarado en schema.sql"""
+    name: str
+    table: str
+    timing: str  # BEFORE | AFTER
+    events: Set[str]  # INSERT | UPDATE | DELETE
+    update_columns: Optional[Set[str]]  # UPDATE OF ...
+    function: str
+
+    def fires_on(self, event: str, changed: Optional[Iterable[str]] = None) -> bool:
+        if event not in self.events:
+            return False
+        if event == "UPDATE" and self.update_columns and changed is not None:
+            return bool(self.update_columns & set(changed))
+        return True
+
+
+@dataclass
+class TableSchema:
+    """Definición de una tabla"""
+    name: str
+    columns: Dict[str, Column]
+    indexes: Set[str] = field(default_factory=set)
+
+
+@dataclass
+class Schema:
+    """Tablas y triggers de la base de datos"""
+    tables: Dict[str, TableSchema]
+    triggers: List[Trigger]
+
+    def referencing(self, table: str) -> List[Tuple[str, Column]]:
+        """Columnas de otras tablas que referencian a ``table``"""
+        return [
+            (other.name, column)
+            for other in self.tables.values()
+            for column in other.columns.values()
+            if column.references and column.references[0] == table
+        ]
+
+
+_TABLE_RE = re.compile(r"CREATE TABLE IF NOT EXISTS (\w+) \((.*?)\n\);", re.DOTALL | re.IGNORECASE)
+_INDEX_RE = re.compile(r"CREATE (?:UNIQUE )?INDEX IF NOT EXISTS \w+ ON (\w+)\s*(?:USING \w+\s*)?\((\w+)", re.IGNORECASE)
+_TRIGGER_RE = re.compile(
+    r"CREATE TRIGGER (\w+)\s+(BEFORE|AFTER)\s+(.*?)\s+ON (\w+)\s+FOR EACH ROW EXECUTE FUNCTION (\w+)",
+    re.DOTALL | re.IGNORECASE,
+)
+
+
+def _parse_column(line: str) -> Optional[Column]:
+    line = line.split("--")[0].strip().rstrip(",")
+    if not line or line.upper().startswith(("PRIMARY KEY", "UNIQUE", "CONSTRAINT", "CHECK", "FOREIGN KEY")):
+        return None
+
+    name, rest = line.split(None, 1)
+    sql_type = rest.split()[0].upper()
+    default = re.search(r"DEFAULT ('[^']*'|\S+)", rest, re.IGNORECASE)
+    check = re.search(r"CHECK \(\w+ IN \(([^)]*)\)\)", rest, re.IGNORECASE)
+    references = re.search(
+        r"REFERENCES (\w+)\((\w+)\)(?: ON DELETE (CASCADE|SET NULL|RESTRICT))?", rest, re.IGNORECASE
+    )
+
+    return Column(
+        name=name,
+        sql_type=sql_type,
+        default=default.group(1) if default else None,
+        not_null="NOT NULL" in rest.upper() or "PRIMARY KEY" in rest.upper(),
+        check_values={v.strip().strip("'") for v in check.group(1).split(",")} if check else None,
+        references=(
+            references.group(1), references.group(2), (references.group(3) or "NO ACTION").upper()
+        ) if references else None,
+    )
+
+
+def parse_schema(sql: str) -> Schema:
+    """Extraer tablas, índices y triggers de un script SQL"""
+    tables: Dict[str, TableSchema] = {}
+    for name, body in _TABLE_RE.findall(sql):
+        columns = [_parse_column(line) for line in body.splitlines()]
+        tables[name] = TableSchema(name, {c.name: c for c in columns if c}, {"id"})
+
+    for table, column in _INDEX_RE.findall(sql):
+        if table in tables:
+            tables[table].indexes.add(column)
+
+    triggers = []
+    for name, timing, events_sql, table, function in _TRIGGER_RE.findall(sql):
+        events: Set[str] = set()
+        update_columns: Optional[Set[str]] = None
+        for event in re.split(r"\s+OR\s+", events_sql.strip(), flags=re.IGNORECASE):
+            parts = event.split(None, 2)
+            events.add(parts[0].upper())
+            if len(parts) == 3 and parts[1].upper() == "OF":
+                update_columns = {c.strip() for c in parts[2].split(",")}
+        triggers.append(Trigger(name, table, timing.upper(), events, update_columns, function))
+
+    return Schema(tables, triggers)
+
+
+_schema_cache: Dict[Path, Schema] = {}
+
+
+def load_schema(path: Path = SCHEMA_PATH) -> Schema:
+    """Leer (y cachear) el esquema desde un fichero SQL"""
+    if path not in _schema_cache:
+        _schema_cache[path] = parse_schema(path.read_text(encoding="utf-8"))
+    return _schema_cache[path]
+
+
+# ---------------------------------------------------------------------------
+# Triggers y funciones RPC (equivalentes Python de las funciones plpgsql)
+# ---------------------------------------------------------------------------
+
+# (db, TG_TABLE_NAME, OLD, NEW) -> NEW
+TriggerFunction = Callable[["MemoryDatabase", str, Optional[dict], Optional[dict]], Optional[dict]]
+TRIGGER_FUNCTIONS: Dict[str, TriggerFunction] = {}
+
+Procedure = Callable[..., Any]
+PROCEDURES: Dict[str, Procedure] = {}
+
+
+def trigger_function(name: str):
+    """Registrar el equivalente Python de una función de trigger"""
+    def decorator(func: TriggerFunction) -> TriggerFunction:
+        TRIGGER_FUNCTIONS[name] = func
+        return func
+    return decorator
+
+
+def procedure(name: str):
+    """Registrar el equivalente Python de una función RPC"""
+    def decorator(func: Procedure) -> Procedure:
+        PROCEDURES[name] = func
+        return func
+    return decorator
+
+
+@trigger_function("update_updated_at_column")
+def _update_updated_at_column(db: "MemoryDatabase", table: str, old: Optional[dict], new: Optional[dict]) -> Optional[dict]:
+    new["updated_at"] = utc_now()
+    return new
+
+
+@trigger_function("update_task_time_spent")
+def _update_task_time_spent(db: "MemoryDatabase", table: str, old: Optional[dict], new: Optional[dict]) -> Optional[dict]:
+    for row, sign in ((old, -1), (new, 1)):
+        if row is None:
+            continue
+        for task in db.find("tasks", [("eq", "id", row["task_id"])]):
+            db.update("tasks", [("eq", "id", task["id"])], {"time_spent": task["time_spent"] + sign * row["time_spent"]})
+    return new
+
+
+@trigger_function("update_task_subtask_counts")
+def _update_task_subtask_counts(db: "MemoryDatabase", table: str, old: Optional[dict], new: Optional[dict]) -> Optional[dict]:
+    for row, sign in ((old, -1), (new, 1)):
+        if row is None:
+            continue
+        for task in db.find("tasks", [("eq", "id", row["task_id"])]):
+            db.update("tasks", [("eq", "id", task["id"])], {
+                "subtask_total": task["subtask_total"] + sign,
+                "subtask_completed": task["subtask_completed"] + sign * int(row["completed"]),
+            })
+    return new
+
+
+@trigger_function("check_task_completion")
+def _check_task_completion(db: "MemoryDatabase", table: str, old: Optional[dict], new: Optional[dict]) -> Optional[dict]:
+    task_id = (new or old)["task_id"]
+    subtasks = db.find("subtasks", [("eq", "task_id", task_id)])
+    if not subtasks:
+        return new
+    db.update("tasks", [("eq", "id", task_id)], {"completed": all(st["completed"] for st in subtasks)})
+    return new
+
+
+@trigger_function("record_sync_tombstone")
+def _record_sync_tombstone(db: "MemoryDatabase", table: str, old: Optional[dict], new: Optional[dict]) -> Optional[dict]:
+    if table == "subtasks":
+        tasks = db.find("tasks", [("eq", "id", old["task_id"])])
+        user_id = tasks[0]["user_id"] if tasks else None
+    else:
+        user_id = old["user_id"]
+    db.insert("sync_tombstones", {"table_name": table, "record_id": old["id"], "user_id": user_id})
+    return old
+
+
+@procedure("complete_pomodoro")
+def _complete_pomodoro(db: "MemoryDatabase", p_pomodoro_id: int, p_actual_duration: Optional[int] = None) -> List[dict]:
+    pomodoros = db.find("pomodoros", [("eq", "id", p_pomodoro_id)])
+    if not pomodoros:
+        return []
+    pomodoro = pomodoros[0]
+
+    duration = p_actual_duration or pomodoro["duration"] or 1500
+    subtask_ids = sorted(link["subtask_id"] for link in db.find("pomodoro_subtasks", [("eq", "pomodoro_id", p_pomodoro_id)]))
+    if pomodoro["completed"]:
+        return [dict(pomodoro, subtask_ids=subtask_ids, already_completed=True)]
+    if pomodoro["mode"] == "pomodoro" and subtask_ids:
+        for subtask in db.find("subtasks", [("in", "id", set(subtask_ids))]):
+            db.update("subtasks", [("eq", "id", subtask["id"])], {"time_spent": subtask["time_spent"] + duration})
+
+    changes = {"completed": True, "completed_at": utc_now()}
+    if p_actual_duration:
+        changes["duration"] = p_actual_duration
+    return [dict(row, subtask_ids=subtask_ids) for row in db.update("pomodoros", [("eq", "id", p_pomodoro_id)], changes)]
+
+
+@procedure("get_focus_sessions")
+def _get_focus_sessions(db: "MemoryDatabase", p_task_id: Optional[int] = None, p_subtask_id: Optional[int] = None,
+                        p_before: Optional[str] = None, p_limit: int = 50) -> List[dict]:
+    if p_subtask_id is not None:
+        links = db.find("pomodoro_subtasks", [("eq", "subtask_id", p_subtask_id)])
+        filters = [("in", "id", {link["pomodoro_id"] for link in links})]
+    else:
+        filters = [("eq", "task_id", p_task_id)]
+    filters += [("eq", "completed", True), ("eq", "mode", "pomodoro")]
+    if p_before is not None:
+        filters.append(("lt", "completed_at", normalize_timestamp(p_before)))
+
+    pomodoros = sorted((p for p in db.find("pomodoros", filters) if p["completed_at"]),
+                       key=lambda p: p["completed_at"], reverse=True)
+    return [
+        {"pomodoro_id": p["id"], "task_id": p["task_id"], "started_at": p["started_at"],
+         "completed_at": p["completed_at"], "duration": p["duration"]}
+        for p in pomodoros[:p_limit]
+    ]
+
+
+@procedure("reconcile_task_totals")
+def _reconcile_task_totals(db: "MemoryDatabase", p_after_id: int = 0, p_limit: int = 500) -> List[dict]:
+    tasks = sorted(db.find("tasks", [("gt", "id", p_after_id)]), key=lambda t: t["id"])[:p_limit]
+    if not tasks:
+        return [{"last_id": None, "checked": 0, "repaired": 0}]
+
+    repaired = 0
+    for task in tasks:
+        subtasks = db.find("subtasks", [("eq", "task_id", task["id"])])
+        totals = {
+            "time_spent": sum(st["time_spent"] for st in subtasks),
+            "subtask_total": len(subtasks),
+            "subtask_completed": sum(1 for st in subtasks if st["completed"]),
+        }
+        if any(task[column] != value for column, value in totals.items()):
+            db.update("tasks", [("eq", "id", task["id"])], totals)
+            repaired += 1
+    return [{"last_id": tasks[-1]["id"], "checked": len(tasks), "repaired": repaired}]
+
+
+# ---------------------------------------------------------------------------
+# Almacenamiento
+# ---------------------------------------------------------------------------
+
+Filter = Tuple[str, str, Any]  # (operador, columna, valor)
+
+
+def _like_to_regex(pattern: str, ignore_case: bool) -> "re.Pattern":
+    """Convertir un patrón LIKE de SQL a expresión regular"""
+    regex = "".join(
+        ".*" if ch == "%" else "." if ch == "_" else re.escape(ch)
+        for ch in pattern
+    )
+    flags = re.DOTALL | (re.IGNORECASE if ignore_case else 0)
+    return re.compile(f"^{regex}$", flags)
+
+
+def _matches(row: dict, flt: Filter) -> bool:
+    op, column, value = flt
+    current = row.get(column)
+    if op == "eq":
+        return current is not None and current == value
+    if op == "neq":
+        return current is not None and current != value
+    if op == "in":
+        return current in value
+    if op == "is":
+        return current is value
+    if op == "cs":
+        return current is not None and set(value) <= set(current)
+    if current is None:
+        return False
+    if op == "gt":
+        return current > value
+    if op == "gte":
+        return current >= value
+    if op == "lt":
+        return current < value
+    if op == "lte":
+        return current <= value
+    if op in ("like", "ilike"):
+        return value.match(str(current)) is not None
+    raise ValueError(f"Operador no soportado: {op}")
+
+
+def _error(code: str, message: str, details: Optional[str] = None) -> APIError:
+    return APIError({"code": code, "message": message, "details": details, "hint": None})
+
+
+class MemoryDatabase:
+    """
+    Tablas en memoria (id -> fila) con índices hash sobre las columnas
+    indexadas en el esquema.
+    """
+
+    def __init__(self, schema: Optional[Schema] = None):
+        self.schema = schema or load_schema()
+        self.lock = threading.RLock()
+        self.tables: Dict[str, Dict[int, dict]] = {name: {} for name in self.schema.tables}
+        self.indexes: Dict[str, Dict[str, Dict[Any, Set[int]]]] = {
+            name: {column: defaultdict(set) for column in table.indexes}
+            for name, table in self.schema.tables.items()
+        }
+        self._sequences: Dict[str, int] = defaultdict(int)
+
+    # Utilidades
+    def table_schema(self, table: str) -> TableSchema:
+        if table not in self.schema.tables:
+            raise _error("42P01", f'relation "public.{table}" does not exist')
+        return self.schema.tables[table]
+
+    def clear(self):
+        """Eliminar todos los datos"""
+        with self.lock:
+            for name in self.tables:
+                self.tables[name].clear()
+                for index in self.indexes[name].values():
+                    index.clear()
+            self._sequences.clear()
+
+    def _index_add(self, table: str, row: dict):
+        for column, index in self.indexes[table].items():
+            value = row.get(column)
+            if value is not None and not isinstance(value, list):
+                index[value].add(row["id"])
+
+    def _index_remove(self, table: str, row: dict):
+        for column, index in self.indexes[table].items():
+            value = row.get(column)
+            if value is not None and not isinstance(value, list):
+                ids = index.get(value)
+                if ids:
+                    ids.discard(row["id"])
+                    if not ids:
+                        del index[value]
+
+    def _normalize(self, table: str, record: dict) -> dict:
+        schema = self.table_schema(table)
+        for column, value in record.items():
+            definition = schema.columns.get(column)
+            if definition is None:
+                raise _error("PGRST204", f"Could not find the '{column}' column of '{table}' in the schema cache")
+            if definition.is_timestamp:
+                record[column] = normalize_timestamp(value)
+        return record
+
+    def _validate(self, table: str, row: dict):
+        schema = self.table_schema(table)
+        for column in schema.columns.values():
+            value = row.get(column.name)
+            if value is None:
+                if column.not_null:
+                    raise _error("23502", f'null value in column "{column.name}" of relation "{table}" violates not-null constraint')
+                continue
+            if column.check_values is not None and value not in column.check_values:
+                raise _error("23514", f'new row for relation "{table}" violates check constraint "{table}_{column.name}_check"')
+            if column.max_length is not None and len(str(value)) > column.max_length:
+                raise _error("22001", f"value too long for type character varying({column.max_length})")
+            if column.references:
+                ref_table, ref_column, _ = column.references
+                if not self.find(ref_table, [("eq", ref_column, value)]):
+                    raise _error(
+                        "23503",
+                        f'insert or update on table "{table}" violates foreign key constraint "{table}_{column.name}_fkey"',
+                        f'Key ({column.name})=({value}) is not present in table "{ref_table}".',
+                    )
+
+    def _run_triggers(self, table: str, timing: str, event: str, old: Optional[dict],
+                      new: Optional[dict], changed: Optional[Iterable[str]] = None) -> Optional[dict]:
+        for trigger in self.schema.triggers:
+            if trigger.table == table and trigger.timing == timing and trigger.fires_on(event, changed):
+                function = TRIGGER_FUNCTIONS.get(trigger.function)
+                if function is None:
+                    raise NotImplementedError(f"Trigger sin equivalente en memoria: {trigger.function}")
+                result = function(self, table, old, new)
+                if timing == "BEFORE" and result is not None:
+                    new = result
+        return new
+
+    # Lectura
+    def candidate_ids(self, table: str, filters: List[Filter]) -> Optional[Set[int]]:
+        """IDs candidatos según los índices (None si ningún filtro es indexable)"""
+        indexes = self.indexes[table]
+        candidates: Optional[Set[int]] = None
+        for op, column, value in filters:
+            if column not in indexes or op not in ("eq", "in"):
+                continue
+            values = [value] if op == "eq" else value
+            ids: Set[int] = set()
+            for v in values:
+                ids |= indexes[column].get(v, set())
+            candidates = ids if candidates is None else candidates & ids
+        return candidates
+
+    def find(self, table: str, filters: List[Filter]) -> List[dict]:
+        """Filas (referencias internas) que cumplen todos los filtros"""
+        rows = self.tables[self.table_schema(table).name]
+        candidates = self.candidate_ids(table, filters)
+        if candidates is None:
+            source = rows.values()
+        else:
+            source = (rows[row_id] for row_id in sorted(candidates) if row_id in rows)
+        return [row for row in source if all(_matches(row, flt) for flt in filters)]
+
+    # Escritura
+    def insert(self, table: str, record: dict) -> dict:
+        """Insertar una fila aplicando valores por defecto, constraints y triggers"""
+        schema = self.table_schema(table)
+        record = self._normalize(table, dict(record))
+
+        row = {}
+        for name, column in schema.columns.items():
+            if name in record:
+                row[name] = record[name]
+            elif column.is_serial:
+                self._sequences[table] += 1
+                row[name] = self._sequences[table]
+            else:
+                row[name] = column.default_value()
+
+        if row["id"] in self.tables[table]:
+            raise _error("23505", f'duplicate key value violates unique constraint "{table}_pkey"')
+        self._sequences[table] = max(self._sequences[table], row["id"])
+
+        row = self._run_triggers(table, "BEFORE", "INSERT", None, row)
+        self._validate(table, row)
+        self.tables[table][row["id"]] = row
+        self._index_add(table, row)
+        self._run_triggers(table, "AFTER", "INSERT", None, row)
+        return row
+
+    def update(self, table: str, filters: List[Filter], changes: dict) -> List[dict]:
+        """Actualizar las filas que cumplen los filtros"""
+        changes = self._normalize(table, dict(changes))
+        updated = []
+        for row in self.find(table, filters):
+            old = dict(row)
+            new = dict(row)
+            new.update(changes)
+            new = self._run_triggers(table, "BEFORE", "UPDATE", old, new, changes.keys())
+            self._validate(table, new)
+
+            self._index_remove(table, row)
+            row.clear()
+            row.update(new)
+            self._index_add(table, row)
+
+            self._run_triggers(table, "AFTER", "UPDATE", old, row, changes.keys())
+            updated.append(row)
+        return updated
+
+    def delete(self, table: str, filters: List[Filter]) -> List[dict]:
+        """Eliminar las filas que cumplen los filtros aplicando ON DELETE"""
+        deleted = []
+        for row in self.find(table, filters):
+            self._run_triggers(table, "BEFORE", "DELETE", row, None)
+            del self.tables[table][row["id"]]
+            self._index_remove(table, row)
+
+            for child_table, column in self.schema.referencing(table):
+                child_filter = [("eq", column.name, row[column.references[1]])]
+                action = column.references[2]
+                if action == "CASCADE":
+                    self.delete(child_table, child_filter)
+                elif action == "SET NULL":
+                    self.update(child_table, child_filter, {column.name: None})
+                elif self.find(child_table, child_filter):
+                    raise _error(
+                        "23503",
+                        f'update or delete on table "{table}" violates foreign key constraint '
+                        f'"{child_table}_{column.name}_fkey" on table "{child_table}"',
+                    )
+
+            self._run_triggers(table, "AFTER", "DELETE", row, None)
+            deleted.append(row)
+        return deleted
+
+
+# ---------------------------------------------------------------------------
+# Query builder
+# ---------------------------------------------------------------------------
+
+class MemoryResponse:
+    """Respuesta equivalente a ``APIResponse`` de postgrest"""
+
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+@dataclass
+class RecordedCall:
+    """Una llamada a ``execute()`` registrada por el cliente en memoria"""
+    table: str
+    operation: str
+    filters: List[Tuple[str, str, Any]]
+    modifiers: List[str]
+    rows: int
+    duration_ms: float
+    error: Optional[str] = None
+
+    def __str__(self) -> str:
+        parts = [f"{op}({column}={value!r})" for op, column, value in self.filters] + self.modifiers
+        suffix = f" !! {self.error}" if self.error else f" -> {self.rows} filas"
+        return f"{self.table}.{self.operation} {' '.join(parts)}".rstrip() + suffix
+
+
+def _split_columns(spec: str) -> List[str]:
+    """Separar columnas de un select respetando los recursos embebidos ``tabla(...)``"""
+    columns, depth, current = [], 0, ""
+    for ch in spec:
+        if ch == "," and depth == 0:
+            columns.append(current.strip())
+            current = ""
+            continue
+        depth += {"(": 1, ")": -1}.get(ch, 0)
+        current += ch
+    if current.strip():
+        columns.append(current.strip())
+    return columns
+
+
+def _copy_row(row: dict) -> dict:
+    return {k: (list(v) if isinstance(v, list) else v) for k, v in row.items()}
+
+
+def _json_roundtrip(payload: Any) -> Any:
+    """Serializar como lo haría el cliente HTTP (falla con tipos no JSON)"""
+    def default(value):
+        if isinstance(value, Enum):
+            return value.value
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+    return json.loads(json.dumps(payload, default=default))
+
+
+class MemoryQuery:
+    """Query builder en memoria"""
+
+    def __init__(self, client: "MemoryClient", table: str):
+        self._client = client
+        self._db = client.db
+        self._table = table
+        self._operation = "select"
+        self._columns: List[str] = ["*"]
+        self._count: Optional[str] = None
+        self._payload: Any = None
+        self._filters: List[Filter] = []
+        self._recorded_filters: List[Tuple[str, str, Any]] = []
+        self._embedded_filters: Dict[str, List[Filter]] = defaultdict(list)
+        self._order: List[Tuple[str, bool]] = []
+        self._limit: Optional[int] = None
+        self._offset = 0
+        self.timeout: Optional[float] = None
+
+    # Operaciones
+    def select(self, *columns: str, count: Optional[str] = None) -> "MemoryQuery":
+        self._operation = "select"
+        self._columns = [c for col in (columns or ("*",)) for c in _split_columns(col)]
+        self._count = count
+        return self
+
+    def insert(self, json: Any, *, count: Optional[str] = None, upsert: bool = False, **kwargs) -> "MemoryQuery":
+        self._operation = "upsert" if upsert else "insert"
+        self._payload = _json_roundtrip(json)
+        self._count = count
+        return self
+
+    def upsert(self, json: Any, *, count: Optional[str] = None, **kwargs) -> "MemoryQuery":
+        self._operation = "upsert"
+        self._payload = _json_roundtrip(json)
+        self._count = count
+        return self
+
+    def update(self, json: dict, *, count: Optional[str] = None, **kwargs) -> "MemoryQuery":
+        self._operation = "update"
+        self._payload = _json_roundtrip(json)
+        self._count = count
+        return self
+
+    def delete(self, *, count: Optional[str] = None, **kwargs) -> "MemoryQuery":
+        self._operation = "delete"
+        self._count = count
+        return self
+
+    # Filtros
+    def _add_filter(self, op: str, column: str, value: Any, raw: Any = None) -> "MemoryQuery":
+        if "." in column:
+            # Filtro sobre un recurso embebido (``tasks.user_id``)
+            embedded, column = column.split(".", 1)
+            self._embedded_filters[embedded].append((op, column, value))
+            self._recorded_filters.append((op, f"{embedded}.{column}", value if raw is None else raw))
+            return self
+        table = self._db.schema.tables.get(self._table)
+        definition = table.columns.get(column) if table else None
+        if definition is not None and definition.is_timestamp and op in ("eq", "neq", "gt", "gte", "lt", "lte"):
+            value = normalize_timestamp(value)
+        self._filters.append((op, column, value))
+        self._recorded_filters.append((op, column, value if raw is None else raw))
+        return self
+
+    def eq(self, column: str, value: Any) -> "MemoryQuery":
+        return self._add_filter("eq", column, _json_roundtrip(value))
+
+    def neq(self, column: str, value: Any) -> "MemoryQuery":
+        return self._add_filter("neq", column, _json_roundtrip(value))
+
+    def gt(self, column: str, value: Any) -> "MemoryQuery":
+        return self._add_filter("gt", column, value)
+
+    def gte(self, column: str, value: Any) -> "MemoryQuery":
+        return self._add_filter("gte", column, value)
+
+    def lt(self, column: str, value: Any) -> "MemoryQuery":
+        return self._add_filter("lt", column, value)
+
+    def lte(self, column: str, value: Any) -> "MemoryQuery":
+        return self._add_filter("lte", column, value)
+
+    def in_(self, column: str, values: Iterable[Any]) -> "MemoryQuery":
+        values = list(values)
+        return self._add_filter("in", column, set(values), values)
+
+    def is_(self, column: str, value: Any) -> "MemoryQuery":
+        expected = None if value in (None, "null") else {"true": True, "false": False}.get(value, value)
+        return self._add_filter("is", column, expected, value)
+
+    def contains(self, column: str, value: Iterable[Any]) -> "MemoryQuery":
+        return self._add_filter("cs", column, list(value))
+
+    def like(self, column: str, pattern: str) -> "MemoryQuery":
+        return self._add_filter("like", column, _like_to_regex(pattern, ignore_case=False), pattern)
+
+    def ilike(self, column: str, pattern: str) -> "MemoryQuery":
+        return self._add_filter("ilike", column, _like_to_regex(pattern, ignore_case=True), pattern)
+
+    # Modificadores
+    def order(self, column: str, *, desc: bool = False, **kwargs) -> "MemoryQuery":
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, size: int, **kwargs) -> "MemoryQuery":
+        self._limit = size
+        return self
+
+    def offset(self, size: int) -> "MemoryQuery":
+        self._offset = size
+        return self
+
+    def range(self, start: int, end: int) -> "MemoryQuery":
+        # postgrest-py 0.13 envía "Range: start-(end-1)": el extremo final es exclusivo
+        self._offset = start
+        self._limit = max(0, end - start)
+        return self
+
+    # Ejecución
+    def _embedded(self) -> List[Tuple[str, str, bool]]:
+        """Recursos embebidos de la select: (tabla, columnas, ``!inner``)"""
+        resources = []
+        for embedded in self._columns:
+            if "(" in embedded:
+                name, inner = embedded.rstrip(")").split("(", 1)
+                table, _, hint = name.strip().partition("!")
+                resources.append((table, inner, hint == "inner"))
+        return resources
+
+    def _project(self, row: dict) -> dict:
+        columns = [c for c in self._columns if "(" not in c]
+        projected = _copy_row(row) if "*" in columns else {column: row.get(column) for column in columns}
+        for table, inner, _ in self._embedded():
+            projected[table] = self._embed(row, table, inner)
+        return projected
+
+    def _embed(self, row: dict, table: str, inner: str) -> Any:
+        """Recurso embebido de PostgREST resuelto por clave foránea (con sus filtros ``tabla.columna``)"""
+        columns = [c.strip() for c in inner.split(",")]
+        filters = self._embedded_filters.get(table, [])
+
+        def pick(related: dict) -> dict:
+            return _copy_row(related) if "*" in columns else {c: related.get(c) for c in columns}
+
+        child = self._db.table_schema(table)
+        for column in child.columns.values():
+            if column.references and column.references[0] == self._table:
+                # Uno a muchos: filas de ``table`` que referencian a esta fila
+                children = self._db.find(table, [("eq", column.name, row[column.references[1]]), *filters])
+                return [pick(related) for related in children]
+
+        parent = self._db.table_schema(self._table)
+        for column in parent.columns.values():
+            if column.references and column.references[0] == table:
+                # Muchos a uno: la fila referenciada (o None)
+                value = row.get(column.name)
+                related = self._db.find(table, [("eq", column.references[1], value), *filters]) if value is not None else []
+                return pick(related[0]) if related else None
+
+        raise _error("PGRST200", f"Could not find a relationship between '{self._table}' and '{table}' in the schema cache")
+
+    def _count_of(self, rows: List[dict]) -> Optional[int]:
+        return len(rows) if self._count else None
+
+    def _run_select(self) -> MemoryResponse:
+        rows = self._db.find(self._table, self._filters)
+        for table, inner, required in self._embedded():
+            if required:
+                # ``!inner``: como un INNER JOIN, sin fila relacionada (que cumpla sus filtros) no hay fila
+                rows = [row for row in rows if self._embed(row, table, inner)]
+        count = self._count_of(rows)
+
+        # Orden estable: de la clave menos significativa a la más significativa.
+        # Como en Postgres, NULL se considera mayor que cualquier valor.
+        for column, desc in reversed(self._order):
+            rows.sort(key=lambda row: (row.get(column) is None, row.get(column) if row.get(column) is not None else 0),
+                      reverse=desc)
+
+        end = None if self._limit is None else self._offset + self._limit
+        return MemoryResponse([self._project(row) for row in rows[self._offset:end]], count)
+
+    def _records(self) -> List[dict]:
+        return self._payload if isinstance(self._payload, list) else [self._payload]
+
+    def _run_insert(self) -> MemoryResponse:
+        rows = [_copy_row(self._db.insert(self._table, record)) for record in self._records()]
+        return MemoryResponse(rows, self._count_of(rows))
+
+    def _run_upsert(self) -> MemoryResponse:
+        rows = []
+        for record in self._records():
+            existing = record.get("id") is not None and self._db.find(self._table, [("eq", "id", record["id"])])
+            if existing:
+                changes = {k: v for k, v in record.items() if k != "id"}
+                rows.extend(_copy_row(r) for r in self._db.update(self._table, [("eq", "id", record["id"])], changes))
+            else:
+                rows.append(_copy_row(self._db.insert(self._table, record)))
+        return MemoryResponse(rows, self._count_of(rows))
+
+    def _run_update(self) -> MemoryResponse:
+        rows = [_copy_row(row) for row in self._db.update(self._table, self._filters, self._payload)]
+        return MemoryResponse(rows, self._count_of(rows))
+
+    def _run_delete(self) -> MemoryResponse:
+        rows = [_copy_row(row) for row in self._db.delete(self._table, self._filters)]
+        return MemoryResponse(rows, self._count_of(rows))
+
+    def _modifiers(self) -> List[str]:
+        modifiers = [f"order({column}{' desc' if desc else ''})" for column, desc in self._order]
+        if self._limit is not None:
+            modifiers.append(f"limit({self._limit})")
+        if self._offset:
+            modifiers.append(f"offset({self._offset})")
+        return modifiers
+
+    def execute(self) -> MemoryResponse:
+        """Ejecutar la consulta (aplicando la latencia inyectada)"""
+        self._client.simulate_latency(self.timeout)
+        start = time.perf_counter()
+        result: Optional[MemoryResponse] = None
+        error: Optional[str] = None
+        try:
+            with self._db.lock:
+                result = getattr(self, f"_run_{self._operation}")()
+            return result
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self._client.record(RecordedCall(
+                table=self._table,
+                operation=self._operation,
+                filters=list(self._recorded_filters),
+                modifiers=self._modifiers(),
+                rows=len(result.data) if result and isinstance(result.data, list) else 0,
+                duration_ms=(time.perf_counter() - start) * 1000,
+                error=error,
+            ))
+
+
+class MemoryRpc:
+    """Llamada a una función RPC registrada en ``PROCEDURES``"""
+
+    def __init__(self, client: "MemoryClient", fn: str, params: dict):
+        self._client = client
+        self._fn = fn
+        self._params = _json_roundtrip(params or {})
+        self.timeout: Optional[float] = None
+
+    def execute(self) -> MemoryResponse:
+        self._client.simulate_latency(self.timeout)
+        start = time.perf_counter()
+        data: Any = None
+        error: Optional[str] = None
+        try:
+            if self._fn not in PROCEDURES:
+                raise _error("PGRST202", f"Could not find the function public.{self._fn} in the schema cache")
+            with self._client.db.lock:
+                data = _json_roundtrip(PROCEDURES[self._fn](self._client.db, **self._params))
+            return MemoryResponse(data)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self._client.record(RecordedCall(
+                table=self._fn,
+                operation="rpc",
+                filters=[("arg", key, value) for key, value in self._params.items()],
+                modifiers=[],
+                rows=len(data) if isinstance(data, list) else (1 if data is not None else 0),
+                duration_ms=(time.perf_counter() - start) * 1000,
+                error=error,
+            ))
+
+
+class MemoryClient:
+    """
+    Cliente en memoria con la misma interfaz que ``supabase.Client``.
+
+    ``latency_ms`` y ``jitter_ms`` simulan el round trip a PostgREST.
+    Las llamadas ejecutadas se acumulan en ``calls`` (ver ``reset_calls``).
+    """
+
+    def __init__(self, db: Optional[MemoryDatabase] = None,
+                 latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 record_calls: bool = True):
+        self.db = db or MemoryDatabase()
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.record_calls = record_calls
+        self.calls: List[RecordedCall] = []
+        self._calls_lock = threading.Lock()
+
+    def simulate_latency(self, timeout: Optional[float] = None):
+        """
+        Dormir el tiempo de latencia configurado. Si supera ``timeout``
+        (segundos) se corta como haría httpx, con ``TimeoutError``.
+        """
+        delay = self.latency_ms + (random.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+        if timeout is not None and delay / 1000 > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Timeout tras {timeout:.3f}s")
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def record(self, call: RecordedCall):
+        """Registrar una llamada ejecutada"""
+        if self.record_calls:
+            with self._calls_lock:
+                self.calls.append(call)
+
+    def reset_calls(self):
+        """Vaciar el registro de llamadas"""
+        with self._calls_lock:
+            self.calls.clear()
+
+    def table(self, table_name: str) -> MemoryQuery:
+        """Obtener un query builder para la tabla"""
+        return MemoryQuery(self, table_name)
+
+    def from_(self, table_name: str) -> MemoryQuery:
+        """Alias de ``table``"""
+        return self.table(table_name)
+
+    def rpc(self, fn: str, params: Optional[dict] = None) -> MemoryRpc:
+        """Llamar a una función RPC registrada"""
+        return MemoryRpc(self, fn, params or {})
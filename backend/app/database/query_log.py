@@ -0,0 +1,294 @@
+"""
+Instrumentación de consultas a Supabase
+
+Envuelve el cliente de Supabase para medir cada llamada a ``execute()``.
+Las consultas que superan ``SLOW_QUERY_THRESHOLD_MS`` se registran como JSON
+estructurado y todas se agregan por "huella" (tabla, operación y columnas
+filtradas, sin valores) para poder detectar qué formas de consulta necesitan
+índices o RPCs.
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from postgrest.exceptions import APIError
+
+from app.config import settings
+from app.core.deadlines import DeadlineExceeded, current_deadline
+from app.database.circuit_breaker import get_breaker
+from app.database.concurrency_limit import get_limiter
+
+logger = logging.getLogger("mypomodoro.queries")
+
+# Métodos del query builder que definen la operación
+OPERATIONS = {"select", "insert", "update", "delete", "upsert"}
+
+# Métodos de filtro cuyo primer argumento es la columna
+FILTERS = {
+    "eq", "neq", "gt", "gte", "lt", "lte", "like", "ilike", "is_", "in_",
+    "contains", "contained_by", "filter", "not_",
+}
+
+# Modificadores que también forman parte de la forma de la consulta
+MODIFIERS = {"order", "limit", "range", "single", "maybe_single"}
+
+
+class QueryStats:
+    """Agregado de tiempos por huella de consulta (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._last_summary = time.monotonic()
+
+    def record(self, fingerprint: str, duration_ms: float, rows: int, slow: bool):
+        """Registrar una ejecución"""
+        with self._lock:
+            entry = self._stats.setdefault(fingerprint, {
+                "fingerprint": fingerprint,
+                "calls": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "rows": 0,
+                "slow_calls": 0,
+            })
+            entry["calls"] += 1
+            entry["total_ms"] += duration_ms
+            entry["max_ms"] = max(entry["max_ms"], duration_ms)
+            entry["rows"] += rows
+            if slow:
+                entry["slow_calls"] += 1
+
+    def top(self, n: int = 10) -> List[Dict[str, Any]]:
+        """Obtener las N huellas con mayor tiempo total"""
+        with self._lock:
+            entries = [dict(e) for e in self._stats.values()]
+
+        entries.sort(key=lambda e: e["total_ms"], reverse=True)
+        for entry in entries:
+            entry["avg_ms"] = round(entry["total_ms"] / entry["calls"], 3)
+            entry["total_ms"] = round(entry["total_ms"], 3)
+            entry["max_ms"] = round(entry["max_ms"], 3)
+        return entries[:n]
+
+    def maybe_log_summary(self):
+        """Emitir el resumen periódico si ha pasado el intervalo configurado"""
+        interval = settings.QUERY_STATS_SUMMARY_INTERVAL
+        if interval <= 0:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_summary < interval:
+                return
+            self._last_summary = now
+
+        logger.info(json.dumps({
+            "event": "query_summary",
+            "top": self.top(settings.QUERY_STATS_TOP_N),
+        }))
+
+    def reset(self):
+        """Limpiar las estadísticas (útil para testing)"""
+        with self._lock:
+            self._stats.clear()
+            self._last_summary = time.monotonic()
+
+
+query_stats = QueryStats()
+
+
+class _TimeoutSession:
+    """Sesión httpx que aplica un timeout fijo a cada petición"""
+
+    def __init__(self, session: Any, timeout: float):
+        self._session = session
+        self._timeout = timeout
+
+    def request(self, *args, **kwargs):
+        kwargs.setdefault("timeout", self._timeout)
+        return self._session.request(*args, **kwargs)
+
+    def __getattr__(self, name: str):
+        return getattr(self._session, name)
+
+
+def _apply_timeout(builder: Any, timeout: float):
+    """
+    Pasar el tiempo restante de la petición como timeout de la llamada: los
+    builders de postgrest usan ``session`` (httpx) y los del backend en memoria
+    exponen ``timeout``.
+    """
+    if hasattr(builder, "session"):
+        builder.session = _TimeoutSession(builder.session, timeout)
+    elif hasattr(builder, "timeout"):
+        builder.timeout = timeout
+
+
+# Errores de PostgREST que indican sobrecarga o caída y no un error lógico:
+# statement_timeout, excepciones de conexión (clase 08), recursos agotados
+# (clase 53), cierre del servidor y los de conexión/pool de PostgREST
+OVERLOAD_CODES = {"57014", "57P01", "57P02", "57P03", "PGRST000", "PGRST001", "PGRST002", "PGRST003"}
+OVERLOAD_CODE_PREFIXES = ("08", "53")
+
+
+def _is_failure(error: Exception) -> bool:
+    """
+    Si un error cuenta como fallo para el circuito y el limitador. Los
+    ``APIError`` con código 4xx o de restricción son respuestas correctas del
+    servidor; los 5xx, timeouts y errores de conexión no.
+    """
+    if not isinstance(error, APIError):
+        return True
+    code = str(error.code or "")
+    if code in OVERLOAD_CODES or code.startswith(OVERLOAD_CODE_PREFIXES):
+        return True
+    # Respuestas sin cuerpo JSON (p. ej. 502/503 de un proxy) llevan el estado HTTP como código
+    return code.isdigit() and len(code) == 3 and code.startswith("5")
+
+
+def _queue_timeout_ms(limiter: Any, timeout: Optional[float]) -> float:
+    """La espera por un hueco del limitador no puede superar el plazo restante"""
+    if timeout is None:
+        return limiter.queue_timeout_ms
+    return min(limiter.queue_timeout_ms, timeout * 1000)
+
+
+class ObservedQuery:
+    """
+    Proxy de un query builder de Supabase.
+    Acumula la forma de la consulta a medida que se encadenan métodos y mide
+    la llamada a ``execute()``.
+    """
+
+    def __init__(self, builder: Any, table: str, operation: str = "select",
+                 shape: Tuple[str, ...] = ()):
+        self._builder = builder
+        self._table = table
+        self._operation = operation
+        self._shape = shape
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._builder, name)
+        if not callable(attr):
+            return attr
+
+        def _chain(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            operation = self._operation
+            shape = self._shape
+
+            if name in OPERATIONS:
+                operation = name
+            elif name in FILTERS and args:
+                shape = shape + (f"{name}({args[0]})",)
+            elif name in MODIFIERS:
+                column = f"({args[0]})" if name == "order" and args else ""
+                shape = shape + (f"{name}{column}",)
+
+            return ObservedQuery(result, self._table, operation, shape)
+
+        return _chain
+
+    @property
+    def fingerprint(self) -> str:
+        """Huella de la consulta: tabla, operación y columnas, sin valores"""
+        parts = [self._table, self._operation.upper()] + sorted(self._shape)
+        return " ".join(parts)
+
+    def execute(self):
+        """
+        Ejecutar la consulta midiendo su duración, si el circuito lo permite,
+        dentro del límite adaptativo y del plazo de la petición en curso
+        """
+        deadline = current_deadline()
+        timeout = None
+        if deadline:
+            deadline.check()
+            timeout = deadline.remaining()
+
+        breaker = get_breaker()
+        limiter = get_limiter()
+        if breaker:
+            breaker.before_call()
+        try:
+            started_at = limiter.acquire(_queue_timeout_ms(limiter, timeout)) if limiter else None
+        except Exception:
+            if breaker:
+                breaker.cancel_call()
+            if deadline and deadline.expired:
+                raise DeadlineExceeded()
+            raise
+
+        if timeout is not None:
+            _apply_timeout(self._builder, deadline.remaining())
+
+        start = time.perf_counter()
+        result = None
+        error: Optional[str] = None
+        dropped = False
+        try:
+            result = self._builder.execute()
+            return result
+        except Exception as e:
+            error = type(e).__name__
+            # Los errores lógicos de PostgREST no cuentan; red, timeouts y 5xx indican sobrecarga
+            dropped = _is_failure(e)
+            if dropped and deadline and deadline.expired:
+                raise DeadlineExceeded() from e
+            raise
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            if limiter:
+                limiter.release(started_at, duration_ms, dropped)
+            if breaker:
+                breaker.record(success=not dropped)
+            self._record(duration_ms, result, error)
+
+    def _record(self, duration_ms: float, result: Any, error: Optional[str]):
+        data = getattr(result, "data", None)
+        rows = len(data) if isinstance(data, list) else (1 if data else 0)
+        slow = duration_ms >= settings.SLOW_QUERY_THRESHOLD_MS
+
+        query_stats.record(self.fingerprint, duration_ms, rows, slow)
+
+        if slow or error:
+            logger.warning(json.dumps({
+                "event": "slow_query" if slow else "query_error",
+                "table": self._table,
+                "operation": self._operation,
+                "filters": sorted(self._shape),
+                "fingerprint": self.fingerprint,
+                "rows": rows,
+                "duration_ms": round(duration_ms, 3),
+                "error": error,
+            }))
+
+        query_stats.maybe_log_summary()
+
+
+class ObservedClient:
+    """Proxy del cliente Supabase que instrumenta todas las consultas"""
+
+    def __init__(self, client: Any):
+        self._client = client
+
+    def table(self, table_name: str) -> ObservedQuery:
+        """Obtener un query builder instrumentado para la tabla"""
+        return ObservedQuery(self._client.table(table_name), table_name)
+
+    def from_(self, table_name: str) -> ObservedQuery:
+        """Alias de ``table``"""
+        return self.table(table_name)
+
+    def rpc(self, fn: str, params: Optional[dict] = None) -> ObservedQuery:
+        """Llamar a una función RPC instrumentada (los parámetros forman la huella)"""
+        params = params or {}
+        shape = tuple(f"arg({key})" for key in params)
+        return ObservedQuery(self._client.rpc(fn, params), fn, "rpc", shape)
+
+    def __getattr__(self, name: str):
+        return getattr(self._client, name)
@@ -0,0 +1,188 @@
+"""
+Comprobación ligera de referencias (claves foráneas) antes de escribir
+
+Los caminos de creación comprueban que existen la tarea, el pomodoro o las
+subtareas a las que apuntan. En lugar de leer la fila completa (y, en las
+tareas, todas sus subtareas) se leen solo las columnas de ``REFERENCE_COLUMNS``
+con una consulta ``IN`` por tabla para todos los IDs de la petición.
+
+Las subtareas no tienen ``user_id``: ``require_task_subtasks`` comprueba que
+son de la tarea a la que se asocian (y, con ello, del mismo usuario).
+
+Los IDs que existen se recuerdan ``REFERENCE_CACHE_TTL`` segundos; los que no
+existen no se recuerdan (pueden crearse enseguida en otro worker). Los borrados
+(propios y de otros workers, por el bus de eventos) se olvidan al momento; el
+TTL acota el tiempo en que un borrado no visto (p. ej. en cascada) pasa por
+existente, y en ese caso la propia clave foránea rechaza la escritura.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from app.config import settings
+from app.database.supabase_client import get_supabase
+
+# Columnas que se leen de cada tabla referenciada
+REFERENCE_COLUMNS = {
+    "tasks": "id, user_id",
+    "subtasks": "id, task_id",
+    "pomodoros": "id, user_id",
+}
+
+NOT_FOUND = {
+    "tasks": "Tarea con ID {} no encontrada",
+    "subtasks": "Subtarea con ID {} no encontrada",
+    "pomodoros": "Pomodoro con ID {} no encontrado",
+}
+
+FORBIDDEN = {
+    "tasks": "La tarea con ID {} pertenece a otro usuario",
+    "pomodoros": "El pomodoro con ID {} pertenece a otro usuario",
+}
+
+# Una fila referenciada: solo las columnas de REFERENCE_COLUMNS
+Reference = Dict[str, Any]
+
+
+class ReferenceCache:
+    """Caché acotada de filas referenciadas que existen (thread-safe)"""
+
+    def __init__(self):
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[float, Reference]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "queries": 0}
+
+    def get_many(self, table: str, ids: Iterable[int]) -> Tuple[Dict[int, Reference], List[int]]:
+        """Filas en caché y IDs que hay que consultar"""
+        now = time.monotonic()
+        found: Dict[int, Reference] = {}
+        missing: List[int] = []
+        with self._lock:
+            for record_id in ids:
+                entry = self._entries.get((table, record_id))
+                if entry is not None and entry[0] > now:
+                    found[record_id] = entry[1]
+                    self.stats["hits"] += 1
+                else:
+                    missing.append(record_id)
+                    self.stats["misses"] += 1
+        return found, missing
+
+    def record_query(self, table: str, rows: Iterable[Reference]):
+        """Guardar las filas que devolvió una consulta"""
+        expires_at = time.monotonic() + settings.REFERENCE_CACHE_TTL
+        with self._lock:
+            self.stats["queries"] += 1
+            if not settings.REFERENCE_CACHE_ENABLED:
+                return
+            for row in rows:
+                key = (table, row["id"])
+                self._entries[key] = (expires_at, row)
+                self._entries.move_to_end(key)
+            while len(self._entries) > settings.REFERENCE_CACHE_MAX_ENTRIES:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, table: str, record_id: Hashable):
+        """Olvidar una fila borrada (y, si es una tarea, sus subtareas)"""
+        with self._lock:
+            self._entries.pop((table, record_id), None)
+            if table == "tasks":
+                for key in [k for k, (_, row) in self._entries.items()
+                            if k[0] == "subtasks" and row.get("task_id") == record_id]:
+                    del self._entries[key]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Estado actual para /metrics"""
+        with self._lock:
+            return {"entries": len(self._entries), **self.stats}
+
+    def clear(self):
+        """Vaciar la caché y las estadísticas (útil para testing)"""
+        with self._lock:
+            self._entries.clear()
+            for name in self.stats:
+                self.stats[name] = 0
+
+
+reference_cache = ReferenceCache()
+
+
+def fetch_references(table: str, ids: Iterable[int], use_cache: bool = True) -> Dict[int, Reference]:
+    """
+    Filas existentes entre ``ids`` (de la caché o con una sola consulta IN).
+    ``use_cache=False`` consulta siempre, para quien no puede tolerar un
+    borrado aún no visto.
+    """
+    unique = list(dict.fromkeys(record_id for record_id in ids if record_id is not None))
+    if not unique:
+        return {}
+    if not (use_cache and settings.REFERENCE_CACHE_ENABLED):
+        found, missing = {}, unique
+    else:
+        found, missing = reference_cache.get_many(table, unique)
+
+    if missing:
+        result = get_supabase().table(table).select(REFERENCE_COLUMNS[table]).in_("id", missing).execute()
+        rows = result.data or []
+        reference_cache.record_query(table, rows)
+        found.update({row["id"]: row for row in rows})
+    return found
+
+
+def require_references(references: Dict[str, Iterable[int]],
+                       user_id: Optional[str] = None) -> Dict[str, Dict[int, Reference]]:
+    """
+    Comprobar que existen todas las filas referenciadas (listas de IDs por
+    tabla, una consulta por tabla; 404 por la primera que falte) y, si se
+    indica ``user_id``, que las tareas y pomodoros con dueño son de ese usuario
+    (403). Devuelve las filas por tabla.
+    """
+    try:
+        rows = {table: fetch_references(table, ids) for table, ids in references.items()}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al comprobar las referencias: {str(e)}"
+        )
+
+    for table, ids in references.items():
+        for record_id in ids:
+            if record_id is None:
+                continue
+            row = rows[table].get(record_id)
+            if row is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=NOT_FOUND[table].format(record_id)
+                )
+            owner = row.get("user_id")
+            if user_id and owner and owner != user_id:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail=FORBIDDEN[table].format(record_id)
+                )
+    return rows
+
+
+def require_task_subtasks(subtasks: Dict[int, Reference], task_id: Optional[int],
+                          user_id: Optional[str] = None):
+    """
+    Las subtareas (filas de ``require_references``) deben ser de la tarea
+    ``task_id`` (422), lo que también garantiza su dueño. Sin tarea, el dueño
+    se comprueba a través de las tareas de las subtareas (403).
+    """
+    if task_id is None:
+        require_references({"tasks": sorted({row["task_id"] for row in subtasks.values()})}, user_id=user_id)
+        return
+    for subtask_id, row in subtasks.items():
+        if row["task_id"] != task_id:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"La subtarea con ID {subtask_id} no pertenece a la tarea {task_id}"
+            )
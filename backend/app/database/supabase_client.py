@@ -4,6 +4,7 @@ Cliente de Supabase para la aplicación
 
 from supabase import create_client, Client
 from app.config import settings
+from app.database.query_log import ObservedClient
 
 
 class SupabaseClient:
@@ -13,14 +14,33 @@ class SupabaseClient:
     
     @classmethod
     def get_client(cls) -> Client:
-        """Obtener instancia del cliente Supabase"""
+        """Obtener instancia del cliente Supabase (instrumentado)"""
         if cls._instance is None:
-            cls._instance = create_client(
-                settings.SUPABASE_URL,
-                settings.SUPABASE_KEY
-            )
+            cls._instance = ObservedClient(cls._create_client())
         return cls._instance
     
+    @classmethod
+    def _create_client(cls):
+        """Crear el cliente según ``DATABASE_BACKEND``"""
+        if settings.DATABASE_BACKEND == "memory":
+            from app.database.memory_client import MemoryClient
+            return MemoryClient(latency_ms=settings.MEMORY_LATENCY_MS)
+        
+        if settings.DATABASE_BACKEND == "postgrest":
+            # PostgREST local sin Supabase (p. ej. para benchmarks)
+            from postgrest import SyncPostgrestClient
+            return SyncPostgrestClient(settings.POSTGREST_URL)
+        
+        return create_client(
+            settings.SUPABASE_URL,
+            settings.SUPABASE_KEY
+        )
+    
+    @classmethod
+    def set_client(cls, client):
+        """Reemplazar el cliente subyacente (benchmarks y testing)"""
+        cls._instance = ObservedClient(client)
+    
     @classmethod
     def reset_client(cls):
         """Resetear la instancia (útil para testing)"""
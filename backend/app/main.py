@@ -3,18 +3,60 @@ MyPomodoro Backend - FastAPI Application
 Aplicación backend para gestión de tiempo tipo Pomodoro con FastAPI y Supabase
 """
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import tasks, subtasks, pomodoros, distractions, statistics
+from app.routers import tasks, subtasks, pomodoros, distractions, statistics, batch, dashboard, sync, events, reports
 from app.config import settings
 from app.database.supabase_client import get_supabase
+from app.database.query_log import query_stats
+from app.database.concurrency_limit import limiter_stats
+from app.database.circuit_breaker import breaker_stats
+from app.database.hedging import hedging_stats, reset_hedger
+from app.core.single_flight import single_flight
+from app.core.bulkheads import bulkhead_stats, shutdown_bulkheads
+from app.core.stale_cache import stale_cache
+from app.core import deadlines
+from app.core.deadlines import DeadlineMiddleware
+from app.core.events import event_bus_stats, get_event_bus, reset_event_bus
+from app.core.history_cache import history_cache
+from app.database.references import reference_cache
+from app.core.jobs import job_runner_stats, reset_job_runner
+from app.services.report_service import invalidate_reports
+from app.services.distraction_service import close_distraction_writer, distraction_writer_stats
+from app.services.task_totals_service import start_reconciler, stop_reconciler, task_totals_stats
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Arranque y apagado de la aplicación"""
+    # Conectar el bus de eventos antes de atender peticiones; los cambios de
+    # cada usuario invalidan sus informes ya generados
+    get_event_bus().add_listener(invalidate_reports)
+    # Conciliación periódica de los totales de las tareas (si está activada)
+    start_reconciler()
+    yield
+    stop_reconciler()
+    # Cerrar los pools de hilos esperando las llamadas en curso
+    shutdown_bulkheads()
+    reset_job_runner()
+    # Escribir las distracciones diferidas que sigan en cola
+    close_distraction_writer()
+    reset_hedger()
+    reset_event_bus()
+
 
 app = FastAPI(
     title="MyPomodoro API",
     description="API REST para gestión de tiempo tipo Pomodoro",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Plazo por petición y cancelación al desconectarse el cliente
+# (se registra antes que CORS para que el 504 también lleve sus cabeceras)
+app.add_middleware(DeadlineMiddleware)
+
 # Configurar CORS
 app.add_middleware(
     CORSMiddleware,
@@ -30,6 +72,11 @@ app.include_router(subtasks.router, prefix="/api/v1/subtasks", tags=["Subtareas"
 app.include_router(pomodoros.router, prefix="/api/v1/pomodoros", tags=["Pomodoros"])
 app.include_router(distractions.router, prefix="/api/v1/distractions", tags=["Distracciones"])
 app.include_router(statistics.router, prefix="/api/v1/statistics", tags=["Estadísticas"])
+app.include_router(dashboard.router, prefix="/api/v1/dashboard", tags=["Dashboard"])
+app.include_router(sync.router, prefix="/api/v1/sync", tags=["Sincronización"])
+app.include_router(events.router, prefix="/api/v1/events", tags=["Eventos"])
+app.include_router(reports.router, prefix="/api/v1/reports", tags=["Informes"])
+app.include_router(batch.router, prefix="/api/v1/batch", tags=["Lotes"])
 
 
 @app.get("/")
@@ -48,6 +95,27 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics")
+async def metrics():
+    """Métricas internas: consultas, coalescencia, pools y protección ante caídas"""
+    return {
+        "queries": query_stats.top(settings.QUERY_STATS_TOP_N),
+        "single_flight": dict(single_flight.stats),
+        "bulkheads": bulkhead_stats(),
+        "concurrency_limit": limiter_stats(),
+        "circuit_breaker": breaker_stats(),
+        "stale_cache": stale_cache.snapshot(),
+        "deadlines": dict(deadlines.stats),
+        "hedging": hedging_stats(),
+        "events": event_bus_stats(),
+        "history_cache": history_cache.snapshot(),
+        "references": reference_cache.snapshot(),
+        "jobs": job_runner_stats(),
+        "deferred_distractions": distraction_writer_stats(),
+        "task_totals": task_totals_stats()
+    }
+
+
 @app.get("/database-status")
 async def database_status():
     """
@@ -3,8 +3,8 @@ Esquemas Pydantic para validación de datos
 """
 
 from pydantic import BaseModel, Field
-from typing import Optional, List
-from datetime import datetime
+from typing import Any, Dict, Optional, List, Union
+from datetime import date, datetime
 from enum import Enum
 
 
@@ -61,7 +61,6 @@ class TaskBase(BaseModel):
     completed: bool = False
     category: TaskCategory = TaskCategory.PERSONAL
     custom_category: Optional[str] = Field(None, max_length=100)
-    time_spent: int = 0  # En segundos (suma de subtareas)
     user_id: Optional[str] = None  # Para multi-usuario en el futuro
 
 
@@ -76,7 +75,6 @@ class TaskUpdate(BaseModel):
     completed: Optional[bool] = None
     category: Optional[TaskCategory] = None
     custom_category: Optional[str] = Field(None, max_length=100)
-    time_spent: Optional[int] = Field(None, ge=0)
 
 
 class TaskResponse(TaskBase):
@@ -84,7 +82,10 @@ class TaskResponse(TaskBase):
     id: int
     created_at: datetime
     updated_at: datetime
-    subtasks: List[SubtaskResponse] = []
+    time_spent: int = 0  # En segundos (suma de subtareas, mantenida por trigger)
+    subtask_total: int = 0  # Conteos mantenidos por trigger (sin leer las subtareas)
+    subtask_completed: int = 0
+    subtasks: List[SubtaskResponse] = []  # Vacía con include_subtasks=false
     
     class Config:
         from_attributes = True
@@ -147,6 +148,11 @@ class DistractionCreate(DistractionBase):
     pass
 
 
+class DistractionQueuedResponse(BaseModel):
+    """Registro de distracción aceptado para escritura diferida"""
+    pending: int  # Registros en cola, incluido este
+
+
 class DistractionResponse(DistractionBase):
     """Schema de respuesta para distracciones"""
     id: int
@@ -182,3 +188,279 @@ class StatisticsResponse(BaseModel):
     category_stats: List[CategoryStats]
     distractions_count: int
     phone_usage_count: int
+
+
+class InsightsResponse(BaseModel):
+    """
+    Analítica de foco del usuario. Las horas son locales según ``utc_offset``;
+    ``heatmap`` tiene 7 filas (lunes a domingo) de 24 horas con los segundos de
+    foco, y las tasas por hora son None en horas sin registros.
+    """
+    total_sessions: int
+    total_focus_time: int  # En segundos
+    average_session: float  # En segundos
+    current_streak: int  # Días consecutivos hasta hoy (o ayer)
+    longest_streak: int
+    heatmap: List[List[int]]
+    distraction_rate_by_hour: List[Optional[float]]
+    phone_rate_by_hour: List[Optional[float]]
+
+
+# Schemas del historial de foco
+class FocusSession(BaseModel):
+    """Pomodoro de foco completado"""
+    pomodoro_id: int
+    task_id: Optional[int] = None
+    started_at: Optional[datetime] = None
+    completed_at: datetime
+    duration: int  # En segundos
+
+
+class FocusDay(BaseModel):
+    """Tiempo de foco de un día, en la zona horaria del cliente"""
+    day: date
+    sessions: int
+    focus_time: int  # En segundos
+
+
+class FocusHistoryResponse(BaseModel):
+    """
+    Una página del historial de foco, de la sesión más reciente a la más
+    antigua. ``days`` agrupa las sesiones de la página (un día partido entre
+    dos páginas continúa en la siguiente) y ``next_before`` es el cursor de la
+    página siguiente, o None si no hay más.
+    """
+    sessions: List[FocusSession]
+    days: List[FocusDay]
+    next_before: Optional[datetime] = None
+
+
+# Schemas de Informes
+class ReportType(str, Enum):
+    """Tipos de informe"""
+    WEEKLY = "weekly"
+    MONTHLY = "monthly"
+    EXPORT = "export"  # Todas las sesiones del rango, fila a fila
+
+
+class ReportCreate(BaseModel):
+    """
+    Informe a generar. ``start`` es el primer día en la zona horaria del
+    cliente (``utc_offset`` en minutos). Los informes semanales y mensuales
+    abarcan siete días o un mes natural desde ``start``; ``export`` abarca
+    hasta ``end`` (exclusivo, por defecto mañana).
+    """
+    type: ReportType
+    user_id: Optional[str] = None
+    start: date
+    end: Optional[date] = None
+    utc_offset: int = Field(0, ge=-720, le=840)
+
+
+class ReportStatus(str, Enum):
+    """Estado de un informe"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class ReportTask(BaseModel):
+    """Tiempo de foco de una tarea en el rango"""
+    task_id: Optional[int] = None  # None para las sesiones sin tarea
+    title: Optional[str] = None
+    sessions: int
+    focus_time: int  # En segundos
+
+
+class ReportSummary(BaseModel):
+    """Resultado de los informes semanal y mensual"""
+    total_sessions: int
+    total_focus_time: int  # En segundos
+    days: List[FocusDay]  # Solo días con actividad, del más antiguo al más reciente
+    tasks: List[ReportTask]  # De más a menos tiempo de foco
+    distractions_count: int
+    phone_usage_count: int
+
+
+class ReportExportRow(BaseModel):
+    """Pomodoro completado del rango (cualquier modo)"""
+    pomodoro_id: int
+    task_id: Optional[int] = None
+    task_title: Optional[str] = None
+    subtask_ids: List[int] = []
+    mode: PomodoroMode
+    objective: Optional[str] = None
+    started_at: Optional[datetime] = None
+    completed_at: datetime
+    duration: int  # En segundos
+
+
+class ReportExport(BaseModel):
+    """Resultado del informe ``export``"""
+    sessions: List[ReportExportRow]
+
+
+class ReportJobResponse(BaseModel):
+    """
+    Estado de un informe. ``progress`` va de 0 a 1 y ``result`` (un
+    ``ReportSummary`` o un ``ReportExport`` según el tipo) solo está cuando
+    ``status`` es ``done``.
+    """
+    id: str
+    type: ReportType
+    status: ReportStatus
+    progress: float
+    start: date
+    end: date
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+
+# Schemas del Dashboard
+class DashboardTask(TaskBase):
+    """Tarea resumida para la pantalla principal (conteos en lugar de subtareas)"""
+    id: int
+    created_at: datetime
+    updated_at: datetime
+    time_spent: int = 0
+    subtask_total: int = 0
+    subtask_completed: int = 0
+
+
+class DashboardSummary(BaseModel):
+    """Resumen compacto de estadísticas"""
+    total_pomodoros: int
+    total_time_spent: int  # En segundos
+    distractions_count: int
+    phone_usage_count: int
+
+
+class DashboardResponse(BaseModel):
+    """
+    Datos de la pantalla principal en una sola respuesta.
+    Solo se incluyen las secciones pedidas y, en cada una, los campos pedidos.
+    """
+    tasks: Optional[List[Dict[str, Any]]] = None
+    today_pomodoros: Optional[int] = None
+    active_pomodoro: Optional[Dict[str, Any]] = None
+    summary: Optional[Dict[str, Any]] = None
+
+
+# Schemas de Sincronización
+class SyncDeleted(BaseModel):
+    """IDs eliminados por tabla desde la marca de agua"""
+    tasks: List[int] = []
+    subtasks: List[int] = []
+    pomodoros: List[int] = []
+    distractions: List[int] = []
+
+
+class SyncResponse(BaseModel):
+    """
+    Cambios desde una marca de agua. Las filas son las de la base de datos
+    (las tareas sin subtareas embebidas). Con ``full`` el cliente debe
+    reemplazar su copia local en lugar de fusionar.
+    """
+    watermark: datetime
+    full: bool
+    tasks: List[Dict[str, Any]]
+    subtasks: List[Dict[str, Any]]
+    pomodoros: List[Dict[str, Any]]
+    distractions: List[Dict[str, Any]]
+    deleted: SyncDeleted
+
+
+# Schemas del registro de operaciones sin conexión
+class OfflineAction(str, Enum):
+    """Acciones del registro de operaciones"""
+    CREATE = "create"
+    UPDATE = "update"
+    COMPLETE = "complete"
+    DELETE = "delete"
+
+
+class OfflineEntity(str, Enum):
+    """Entidades del registro de operaciones"""
+    TASK = "task"
+    SUBTASK = "subtask"
+    POMODORO = "pomodoro"
+    DISTRACTION = "distraction"
+
+
+class OfflineOperation(BaseModel):
+    """
+    Operación hecha sin conexión. En ``create``, ``id`` es el ID generado por
+    el cliente; en el resto, un ID del servidor o uno creado antes en el
+    registro. Las referencias en ``data`` (task_id, pomodoro_id, subtask_ids)
+    admiten igualmente IDs del cliente.
+    """
+    action: OfflineAction
+    entity: OfflineEntity
+    id: Union[int, str]
+    data: Dict[str, Any] = {}
+    updated_at: datetime  # Momento del cambio en el cliente
+
+
+class OfflineLogRequest(BaseModel):
+    """Registro ordenado de operaciones sin conexión"""
+    user_id: Optional[str] = None
+    operations: List[OfflineOperation] = Field(..., min_length=1)
+
+
+class OfflineOperationStatus(str, Enum):
+    """Resultado de cada operación"""
+    APPLIED = "applied"
+    CONFLICT = "conflict"  # El servidor tenía un cambio más reciente
+    MISSING = "missing"  # La fila ya no existe en el servidor
+
+
+class OfflineOperationResult(BaseModel):
+    """Resultado de una operación del registro"""
+    index: int
+    status: OfflineOperationStatus
+    id: Optional[int] = None  # ID del servidor
+
+
+class OfflineLogResponse(BaseModel):
+    """IDs del cliente reasignados y resultado de cada operación"""
+    user_id: Optional[str] = None
+    id_map: Dict[str, int]
+    results: List[OfflineOperationResult]
+
+
+# Schemas de Lotes (batch)
+class BatchMethod(str, Enum):
+    """Métodos HTTP admitidos en una operación del lote"""
+    GET = "GET"
+    POST = "POST"
+    PUT = "PUT"
+    DELETE = "DELETE"
+
+
+class BatchOperation(BaseModel):
+    """Una petición dentro de un lote"""
+    id: Optional[str] = None  # Identificador libre del cliente, se devuelve en la respuesta
+    method: BatchMethod = BatchMethod.GET
+    path: str = Field(..., min_length=1)  # Ruta de la API, p. ej. /api/v1/tasks/
+    params: Dict[str, Any] = Field(default_factory=dict)  # Parámetros de query
+    body: Optional[Any] = None
+
+
+class BatchRequest(BaseModel):
+    """Lote de peticiones a ejecutar en una sola llamada HTTP"""
+    requests: List[BatchOperation] = Field(..., min_length=1)
+
+
+class BatchItemResponse(BaseModel):
+    """Resultado de una operación del lote"""
+    id: Optional[str] = None
+    status: int
+    body: Optional[Any] = None
+
+
+class BatchResponse(BaseModel):
+    """Resultados del lote, en el mismo orden que las peticiones"""
+    responses: List[BatchItemResponse]
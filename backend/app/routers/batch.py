@@ -0,0 +1,141 @@
+"""
+Router para ejecutar varias peticiones en una sola llamada HTTP
+
+Cada operación del lote se despacha internamente a la propia aplicación (con
+sus validaciones, bulkheads, cachés y plazos). Las lecturas consecutivas se
+ejecutan en paralelo; cada escritura espera a lo anterior y se aplica en orden,
+así una lectura posterior a una escritura del mismo lote ya ve su efecto.
+"""
+
+import asyncio
+import json
+from typing import Any, List, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from fastapi import APIRouter, HTTPException, Request, status
+from app.config import settings
+from app.models.schemas import (
+    BatchItemResponse, BatchMethod, BatchOperation, BatchRequest, BatchResponse
+)
+
+router = APIRouter()
+
+# Solo se pueden despachar rutas de la API, y no otro lote
+API_PREFIX = "/api/"
+BATCH_PATH = "/api/v1/batch"
+
+# Cabeceras de la petición externa que se propagan a cada operación
+FORWARDED_HEADERS = {b"authorization"}
+
+
+@router.post("/", response_model=BatchResponse)
+async def execute_batch(batch: BatchRequest, request: Request):
+    """Ejecutar un lote de peticiones y devolver el estado y cuerpo de cada una"""
+    if len(batch.requests) > settings.BATCH_MAX_REQUESTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"El lote admite como máximo {settings.BATCH_MAX_REQUESTS} peticiones"
+        )
+
+    headers = [(k, v) for k, v in request.scope["headers"] if k in FORWARDED_HEADERS]
+    responses: List[BatchItemResponse] = []
+    reads: List[BatchOperation] = []
+
+    async def flush_reads():
+        results = await asyncio.gather(*(_dispatch(request.app, op, headers) for op in reads))
+        responses.extend(results)
+        reads.clear()
+
+    for operation in batch.requests:
+        if operation.method == BatchMethod.GET:
+            reads.append(operation)
+            continue
+        await flush_reads()
+        responses.append(await _dispatch(request.app, operation, headers))
+    await flush_reads()
+
+    return BatchResponse(responses=responses)
+
+
+async def _dispatch(app: Any, operation: BatchOperation,
+                    headers: List[Tuple[bytes, bytes]]) -> BatchItemResponse:
+    """Ejecutar una operación contra la aplicación ASGI y recoger su respuesta"""
+    path, _, query = operation.path.partition("?")
+    if not path.startswith(API_PREFIX) or path.rstrip("/") == BATCH_PATH:
+        return BatchItemResponse(
+            id=operation.id,
+            status=status.HTTP_400_BAD_REQUEST,
+            body={"detail": f"Ruta no admitida en un lote: {operation.path}"}
+        )
+
+    if operation.params:
+        extra = urlencode(operation.params, doseq=True)
+        query = f"{query}&{extra}" if query else extra
+
+    body = b"" if operation.body is None else json.dumps(operation.body).encode()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": operation.method.value,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query.encode(),
+        "headers": headers + [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+        "client": None,
+        "server": None,
+    }
+
+    body_sent = False
+    finished = asyncio.Event()
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # La conexión "sigue abierta" hasta terminar la operación
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    response_status = status.HTTP_500_INTERNAL_SERVER_ERROR
+    location = None
+    chunks: List[bytes] = []
+
+    async def send(message):
+        nonlocal response_status, location
+        if message["type"] == "http.response.start":
+            response_status = message["status"]
+            location = dict(message.get("headers", [])).get(b"location")
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await app(scope, receive, send)
+    except Exception:
+        # Un error no controlado en una operación no tumba el lote entero
+        if not chunks:
+            response_status = status.HTTP_500_INTERNAL_SERVER_ERROR
+            chunks.append(json.dumps({"detail": "Error interno"}).encode())
+    finally:
+        finished.set()
+
+    # Redirección de FastAPI por la barra final (/api/v1/tasks -> /api/v1/tasks/)
+    if response_status == status.HTTP_307_TEMPORARY_REDIRECT and location:
+        redirected = urlsplit(location.decode()).path
+        if redirected.rstrip("/") == path.rstrip("/") and redirected != path:
+            retry_path = f"{redirected}?{query}" if query else redirected
+            retry = operation.model_copy(update={"path": retry_path, "params": {}})
+            return await _dispatch(app, retry, headers)
+
+    raw = b"".join(chunks)
+    try:
+        payload = json.loads(raw) if raw else None
+    except ValueError:
+        payload = raw.decode(errors="replace")
+    return BatchItemResponse(id=operation.id, status=response_status, body=payload)
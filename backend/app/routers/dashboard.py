@@ -0,0 +1,92 @@
+"""
+Router para la pantalla principal (dashboard)
+
+Reúne en una sola respuesta lo que el frontend pedía con varias llamadas:
+tareas con conteo de subtareas, pomodoros completados hoy, pomodoro activo y un
+resumen de estadísticas. Cada sección es una consulta independiente y se
+ejecutan en paralelo en el bulkhead por defecto, así la latencia total es la de
+la sección más lenta y no la suma de todas.
+"""
+
+import asyncio
+from datetime import datetime, time, timezone
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.encoders import jsonable_encoder
+from app.models.schemas import DashboardResponse
+from app.services.dashboard_service import DashboardService
+from app.core.single_flight import coalesce
+from app.core.bulkheads import get_bulkhead, DEFAULT
+from app.core.stale_cache import serve_stale
+
+router = APIRouter()
+
+SECTIONS = ("tasks", "today_pomodoros", "active_pomodoro", "summary")
+
+
+def _parse_list(value: Optional[str]) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()] if value else []
+
+
+def _parse_fields(fields: Optional[str]) -> Dict[str, Set[str]]:
+    """``tasks.id,tasks.title,summary.total_pomodoros`` -> {sección: campos}"""
+    selected: Dict[str, Set[str]] = {}
+    for item in _parse_list(fields):
+        section, _, field = item.partition(".")
+        if section not in SECTIONS or not field:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Campo no válido: {item} (formato sección.campo)"
+            )
+        selected.setdefault(section, set()).add(field)
+    return selected
+
+
+def _pick(value: Any, fields: Optional[Set[str]]) -> Any:
+    """Quedarse solo con los campos pedidos de un objeto o lista de objetos"""
+    value = jsonable_encoder(value)
+    if not fields or value is None:
+        return value
+    if isinstance(value, list):
+        return [{k: v for k, v in item.items() if k in fields} for item in value]
+    if isinstance(value, dict):
+        return {k: v for k, v in value.items() if k in fields}
+    return value
+
+
+@router.get("/", response_model=DashboardResponse, response_model_exclude_unset=True)
+@serve_stale("dashboard")
+@coalesce("dashboard")
+async def get_dashboard(
+    user_id: Optional[str] = Query(None),
+    sections: Optional[str] = Query(None, description="Secciones separadas por comas (por defecto, todas)"),
+    fields: Optional[str] = Query(None, description="Campos por sección, p. ej. tasks.id,tasks.title"),
+    today_start: Optional[datetime] = Query(None, description="Inicio del día del cliente (por defecto, medianoche UTC)")
+):
+    """Obtener los datos de la pantalla principal en una sola petición"""
+    requested = _parse_list(sections) or list(SECTIONS)
+    unknown = [name for name in requested if name not in SECTIONS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Secciones no válidas: {', '.join(unknown)}"
+        )
+    selected = _parse_fields(fields)
+
+    if today_start is None:
+        today_start = datetime.combine(datetime.now(timezone.utc).date(), time.min, tzinfo=timezone.utc)
+
+    loaders: Dict[str, Callable[[], Any]] = {
+        "tasks": lambda: DashboardService.get_tasks(user_id=user_id),
+        "today_pomodoros": lambda: DashboardService.get_completed_pomodoros_since(today_start, user_id=user_id),
+        "active_pomodoro": lambda: DashboardService.get_active_pomodoro(user_id=user_id),
+        "summary": lambda: DashboardService.get_summary(user_id=user_id),
+    }
+
+    pool = get_bulkhead(DEFAULT)
+    results = await asyncio.gather(*(pool.run(loaders[name]) for name in requested))
+
+    return DashboardResponse(**{
+        name: _pick(result, selected.get(name)) for name, result in zip(requested, results)
+    })
@@ -2,22 +2,39 @@
 Router para endpoints de distracciones
 """
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Query, status
 from typing import List, Optional
-from app.models.schemas import DistractionCreate, DistractionResponse
+from app.models.schemas import DistractionCreate, DistractionQueuedResponse, DistractionResponse
 from app.services.distraction_service import DistractionService
+from app.core.single_flight import invalidates
+from app.core.bulkheads import bulkhead, DEFAULT, TIMER
+from app.core.stale_cache import serve_stale
 
 router = APIRouter()
 
 
 @router.post("/", response_model=DistractionResponse)
-async def create_distraction(distraction: DistractionCreate):
+@invalidates()
+@bulkhead(TIMER)
+def create_distraction(distraction: DistractionCreate):
     """Crear un nuevo registro de distracción"""
     return DistractionService.create_distraction(distraction)
 
 
+@router.post("/deferred", response_model=DistractionQueuedResponse, status_code=status.HTTP_202_ACCEPTED)
+@bulkhead(TIMER)
+def create_distraction_deferred(distraction: DistractionCreate):
+    """
+    Registrar una distracción sin esperar a la base de datos: se encola y se
+    escribe en lote en menos de ``DISTRACTION_FLUSH_INTERVAL`` segundos
+    """
+    return DistractionService.enqueue_distraction(distraction)
+
+
 @router.get("/", response_model=List[DistractionResponse])
-async def get_distractions(
+@serve_stale("distractions")
+@bulkhead(DEFAULT)
+def get_distractions(
     user_id: Optional[str] = Query(None, description="ID del usuario para filtrar")
 ):
     """Obtener todas las distracciones"""
@@ -25,12 +42,16 @@ async def get_distractions(
 
 
 @router.get("/pomodoro/{pomodoro_id}", response_model=List[DistractionResponse])
-async def get_distractions_by_pomodoro(pomodoro_id: int):
+@serve_stale("distractions_by_pomodoro")
+@bulkhead(DEFAULT)
+def get_distractions_by_pomodoro(pomodoro_id: int):
     """Obtener todas las distracciones de un pomodoro"""
     return DistractionService.get_distractions_by_pomodoro_id(pomodoro_id)
 
 
 @router.get("/{distraction_id}", response_model=DistractionResponse)
-async def get_distraction(distraction_id: int):
+@serve_stale("distraction")
+@bulkhead(DEFAULT)
+def get_distraction(distraction_id: int):
     """Obtener una distracción por ID"""
     return DistractionService.get_distraction_by_id(distraction_id)
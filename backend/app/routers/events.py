@@ -0,0 +1,99 @@
+"""
+Router para recibir los cambios en tiempo real
+
+Los clientes de un usuario se suscriben por SSE (``GET /api/v1/events``) o
+WebSocket (``/api/v1/events/ws``) y reciben un evento por cada creación,
+actualización o borrado hecho desde cualquier dispositivo (y cualquier worker,
+según ``EVENT_BUS_BACKEND``). Los eventos solo llevan IDs: el cliente relee lo
+que necesite o pide ``GET /api/v1/sync``. Si un cliente no consume a tiempo y
+se pierden eventos, recibe ``resync`` y debe sincronizar.
+"""
+
+import asyncio
+import json
+from dataclasses import asdict
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from fastapi import APIRouter, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from app.config import settings
+from app.core.events import ChangeEvent, Subscription, get_event_bus
+
+router = APIRouter()
+
+
+def _payload(event: ChangeEvent) -> dict:
+    data = asdict(event)
+    data.pop("origin", None)
+    return data
+
+
+async def event_stream(subscription: Subscription,
+                       is_disconnected: Callable[[], Awaitable[bool]],
+                       keepalive: float) -> AsyncIterator[str]:
+    """Mensajes SSE de una suscripción hasta que el cliente se desconecta o se cierra el bus"""
+    try:
+        yield "retry: 3000\n\n"
+        while not await is_disconnected():
+            event = await subscription.get(timeout=keepalive)
+            if subscription.overflowed:
+                subscription.overflowed = False
+                yield "event: resync\ndata: {}\n\n"
+            if subscription.closed:
+                return
+            if event is None:
+                # Comentario para mantener viva la conexión a través de proxies
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: change\ndata: {json.dumps(_payload(event))}\n\n"
+    finally:
+        subscription.close()
+
+
+@router.get("/")
+async def stream_events(request: Request, user_id: Optional[str] = Query(None)):
+    """Recibir los cambios del usuario como Server-Sent Events"""
+    subscription = get_event_bus().subscribe(user_id)
+    return StreamingResponse(
+        event_stream(subscription, request.is_disconnected, settings.EVENT_STREAM_KEEPALIVE),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.websocket("/ws")
+async def websocket_events(websocket: WebSocket, user_id: Optional[str] = Query(None)):
+    """Recibir los cambios del usuario por WebSocket"""
+    # Suscribir antes de aceptar: ningún cambio posterior a la conexión se pierde
+    subscription = get_event_bus().subscribe(user_id)
+    await websocket.accept()
+
+    async def watch_disconnect():
+        # El cliente no envía nada; solo interesa saber cuándo se va
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        while True:
+            getter = asyncio.ensure_future(subscription.get(timeout=settings.EVENT_STREAM_KEEPALIVE))
+            await asyncio.wait({watcher, getter}, return_when=asyncio.FIRST_COMPLETED)
+            if watcher.done():
+                getter.cancel()
+                break
+            if subscription.overflowed:
+                subscription.overflowed = False
+                await websocket.send_json({"type": "resync"})
+            event = getter.result()
+            if subscription.closed:
+                await websocket.close()
+                break
+            if event is not None:
+                await websocket.send_json({"type": "change", **_payload(event)})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        watcher.cancel()
+        subscription.close()
@@ -8,18 +8,25 @@ from app.models.schemas import (
     PomodoroCreate, PomodoroUpdate, PomodoroResponse, PomodoroComplete
 )
 from app.services.pomodoro_service import PomodoroService
+from app.core.single_flight import invalidates
+from app.core.bulkheads import bulkhead, DEFAULT, TIMER
+from app.core.stale_cache import serve_stale
 
 router = APIRouter()
 
 
 @router.post("/", response_model=PomodoroResponse)
-async def create_pomodoro(pomodoro: PomodoroCreate):
+@invalidates()
+@bulkhead(TIMER)
+def create_pomodoro(pomodoro: PomodoroCreate):
     """Crear un nuevo pomodoro"""
     return PomodoroService.create_pomodoro(pomodoro)
 
 
 @router.get("/", response_model=List[PomodoroResponse])
-async def get_pomodoros(
+@serve_stale("pomodoros")
+@bulkhead(DEFAULT)
+def get_pomodoros(
     user_id: Optional[str] = Query(None, description="ID del usuario para filtrar"),
     completed: Optional[bool] = Query(None, description="Filtrar por estado de completitud")
 ):
@@ -28,25 +35,33 @@ async def get_pomodoros(
 
 
 @router.get("/count", response_model=dict)
-async def get_pomodoro_count(user_id: Optional[str] = Query(None)):
+@serve_stale("pomodoro_count")
+@bulkhead(DEFAULT)
+def get_pomodoro_count(user_id: Optional[str] = Query(None)):
     """Obtener el conteo total de pomodoros completados"""
     count = PomodoroService.get_pomodoro_count(user_id=user_id)
     return {"count": count}
 
 
 @router.get("/{pomodoro_id}", response_model=PomodoroResponse)
-async def get_pomodoro(pomodoro_id: int):
+@serve_stale("pomodoro")
+@bulkhead(DEFAULT)
+def get_pomodoro(pomodoro_id: int):
     """Obtener un pomodoro por ID"""
     return PomodoroService.get_pomodoro_by_id(pomodoro_id)
 
 
 @router.put("/{pomodoro_id}", response_model=PomodoroResponse)
-async def update_pomodoro(pomodoro_id: int, pomodoro_update: PomodoroUpdate):
+@invalidates()
+@bulkhead(TIMER)
+def update_pomodoro(pomodoro_id: int, pomodoro_update: PomodoroUpdate):
     """Actualizar un pomodoro (estado, objetivo, etc.)"""
     return PomodoroService.update_pomodoro(pomodoro_id, pomodoro_update)
 
 
 @router.post("/complete", response_model=PomodoroResponse)
-async def complete_pomodoro(pomodoro_complete: PomodoroComplete):
+@invalidates()
+@bulkhead(TIMER)
+def complete_pomodoro(pomodoro_complete: PomodoroComplete):
     """Completar un pomodoro y actualizar tiempos de subtareas"""
     return PomodoroService.complete_pomodoro(pomodoro_complete)
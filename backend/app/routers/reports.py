@@ -0,0 +1,28 @@
+"""
+Router para los informes generados en segundo plano
+
+``POST /`` encola el informe y responde ``202`` con su ID; el cliente consulta
+``GET /{report_id}`` hasta que ``status`` es ``done`` (con ``result``) o
+``failed`` (con ``error``).
+"""
+
+from fastapi import APIRouter, status
+from app.models.schemas import ReportCreate, ReportJobResponse
+from app.services.report_service import ReportService
+from app.core.bulkheads import bulkhead, DEFAULT
+
+router = APIRouter()
+
+
+@router.post("/", response_model=ReportJobResponse, status_code=status.HTTP_202_ACCEPTED)
+@bulkhead(DEFAULT)
+def create_report(report: ReportCreate):
+    """Encolar un informe semanal, mensual o una exportación"""
+    return ReportService.create_report(report)
+
+
+@router.get("/{report_id}", response_model=ReportJobResponse)
+@bulkhead(DEFAULT)
+def get_report(report_id: str):
+    """Obtener el estado, el progreso y, al terminar, el resultado de un informe"""
+    return ReportService.get_report(report_id)
@@ -4,22 +4,29 @@ Router para endpoints de estadísticas
 
 from fastapi import APIRouter, Query
 from typing import Optional
-from app.models.schemas import StatisticsResponse, TaskStats, CategoryStats
+from app.models.schemas import StatisticsResponse, TaskStats, CategoryStats, InsightsResponse
 from app.database.supabase_client import get_supabase
 from app.services.pomodoro_service import PomodoroService
 from app.services.distraction_service import DistractionService
 from app.services.task_service import TaskService
+from app.services.insights_service import InsightsService
+from app.core.single_flight import coalesce
+from app.core.bulkheads import bulkhead, ANALYTICS
+from app.core.stale_cache import serve_stale
 
 router = APIRouter()
 
 
 @router.get("/", response_model=StatisticsResponse)
-async def get_statistics(user_id: Optional[str] = Query(None)):
+@serve_stale("statistics")
+@coalesce("statistics")
+@bulkhead(ANALYTICS)
+def get_statistics(user_id: Optional[str] = Query(None)):
     """Obtener estadísticas generales del usuario"""
     supabase = get_supabase()
     
-    # Obtener todas las tareas
-    tasks = TaskService.get_all_tasks(user_id=user_id)
+    # Obtener todas las tareas (solo los conteos de subtareas)
+    tasks = TaskService.get_all_tasks(user_id=user_id, include_subtasks=False)
     
     # Calcular estadísticas de tareas
     tasks_stats = []
@@ -29,8 +36,8 @@ async def get_statistics(user_id: Optional[str] = Query(None)):
         pomodoros_count = len(pomodoros_result.data) if pomodoros_result.data else 0
         
         # Calcular porcentaje de completitud
-        total_subtasks = len(task.subtasks)
-        completed_subtasks = len([st for st in task.subtasks if st.completed])
+        total_subtasks = task.subtask_total
+        completed_subtasks = task.subtask_completed
         completion_percentage = (completed_subtasks / total_subtasks * 100) if total_subtasks > 0 else 0
         
         tasks_stats.append(TaskStats(
@@ -89,3 +96,15 @@ async def get_statistics(user_id: Optional[str] = Query(None)):
         distractions_count=distractions_count,
         phone_usage_count=phone_usage_count
     )
+
+
+@router.get("/insights", response_model=InsightsResponse)
+@serve_stale("insights")
+@coalesce("insights")
+@bulkhead(ANALYTICS)
+def get_insights(
+    user_id: Optional[str] = Query(None),
+    utc_offset: int = Query(0, ge=-720, le=840, description="Desfase del cliente respecto a UTC en minutos")
+):
+    """Rachas, mapa de calor semanal, tasas de distracción por hora y duración media de las sesiones"""
+    return InsightsService.get_insights(user_id=user_id, utc_offset=utc_offset)
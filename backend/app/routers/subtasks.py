@@ -2,40 +2,68 @@
 Router para endpoints de subtareas
 """
 
-from fastapi import APIRouter
-from typing import List
-from app.models.schemas import SubtaskCreate, SubtaskUpdate, SubtaskResponse
+from fastapi import APIRouter, Query
+from datetime import datetime
+from typing import List, Optional
+from app.models.schemas import SubtaskCreate, SubtaskUpdate, SubtaskResponse, FocusHistoryResponse
 from app.services.subtask_service import SubtaskService
+from app.services.history_service import HistoryService
+from app.core.single_flight import invalidates
+from app.core.bulkheads import bulkhead, ANALYTICS, DEFAULT
+from app.core.stale_cache import serve_stale
 
 router = APIRouter()
 
 
 @router.post("/", response_model=SubtaskResponse)
-async def create_subtask(subtask: SubtaskCreate):
+@invalidates()
+@bulkhead(DEFAULT)
+def create_subtask(subtask: SubtaskCreate):
     """Crear una nueva subtarea"""
     return SubtaskService.create_subtask(subtask)
 
 
 @router.get("/task/{task_id}", response_model=List[SubtaskResponse])
-async def get_subtasks_by_task(task_id: int):
+@serve_stale("subtasks_by_task")
+@bulkhead(DEFAULT)
+def get_subtasks_by_task(task_id: int):
     """Obtener todas las subtareas de una tarea"""
     return SubtaskService.get_subtasks_by_task_id(task_id)
 
 
 @router.get("/{subtask_id}", response_model=SubtaskResponse)
-async def get_subtask(subtask_id: int):
+@serve_stale("subtask")
+@bulkhead(DEFAULT)
+def get_subtask(subtask_id: int):
     """Obtener una subtarea por ID"""
     return SubtaskService.get_subtask_by_id(subtask_id)
 
 
+@router.get("/{subtask_id}/history", response_model=FocusHistoryResponse)
+@serve_stale("subtask_history")
+@bulkhead(ANALYTICS)
+def get_subtask_history(
+    subtask_id: int,
+    before: Optional[datetime] = Query(None, description="Cursor: sesiones completadas antes de este instante"),
+    limit: int = Query(50, ge=1, le=200, description="Sesiones por página"),
+    utc_offset: int = Query(0, ge=-720, le=840, description="Desfase del cliente respecto a UTC en minutos")
+):
+    """Historial de foco de una subtarea: sesiones y tiempo por día, paginado"""
+    return HistoryService.get_subtask_history(subtask_id, before=before, limit=limit, utc_offset=utc_offset)
+
+
 @router.put("/{subtask_id}", response_model=SubtaskResponse)
-async def update_subtask(subtask_id: int, subtask_update: SubtaskUpdate):
+@invalidates()
+@bulkhead(DEFAULT)
+def update_subtask(subtask_id: int, subtask_update: SubtaskUpdate):
     """Actualizar una subtarea"""
     return SubtaskService.update_subtask(subtask_id, subtask_update)
 
 
 @router.delete("/{subtask_id}")
-async def delete_subtask(subtask_id: int):
+@invalidates()
+@bulkhead(DEFAULT)
+def delete_subtask(subtask_id: int):
     """Eliminar una subtarea"""
     SubtaskService.delete_subtask(subtask_id)
     return {"message": "Subtarea eliminada correctamente"}
@@ -0,0 +1,76 @@
+"""
+Router para la sincronización incremental
+
+``GET /api/v1/sync?since=<marca>`` devuelve solo las filas creadas, modificadas
+o eliminadas desde la marca de agua, junto con la marca para la siguiente
+llamada. Las lecturas usan los índices sobre ``updated_at`` y la tabla
+``sync_tombstones``, así el tráfico de refresco depende del volumen de cambios
+y no del volumen de datos.
+
+La nueva marca se fija ``SYNC_WATERMARK_LAG_SECONDS`` antes del inicio de la
+consulta: una fila escrita por una transacción que aún no había confirmado (o
+con el reloj de la base de datos algo adelantado) vuelve a entrar en la
+siguiente sincronización. El cliente debe aplicar los cambios como upserts
+idempotentes.
+
+``POST /api/v1/sync/log`` es el camino inverso: sube en una sola petición el
+registro de operaciones hechas sin conexión.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Query
+from app.config import settings
+from app.models.schemas import OfflineLogRequest, OfflineLogResponse, SyncDeleted, SyncResponse
+from app.services.sync_service import SyncService, USER_TABLES
+from app.services.offline_service import OfflineLogService
+from app.core.single_flight import invalidates
+from app.core.bulkheads import bulkhead, get_bulkhead, DEFAULT
+
+router = APIRouter()
+
+
+@router.get("/", response_model=SyncResponse)
+async def get_changes(
+    user_id: Optional[str] = Query(None),
+    since: Optional[datetime] = Query(None, description="Marca de agua de la sincronización anterior")
+):
+    """Obtener los cambios desde la marca de agua (o una copia completa sin ella)"""
+    now = datetime.now(timezone.utc)
+    watermark = now - timedelta(seconds=settings.SYNC_WATERMARK_LAG_SECONDS)
+
+    if since is not None and since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    # Sin tombstones tan antiguos no se pueden reconstruir los borrados
+    if since is not None and since < now - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS):
+        since = None
+
+    pool = get_bulkhead(DEFAULT)
+    calls = [pool.run(SyncService.get_changed_rows, table, since, user_id) for table in USER_TABLES]
+    calls.append(pool.run(SyncService.get_changed_subtasks, since, user_id))
+    if since is not None:
+        calls.append(pool.run(SyncService.get_deleted, since, user_id))
+    tasks, pomodoros, distractions, subtasks, *deleted = await asyncio.gather(*calls)
+
+    return SyncResponse(
+        watermark=watermark,
+        full=since is None,
+        tasks=tasks,
+        subtasks=subtasks,
+        pomodoros=pomodoros,
+        distractions=distractions,
+        deleted=deleted[0] if deleted else SyncDeleted()
+    )
+
+
+@router.post("/log", response_model=OfflineLogResponse)
+@invalidates()
+@bulkhead(DEFAULT)
+def upload_offline_log(log: OfflineLogRequest):
+    """
+    Aplicar un registro ordenado de operaciones hechas sin conexión y devolver
+    los IDs del cliente reasignados
+    """
+    return OfflineLogService.apply_log(log)
@@ -3,42 +3,75 @@ Router para endpoints de tareas
 """
 
 from fastapi import APIRouter, Query, HTTPException, status
+from datetime import datetime
 from typing import List, Optional
-from app.models.schemas import TaskCreate, TaskUpdate, TaskResponse
+from app.models.schemas import TaskCreate, TaskUpdate, TaskResponse, FocusHistoryResponse
 from app.services.task_service import TaskService
+from app.services.history_service import HistoryService
+from app.core.single_flight import coalesce, invalidates
+from app.core.bulkheads import bulkhead, ANALYTICS, DEFAULT
+from app.core.stale_cache import serve_stale
 
 router = APIRouter()
 
 
 @router.post("/", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
-async def create_task(task: TaskCreate):
+@invalidates()
+@bulkhead(DEFAULT)
+def create_task(task: TaskCreate):
     """Crear una nueva tarea"""
     return TaskService.create_task(task)
 
 
 @router.get("/", response_model=List[TaskResponse])
-async def get_tasks(
+@serve_stale("tasks")
+@coalesce("tasks")
+@bulkhead(DEFAULT)
+def get_tasks(
     user_id: Optional[str] = Query(None, description="ID del usuario para filtrar"),
-    search: Optional[str] = Query(None, description="Búsqueda por título")
+    search: Optional[str] = Query(None, description="Búsqueda por título"),
+    include_subtasks: bool = Query(True, description="False: solo los conteos de subtareas, sin la lista")
 ):
     """Obtener todas las tareas con filtros opcionales"""
-    return TaskService.get_all_tasks(user_id=user_id, search=search)
+    return TaskService.get_all_tasks(user_id=user_id, search=search, include_subtasks=include_subtasks)
 
 
 @router.get("/{task_id}", response_model=TaskResponse)
-async def get_task(task_id: int):
+@serve_stale("task")
+@bulkhead(DEFAULT)
+def get_task(
+    task_id: int,
+    include_subtasks: bool = Query(True, description="False: solo los conteos de subtareas, sin la lista")
+):
     """Obtener una tarea por ID"""
-    return TaskService.get_task_by_id(task_id)
+    return TaskService.get_task_by_id(task_id, include_subtasks=include_subtasks)
+
+
+@router.get("/{task_id}/history", response_model=FocusHistoryResponse)
+@serve_stale("task_history")
+@bulkhead(ANALYTICS)
+def get_task_history(
+    task_id: int,
+    before: Optional[datetime] = Query(None, description="Cursor: sesiones completadas antes de este instante"),
+    limit: int = Query(50, ge=1, le=200, description="Sesiones por página"),
+    utc_offset: int = Query(0, ge=-720, le=840, description="Desfase del cliente respecto a UTC en minutos")
+):
+    """Historial de foco de una tarea: sesiones y tiempo por día, paginado"""
+    return HistoryService.get_task_history(task_id, before=before, limit=limit, utc_offset=utc_offset)
 
 
 @router.put("/{task_id}", response_model=TaskResponse)
-async def update_task(task_id: int, task_update: TaskUpdate):
+@invalidates()
+@bulkhead(DEFAULT)
+def update_task(task_id: int, task_update: TaskUpdate):
     """Actualizar una tarea"""
     return TaskService.update_task(task_id, task_update)
 
 
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_task(task_id: int):
+@invalidates()
+@bulkhead(DEFAULT)
+def delete_task(task_id: int):
     """Eliminar una tarea"""
     TaskService.delete_task(task_id)
     return None
@@ -0,0 +1,111 @@
+"""
+Servicio para los datos de la pantalla principal (dashboard)
+"""
+
+from datetime import datetime
+from typing import List, Optional
+from app.database.supabase_client import get_supabase
+from app.models.schemas import DashboardTask, DashboardSummary, PomodoroResponse
+from app.services.pomodoro_service import PomodoroService, POMODORO_SELECT, with_subtask_ids
+from fastapi import HTTPException, status
+
+
+def _count(result) -> int:
+    """Conteo exacto de una consulta con count='exact'"""
+    return result.count if result.count is not None else len(result.data or [])
+
+
+class DashboardService:
+    """Servicio con una consulta por sección del dashboard"""
+
+    @staticmethod
+    def get_tasks(user_id: Optional[str] = None) -> List[DashboardTask]:
+        """Tareas con el número de subtareas totales y completadas (columnas de la tarea)"""
+        supabase = get_supabase()
+
+        try:
+            query = supabase.table("tasks").select("*")
+            if user_id:
+                query = query.eq("user_id", user_id)
+            result = query.order("created_at", desc=True).execute()
+
+            return [
+                DashboardTask(**task_data)
+                for task_data in result.data or []
+            ]
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error al obtener las tareas del dashboard: {str(e)}"
+            )
+
+    @staticmethod
+    def get_completed_pomodoros_since(since: datetime, user_id: Optional[str] = None) -> int:
+        """Pomodoros (no descansos) completados desde ``since``"""
+        supabase = get_supabase()
+
+        try:
+            query = supabase.table("pomodoros").select("id", count="exact")
+            query = query.eq("completed", True).eq("mode", "pomodoro").gte("completed_at", since.isoformat())
+            if user_id:
+                query = query.eq("user_id", user_id)
+            return _count(query.limit(1).execute())
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error al contar los pomodoros de hoy: {str(e)}"
+            )
+
+    @staticmethod
+    def get_active_pomodoro(user_id: Optional[str] = None) -> Optional[PomodoroResponse]:
+        """Último pomodoro sin completar, si lo hay"""
+        supabase = get_supabase()
+
+        try:
+            query = supabase.table("pomodoros").select(POMODORO_SELECT).eq("completed", False)
+            if user_id:
+                query = query.eq("user_id", user_id)
+            result = query.order("created_at", desc=True).limit(1).execute()
+
+            return PomodoroResponse(**with_subtask_ids(result.data[0])) if result.data else None
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error al obtener el pomodoro activo: {str(e)}"
+            )
+
+    @staticmethod
+    def get_summary(user_id: Optional[str] = None) -> DashboardSummary:
+        """Resumen de estadísticas con consultas de conteo, sin cargar filas completas"""
+        supabase = get_supabase()
+
+        try:
+            tasks_query = supabase.table("tasks").select("time_spent")
+            distractions_query = supabase.table("distractions").select("id", count="exact").eq("had_distractions", True)
+            phone_query = supabase.table("distractions").select("id", count="exact").eq("used_phone", True)
+            if user_id:
+                tasks_query = tasks_query.eq("user_id", user_id)
+                distractions_query = distractions_query.eq("user_id", user_id)
+                phone_query = phone_query.eq("user_id", user_id)
+
+            tasks = tasks_query.execute().data or []
+
+            return DashboardSummary(
+                total_pomodoros=PomodoroService.get_pomodoro_count(user_id=user_id),
+                total_time_spent=sum(task["time_spent"] for task in tasks),
+                distractions_count=_count(distractions_query.limit(1).execute()),
+                phone_usage_count=_count(phone_query.limit(1).execute())
+            )
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error al obtener el resumen: {str(e)}"
+            )
@@ -2,11 +2,23 @@
 Servicio para operaciones con distracciones
 """
 
-from typing import List
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from app.config import settings
 from app.database.supabase_client import get_supabase
-from app.models.schemas import DistractionCreate, DistractionResponse
+from app.models.schemas import DistractionCreate, DistractionQueuedResponse, DistractionResponse
 from fastapi import HTTPException, status
 from app.services.pomodoro_service import PomodoroService
+from app.core.events import publish_change, CREATE
+from app.core.history_cache import history_cache
+from app.core.single_flight import single_flight
+from app.core.write_behind import WriteBehindQueue
+from app.database.references import fetch_references, require_references
+
+logger = logging.getLogger("mypomodoro.distractions")
 
 
 class DistractionService:
@@ -17,8 +29,8 @@ class DistractionService:
         """Crear un nuevo registro de distracción"""
         supabase = get_supabase()
         
-        # Verificar que el pomodoro existe
-        PomodoroService.get_pomodoro_by_id(distraction.pomodoro_id)
+        # Verificar que el pomodoro existe (solo id y user_id)
+        require_references({"pomodoros": [distraction.pomodoro_id]}, user_id=distraction.user_id)
         
         distraction_data = distraction.model_dump(exclude_unset=True)
         
@@ -31,7 +43,10 @@ class DistractionService:
                     detail="Error al crear el registro de distracción"
                 )
             
-            return DistractionResponse(**result.data[0])
+            created = DistractionResponse(**result.data[0])
+            history_cache.update(created.user_id, lambda history: history.add_distractions(result.data[:1]))
+            publish_change("distractions", CREATE, created.id, user_id=created.user_id)
+            return created
         except HTTPException:
             raise
         except Exception as e:
@@ -40,6 +55,53 @@ class DistractionService:
                 detail=f"Error al crear el registro de distracción: {str(e)}"
             )
     
+    @staticmethod
+    def enqueue_distraction(distraction: DistractionCreate) -> DistractionQueuedResponse:
+        """
+        Aceptar un registro de distracción sin escribirlo: se guarda en lote
+        junto con otros (``write_distractions``). El momento del registro es
+        el de la petición, no el de la escritura. El pomodoro y su dueño se
+        comprueban al encolar (404/403), para que un registro inválido no
+        llegue al lote.
+        """
+        require_references({"pomodoros": [distraction.pomodoro_id]}, user_id=distraction.user_id)
+
+        record = distraction.model_dump(mode="json", exclude_unset=True)
+        record["created_at"] = datetime.now(timezone.utc).isoformat()
+        return DistractionQueuedResponse(pending=get_distraction_writer().submit(record))
+
+    @staticmethod
+    def write_distractions(records: List[Dict[str, Any]]) -> int:
+        """
+        Escribir un lote diferido: una consulta ``IN`` comprueba que los
+        pomodoros siguen existiendo y un único insert guarda los registros
+        válidos (los de pomodoros borrados se descartan). Los errores se
+        propagan para que el lote se reintente.
+        """
+        supabase = get_supabase()
+
+        # Sin caché: un pomodoro borrado haría fallar el insert de todo el lote
+        known = fetch_references("pomodoros", [record["pomodoro_id"] for record in records], use_cache=False)
+        valid = [record for record in records if record["pomodoro_id"] in known]
+        if len(valid) < len(records):
+            logger.warning("Descartados %d registros de distracción de pomodoros inexistentes",
+                           len(records) - len(valid))
+        if not valid:
+            return 0
+
+        result = supabase.table("distractions").insert(valid).execute()
+        created = result.data or []
+
+        by_user: Dict[Optional[str], List[Dict[str, Any]]] = defaultdict(list)
+        for row in created:
+            by_user[row.get("user_id")].append(row)
+        for user_id, rows in by_user.items():
+            history_cache.update(user_id, lambda history, rows=rows: history.add_distractions(rows))
+            single_flight.invalidate(user_id)
+        for row in created:
+            publish_change("distractions", CREATE, row["id"], user_id=row.get("user_id"))
+        return len(created)
+
     @staticmethod
     def get_distraction_by_id(distraction_id: int) -> DistractionResponse:
         """Obtener un registro de distracción por ID"""
@@ -97,8 +159,48 @@ class DistractionService:
             result = query.order("created_at", desc=True).execute()
             
             return [DistractionResponse(**d) for d in result.data] if result.data else []
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error al obtener las distracciones: {str(e)}"
             )
+
+
+_writer: Optional[WriteBehindQueue] = None
+_writer_lock = threading.Lock()
+
+
+def get_distraction_writer() -> WriteBehindQueue:
+    """Cola de escritura diferida de distracciones según Settings"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = WriteBehindQueue(
+                "distractions",
+                DistractionService.write_distractions,
+                batch_size=settings.DISTRACTION_BATCH_SIZE,
+                interval=settings.DISTRACTION_FLUSH_INTERVAL,
+                max_pending=settings.DISTRACTION_QUEUE_MAX,
+                max_retries=settings.DISTRACTION_MAX_RETRIES,
+                retry_backoff=settings.DISTRACTION_RETRY_BACKOFF,
+                wal_path=settings.DISTRACTION_WAL_PATH,
+            )
+        return _writer
+
+
+def close_distraction_writer():
+    """Escribir lo pendiente y detener la cola"""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.close()
+
+
+def distraction_writer_stats() -> Dict[str, Any]:
+    """Estado de la cola para /metrics (sin crearla)"""
+    with _writer_lock:
+        writer = _writer
+    return writer.snapshot() if writer is not None else {"pending": 0}
@@ -0,0 +1,75 @@
+"""
+Servicio para el historial de foco de tareas y subtareas
+
+Las sesiones salen de la RPC ``get_focus_sessions``, que recorre por índice
+(``idx_pomodoros_task_focus`` o ``pomodoro_subtasks``) solo la página pedida:
+el coste depende del tamaño de página y no de todo el historial del usuario.
+"""
+
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from app.database.supabase_client import get_supabase
+from app.models.schemas import FocusDay, FocusHistoryResponse, FocusSession
+from app.services.task_service import TaskService
+from app.services.subtask_service import SubtaskService
+from fastapi import HTTPException, status
+
+
+class HistoryService:
+    """Servicio para consultar el historial de foco"""
+
+    @staticmethod
+    def get_task_history(task_id: int, before: Optional[datetime] = None, limit: int = 50,
+                         utc_offset: int = 0) -> FocusHistoryResponse:
+        """Sesiones de foco de una tarea (por pomodoros.task_id)"""
+        TaskService.get_task_by_id(task_id)
+        return HistoryService._get_history({"p_task_id": task_id}, before, limit, utc_offset)
+
+    @staticmethod
+    def get_subtask_history(subtask_id: int, before: Optional[datetime] = None, limit: int = 50,
+                            utc_offset: int = 0) -> FocusHistoryResponse:
+        """Sesiones de foco de una subtarea (por pomodoro_subtasks)"""
+        SubtaskService.get_subtask_by_id(subtask_id)
+        return HistoryService._get_history({"p_subtask_id": subtask_id}, before, limit, utc_offset)
+
+    @staticmethod
+    def _get_history(target: Dict[str, int], before: Optional[datetime], limit: int,
+                     utc_offset: int) -> FocusHistoryResponse:
+        supabase = get_supabase()
+
+        try:
+            # Una fila de más para saber si hay página siguiente
+            result = supabase.rpc("get_focus_sessions", {
+                **target,
+                "p_before": before.isoformat() if before else None,
+                "p_limit": limit + 1
+            }).execute()
+            sessions = [FocusSession(**row) for row in result.data or []]
+
+            next_before = sessions[limit - 1].completed_at if len(sessions) > limit else None
+            sessions = sessions[:limit]
+            return FocusHistoryResponse(
+                sessions=sessions,
+                days=HistoryService._group_by_day(sessions, utc_offset),
+                next_before=next_before
+            )
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error al obtener el historial: {str(e)}"
+            )
+
+    @staticmethod
+    def _group_by_day(sessions: List[FocusSession], utc_offset: int) -> List[FocusDay]:
+        """Tiempo de foco por día local (``utc_offset`` en minutos), del más reciente al más antiguo"""
+        days: "OrderedDict[Any, Dict[str, int]]" = OrderedDict()
+        offset = timedelta(minutes=utc_offset)
+        for session in sessions:
+            day = (session.completed_at + offset).date()
+            totals = days.setdefault(day, {"sessions": 0, "focus_time": 0})
+            totals["sessions"] += 1
+            totals["focus_time"] += session.duration
+        return [FocusDay(day=day, **totals) for day, totals in days.items()]
@@ -0,0 +1,316 @@
+"""
+Servicio de analítica de foco vectorizada (NumPy)
+
+El historial de un usuario se carga en columnas compactas (``FocusHistory``):
+instantes en segundos epoch, duraciones, códigos de modo, IDs de tarea e
+indicadores de distracción. Rachas, mapa de calor por hora de la semana y
+tasas de distracción se calculan con operaciones vectorizadas sobre esas
+columnas, sin objetos por fila, así que escalan a usuarios con cientos de
+miles de sesiones. Las columnas crecen por añadidos, así el historial de los
+usuarios activos se mantiene en memoria (``app.core.history_cache``) y se
+actualiza con cada pomodoro completado o distracción registrada.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.core.history_cache import history_cache
+from app.database.supabase_client import get_supabase
+from app.models.schemas import InsightsResponse
+from fastapi import HTTPException, status
+
+
+# Códigos de modo en la columna ``mode`` (int8)
+MODE_CODES = {"pomodoro": 0, "shortBreak": 1, "longBreak": 2}
+FOCUS = MODE_CODES["pomodoro"]
+
+# Sin tarea en la columna ``task_id``
+NO_TASK = -1
+
+SECONDS_PER_DAY = 86400
+HOURS_PER_WEEK = 7 * 24
+
+
+def _epoch(value: str) -> int:
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+# Columnas de cada grupo y su tipo
+SESSION_COLUMNS = {"id": np.int64, "completed_at": np.int64, "duration": np.int32, "mode": np.int8, "task_id": np.int64}
+DISTRACTION_COLUMNS = {"id": np.int64, "created_at": np.int64, "had_distractions": np.bool_, "used_phone": np.bool_}
+
+
+class ColumnGroup:
+    """
+    Columnas NumPy de la misma longitud con capacidad de reserva: añadir filas
+    es amortizado O(1) porque la capacidad crece al doble.
+    """
+
+    def __init__(self, dtypes: Dict[str, Any]):
+        self.dtypes = dtypes
+        self.size = 0
+        self._arrays: Dict[str, np.ndarray] = {name: np.empty(0, dtype) for name, dtype in dtypes.items()}
+
+    def column(self, name: str) -> np.ndarray:
+        return self._arrays[name][:self.size]
+
+    def extend(self, values: Dict[str, np.ndarray]):
+        """Añadir filas (una columna por clave, todas de la misma longitud)"""
+        count = len(next(iter(values.values())))
+        needed = self.size + count
+        arrays = self._arrays
+        capacity = len(arrays["id"])
+        if needed > capacity:
+            capacity = max(needed, 2 * capacity, 16)
+            arrays = {}
+            for name, dtype in self.dtypes.items():
+                arrays[name] = np.empty(capacity, dtype)
+                arrays[name][:self.size] = self._arrays[name][:self.size]
+        for name in self.dtypes:
+            arrays[name][self.size:needed] = values[name]
+        # Primero los datos y después el tamaño: una vista tomada a la vez sigue siendo coherente
+        self._arrays = arrays
+        self.size = needed
+
+    def view(self) -> "ColumnGroup":
+        """Copia de solo lectura con el tamaño actual (comparte los arrays)"""
+        size = self.size
+        group = ColumnGroup.__new__(ColumnGroup)
+        group.dtypes = self.dtypes
+        group.size = size
+        group._arrays = {name: array[:size] for name, array in self._arrays.items()}
+        return group
+
+    @property
+    def nbytes(self) -> int:
+        """Memoria reservada (incluida la capacidad de reserva)"""
+        return sum(array.nbytes for array in self._arrays.values())
+
+
+class FocusHistory:
+    """
+    Historial de un usuario en columnas (struct-of-arrays): los pomodoros
+    completados (instante en segundos epoch, duración, código de modo y tarea,
+    ``NO_TASK`` si no tiene) y los registros de distracción.
+    """
+
+    def __init__(self):
+        self._sessions = ColumnGroup(SESSION_COLUMNS)
+        self._distractions = ColumnGroup(DISTRACTION_COLUMNS)
+
+    @classmethod
+    def from_rows(cls, pomodoros: List[Dict[str, Any]], distractions: List[Dict[str, Any]]) -> "FocusHistory":
+        """Construir las columnas a partir de filas de PostgREST"""
+        history = cls()
+        history.add_sessions(pomodoros)
+        history.add_distractions(distractions)
+        return history
+
+    @staticmethod
+    def _new_rows(group: ColumnGroup, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        ids = np.fromiter((row["id"] for row in rows), np.int64, len(rows))
+        known = np.isin(ids, group.column("id"))
+        return [row for row, seen in zip(rows, known) if not seen]
+
+    def add_sessions(self, pomodoros: List[Dict[str, Any]]):
+        """Añadir pomodoros completados (se ignoran los ya presentes y los no completados)"""
+        rows = self._new_rows(self._sessions, [p for p in pomodoros if p.get("completed_at")])
+        if not rows:
+            return
+        count = len(rows)
+        self._sessions.extend({
+            "id": np.fromiter((p["id"] for p in rows), np.int64, count),
+            "completed_at": np.fromiter((_epoch(p["completed_at"]) for p in rows), np.int64, count),
+            "duration": np.fromiter((p["duration"] or 0 for p in rows), np.int32, count),
+            "mode": np.fromiter((MODE_CODES.get(p["mode"], FOCUS) for p in rows), np.int8, count),
+            "task_id": np.fromiter((NO_TASK if p["task_id"] is None else p["task_id"] for p in rows), np.int64, count),
+        })
+
+    def add_distractions(self, distractions: List[Dict[str, Any]]):
+        """Añadir registros de distracción (se ignoran los ya presentes)"""
+        rows = self._new_rows(self._distractions, distractions)
+        if not rows:
+            return
+        count = len(rows)
+        self._distractions.extend({
+            "id": np.fromiter((d["id"] for d in rows), np.int64, count),
+            "created_at": np.fromiter((_epoch(d["created_at"]) for d in rows), np.int64, count),
+            "had_distractions": np.fromiter((bool(d["had_distractions"]) for d in rows), np.bool_, count),
+            "used_phone": np.fromiter((bool(d["used_phone"]) for d in rows), np.bool_, count),
+        })
+
+    def view(self) -> "FocusHistory":
+        """Instantánea coherente para leer mientras otros hilos añaden filas"""
+        history = FocusHistory.__new__(FocusHistory)
+        history._sessions = self._sessions.view()
+        history._distractions = self._distractions.view()
+        return history
+
+    @property
+    def completed_at(self) -> np.ndarray:
+        return self._sessions.column("completed_at")
+
+    @property
+    def duration(self) -> np.ndarray:
+        return self._sessions.column("duration")
+
+    @property
+    def mode(self) -> np.ndarray:
+        return self._sessions.column("mode")
+
+    @property
+    def task_id(self) -> np.ndarray:
+        return self._sessions.column("task_id")
+
+    @property
+    def distraction_at(self) -> np.ndarray:
+        return self._distractions.column("created_at")
+
+    @property
+    def had_distractions(self) -> np.ndarray:
+        return self._distractions.column("had_distractions")
+
+    @property
+    def used_phone(self) -> np.ndarray:
+        return self._distractions.column("used_phone")
+
+    @property
+    def sessions(self) -> int:
+        return self._sessions.size
+
+    @property
+    def distractions(self) -> int:
+        return self._distractions.size
+
+    @property
+    def nbytes(self) -> int:
+        """Memoria ocupada por las columnas"""
+        return self._sessions.nbytes + self._distractions.nbytes
+
+
+def daily_streaks(day_numbers: np.ndarray, today: int) -> Dict[str, int]:
+    """
+    Racha actual y racha más larga de días consecutivos con actividad.
+    ``day_numbers`` son días desde epoch (con repeticiones y en cualquier orden).
+    La racha actual sigue viva si el último día con actividad es hoy o ayer.
+    """
+    days = np.unique(day_numbers)
+    if days.size == 0:
+        return {"current": 0, "longest": 0}
+
+    # Cada hueco entre días consecutivos abre una racha nueva
+    breaks = np.flatnonzero(np.diff(days) != 1) + 1
+    starts = np.concatenate(([0], breaks))
+    lengths = np.diff(np.concatenate((starts, [days.size])))
+
+    current = int(lengths[-1]) if today - days[-1] <= 1 else 0
+    return {"current": current, "longest": int(lengths.max())}
+
+
+def hour_of_week(epoch_seconds: np.ndarray, utc_offset: int) -> np.ndarray:
+    """Hora de la semana local (0 = lunes 00:00 ... 167 = domingo 23:00)"""
+    local = epoch_seconds + utc_offset * 60
+    # El 1 de enero de 1970 fue jueves (día 3 contando desde el lunes)
+    weekday = (local // SECONDS_PER_DAY + 3) % 7
+    hour = (local % SECONDS_PER_DAY) // 3600
+    return weekday * 24 + hour
+
+
+def rate_by_hour(epoch_seconds: np.ndarray, flags: np.ndarray, utc_offset: int) -> List[Optional[float]]:
+    """Fracción de registros con ``flags`` por hora local del día (None si no hay registros)"""
+    hours = ((epoch_seconds + utc_offset * 60) % SECONDS_PER_DAY) // 3600
+    totals = np.bincount(hours, minlength=24)
+    hits = np.bincount(hours, weights=flags.astype(np.float64), minlength=24)
+    rates = np.divide(hits, totals, out=np.zeros(24), where=totals > 0)
+    return [round(float(rate), 4) if total else None for rate, total in zip(rates, totals)]
+
+
+def compute_insights(history: FocusHistory, utc_offset: int = 0, now: Optional[datetime] = None) -> InsightsResponse:
+    """Calcular todas las métricas a partir de las columnas del historial"""
+    now = now or datetime.now(timezone.utc)
+    focus = history.mode == FOCUS
+    focus_at = history.completed_at[focus]
+    focus_duration = history.duration[focus].astype(np.int64)
+
+    offset = utc_offset * 60
+    today = (int(now.timestamp()) + offset) // SECONDS_PER_DAY
+    streaks = daily_streaks((focus_at + offset) // SECONDS_PER_DAY, today)
+
+    heatmap = np.bincount(hour_of_week(focus_at, utc_offset), weights=focus_duration, minlength=HOURS_PER_WEEK)
+
+    return InsightsResponse(
+        total_sessions=int(focus_at.size),
+        total_focus_time=int(focus_duration.sum()),
+        average_session=round(float(focus_duration.mean()), 2) if focus_at.size else 0.0,
+        current_streak=streaks["current"],
+        longest_streak=streaks["longest"],
+        heatmap=heatmap.astype(np.int64).reshape(7, 24).tolist(),
+        distraction_rate_by_hour=rate_by_hour(history.distraction_at, history.had_distractions, utc_offset),
+        phone_rate_by_hour=rate_by_hour(history.distraction_at, history.used_phone, utc_offset),
+    )
+
+
+class InsightsService:
+    """Servicio para cargar el historial de un usuario y calcular sus métricas"""
+
+    @staticmethod
+    def _fetch_all(table: str, columns: str, user_id: Optional[str], completed_only: bool = False,
+                   time_range: Optional[Tuple[str, datetime, datetime]] = None) -> List[Dict[str, Any]]:
+        """
+        Todas las filas, en páginas de ``INSIGHTS_PAGE_SIZE`` (PostgREST limita
+        las filas por respuesta). Se pagina por ``id`` en lugar de por offset
+        para que cada página cueste lo mismo. ``time_range`` (columna, desde,
+        hasta exclusivo) limita las filas a un intervalo.
+        """
+        supabase = get_supabase()
+        page_size = settings.INSIGHTS_PAGE_SIZE
+        rows: List[Dict[str, Any]] = []
+        while True:
+            query = supabase.table(table).select(columns)
+            if completed_only:
+                query = query.eq("completed", True)
+            if user_id:
+                query = query.eq("user_id", user_id)
+            if time_range:
+                column, since, until = time_range
+                query = query.gte(column, since.isoformat()).lt(column, until.isoformat())
+            if rows:
+                query = query.gt("id", rows[-1]["id"])
+            page = query.order("id").limit(page_size).execute().data or []
+            rows.extend(page)
+            if len(page) < page_size:
+                return rows
+
+    @staticmethod
+    def load_history(user_id: Optional[str] = None) -> FocusHistory:
+        """Cargar el historial del usuario en columnas"""
+        try:
+            pomodoros = InsightsService._fetch_all(
+                "pomodoros", "id, mode, task_id, duration, completed_at", user_id, completed_only=True
+            )
+            distractions = InsightsService._fetch_all(
+                "distractions", "id, had_distractions, used_phone, created_at", user_id
+            )
+            return FocusHistory.from_rows(pomodoros, distractions)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error al cargar el historial: {str(e)}"
+            )
+
+    @staticmethod
+    def get_insights(user_id: Optional[str] = None, utc_offset: int = 0) -> InsightsResponse:
+        """
+        Métricas de foco del usuario. El historial sale de ``history_cache``
+        (sin consultas mientras el usuario siga en caché).
+        """
+        history = history_cache.get(user_id, lambda: InsightsService.load_history(user_id))
+        return compute_insights(history.view(), utc_offset)
@@ -0,0 +1,452 @@
+"""
+Servicio para aplicar el registro de operaciones hechas sin conexión
+
+El frontend trabaja con ``cache.js`` sin sesión y al reconectar sube todo lo
+hecho en una sola petición. El registro se aplica así:
+
+1. Se valida completo antes de escribir nada (esquemas de cada entidad y
+   referencias a IDs del cliente que se crean antes en el registro).
+2. Se leen de una vez (una consulta ``IN`` por tabla) las filas del servidor a
+   las que se refiere, para resolver conflictos: gana la última escritura según
+   ``updated_at`` (la del servidor frente al momento del cambio en el cliente).
+   Esas filas, y las que referencian las operaciones, deben ser del usuario del
+   registro (403); las subtareas se comprueban a través de su tarea.
+3. Se aplica en orden reasignando los IDs del cliente a los del servidor. Los
+   borrados se aplican al final, cuando ya no puede fallar nada más.
+4. Si una operación falla se deshace lo aplicado (en orden inverso) y no se
+   aplica ningún cambio. Como PostgREST no ofrece transacciones entre llamadas,
+   lo borrado en cascada no se restaura y ``updated_at`` queda con la hora de
+   la restauración. Se deshace sin el plazo de la petición (``shielded``): un
+   504 no deja el registro a medias. Si aun así algo no se puede deshacer se
+   responde 409 con las operaciones que siguen aplicadas y sus IDs, para que
+   el cliente no reenvíe el registro completo a ciegas.
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+from pydantic import ValidationError
+from app.database.supabase_client import get_supabase
+from app.database.references import fetch_references
+from app.core.deadlines import shielded
+from app.core.events import publish_change, CREATE, UPDATE, DELETE
+from app.core.single_flight import single_flight
+from app.core.history_cache import affects_history, history_cache
+from app.models.schemas import (
+    DistractionCreate, OfflineAction, OfflineEntity, OfflineLogRequest, OfflineLogResponse,
+    OfflineOperation, OfflineOperationResult, OfflineOperationStatus, PomodoroCreate,
+    PomodoroUpdate, SubtaskCreate, SubtaskUpdate, TaskCreate, TaskUpdate
+)
+from app.services.pomodoro_service import MODE_DURATIONS, POMODORO_SELECT, PomodoroService, with_subtask_ids
+from fastapi import HTTPException, status
+
+logger = logging.getLogger("mypomodoro.offline")
+
+TABLES = {
+    OfflineEntity.TASK: "tasks",
+    OfflineEntity.SUBTASK: "subtasks",
+    OfflineEntity.POMODORO: "pomodoros",
+    OfflineEntity.DISTRACTION: "distractions",
+}
+
+CREATE_MODELS = {
+    OfflineEntity.TASK: TaskCreate,
+    OfflineEntity.SUBTASK: SubtaskCreate,
+    OfflineEntity.POMODORO: PomodoroCreate,
+    OfflineEntity.DISTRACTION: DistractionCreate,
+}
+
+UPDATE_MODELS = {
+    OfflineEntity.TASK: TaskUpdate,
+    OfflineEntity.SUBTASK: SubtaskUpdate,
+    OfflineEntity.POMODORO: PomodoroUpdate,
+}
+
+# Entidades con columna user_id propia
+OWNED_ENTITIES = {OfflineEntity.TASK, OfflineEntity.POMODORO, OfflineEntity.DISTRACTION}
+
+# Columnas que referencian a otras filas (y admiten IDs del cliente)
+REFERENCE_COLUMNS = ("task_id", "pomodoro_id")
+
+# Valor con el que se validan las referencias aún pendientes de crear
+PENDING_ID = 0
+
+Undo = Tuple[int, str, str, Any]  # (operación, acción, tabla, fila o ID)
+
+
+def _invalid(index: int, detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        detail=f"Operación {index}: {detail}"
+    )
+
+
+def _is_server_id(value: Union[int, str]) -> bool:
+    return isinstance(value, int) or (isinstance(value, str) and value.isdigit())
+
+
+def _parse_timestamp(value: Union[str, datetime]) -> datetime:
+    parsed = value if isinstance(value, datetime) else datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class _Plan:
+    """Operación validada, lista para aplicar"""
+
+    def __init__(self, index: int, operation: OfflineOperation, payload: Optional[Dict[str, Any]]):
+        self.index = index
+        self.operation = operation
+        self.table = TABLES[operation.entity]
+        self.key = str(operation.id)
+        self.payload = payload
+
+
+class OfflineLogService:
+    """Servicio para aplicar registros de operaciones sin conexión"""
+
+    @staticmethod
+    def apply_log(log: OfflineLogRequest) -> OfflineLogResponse:
+        """Aplicar el registro completo o ninguna de sus operaciones"""
+        plans = OfflineLogService._validate(log)
+        snapshots = OfflineLogService._fetch_targets(plans)
+        OfflineLogService._check_ownership(plans, snapshots, log.user_id)
+        return _LogApplier(snapshots).run(plans, log.user_id)
+
+    @staticmethod
+    def _validate(log: OfflineLogRequest) -> List[_Plan]:
+        """Validar todas las operaciones antes de escribir nada"""
+        created: Set[str] = set()
+        plans = []
+
+        def check_reference(index: int, value: Any):
+            if str(value) not in created and not _is_server_id(value):
+                raise _invalid(index, f"referencia a un ID desconocido: {value}")
+
+        for index, operation in enumerate(log.operations):
+            key = str(operation.id)
+            entity = operation.entity
+            if operation.action != OfflineAction.CREATE:
+                check_reference(index, operation.id)
+
+            payload: Optional[Dict[str, Any]] = None
+            if operation.action in (OfflineAction.CREATE, OfflineAction.UPDATE):
+                model = CREATE_MODELS.get(entity) if operation.action == OfflineAction.CREATE else UPDATE_MODELS.get(entity)
+                if model is None:
+                    raise _invalid(index, f"no se puede actualizar {entity.value}")
+
+                data = dict(operation.data)
+                data.pop("id", None)
+                if operation.action == OfflineAction.CREATE and entity in OWNED_ENTITIES and log.user_id:
+                    data.setdefault("user_id", log.user_id)
+
+                # Las referencias a IDs del cliente se validan con un ID provisional
+                references = {column: data[column] for column in REFERENCE_COLUMNS if data.get(column) is not None}
+                subtask_refs = data.get("subtask_ids") or []
+                for value in [*references.values(), *subtask_refs]:
+                    check_reference(index, value)
+                candidate = dict(data)
+                candidate.update({c: v if _is_server_id(v) else PENDING_ID for c, v in references.items()})
+                if "subtask_ids" in data and data["subtask_ids"] is not None:
+                    candidate["subtask_ids"] = [v if _is_server_id(v) else PENDING_ID for v in subtask_refs]
+
+                try:
+                    validated = model(**candidate)
+                except ValidationError as e:
+                    raise _invalid(index, str(e))
+
+                payload = validated.model_dump(mode="json", exclude_unset=True)
+                payload.update(references)
+                if "subtask_ids" in payload:
+                    payload["subtask_ids"] = data["subtask_ids"]
+                if entity == OfflineEntity.POMODORO and operation.action == OfflineAction.CREATE \
+                        and not payload.get("duration"):
+                    payload["duration"] = MODE_DURATIONS.get(payload.get("mode", "pomodoro"), 1500)
+
+            elif operation.action == OfflineAction.COMPLETE:
+                if entity == OfflineEntity.DISTRACTION:
+                    raise _invalid(index, "las distracciones no se completan")
+                if entity == OfflineEntity.POMODORO:
+                    payload = {"actual_duration": operation.data.get("actual_duration")}
+                else:
+                    payload = {"completed": True}
+
+            if operation.action == OfflineAction.CREATE:
+                if key in created:
+                    raise _invalid(index, f"ID del cliente repetido: {key}")
+                created.add(key)
+            plans.append(_Plan(index, operation, payload))
+
+        return plans
+
+    @staticmethod
+    def _fetch_targets(plans: List[_Plan]) -> Dict[str, Dict[int, dict]]:
+        """Filas actuales del servidor afectadas por el registro (una consulta por tabla)"""
+        supabase = get_supabase()
+        created = {plan.key for plan in plans if plan.operation.action == OfflineAction.CREATE}
+
+        ids: Dict[str, Set[int]] = {}
+        for plan in plans:
+            if plan.operation.action != OfflineAction.CREATE and plan.key not in created:
+                ids.setdefault(plan.table, set()).add(int(plan.key))
+
+        try:
+            snapshots = {}
+            for table, table_ids in ids.items():
+                columns = POMODORO_SELECT if table == "pomodoros" else "*"
+                result = supabase.table(table).select(columns).in_("id", sorted(table_ids)).execute()
+                snapshots[table] = {row["id"]: with_subtask_ids(row) for row in result.data or []}
+            return snapshots
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error al leer las filas del registro: {str(e)}"
+            )
+
+    @staticmethod
+    def _check_ownership(plans: List[_Plan], snapshots: Dict[str, Dict[int, dict]],
+                         user_id: Optional[str]):
+        """
+        Las filas del servidor que el registro modifica o referencia deben ser
+        de ``user_id`` (403). Las que no existen se dejan pasar: los objetivos
+        quedan como ``missing`` y las referencias las rechaza la clave foránea.
+        """
+        if not user_id:
+            return
+        created = {plan.key for plan in plans if plan.operation.action == OfflineAction.CREATE}
+
+        def is_server_row(value: Any) -> bool:
+            return str(value) not in created and _is_server_id(value)
+
+        references: Dict[str, Set[int]] = {}
+        for plan in plans:
+            payload = plan.payload or {}
+            for column, table in (("task_id", "tasks"), ("pomodoro_id", "pomodoros")):
+                if payload.get(column) is not None and is_server_row(payload[column]):
+                    references.setdefault(table, set()).add(int(payload[column]))
+            for value in payload.get("subtask_ids") or []:
+                if is_server_row(value):
+                    references.setdefault("subtasks", set()).add(int(value))
+
+        try:
+            rows = {table: dict(table_rows) for table, table_rows in snapshots.items()}
+            for table, ids in references.items():
+                rows.setdefault(table, {}).update(fetch_references(table, ids))
+            # Las subtareas no tienen user_id: el dueño es el de su tarea
+            parents = fetch_references("tasks", [row["task_id"] for row in rows.get("subtasks", {}).values()])
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error al comprobar las filas del registro: {str(e)}"
+            )
+
+        for table, table_rows in rows.items():
+            for record_id, row in table_rows.items():
+                if table == "subtasks":
+                    owner = parents.get(row["task_id"], {}).get("user_id")
+                else:
+                    owner = row.get("user_id")
+                if owner and owner != user_id:
+                    raise HTTPException(
+                        status_code=status.HTTP_403_FORBIDDEN,
+                        detail=f"La fila {record_id} de {table} pertenece a otro usuario"
+                    )
+
+
+class _LogApplier:
+    """Estado de la aplicación de un registro: IDs reasignados, filas actuales y deshacer"""
+
+    def __init__(self, snapshots: Dict[str, Dict[int, dict]]):
+        self.supabase = get_supabase()
+        self.current = snapshots
+        self.id_map: Dict[str, int] = {}
+        self.touched: Set[Tuple[str, int]] = set()
+        self.undo: List[Undo] = []
+        # Operación en curso (para saber qué queda aplicado si falla el deshacer)
+        self.index = 0
+        self.keys: Dict[int, str] = {}
+        # Eventos de cambio: se publican solo si se aplica el registro completo
+        self.changes: List[Tuple[str, str, dict]] = []
+
+    def resolve(self, value: Union[int, str]) -> int:
+        key = str(value)
+        return self.id_map[key] if key in self.id_map else int(value)
+
+    def run(self, plans: List[_Plan], user_id: Optional[str]) -> OfflineLogResponse:
+        results: Dict[int, OfflineOperationResult] = {}
+        # Los borrados van al final: así nunca hay que restaurar filas borradas
+        # por un fallo posterior
+        ordered = [p for p in plans if p.operation.action != OfflineAction.DELETE] + \
+                  [p for p in plans if p.operation.action == OfflineAction.DELETE]
+
+        for plan in ordered:
+            self.index = plan.index
+            try:
+                results[plan.index] = self.apply(plan)
+            except Exception as e:
+                with shielded():
+                    still_applied = self.rollback()
+                if still_applied:
+                    raise self.partially_applied(plan.index, e, still_applied, user_id)
+                if isinstance(e, HTTPException):
+                    raise
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Operación {plan.index} no aplicada ({str(e)}); no se ha aplicado ningún cambio"
+                )
+
+        for table, action, row in self.changes:
+            if affects_history(table, action):
+                history_cache.invalidate(row.get("user_id") or user_id)
+            publish_change(table, action, row["id"], user_id=row.get("user_id"), task_id=row.get("task_id"))
+
+        return OfflineLogResponse(
+            user_id=user_id,
+            id_map=self.id_map,
+            results=[results[index] for index in sorted(results)]
+        )
+
+    def apply(self, plan: _Plan) -> OfflineOperationResult:
+        action = plan.operation.action
+        if action == OfflineAction.CREATE:
+            return self.create(plan)
+
+        row_id = self.resolve(plan.key)
+        row = self.current.get(plan.table, {}).get(row_id)
+        changed = True
+        if row is None:
+            return OfflineOperationResult(index=plan.index, status=OfflineOperationStatus.MISSING, id=row_id)
+        # Última escritura gana, salvo en filas que ya ha tocado este registro
+        if (plan.table, row_id) not in self.touched and \
+                _parse_timestamp(row["updated_at"]) > _parse_timestamp(plan.operation.updated_at):
+            return OfflineOperationResult(index=plan.index, status=OfflineOperationStatus.CONFLICT, id=row_id)
+
+        if action == OfflineAction.DELETE:
+            self.supabase.table(plan.table).delete().eq("id", row_id).execute()
+            self.undo.append((self.index, "insert", plan.table, row))
+            self.changes.append((plan.table, DELETE, row))
+            self.current[plan.table].pop(row_id, None)
+        elif action == OfflineAction.COMPLETE and plan.table == "pomodoros":
+            changed = self.complete_pomodoro(row, plan.payload["actual_duration"])
+        else:
+            self.update(plan.table, row, self.resolve_references(plan.payload))
+
+        if action != OfflineAction.DELETE and changed:
+            self.changes.append((plan.table, UPDATE, self.current[plan.table][row_id]))
+        self.touched.add((plan.table, row_id))
+        return OfflineOperationResult(index=plan.index, status=OfflineOperationStatus.APPLIED, id=row_id)
+
+    def resolve_references(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        payload = dict(payload)
+        for column in REFERENCE_COLUMNS:
+            if payload.get(column) is not None:
+                payload[column] = self.resolve(payload[column])
+        if payload.get("subtask_ids"):
+            payload["subtask_ids"] = [self.resolve(value) for value in payload["subtask_ids"]]
+        return payload
+
+    def create(self, plan: _Plan) -> OfflineOperationResult:
+        payload = self.resolve_references(plan.payload)
+        subtask_ids = list(dict.fromkeys(payload.pop("subtask_ids", None) or []))
+        result = self.supabase.table(plan.table).insert(payload).execute()
+        row = result.data[0]
+        self.undo.append((self.index, "delete", plan.table, row["id"]))
+        if plan.table == "pomodoros":
+            # Las relaciones se borran en cascada si hay que deshacer el alta
+            PomodoroService.set_subtask_links(row["id"], subtask_ids)
+            row["subtask_ids"] = subtask_ids
+        self.changes.append((plan.table, CREATE, row))
+        self.id_map[plan.key] = row["id"]
+        self.keys[plan.index] = plan.key
+        self.current.setdefault(plan.table, {})[row["id"]] = row
+        self.touched.add((plan.table, row["id"]))
+        return OfflineOperationResult(index=plan.index, status=OfflineOperationStatus.APPLIED, id=row["id"])
+
+    def update(self, table: str, row: dict, changes: Dict[str, Any]):
+        if not changes:
+            return
+        subtask_ids = row.get("subtask_ids")
+        if "subtask_ids" in changes:
+            subtask_ids = list(dict.fromkeys(changes.pop("subtask_ids") or []))
+            PomodoroService.set_subtask_links(row["id"], subtask_ids, row.get("subtask_ids") or [])
+            self.undo.append((self.index, "links", table, {
+                "id": row["id"], "subtask_ids": row.get("subtask_ids") or [], "current": subtask_ids
+            }))
+            changes.setdefault("updated_at", datetime.now(timezone.utc).isoformat())
+        result = self.supabase.table(table).update(changes).eq("id", row["id"]).execute()
+        restored = {column: row[column] for column in changes} | {"id": row["id"]}
+        self.undo.append((self.index, "restore", table, restored))
+        self.current[table][row["id"]] = result.data[0]
+        if table == "pomodoros":
+            self.current[table][row["id"]]["subtask_ids"] = subtask_ids
+
+    def complete_pomodoro(self, pomodoro: dict, actual_duration: Optional[int]) -> bool:
+        """Completar el pomodoro; False si ya estaba completado (no cambia nada)"""
+        if pomodoro.get("completed"):
+            return False
+        # La RPC suma tiempo a las subtareas: se guardan para poder deshacerlo
+        subtask_ids = pomodoro.get("subtask_ids") or []
+        if subtask_ids:
+            subtasks = self.supabase.table("subtasks").select("id, time_spent").in_("id", subtask_ids).execute()
+            for subtask in subtasks.data or []:
+                self.undo.append((self.index, "restore", "subtasks", subtask))
+
+        result = self.supabase.rpc("complete_pomodoro", {
+            "p_pomodoro_id": pomodoro["id"],
+            "p_actual_duration": actual_duration
+        }).execute()
+        self.undo.append((self.index, "restore", "pomodoros", {
+            column: pomodoro[column] for column in ("id", "completed", "completed_at", "duration")
+        }))
+        row = dict(result.data[0])
+        # Completado por otra petición después de leerlo: la RPC no ha cambiado nada
+        already_completed = row.pop("already_completed", False)
+        self.current["pomodoros"][pomodoro["id"]] = row
+        return not already_completed
+
+    def rollback(self) -> List[int]:
+        """
+        Deshacer lo aplicado, en orden inverso (mejor esfuerzo). Devuelve las
+        operaciones que no se pudieron deshacer del todo.
+        """
+        failed: Set[int] = set()
+        for index, action, table, value in reversed(self.undo):
+            try:
+                if action == "delete":
+                    self.supabase.table(table).delete().eq("id", value).execute()
+                elif action == "restore":
+                    changes = {k: v for k, v in value.items() if k != "id"}
+                    self.supabase.table(table).update(changes).eq("id", value["id"]).execute()
+                elif action == "insert":
+                    row = dict(value)
+                    subtask_ids = row.pop("subtask_ids", None)
+                    self.supabase.table(table).insert(row).execute()
+                    if subtask_ids:
+                        PomodoroService.set_subtask_links(row["id"], subtask_ids)
+                elif action == "links":
+                    PomodoroService.set_subtask_links(value["id"], value["subtask_ids"], value["current"])
+            except Exception as e:
+                failed.add(index)
+                logger.error("No se pudo deshacer %s en %s (operación %d): %s", action, table, index, e)
+        self.undo.clear()
+        return sorted(failed)
+
+    def partially_applied(self, index: int, error: Exception, still_applied: List[int],
+                          user_id: Optional[str]) -> HTTPException:
+        """Error 409 con las operaciones que siguen aplicadas y los IDs de sus altas"""
+        # Las lecturas en caché ya no reflejan la base de datos
+        history_cache.invalidate(user_id)
+        single_flight.invalidate(user_id)
+        cause = error.detail if isinstance(error, HTTPException) else str(error)
+        return HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={
+                "message": f"Operación {index} no aplicada ({cause}); el registro quedó aplicado en parte",
+                "applied": still_applied,
+                "id_map": {self.keys[i]: self.id_map[self.keys[i]] for i in still_applied if i in self.keys},
+            }
+        )
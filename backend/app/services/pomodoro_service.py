@@ -2,16 +2,38 @@
 Servicio para operaciones con pomodoros
 """
 
-from typing import List, Optional
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional
 from app.database.supabase_client import get_supabase
+from app.database.hedging import execute_hedged
 from app.models.schemas import (
     PomodoroCreate, PomodoroUpdate, PomodoroResponse, 
     PomodoroComplete
 )
 from fastapi import HTTPException, status
-from datetime import datetime
-from app.services.subtask_service import SubtaskService
-from app.services.task_service import TaskService
+from app.database.references import require_references, require_task_subtasks
+from app.core.events import publish_change, CREATE, UPDATE
+from app.core.history_cache import history_cache
+from app.core.deadlines import shielded
+
+
+# Duración por defecto de cada modo en segundos
+MODE_DURATIONS = {
+    "pomodoro": 1500,  # 25 minutos
+    "shortBreak": 300,  # 5 minutos
+    "longBreak": 900   # 15 minutos
+}
+
+# La API expone las subtareas de un pomodoro como ``subtask_ids``, pero se
+# guardan en la tabla de relación pomodoro_subtasks
+POMODORO_SELECT = "*, pomodoro_subtasks(subtask_id)"
+
+
+def with_subtask_ids(row: dict) -> dict:
+    """Sustituir el recurso embebido ``pomodoro_subtasks`` por ``subtask_ids``"""
+    if "pomodoro_subtasks" in row:
+        row["subtask_ids"] = sorted(link["subtask_id"] for link in row.pop("pomodoro_subtasks") or [])
+    return row
 
 
 class PomodoroService:
@@ -22,20 +44,16 @@ class PomodoroService:
         """Crear un nuevo pomodoro"""
         supabase = get_supabase()
         
-        # Verificar que la tarea existe si se proporciona
-        if pomodoro.task_id:
-            TaskService.get_task_by_id(pomodoro.task_id)
-        
         pomodoro_data = pomodoro.model_dump(exclude_unset=True)
+        subtask_ids = list(dict.fromkeys(pomodoro_data.pop("subtask_ids", None) or []))
+        
+        # Verificar la tarea (si se proporciona) y las subtareas en la misma comprobación
+        references = require_references({"tasks": [pomodoro.task_id], "subtasks": subtask_ids}, user_id=pomodoro.user_id)
+        require_task_subtasks(references["subtasks"], pomodoro.task_id, user_id=pomodoro.user_id)
         
         # Establecer duración por defecto según el modo
         if not pomodoro_data.get("duration"):
-            mode_durations = {
-                "pomodoro": 1500,  # 25 minutos
-                "shortBreak": 300,  # 5 minutos
-                "longBreak": 900   # 15 minutos
-            }
-            pomodoro_data["duration"] = mode_durations.get(pomodoro_data.get("mode", "pomodoro"), 1500)
+            pomodoro_data["duration"] = MODE_DURATIONS.get(pomodoro_data.get("mode", "pomodoro"), 1500)
         
         try:
             result = supabase.table("pomodoros").insert(pomodoro_data).execute()
@@ -46,7 +64,19 @@ class PomodoroService:
                     detail="Error al crear el pomodoro"
                 )
             
-            return PomodoroResponse(**result.data[0])
+            row = result.data[0]
+            try:
+                PomodoroService.set_subtask_links(row["id"], subtask_ids)
+            except Exception:
+                # Sin transacción entre llamadas: no dejar el pomodoro sin sus subtareas
+                # (aunque el fallo sea el plazo agotado)
+                with shielded():
+                    supabase.table("pomodoros").delete().eq("id", row["id"]).execute()
+                raise
+            
+            created = PomodoroResponse(**{**row, "subtask_ids": subtask_ids})
+            publish_change("pomodoros", CREATE, created.id, user_id=created.user_id, task_id=created.task_id)
+            return created
         except HTTPException:
             raise
         except Exception as e:
@@ -61,7 +91,7 @@ class PomodoroService:
         supabase = get_supabase()
         
         try:
-            result = supabase.table("pomodoros").select("*").eq("id", pomodoro_id).execute()
+            result = execute_hedged(lambda: supabase.table("pomodoros").select(POMODORO_SELECT).eq("id", pomodoro_id))
             
             if not result.data:
                 raise HTTPException(
@@ -69,7 +99,7 @@ class PomodoroService:
                     detail=f"Pomodoro con ID {pomodoro_id} no encontrado"
                 )
             
-            return PomodoroResponse(**result.data[0])
+            return PomodoroResponse(**with_subtask_ids(result.data[0]))
         except HTTPException:
             raise
         except Exception as e:
@@ -84,7 +114,7 @@ class PomodoroService:
         supabase = get_supabase()
         
         try:
-            query = supabase.table("pomodoros").select("*")
+            query = supabase.table("pomodoros").select(POMODORO_SELECT)
             
             if user_id:
                 query = query.eq("user_id", user_id)
@@ -94,7 +124,9 @@ class PomodoroService:
             
             result = query.order("created_at", desc=True).execute()
             
-            return [PomodoroResponse(**p) for p in result.data] if result.data else []
+            return [PomodoroResponse(**with_subtask_ids(p)) for p in result.data] if result.data else []
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -107,14 +139,33 @@ class PomodoroService:
         supabase = get_supabase()
         
         # Verificar que el pomodoro existe
-        PomodoroService.get_pomodoro_by_id(pomodoro_id)
+        existing = PomodoroService.get_pomodoro_by_id(pomodoro_id)
         
         update_data = pomodoro_update.model_dump(exclude_unset=True)
+        subtask_ids = update_data.pop("subtask_ids", None)
+        
+        if not update_data and subtask_ids is None:
+            return existing
         
-        if not update_data:
-            return PomodoroService.get_pomodoro_by_id(pomodoro_id)
+        # Verificar la nueva tarea y las subtareas añadidas (todas si cambia la tarea)
+        task_id = update_data.get("task_id", existing.task_id)
+        if task_id != existing.task_id:
+            checked = subtask_ids if subtask_ids is not None else existing.subtask_ids or []
+        else:
+            checked = [i for i in subtask_ids or [] if i not in (existing.subtask_ids or [])]
+        references = require_references({"tasks": [update_data.get("task_id")], "subtasks": checked},
+                                        user_id=existing.user_id)
+        require_task_subtasks(references["subtasks"], task_id, user_id=existing.user_id)
         
         try:
+            if subtask_ids is None:
+                subtask_ids = existing.subtask_ids or []
+            else:
+                subtask_ids = list(dict.fromkeys(subtask_ids))
+                PomodoroService.set_subtask_links(pomodoro_id, subtask_ids, existing.subtask_ids or [])
+                # Cambiar las subtareas también cuenta como cambio del pomodoro (sync)
+                update_data.setdefault("updated_at", datetime.now(timezone.utc).isoformat())
+            
             result = supabase.table("pomodoros").update(update_data).eq("id", pomodoro_id).execute()
             
             if not result.data:
@@ -123,7 +174,11 @@ class PomodoroService:
                     detail="Error al actualizar el pomodoro"
                 )
             
-            return PomodoroResponse(**result.data[0])
+            updated = PomodoroResponse(**{**result.data[0], "subtask_ids": subtask_ids})
+            # Una edición puede cambiar filas ya cargadas: el historial se recarga
+            history_cache.invalidate(updated.user_id)
+            publish_change("pomodoros", UPDATE, updated.id, user_id=updated.user_id, task_id=updated.task_id)
+            return updated
         except HTTPException:
             raise
         except Exception as e:
@@ -133,43 +188,54 @@ class PomodoroService:
             )
     
     @staticmethod
-    def complete_pomodoro(pomodoro_complete: PomodoroComplete) -> PomodoroResponse:
-        """Completar un pomodoro y actualizar tiempos de subtareas"""
+    def set_subtask_links(pomodoro_id: int, subtask_ids: List[int], current: Iterable[int] = ()):
+        """
+        Guardar las subtareas de un pomodoro en pomodoro_subtasks. ``current``
+        son las que ya tiene: solo se borran las que sobran y se insertan las
+        que faltan, con una consulta para cada cosa como mucho.
+        """
         supabase = get_supabase()
+        current = set(current)
+        removed = sorted(current - set(subtask_ids))
+        added = [subtask_id for subtask_id in subtask_ids if subtask_id not in current]
         
-        # Obtener el pomodoro
-        pomodoro = PomodoroService.get_pomodoro_by_id(pomodoro_complete.pomodoro_id)
-        
-        # Solo actualizar tiempos si es un pomodoro (no un break)
-        if pomodoro.mode == "pomodoro" and pomodoro.subtask_ids:
-            # Duración a sumar (por defecto 25 minutos = 1500 segundos)
-            duration_to_add = pomodoro_complete.actual_duration or pomodoro.duration or 1500
-            
-            # Actualizar tiempo de cada subtarea
-            for subtask_id in pomodoro.subtask_ids:
-                subtask = SubtaskService.get_subtask_by_id(subtask_id)
-                new_time = subtask.time_spent + duration_to_add
-                SubtaskService.update_subtask(subtask_id, {"time_spent": new_time})
-        
-        # Marcar pomodoro como completado
-        update_data = {
-            "completed": True,
-            "completed_at": datetime.utcnow().isoformat()
-        }
-        
-        if pomodoro_complete.actual_duration:
-            update_data["duration"] = pomodoro_complete.actual_duration
+        if removed:
+            supabase.table("pomodoro_subtasks").delete() \
+                .eq("pomodoro_id", pomodoro_id).in_("subtask_id", removed).execute()
+        if added:
+            supabase.table("pomodoro_subtasks").insert([
+                {"pomodoro_id": pomodoro_id, "subtask_id": subtask_id} for subtask_id in added
+            ]).execute()
+    
+    @staticmethod
+    def complete_pomodoro(pomodoro_complete: PomodoroComplete) -> PomodoroResponse:
+        """
+        Completar un pomodoro y actualizar tiempos de subtareas.
+        La RPC ``complete_pomodoro`` suma la duración a las subtareas (solo en
+        modo pomodoro) y marca el pomodoro como completado en una sola llamada.
+        """
+        supabase = get_supabase()
         
         try:
-            result = supabase.table("pomodoros").update(update_data).eq("id", pomodoro_complete.pomodoro_id).execute()
+            result = supabase.rpc("complete_pomodoro", {
+                "p_pomodoro_id": pomodoro_complete.pomodoro_id,
+                "p_actual_duration": pomodoro_complete.actual_duration
+            }).execute()
             
             if not result.data:
                 raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Error al completar el pomodoro"
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Pomodoro con ID {pomodoro_complete.pomodoro_id} no encontrado"
                 )
             
-            return PomodoroResponse(**result.data[0])
+            row = dict(result.data[0])
+            completed = PomodoroResponse(**row)
+            # Ya estaba completado (p. ej. un reintento): la sesión ya está contada
+            if row.pop("already_completed", False):
+                return completed
+            history_cache.update(completed.user_id, lambda history: history.add_sessions([row]))
+            publish_change("pomodoros", UPDATE, completed.id, user_id=completed.user_id, task_id=completed.task_id)
+            return completed
         except HTTPException:
             raise
         except Exception as e:
@@ -194,6 +260,8 @@ class PomodoroService:
             
             # Supabase devuelve el count en los headers o en la respuesta
             return result.count if hasattr(result, 'count') and result.count else len(result.data or [])
+        except HTTPException:
+            raise
         except Exception as e:
             # Fallback: contar manualmente
             pomodoros = PomodoroService.get_all_pomodoros(user_id=user_id, completed=True)
@@ -0,0 +1,193 @@
+"""
+Servicio para los informes pesados (semanal, mensual y exportación)
+
+Los informes se generan en segundo plano con ``app.core.jobs``: crearlos solo
+los encola y el cliente consulta ``GET /api/v1/reports/{id}`` hasta que
+terminan. Un informe igual (usuario, tipo, rango y zona horaria) en cola, en
+curso o recién terminado se reutiliza; los cambios del usuario lo invalidan.
+"""
+
+import calendar
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.config import settings
+from app.core.events import ChangeEvent
+from app.core.jobs import Job, get_job_runner
+from app.database.supabase_client import get_supabase
+from app.models.schemas import (
+    FocusDay, ReportCreate, ReportExport, ReportExportRow, ReportJobResponse, ReportSummary,
+    ReportTask, ReportType
+)
+from app.services.insights_service import InsightsService
+from app.services.pomodoro_service import POMODORO_SELECT, with_subtask_ids
+from fastapi import HTTPException, status
+
+# Tareas por consulta IN al resolver títulos (la URL de PostgREST es limitada)
+TITLE_CHUNK = 200
+
+
+def _add_month(day: date) -> date:
+    """Mismo día del mes siguiente (o el último, si no existe)"""
+    year, month = (day.year + 1, 1) if day.month == 12 else (day.year, day.month + 1)
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def _job_response(job: Job) -> ReportJobResponse:
+    finished_at = datetime.fromtimestamp(job.finished_at, timezone.utc) if job.finished_at else None
+    return ReportJobResponse(
+        id=job.id,
+        status=job.status,
+        progress=job.progress,
+        created_at=datetime.fromtimestamp(job.created_at, timezone.utc),
+        finished_at=finished_at,
+        result=job.result,
+        error=job.error,
+        **job.params
+    )
+
+
+class ReportService:
+    """Servicio para encolar, generar y consultar informes"""
+
+    @staticmethod
+    def report_range(report: ReportCreate) -> Tuple[date, date]:
+        """Primer día y día final (exclusivo) del informe"""
+        if report.type == ReportType.WEEKLY:
+            end = report.start + timedelta(days=7)
+        elif report.type == ReportType.MONTHLY:
+            end = _add_month(report.start)
+        else:
+            today = (datetime.now(timezone.utc) + timedelta(minutes=report.utc_offset)).date()
+            end = report.end or today + timedelta(days=1)
+
+        if end <= report.start:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="La fecha final debe ser posterior a la inicial"
+            )
+        if (end - report.start).days > settings.REPORT_MAX_RANGE_DAYS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"El rango no puede superar {settings.REPORT_MAX_RANGE_DAYS} días"
+            )
+        return report.start, end
+
+    @staticmethod
+    def create_report(report: ReportCreate) -> ReportJobResponse:
+        """Encolar un informe (o devolver el mismo informe ya pedido)"""
+        start, end = ReportService.report_range(report)
+        key = (report.user_id, report.type.value, start, end, report.utc_offset)
+
+        def build(progress: Callable[[float], None]) -> Dict[str, Any]:
+            return ReportService.build_report(report.type, report.user_id, start, end, report.utc_offset, progress)
+
+        job = get_job_runner().submit(
+            key, build, scope=report.user_id,
+            params={"type": report.type, "start": start, "end": end}
+        )
+        return _job_response(job)
+
+    @staticmethod
+    def get_report(report_id: str) -> ReportJobResponse:
+        """Estado, progreso y resultado de un informe"""
+        job = get_job_runner().get(report_id)
+        if job is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Informe {report_id} no encontrado"
+            )
+        return _job_response(job)
+
+    @staticmethod
+    def build_report(report_type: ReportType, user_id: Optional[str], start: date, end: date,
+                     utc_offset: int = 0, progress: Callable[[float], None] = lambda _: None) -> Dict[str, Any]:
+        """Generar el informe (en un hilo de trabajos)"""
+        offset = timedelta(minutes=utc_offset)
+        since = datetime.combine(start, time.min, tzinfo=timezone.utc) - offset
+        until = datetime.combine(end, time.min, tzinfo=timezone.utc) - offset
+
+        pomodoros = InsightsService._fetch_all(
+            "pomodoros", POMODORO_SELECT, user_id, completed_only=True,
+            time_range=("completed_at", since, until)
+        )
+        progress(0.5)
+
+        if report_type == ReportType.EXPORT:
+            titles = ReportService._task_titles(p["task_id"] for p in pomodoros)
+            progress(0.8)
+            return ReportService._export(pomodoros, titles).model_dump(mode="json")
+
+        focus = [p for p in pomodoros if p["mode"] == "pomodoro"]
+        distractions = InsightsService._fetch_all(
+            "distractions", "id, had_distractions, used_phone, created_at", user_id,
+            time_range=("created_at", since, until)
+        )
+        progress(0.7)
+        titles = ReportService._task_titles(p["task_id"] for p in focus)
+        progress(0.8)
+        return ReportService._summary(focus, distractions, titles, offset).model_dump(mode="json")
+
+    @staticmethod
+    def _task_titles(task_ids: Iterable[Optional[int]]) -> Dict[int, str]:
+        """Títulos de las tareas, con una consulta IN por bloque"""
+        supabase = get_supabase()
+        ids = sorted({task_id for task_id in task_ids if task_id is not None})
+        titles: Dict[int, str] = {}
+        for index in range(0, len(ids), TITLE_CHUNK):
+            result = supabase.table("tasks").select("id, title").in_("id", ids[index:index + TITLE_CHUNK]).execute()
+            titles.update({row["id"]: row["title"] for row in result.data or []})
+        return titles
+
+    @staticmethod
+    def _summary(focus: List[Dict[str, Any]], distractions: List[Dict[str, Any]],
+                 titles: Dict[int, str], offset: timedelta) -> ReportSummary:
+        days: Dict[date, Dict[str, int]] = defaultdict(lambda: {"sessions": 0, "focus_time": 0})
+        tasks: Dict[Optional[int], Dict[str, int]] = defaultdict(lambda: {"sessions": 0, "focus_time": 0})
+        for pomodoro in focus:
+            duration = pomodoro["duration"] or 0
+            day = (datetime.fromisoformat(pomodoro["completed_at"]) + offset).date()
+            for totals in (days[day], tasks[pomodoro["task_id"]]):
+                totals["sessions"] += 1
+                totals["focus_time"] += duration
+
+        return ReportSummary(
+            total_sessions=len(focus),
+            total_focus_time=sum(totals["focus_time"] for totals in days.values()),
+            days=[FocusDay(day=day, **totals) for day, totals in sorted(days.items())],
+            tasks=sorted(
+                (ReportTask(task_id=task_id, title=titles.get(task_id), **totals) for task_id, totals in tasks.items()),
+                key=lambda task: task.focus_time, reverse=True
+            ),
+            distractions_count=sum(1 for d in distractions if d["had_distractions"]),
+            phone_usage_count=sum(1 for d in distractions if d["used_phone"]),
+        )
+
+    @staticmethod
+    def _export(pomodoros: List[Dict[str, Any]], titles: Dict[int, str]) -> ReportExport:
+        rows = []
+        for pomodoro in sorted(pomodoros, key=lambda p: datetime.fromisoformat(p["completed_at"])):
+            pomodoro = with_subtask_ids(pomodoro)
+            rows.append(ReportExportRow(
+                pomodoro_id=pomodoro["id"],
+                task_id=pomodoro["task_id"],
+                task_title=titles.get(pomodoro["task_id"]),
+                subtask_ids=pomodoro.get("subtask_ids") or [],
+                mode=pomodoro["mode"],
+                objective=pomodoro.get("objective"),
+                started_at=pomodoro.get("started_at"),
+                completed_at=pomodoro["completed_at"],
+                duration=pomodoro["duration"] or 0,
+            ))
+        return ReportExport(sessions=rows)
+
+
+def invalidate_reports(event: ChangeEvent):
+    """
+    Listener del bus: los cambios de un usuario invalidan sus informes. Las
+    subtareas no aparecen en los informes (salvo los IDs, que cambian con el
+    pomodoro).
+    """
+    if event.entity != "subtasks":
+        get_job_runner().invalidate(event.user_id)
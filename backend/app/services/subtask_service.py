@@ -2,11 +2,19 @@
 Servicio para operaciones con subtareas
 """
 
-from typing import List
+from typing import List, Optional
 from app.database.supabase_client import get_supabase
 from app.models.schemas import SubtaskCreate, SubtaskUpdate, SubtaskResponse
 from fastapi import HTTPException, status
 from app.services.task_service import TaskService
+from app.database.references import fetch_references, require_references
+from app.core.events import publish_change, CREATE, UPDATE, DELETE
+
+
+def _task_owner(task_id: int) -> Optional[str]:
+    """user_id de la tarea de una subtarea (solo id y user_id, con la caché de referencias)"""
+    task = fetch_references("tasks", [task_id]).get(task_id)
+    return task.get("user_id") if task else None
 
 
 class SubtaskService:
@@ -17,8 +25,8 @@ class SubtaskService:
         """Crear una nueva subtarea"""
         supabase = get_supabase()
         
-        # Verificar que la tarea existe
-        TaskService.get_task_by_id(subtask.task_id)
+        # Verificar que la tarea existe (solo id y user_id)
+        task = require_references({"tasks": [subtask.task_id]})["tasks"][subtask.task_id]
         
         subtask_data = subtask.model_dump(exclude_unset=True)
         
@@ -31,7 +39,9 @@ class SubtaskService:
                     detail="Error al crear la subtarea"
                 )
             
-            return SubtaskResponse(**result.data[0])
+            created = SubtaskResponse(**result.data[0])
+            publish_change("subtasks", CREATE, created.id, user_id=task["user_id"], task_id=created.task_id)
+            return created
         except HTTPException:
             raise
         except Exception as e:
@@ -105,7 +115,10 @@ class SubtaskService:
                     detail="Error al actualizar la subtarea"
                 )
             
-            return SubtaskResponse(**result.data[0])
+            updated = SubtaskResponse(**result.data[0])
+            publish_change("subtasks", UPDATE, updated.id, user_id=_task_owner(updated.task_id),
+                           task_id=updated.task_id)
+            return updated
         except HTTPException:
             raise
         except Exception as e:
@@ -120,11 +133,14 @@ class SubtaskService:
         supabase = get_supabase()
         
         # Verificar que la subtarea existe
-        SubtaskService.get_subtask_by_id(subtask_id)
+        existing = SubtaskService.get_subtask_by_id(subtask_id)
         
         try:
+            # El dueño se resuelve antes de borrar (la tarea podría borrarse a la vez)
+            owner = _task_owner(existing.task_id)
             result = supabase.table("subtasks").delete().eq("id", subtask_id).execute()
             
+            publish_change("subtasks", DELETE, subtask_id, user_id=owner, task_id=existing.task_id)
             return True
         except HTTPException:
             raise
@@ -0,0 +1,140 @@
+"""
+Servicio para la sincronización incremental por marca de agua (updated_at)
+"""
+
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from app.config import settings
+from app.database.supabase_client import get_supabase
+from app.models.schemas import SyncDeleted
+from app.services.pomodoro_service import POMODORO_SELECT, with_subtask_ids
+from fastapi import HTTPException, status
+
+
+# Tablas con user_id propio; las subtareas heredan el de su tarea
+USER_TABLES = ("tasks", "pomodoros", "distractions")
+
+# Columnas de cada tabla en la respuesta (los pomodoros con sus subtask_ids)
+SELECTS = {"pomodoros": POMODORO_SELECT}
+
+# Las subtareas no tienen user_id: se filtran por el de su tarea con un join
+SUBTASK_SELECT = "*, tasks!inner(user_id)"
+
+
+def _fetch_pages(build: Callable[[], Any], order_by: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Todas las filas de la consulta que devuelve ``build``, en páginas de
+    ``SYNC_PAGE_SIZE`` ordenadas por ``(order_by, id)`` o solo por ``id``
+    (PostgREST limita las filas por respuesta y una sola select se truncaría
+    sin aviso). Cada página sigue a la última fila leída; como postgrest-py no
+    tiene ``or_``, tras una página completa con ``order_by`` se leen primero las
+    filas que empatan con su último valor y después las de valores mayores.
+    """
+    page_size = settings.SYNC_PAGE_SIZE
+    rows: List[Dict[str, Any]] = []
+    tied = False
+    while True:
+        query = build()
+        if rows:
+            last = rows[-1]
+            if not order_by:
+                query = query.gt("id", last["id"])
+            elif tied:
+                query = query.eq(order_by, last[order_by]).gt("id", last["id"])
+            else:
+                query = query.gt(order_by, last[order_by])
+        if order_by and not tied:
+            query = query.order(order_by)
+        page = query.order("id").limit(page_size).execute().data or []
+        rows.extend(page)
+        if len(page) == page_size:
+            tied = bool(order_by)
+        elif tied:
+            tied = False
+        else:
+            return rows
+
+
+class SyncService:
+    """Servicio para obtener los cambios desde una marca de agua"""
+
+    @staticmethod
+    def get_changed_rows(table: str, since: Optional[datetime] = None,
+                         user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Filas de ``table`` creadas o modificadas desde ``since`` (todas si es None)"""
+        supabase = get_supabase()
+
+        def build():
+            query = supabase.table(table).select(SELECTS.get(table, "*"))
+            if since:
+                query = query.gte("updated_at", since.isoformat())
+            if user_id:
+                query = query.eq("user_id", user_id)
+            return query
+
+        try:
+            rows = _fetch_pages(build)
+            return [with_subtask_ids(row) for row in rows] if table in SELECTS else rows
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error al obtener los cambios de {table}: {str(e)}"
+            )
+
+    @staticmethod
+    def get_changed_subtasks(since: Optional[datetime] = None,
+                             user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Subtareas creadas o modificadas desde ``since``. Como no tienen user_id,
+        con ``user_id`` se filtran por el de su tarea (``tasks!inner``) en la
+        misma consulta, sin leer las subtareas de otros usuarios.
+        """
+        supabase = get_supabase()
+
+        def build():
+            query = supabase.table("subtasks").select(SUBTASK_SELECT if user_id else "*")
+            if since:
+                query = query.gte("updated_at", since.isoformat())
+            if user_id:
+                query = query.eq("tasks.user_id", user_id)
+            return query
+
+        try:
+            subtasks = _fetch_pages(build)
+            for subtask in subtasks:
+                subtask.pop("tasks", None)
+            return subtasks
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error al obtener los cambios de subtareas: {str(e)}"
+            )
+
+    @staticmethod
+    def get_deleted(since: datetime, user_id: Optional[str] = None) -> SyncDeleted:
+        """IDs eliminados desde ``since`` agrupados por tabla"""
+        supabase = get_supabase()
+
+        def build():
+            query = supabase.table("sync_tombstones").select("id, table_name, record_id, deleted_at")
+            query = query.gte("deleted_at", since.isoformat())
+            if user_id:
+                query = query.eq("user_id", user_id)
+            return query
+
+        try:
+            deleted: Dict[str, List[int]] = {}
+            for tombstone in _fetch_pages(build, order_by="deleted_at"):
+                deleted.setdefault(tombstone["table_name"], []).append(tombstone["record_id"])
+            return SyncDeleted(**deleted)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error al obtener los registros eliminados: {str(e)}"
+            )
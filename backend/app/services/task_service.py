@@ -4,10 +4,28 @@ Servicio para operaciones con tareas
 
 from typing import List, Optional
 from app.database.supabase_client import get_supabase
+from app.database.hedging import execute_hedged
+from app.core.events import publish_change, CREATE, UPDATE, DELETE
+from app.core.history_cache import history_cache
 from app.models.schemas import TaskCreate, TaskUpdate, TaskResponse, SubtaskResponse
 from fastapi import HTTPException, status
 
 
+# Tarea con sus subtareas embebidas (PostgREST las resuelve en la misma consulta)
+TASK_WITH_SUBTASKS = "*, subtasks(*)"
+
+# Sin subtareas: los conteos (subtask_total, subtask_completed) y el tiempo
+# sumado (time_spent) son columnas de la propia tarea
+TASK_ONLY = "*"
+
+
+def _build_task_response(task_data: dict) -> TaskResponse:
+    """Construir la respuesta de una tarea a partir de la fila con subtareas embebidas"""
+    subtasks = sorted(task_data.get("subtasks") or [], key=lambda st: st["created_at"])
+    task_data["subtasks"] = [SubtaskResponse(**st) for st in subtasks]
+    return TaskResponse(**task_data)
+
+
 class TaskService:
     """Servicio para gestionar tareas"""
     
@@ -27,7 +45,11 @@ class TaskService:
                     detail="Error al crear la tarea"
                 )
             
-            return TaskService.get_task_by_id(result.data[0]["id"])
+            created = result.data[0]
+            publish_change("tasks", CREATE, created["id"], user_id=created.get("user_id"))
+            return TaskService.get_task_by_id(created["id"])
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -35,13 +57,16 @@ class TaskService:
             )
     
     @staticmethod
-    def get_task_by_id(task_id: int) -> TaskResponse:
-        """Obtener una tarea por ID con sus subtareas"""
+    def get_task_by_id(task_id: int, include_subtasks: bool = True) -> TaskResponse:
+        """Obtener una tarea por ID con sus subtareas (o solo sus conteos)"""
         supabase = get_supabase()
         
         try:
-            # Obtener la tarea
-            task_result = supabase.table("tasks").select("*").eq("id", task_id).execute()
+            # Obtener la tarea con sus subtareas en una sola consulta
+            columns = TASK_WITH_SUBTASKS if include_subtasks else TASK_ONLY
+            task_result = execute_hedged(
+                lambda: supabase.table("tasks").select(columns).eq("id", task_id)
+            )
             
             if not task_result.data:
                 raise HTTPException(
@@ -49,15 +74,7 @@ class TaskService:
                     detail=f"Tarea con ID {task_id} no encontrada"
                 )
             
-            task_data = task_result.data[0]
-            
-            # Obtener subtareas
-            subtasks_result = supabase.table("subtasks").select("*").eq("task_id", task_id).order("created_at").execute()
-            subtasks = [SubtaskResponse(**st) for st in subtasks_result.data] if subtasks_result.data else []
-            
-            task_data["subtasks"] = subtasks
-            
-            return TaskResponse(**task_data)
+            return _build_task_response(task_result.data[0])
         except HTTPException:
             raise
         except Exception as e:
@@ -67,12 +84,14 @@ class TaskService:
             )
     
     @staticmethod
-    def get_all_tasks(user_id: Optional[str] = None, search: Optional[str] = None) -> List[TaskResponse]:
+    def get_all_tasks(user_id: Optional[str] = None, search: Optional[str] = None,
+                      include_subtasks: bool = True) -> List[TaskResponse]:
         """Obtener todas las tareas, opcionalmente filtradas por user_id y búsqueda"""
         supabase = get_supabase()
         
         try:
-            query = supabase.table("tasks").select("*")
+            # Las subtareas se embeben en la misma consulta (sin N+1)
+            query = supabase.table("tasks").select(TASK_WITH_SUBTASKS if include_subtasks else TASK_ONLY)
             
             if user_id:
                 query = query.eq("user_id", user_id)
@@ -82,16 +101,9 @@ class TaskService:
             
             result = query.order("created_at", desc=True).execute()
             
-            tasks = []
-            if result.data:
-                # Para cada tarea, obtener sus subtareas
-                for task_data in result.data:
-                    subtasks_result = supabase.table("subtasks").select("*").eq("task_id", task_data["id"]).order("created_at").execute()
-                    subtasks = [SubtaskResponse(**st) for st in subtasks_result.data] if subtasks_result.data else []
-                    task_data["subtasks"] = subtasks
-                    tasks.append(TaskResponse(**task_data))
-            
-            return tasks
+            return [_build_task_response(task_data) for task_data in result.data] if result.data else []
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -104,7 +116,7 @@ class TaskService:
         supabase = get_supabase()
         
         # Verificar que la tarea existe
-        TaskService.get_task_by_id(task_id)
+        existing = TaskService.get_task_by_id(task_id)
         
         update_data = task_update.model_dump(exclude_unset=True)
         
@@ -120,6 +132,7 @@ class TaskService:
                     detail="Error al actualizar la tarea"
                 )
             
+            publish_change("tasks", UPDATE, task_id, user_id=existing.user_id)
             return TaskService.get_task_by_id(task_id)
         except HTTPException:
             raise
@@ -135,11 +148,14 @@ class TaskService:
         supabase = get_supabase()
         
         # Verificar que la tarea existe
-        TaskService.get_task_by_id(task_id)
+        existing = TaskService.get_task_by_id(task_id)
         
         try:
             result = supabase.table("tasks").delete().eq("id", task_id).execute()
             
+            # Sus pomodoros quedan sin tarea (ON DELETE SET NULL)
+            history_cache.invalidate(existing.user_id)
+            publish_change("tasks", DELETE, task_id, user_id=existing.user_id)
             return True
         except HTTPException:
             raise
@@ -0,0 +1,138 @@
+"""
+Conciliación de los totales de las tareas (time_spent y conteos de subtareas)
+
+Los triggers de ``subtasks`` mantienen ``time_spent``, ``subtask_total`` y
+``subtask_completed`` de cada tarea en la misma transacción que la escritura.
+La conciliación recorre todas las tareas por bloques de
+``TASK_TOTALS_RECONCILE_CHUNK`` (paginación por id con la RPC
+``reconcile_task_totals``), recalcula los totales desde las subtareas y corrige
+las desviaciones (datos anteriores a los triggers, ediciones directas en la
+base de datos). Cada bloque es una transacción corta que solo bloquea sus
+tareas.
+
+Se ejecuta como trabajo en segundo plano cada ``TASK_TOTALS_RECONCILE_INTERVAL``
+segundos o una vez desde cron: ``python -m app.services.task_totals_service``.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.config import settings
+from app.core.jobs import Job, get_job_runner
+from app.core.single_flight import single_flight
+from app.database.supabase_client import get_supabase
+
+logger = logging.getLogger("mypomodoro.task_totals")
+
+RECONCILE_JOB_KEY = ("reconcile_task_totals",)
+RECONCILE_SCOPE = "task_totals"
+
+
+class TaskTotalsService:
+    """Servicio para conciliar los totales de las tareas"""
+
+    @staticmethod
+    def reconcile_chunk(after_id: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Conciliar las tareas siguientes a ``after_id``: last_id, checked y repaired"""
+        limit = limit or settings.TASK_TOTALS_RECONCILE_CHUNK
+        result = get_supabase().rpc(
+            "reconcile_task_totals", {"p_after_id": after_id, "p_limit": limit}
+        ).execute()
+        return result.data[0] if result.data else {"last_id": None, "checked": 0, "repaired": 0}
+
+    @staticmethod
+    def reconcile(chunk_size: Optional[int] = None) -> Dict[str, Any]:
+        """Recorrer todas las tareas por bloques y corregir los totales desviados"""
+        chunk_size = chunk_size or settings.TASK_TOTALS_RECONCILE_CHUNK
+        started = time.monotonic()
+        summary = {"checked": 0, "repaired": 0, "chunks": 0}
+        after_id = 0
+        while True:
+            chunk = TaskTotalsService.reconcile_chunk(after_id, chunk_size)
+            if not chunk["checked"]:
+                break
+            summary["chunks"] += 1
+            summary["checked"] += chunk["checked"]
+            summary["repaired"] += chunk["repaired"]
+            after_id = chunk["last_id"]
+            if chunk["checked"] < chunk_size:
+                break
+
+        summary["duration_ms"] = round((time.monotonic() - started) * 1000, 1)
+        if summary["repaired"]:
+            # Las lecturas en caché podrían tener los totales anteriores
+            single_flight.invalidate_all()
+            logger.warning("Totales corregidos en %d de %d tareas", summary["repaired"], summary["checked"])
+        _record_run(summary)
+        return summary
+
+
+_stats: Dict[str, Any] = {"runs": 0, "repaired": 0, "last_run": None}
+_stats_lock = threading.Lock()
+
+
+def _record_run(summary: Dict[str, Any]):
+    with _stats_lock:
+        _stats["runs"] += 1
+        _stats["repaired"] += summary["repaired"]
+        _stats["last_run"] = dict(summary, finished_at=time.time())
+
+
+def task_totals_stats() -> Dict[str, Any]:
+    """Conciliaciones hechas para /metrics"""
+    with _stats_lock:
+        return {**_stats, "interval": settings.TASK_TOTALS_RECONCILE_INTERVAL}
+
+
+def submit_reconciliation() -> Job:
+    """Encolar una conciliación completa (o devolver la que ya está en cola o en curso)"""
+    runner = get_job_runner()
+
+    def run(progress):
+        return TaskTotalsService.reconcile()
+
+    job = runner.submit(RECONCILE_JOB_KEY, run, scope=RECONCILE_SCOPE)
+    if job.finished:
+        # Una pasada terminada no se reutiliza: los datos pueden haber vuelto a desviarse
+        runner.invalidate(RECONCILE_SCOPE)
+        job = runner.submit(RECONCILE_JOB_KEY, run, scope=RECONCILE_SCOPE)
+    return job
+
+
+_scheduler: Optional[threading.Thread] = None
+_scheduler_stop = threading.Event()
+
+
+def start_reconciler():
+    """Encolar una conciliación cada TASK_TOTALS_RECONCILE_INTERVAL segundos (si es > 0)"""
+    global _scheduler
+    interval = settings.TASK_TOTALS_RECONCILE_INTERVAL
+    if interval <= 0 or _scheduler is not None:
+        return
+
+    def run():
+        while not _scheduler_stop.wait(interval):
+            try:
+                submit_reconciliation()
+            except Exception as e:
+                logger.warning("No se pudo encolar la conciliación de totales: %s", e)
+
+    _scheduler_stop.clear()
+    _scheduler = threading.Thread(target=run, name="task-totals-reconciler", daemon=True)
+    _scheduler.start()
+
+
+def stop_reconciler():
+    """Detener la conciliación periódica"""
+    global _scheduler
+    _scheduler_stop.set()
+    if _scheduler is not None:
+        _scheduler.join(timeout=5)
+        _scheduler = None
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(TaskTotalsService.reconcile())
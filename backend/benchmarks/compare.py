@@ -0,0 +1,48 @@
+"""
+Comparar dos ejecuciones de benchmark
+
+Uso (desde backend/):
+    python -m benchmarks.compare benchmarks/results/base.json benchmarks/results/nuevo.json
+"""
+
+import argparse
+import json
+from typing import Dict, Optional
+
+METRICS = ["p50_ms", "p95_ms", "p99_ms", "throughput_rps"]
+
+
+def _delta(before: float, after: float) -> str:
+    if not before:
+        return "    n/a"
+    return f"{(after - before) / before * 100:+7.1f}%"
+
+
+def compare(before: Dict, after: Dict) -> str:
+    """Generar una tabla con la variación de cada métrica por endpoint"""
+    lines = [f"{'endpoint':45s} " + " ".join(f"{m:>24s}" for m in METRICS)]
+    for name, new in after["endpoints"].items():
+        old: Optional[Dict] = before["endpoints"].get(name)
+        if old is None:
+            lines.append(f"{name:45s} (nuevo)")
+            continue
+        cells = [f"{old[m]:9.2f}->{new[m]:9.2f}{_delta(old[m], new[m])}" for m in METRICS]
+        lines.append(f"{name:45s} " + " ".join(f"{c:>24s}" for c in cells))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comparar resultados de benchmark")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+
+    with open(args.before, encoding="utf-8") as f:
+        before = json.load(f)
+    with open(args.after, encoding="utf-8") as f:
+        after = json.load(f)
+    print(compare(before, after))
+
+
+if __name__ == "__main__":
+    main()
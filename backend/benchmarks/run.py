@@ -0,0 +1,315 @@
+"""
+Benchmark de los endpoints de la API
+
+Arranca la aplicación FastAPI contra un sustituto local de PostgREST
+(cliente en memoria con latencia inyectada, o un PostgREST local real),
+genera datos sintéticos y mide latencia p50/p95/p99 y throughput de cada
+endpoint. Los resultados se guardan en JSON para comparar ejecuciones.
+
+Uso (desde backend/):
+    python -m benchmarks.run --latency-ms 2 --output benchmarks/results/base.json
+    python -m benchmarks.run --backend postgrest --postgrest-url http://localhost:3000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import quote
+
+# La configuración exige credenciales de Supabase aunque no se usen
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "benchmark")
+
+import httpx
+
+from app.config import settings
+from app.database.hedging import reset_hedger
+from app.database.memory_client import MemoryClient
+from app.database.supabase_client import SupabaseClient
+from benchmarks.seed import SeedConfig, seed
+
+
+@dataclass
+class Scenario:
+    """
+    Petición a medir: método, ruta, generador opcional de cuerpo y valores de
+    Settings que se aplican solo durante el escenario
+    """
+    name: str
+    method: str
+    path: Callable[["BenchContext"], str]
+    body: Optional[Callable[["BenchContext"], Any]] = None
+    settings: Dict[str, Any] = field(default_factory=dict)
+
+
+class BenchContext:
+    """Datos compartidos por los escenarios (usuario, IDs existentes)"""
+
+    def __init__(self, client, user_id: str, rng: random.Random):
+        self.client = client
+        self.user_id = user_id
+        self.rng = rng
+        self.task_ids = self._ids("tasks", "user_id", user_id)
+        self.pomodoro_ids = self._ids("pomodoros", "user_id", user_id)
+        self.distraction_ids = self._ids("distractions", "user_id", user_id)
+        self.subtask_ids = [
+            row["id"] for row in client.table("subtasks").select("id").in_("task_id", self.task_ids[:200]).execute().data
+        ] if self.task_ids else []
+        self._report_id: Optional[str] = None
+
+    def _ids(self, table: str, column: str, value: Any) -> List[int]:
+        return [row["id"] for row in self.client.table(table).select("id").eq(column, value).execute().data]
+
+    def task_id(self) -> int:
+        return self.rng.choice(self.task_ids)
+
+    def subtask_id(self) -> int:
+        return self.rng.choice(self.subtask_ids)
+
+    def pomodoro_id(self) -> int:
+        return self.rng.choice(self.pomodoro_ids)
+
+    def fresh_pomodoro(self) -> int:
+        """Crear (sin medir) un pomodoro pendiente con 5 subtareas para completarlo"""
+        row = self.client.table("pomodoros").insert({
+            "mode": "pomodoro",
+            "task_id": self.task_id(),
+            "user_id": self.user_id,
+        }).execute().data[0]
+        self.client.table("pomodoro_subtasks").insert([
+            {"pomodoro_id": row["id"], "subtask_id": subtask_id}
+            for subtask_id in self.rng.sample(self.subtask_ids, min(5, len(self.subtask_ids)))
+        ]).execute()
+        return row["id"]
+
+    def since(self) -> str:
+        """Marca de agua de hace un minuto (sincronización incremental), codificada para la URL"""
+        return quote((datetime.now(timezone.utc) - timedelta(minutes=1)).isoformat())
+
+    def report(self) -> Dict[str, Any]:
+        """Informe semanal de una de las últimas 52 semanas (informes distintos, no solo el repetido)"""
+        start = date.today() - timedelta(weeks=self.rng.randint(1, 52))
+        return {"type": "weekly", "user_id": self.user_id, "start": start.isoformat()}
+
+    def report_id(self) -> str:
+        """Crear (sin medir) un informe para consultar su estado"""
+        if self._report_id is None:
+            from app.models.schemas import ReportCreate
+            from app.services.report_service import ReportService
+            self._report_id = ReportService.create_report(ReportCreate(**self.report())).id
+        return self._report_id
+
+
+SCENARIOS: List[Scenario] = [
+    Scenario("GET /api/v1/tasks/", "GET", lambda c: f"/api/v1/tasks/?user_id={c.user_id}"),
+    Scenario("GET /api/v1/tasks/?search", "GET", lambda c: f"/api/v1/tasks/?user_id={c.user_id}&search=Tarea%201"),
+    Scenario("GET /api/v1/tasks/?include_subtasks=false", "GET",
+             lambda c: f"/api/v1/tasks/?user_id={c.user_id}&include_subtasks=false"),
+    Scenario("GET /api/v1/tasks/{id}", "GET", lambda c: f"/api/v1/tasks/{c.task_id()}"),
+    Scenario("GET /api/v1/tasks/{id} (hedging)", "GET", lambda c: f"/api/v1/tasks/{c.task_id()}",
+             settings={"HEDGING_ENABLED": True}),
+    Scenario("POST /api/v1/tasks/", "POST", lambda c: "/api/v1/tasks/",
+             lambda c: {"title": "Tarea benchmark", "user_id": c.user_id}),
+    Scenario("PUT /api/v1/tasks/{id}", "PUT", lambda c: f"/api/v1/tasks/{c.task_id()}",
+             lambda c: {"title": "Tarea renombrada"}),
+    Scenario("GET /api/v1/subtasks/task/{id}", "GET", lambda c: f"/api/v1/subtasks/task/{c.task_id()}"),
+    Scenario("GET /api/v1/subtasks/{id}", "GET", lambda c: f"/api/v1/subtasks/{c.subtask_id()}"),
+    Scenario("POST /api/v1/subtasks/", "POST", lambda c: "/api/v1/subtasks/",
+             lambda c: {"title": "Subtarea benchmark", "task_id": c.task_id()}),
+    Scenario("PUT /api/v1/subtasks/{id}", "PUT", lambda c: f"/api/v1/subtasks/{c.subtask_id()}",
+             lambda c: {"completed": True}),
+    Scenario("GET /api/v1/pomodoros/", "GET", lambda c: f"/api/v1/pomodoros/?user_id={c.user_id}&completed=false"),
+    Scenario("GET /api/v1/pomodoros/count", "GET", lambda c: f"/api/v1/pomodoros/count?user_id={c.user_id}"),
+    Scenario("GET /api/v1/pomodoros/{id}", "GET", lambda c: f"/api/v1/pomodoros/{c.pomodoro_id()}"),
+    Scenario("POST /api/v1/pomodoros/", "POST", lambda c: "/api/v1/pomodoros/",
+             lambda c: {"mode": "pomodoro", "task_id": c.task_id(), "user_id": c.user_id}),
+    Scenario("POST /api/v1/pomodoros/complete", "POST", lambda c: "/api/v1/pomodoros/complete",
+             lambda c: {"pomodoro_id": c.fresh_pomodoro()}),
+    Scenario("GET /api/v1/distractions/", "GET", lambda c: f"/api/v1/distractions/?user_id={c.user_id}"),
+    Scenario("GET /api/v1/distractions/pomodoro/{id}", "GET", lambda c: f"/api/v1/distractions/pomodoro/{c.pomodoro_id()}"),
+    Scenario("POST /api/v1/distractions/", "POST", lambda c: "/api/v1/distractions/",
+             lambda c: {"pomodoro_id": c.pomodoro_id(), "had_distractions": True,
+                        "used_phone": False, "user_id": c.user_id}),
+    Scenario("GET /api/v1/statistics/", "GET", lambda c: f"/api/v1/statistics/?user_id={c.user_id}"),
+    Scenario("GET /api/v1/statistics/insights", "GET", lambda c: f"/api/v1/statistics/insights?user_id={c.user_id}"),
+    Scenario("GET /api/v1/dashboard/", "GET", lambda c: f"/api/v1/dashboard/?user_id={c.user_id}"),
+    Scenario("GET /api/v1/sync/", "GET", lambda c: f"/api/v1/sync/?user_id={c.user_id}"),
+    Scenario("GET /api/v1/sync/?since", "GET", lambda c: f"/api/v1/sync/?user_id={c.user_id}&since={c.since()}"),
+    Scenario("POST /api/v1/reports/", "POST", lambda c: "/api/v1/reports/", lambda c: c.report()),
+    Scenario("GET /api/v1/reports/{id}", "GET", lambda c: f"/api/v1/reports/{c.report_id()}"),
+]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Percentil por rango más cercano"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+async def run_scenario(http: httpx.AsyncClient, scenario: Scenario, ctx: BenchContext,
+                       requests: int, concurrency: int, warmup: int) -> Dict[str, Any]:
+    """Ejecutar un escenario y devolver sus métricas"""
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(measure: bool):
+        nonlocal errors
+        # El cuerpo se prepara fuera de la medición (puede crear datos auxiliares)
+        path = scenario.path(ctx)
+        body = await asyncio.to_thread(scenario.body, ctx) if scenario.body else None
+        start = time.perf_counter()
+        response = await http.request(scenario.method, path, json=body)
+        elapsed = (time.perf_counter() - start) * 1000
+        if measure:
+            latencies.append(elapsed)
+            if response.status_code >= 400:
+                errors += 1
+
+    previous = {name: getattr(settings, name) for name in scenario.settings}
+    for name, value in scenario.settings.items():
+        setattr(settings, name, value)
+    try:
+        for _ in range(warmup):
+            await one(measure=False)
+
+        remaining = iter(range(requests))
+
+        async def worker():
+            for _ in remaining:
+                await one(measure=True)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    finally:
+        for name, value in previous.items():
+            setattr(settings, name, value)
+        reset_hedger()
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        "max_ms": round(latencies[-1], 3) if latencies else 0.0,
+        "throughput_rps": round(len(latencies) / elapsed, 3) if elapsed > 0 else 0.0,
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    if args.backend == "postgrest":
+        from postgrest import SyncPostgrestClient
+        data_client = SyncPostgrestClient(args.postgrest_url)
+    else:
+        data_client = MemoryClient(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, record_calls=False)
+
+    config = SeedConfig(
+        users=args.users, tasks=args.tasks, subtasks_per_task=args.subtasks_per_task,
+        pomodoros=args.pomodoros, distractions=args.distractions, seed=args.seed,
+    )
+
+    # Sembrar sin latencia inyectada
+    latency = getattr(data_client, "latency_ms", None)
+    if latency is not None:
+        data_client.latency_ms, jitter, data_client.jitter_ms = 0.0, data_client.jitter_ms, 0.0
+    seed_start = time.perf_counter()
+    volumes = seed(data_client, config) if not args.skip_seed else {}
+    seed_seconds = time.perf_counter() - seed_start
+    if latency is not None:
+        data_client.latency_ms, data_client.jitter_ms = latency, jitter
+
+    SupabaseClient.set_client(data_client)
+    from app.main import app
+
+    rng = random.Random(args.seed)
+    ctx = BenchContext(data_client, "bench-user-0", rng)
+    selected = [s for s in SCENARIOS if not args.only or any(f in s.name for f in args.only)]
+
+    results: Dict[str, Any] = {}
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        for scenario in selected:
+            results[scenario.name] = await run_scenario(
+                http, scenario, ctx, args.requests, args.concurrency, args.warmup
+            )
+            stats = results[scenario.name]
+            print(f"{scenario.name:45s} p50={stats['p50_ms']:9.2f}ms p95={stats['p95_ms']:9.2f}ms "
+                  f"p99={stats['p99_ms']:9.2f}ms rps={stats['throughput_rps']:8.2f} errors={stats['errors']}")
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": _git_revision(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "backend": args.backend,
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": asdict(config),
+            "seed_seconds": round(seed_seconds, 3),
+            "volumes": volumes,
+        },
+        "endpoints": results,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark de la API MyPomodoro")
+    parser.add_argument("--backend", choices=["memory", "postgrest"], default="memory")
+    parser.add_argument("--postgrest-url", default="http://localhost:3000")
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="Latencia inyectada por consulta")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Variación aleatoria de la latencia")
+    parser.add_argument("--users", type=int, default=1)
+    parser.add_argument("--tasks", type=int, default=1000)
+    parser.add_argument("--subtasks-per-task", type=int, default=4)
+    parser.add_argument("--pomodoros", type=int, default=50000)
+    parser.add_argument("--distractions", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-seed", action="store_true", help="Usar los datos ya existentes")
+    parser.add_argument("--requests", type=int, default=50, help="Peticiones medidas por endpoint")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--only", nargs="*", help="Filtrar escenarios por subcadena del nombre")
+    parser.add_argument("--output", default=None, help="Ruta del JSON de resultados")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    report = asyncio.run(main_async(args))
+
+    output = args.output or os.path.join(
+        "benchmarks", "results", f"bench-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResultados guardados en {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Generador de datos sintéticos para los benchmarks
+
+Crea usuarios con volúmenes realistas de tareas, subtareas, pomodoros y
+distracciones, de forma determinista (misma semilla = mismos datos).
+"""
+
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+
+@dataclass
+class SeedConfig:
+    """Volúmenes por usuario"""
+    users: int = 1
+    tasks: int = 1000
+    subtasks_per_task: int = 4
+    pomodoros: int = 50000
+    distractions: int = 20000
+    days: int = 365
+    seed: int = 42
+    chunk_size: int = 1000
+
+
+MODES = ["pomodoro"] * 8 + ["shortBreak"] * 3 + ["longBreak"]
+MODE_DURATIONS = {"pomodoro": 1500, "shortBreak": 300, "longBreak": 900}
+CATEGORIES = ["personal", "laboral", "otro"]
+
+
+def _insert_chunked(client, table: str, rows: List[dict], chunk_size: int) -> List[dict]:
+    """Insertar filas en bloques (inserción multi-fila)"""
+    inserted = []
+    for start in range(0, len(rows), chunk_size):
+        result = client.table(table).insert(rows[start:start + chunk_size]).execute()
+        inserted.extend(result.data or [])
+    return inserted
+
+
+def seed_user(client, user_id: str, config: SeedConfig, rng: random.Random) -> Dict[str, int]:
+    """Generar los datos de un usuario y devolver los volúmenes creados"""
+    now = datetime.now(timezone.utc)
+
+    def random_moment() -> str:
+        return (now - timedelta(seconds=rng.randint(0, config.days * 86400))).isoformat()
+
+    tasks = _insert_chunked(client, "tasks", [
+        {
+            "title": f"Tarea {i}",
+            "completed": rng.random() < 0.3,
+            "category": rng.choice(CATEGORIES),
+            "custom_category": "Proyecto" if rng.random() < 0.1 else None,
+            "user_id": user_id,
+            "created_at": random_moment(),
+        }
+        for i in range(config.tasks)
+    ], config.chunk_size)
+    task_ids = [task["id"] for task in tasks]
+
+    subtasks = _insert_chunked(client, "subtasks", [
+        {
+            "task_id": task_id,
+            "title": f"Subtarea {task_id}-{j}",
+            "completed": rng.random() < 0.5,
+            "time_spent": rng.randint(0, 20) * 1500,
+        }
+        for task_id in task_ids
+        for j in range(rng.randint(0, 2 * config.subtasks_per_task))
+    ], config.chunk_size)
+
+    subtasks_by_task: Dict[int, List[int]] = {}
+    for subtask in subtasks:
+        subtasks_by_task.setdefault(subtask["task_id"], []).append(subtask["id"])
+
+    pomodoro_rows = []
+    pomodoro_subtask_ids = []
+    for _ in range(config.pomodoros):
+        mode = rng.choice(MODES)
+        task_id = rng.choice(task_ids) if task_ids and mode == "pomodoro" else None
+        candidates = subtasks_by_task.get(task_id, [])
+        started_at = random_moment()
+        completed = rng.random() < 0.95
+        pomodoro_rows.append({
+            "mode": mode,
+            "objective": "Sesión sintética",
+            "task_id": task_id,
+            "duration": MODE_DURATIONS[mode],
+            "completed": completed,
+            "started_at": started_at,
+            "completed_at": started_at if completed else None,
+            "user_id": user_id,
+            "created_at": started_at,
+        })
+        pomodoro_subtask_ids.append(rng.sample(candidates, min(len(candidates), rng.randint(0, 2))))
+    pomodoros = _insert_chunked(client, "pomodoros", pomodoro_rows, config.chunk_size)
+    pomodoro_ids = [pomodoro["id"] for pomodoro in pomodoros]
+
+    _insert_chunked(client, "pomodoro_subtasks", [
+        {"pomodoro_id": pomodoro_id, "subtask_id": subtask_id}
+        for pomodoro_id, subtask_ids in zip(pomodoro_ids, pomodoro_subtask_ids)
+        for subtask_id in subtask_ids
+    ], config.chunk_size)
+
+    distractions = _insert_chunked(client, "distractions", [
+        {
+            "pomodoro_id": rng.choice(pomodoro_ids),
+            "had_distractions": rng.random() < 0.4,
+            "used_phone": rng.random() < 0.25,
+            "user_id": user_id,
+            "created_at": random_moment(),
+        }
+        for _ in range(config.distractions if pomodoro_ids else 0)
+    ], config.chunk_size)
+
+    return {
+        "tasks": len(tasks),
+        "subtasks": len(subtasks),
+        "pomodoros": len(pomodoros),
+        "distractions": len(distractions),
+    }
+
+
+def seed(client, config: SeedConfig) -> Dict[str, Dict[str, int]]:
+    """Generar los datos de todos los usuarios sintéticos"""
+    rng = random.Random(config.seed)
+    return {
+        f"bench-user-{n}": seed_user(client, f"bench-user-{n}", config, rng)
+        for n in range(config.users)
+    }
@@ -0,0 +1,34 @@
+-- Migración 001: completar un pomodoro en una sola llamada (RPC)
+-- Suma la duración a las subtareas del pomodoro y lo marca como completado
+-- de forma atómica. Sustituye las N lecturas/escrituras por subtarea que
+-- hacía el servicio.
+
+CREATE OR REPLACE FUNCTION complete_pomodoro(p_pomodoro_id BIGINT, p_actual_duration INTEGER DEFAULT NULL)
+RETURNS SETOF pomodoros AS $$
+DECLARE
+    v_pomodoro pomodoros%ROWTYPE;
+    v_duration INTEGER;
+BEGIN
+    SELECT * INTO v_pomodoro FROM pomodoros WHERE id = p_pomodoro_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN;
+    END IF;
+    
+    v_duration := COALESCE(NULLIF(p_actual_duration, 0), NULLIF(v_pomodoro.duration, 0), 1500);
+    
+    -- Solo los pomodoros (no los descansos) suman tiempo a las subtareas
+    IF v_pomodoro.mode = 'pomodoro' AND v_pomodoro.subtask_ids IS NOT NULL THEN
+        UPDATE subtasks
+        SET time_spent = time_spent + v_duration
+        WHERE id = ANY(v_pomodoro.subtask_ids);
+    END IF;
+    
+    RETURN QUERY
+    UPDATE pomodoros
+    SET completed = TRUE,
+        completed_at = NOW(),
+        duration = COALESCE(NULLIF(p_actual_duration, 0), duration)
+    WHERE id = p_pomodoro_id
+    RETURNING *;
+END;
+$$ language 'plpgsql';
@@ -0,0 +1,65 @@
+-- Migración 002: sincronización incremental (GET /api/v1/sync)
+-- Índices sobre updated_at para leer solo lo cambiado desde una marca de agua,
+-- updated_at en distracciones y una tabla de tombstones para los borrados.
+
+ALTER TABLE distractions
+    ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_tasks_updated_at ON tasks(updated_at);
+CREATE INDEX IF NOT EXISTS idx_subtasks_updated_at ON subtasks(updated_at);
+CREATE INDEX IF NOT EXISTS idx_pomodoros_updated_at ON pomodoros(updated_at);
+CREATE INDEX IF NOT EXISTS idx_distractions_updated_at ON distractions(updated_at);
+
+DROP TRIGGER IF EXISTS update_distractions_updated_at ON distractions;
+CREATE TRIGGER update_distractions_updated_at BEFORE UPDATE ON distractions
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+CREATE TABLE IF NOT EXISTS sync_tombstones (
+    id BIGSERIAL PRIMARY KEY,
+    table_name VARCHAR(50) NOT NULL CHECK (table_name IN ('tasks', 'subtasks', 'pomodoros', 'distractions')),
+    record_id BIGINT NOT NULL,
+    user_id VARCHAR(255), -- NULL en subtareas borradas en cascada con su tarea
+    deleted_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_sync_tombstones_deleted_at ON sync_tombstones(deleted_at);
+CREATE INDEX IF NOT EXISTS idx_sync_tombstones_user_id ON sync_tombstones(user_id);
+
+CREATE OR REPLACE FUNCTION record_sync_tombstone()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_user_id VARCHAR(255);
+BEGIN
+    -- Las subtareas no tienen user_id: se toma de su tarea (si aún existe)
+    IF TG_TABLE_NAME = 'subtasks' THEN
+        SELECT user_id INTO v_user_id FROM tasks WHERE id = OLD.task_id;
+    ELSE
+        v_user_id := OLD.user_id;
+    END IF;
+    
+    INSERT INTO sync_tombstones (table_name, record_id, user_id)
+    VALUES (TG_TABLE_NAME, OLD.id, v_user_id);
+    RETURN OLD;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS record_tasks_tombstone ON tasks;
+CREATE TRIGGER record_tasks_tombstone AFTER DELETE ON tasks
+    FOR EACH ROW EXECUTE FUNCTION record_sync_tombstone();
+
+DROP TRIGGER IF EXISTS record_subtasks_tombstone ON subtasks;
+CREATE TRIGGER record_subtasks_tombstone AFTER DELETE ON subtasks
+    FOR EACH ROW EXECUTE FUNCTION record_sync_tombstone();
+
+DROP TRIGGER IF EXISTS record_pomodoros_tombstone ON pomodoros;
+CREATE TRIGGER record_pomodoros_tombstone AFTER DELETE ON pomodoros
+    FOR EACH ROW EXECUTE FUNCTION record_sync_tombstone();
+
+DROP TRIGGER IF EXISTS record_distractions_tombstone ON distractions;
+CREATE TRIGGER record_distractions_tombstone AFTER DELETE ON distractions
+    FOR EACH ROW EXECUTE FUNCTION record_sync_tombstone();
+
+-- Los tombstones solo hacen falta durante SYNC_TOMBSTONE_RETENTION_DAYS; los
+-- clientes con una marca de agua más antigua reciben una copia completa.
+-- Purga periódica recomendada:
+--   DELETE FROM sync_tombstones WHERE deleted_at < NOW() - INTERVAL '30 days';
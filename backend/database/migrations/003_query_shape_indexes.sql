@@ -0,0 +1,52 @@
+-- Migración 003: índices compuestos y parciales según las consultas de los servicios
+-- Sustituye los índices de una columna por índices que cubren filtro y orden
+-- de las consultas frecuentes, y elimina los índices sobre booleanos de baja
+-- selectividad (solo añadían coste a las escrituras).
+--
+-- En producción, con tablas grandes, conviene ejecutar cada CREATE INDEX con
+-- CONCURRENTLY (fuera de una transacción) para no bloquear escrituras.
+
+-- Tareas: WHERE user_id = ? ORDER BY created_at DESC (get_all_tasks, dashboard)
+CREATE INDEX IF NOT EXISTS idx_tasks_user_created ON tasks(user_id, created_at DESC);
+-- Tareas: WHERE user_id = ? AND updated_at >= ? (sync)
+CREATE INDEX IF NOT EXISTS idx_tasks_user_updated ON tasks(user_id, updated_at);
+DROP INDEX IF EXISTS idx_tasks_user_id;
+DROP INDEX IF EXISTS idx_tasks_completed;
+
+-- Subtareas: WHERE task_id = ? ORDER BY created_at (get_subtasks_by_task_id)
+CREATE INDEX IF NOT EXISTS idx_subtasks_task_created ON subtasks(task_id, created_at);
+DROP INDEX IF EXISTS idx_subtasks_task_id;
+DROP INDEX IF EXISTS idx_subtasks_completed;
+
+-- Pomodoros: WHERE user_id = ? ORDER BY created_at DESC (get_all_pomodoros)
+CREATE INDEX IF NOT EXISTS idx_pomodoros_user_created ON pomodoros(user_id, created_at DESC);
+-- Pomodoros completados de una tarea (estadísticas)
+CREATE INDEX IF NOT EXISTS idx_pomodoros_task_completed ON pomodoros(task_id) WHERE completed;
+-- Pomodoros de foco completados por usuario y fecha (get_pomodoro_count, pomodoros de hoy)
+CREATE INDEX IF NOT EXISTS idx_pomodoros_focus_completed ON pomodoros(user_id, completed_at)
+    WHERE completed AND mode = 'pomodoro';
+-- Pomodoro activo: WHERE NOT completed AND user_id = ? ORDER BY created_at DESC LIMIT 1
+CREATE INDEX IF NOT EXISTS idx_pomodoros_active ON pomodoros(user_id, created_at DESC) WHERE NOT completed;
+-- Pomodoros: WHERE user_id = ? AND updated_at >= ? (sync)
+CREATE INDEX IF NOT EXISTS idx_pomodoros_user_updated ON pomodoros(user_id, updated_at);
+DROP INDEX IF EXISTS idx_pomodoros_user_id;
+DROP INDEX IF EXISTS idx_pomodoros_completed;
+DROP INDEX IF EXISTS idx_pomodoros_mode;
+
+-- Distracciones: WHERE pomodoro_id = ? ORDER BY created_at DESC
+CREATE INDEX IF NOT EXISTS idx_distractions_pomodoro_created ON distractions(pomodoro_id, created_at DESC);
+-- Distracciones: WHERE user_id = ? ORDER BY created_at DESC
+CREATE INDEX IF NOT EXISTS idx_distractions_user_created ON distractions(user_id, created_at DESC);
+-- Conteos de distracciones y uso del móvil por usuario (estadísticas, dashboard)
+CREATE INDEX IF NOT EXISTS idx_distractions_user_distracted ON distractions(user_id) WHERE had_distractions;
+CREATE INDEX IF NOT EXISTS idx_distractions_user_phone ON distractions(user_id) WHERE used_phone;
+-- Distracciones: WHERE user_id = ? AND updated_at >= ? (sync)
+CREATE INDEX IF NOT EXISTS idx_distractions_user_updated ON distractions(user_id, updated_at);
+DROP INDEX IF EXISTS idx_distractions_pomodoro_id;
+DROP INDEX IF EXISTS idx_distractions_user_id;
+
+-- Tombstones: WHERE user_id = ? AND deleted_at >= ? (sync)
+CREATE INDEX IF NOT EXISTS idx_sync_tombstones_user_deleted ON sync_tombstones(user_id, deleted_at);
+DROP INDEX IF EXISTS idx_sync_tombstones_user_id;
+
+ANALYZE tasks, subtasks, pomodoros, distractions, sync_tombstones;
@@ -0,0 +1,81 @@
+-- Migración 004: tabla de relación pomodoro_subtasks
+-- Sustituye la columna pomodoros.subtask_ids (BIGINT[] sin índice) por una
+-- tabla con índices en ambos sentidos: "pomodoros de la subtarea X" o "tiempo
+-- por subtarea y día" pasan a ser búsquedas por índice.
+--
+-- Despliega el backend compatible antes o junto con esta migración: la API
+-- sigue aceptando y devolviendo subtask_ids, pero los lee y escribe en la
+-- tabla nueva. Se ejecuta en una transacción para que el relleno y la
+-- eliminación de la columna sean atómicos.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS pomodoro_subtasks (
+    id BIGSERIAL PRIMARY KEY,
+    pomodoro_id BIGINT NOT NULL REFERENCES pomodoros(id) ON DELETE CASCADE,
+    subtask_id BIGINT NOT NULL REFERENCES subtasks(id) ON DELETE CASCADE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_pomodoro_subtasks_pomodoro_subtask ON pomodoro_subtasks(pomodoro_id, subtask_id);
+CREATE INDEX IF NOT EXISTS idx_pomodoro_subtasks_subtask_pomodoro ON pomodoro_subtasks(subtask_id, pomodoro_id);
+
+COMMENT ON TABLE pomodoro_subtasks IS 'Subtareas trabajadas en cada pomodoro';
+
+-- Relleno desde el array. Se omiten los IDs de subtareas ya eliminadas (el
+-- array no tenía clave foránea) y los repetidos.
+INSERT INTO pomodoro_subtasks (pomodoro_id, subtask_id, created_at)
+SELECT DISTINCT p.id, s.id, p.created_at
+FROM pomodoros p
+CROSS JOIN LATERAL unnest(p.subtask_ids) AS ids(subtask_id)
+JOIN subtasks s ON s.id = ids.subtask_id
+WHERE p.subtask_ids IS NOT NULL
+ON CONFLICT (pomodoro_id, subtask_id) DO NOTHING;
+
+-- La RPC cambia de tipo de retorno: hay que eliminarla antes de recrearla
+DROP FUNCTION IF EXISTS complete_pomodoro(BIGINT, INTEGER);
+
+-- Función RPC para completar un pomodoro en una sola llamada:
+-- suma la duración a sus subtareas y lo marca como completado de forma atómica.
+-- Devuelve el pomodoro con sus subtask_ids (de pomodoro_subtasks)
+CREATE OR REPLACE FUNCTION complete_pomodoro(p_pomodoro_id BIGINT, p_actual_duration INTEGER DEFAULT NULL)
+RETURNS SETOF jsonb AS $$
+DECLARE
+    v_pomodoro pomodoros%ROWTYPE;
+    v_duration INTEGER;
+BEGIN
+    SELECT * INTO v_pomodoro FROM pomodoros WHERE id = p_pomodoro_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN;
+    END IF;
+    
+    v_duration := COALESCE(NULLIF(p_actual_duration, 0), NULLIF(v_pomodoro.duration, 0), 1500);
+    
+    -- Solo los pomodoros (no los descansos) suman tiempo a las subtareas
+    IF v_pomodoro.mode = 'pomodoro' THEN
+        UPDATE subtasks
+        SET time_spent = subtasks.time_spent + v_duration
+        FROM pomodoro_subtasks
+        WHERE pomodoro_subtasks.pomodoro_id = p_pomodoro_id
+          AND subtasks.id = pomodoro_subtasks.subtask_id;
+    END IF;
+    
+    UPDATE pomodoros
+    SET completed = TRUE,
+        completed_at = NOW(),
+        duration = COALESCE(NULLIF(p_actual_duration, 0), duration)
+    WHERE id = p_pomodoro_id
+    RETURNING * INTO v_pomodoro;
+    
+    RETURN NEXT to_jsonb(v_pomodoro) || jsonb_build_object('subtask_ids', COALESCE(
+        (SELECT jsonb_agg(subtask_id ORDER BY subtask_id) FROM pomodoro_subtasks WHERE pomodoro_id = p_pomodoro_id),
+        '[]'::jsonb
+    ));
+END;
+$$ language 'plpgsql';
+
+ALTER TABLE pomodoros DROP COLUMN IF EXISTS subtask_ids;
+
+ANALYZE pomodoro_subtasks;
+
+COMMIT;
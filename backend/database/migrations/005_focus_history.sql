@@ -0,0 +1,48 @@
+-- Migración 005: historial de foco por tarea y subtarea
+-- Índice parcial para recorrer las sesiones de foco de una tarea por fecha y
+-- RPC get_focus_sessions (GET /api/v1/tasks/{id}/history y
+-- /api/v1/subtasks/{id}/history). Requiere la migración 004.
+
+CREATE INDEX IF NOT EXISTS idx_pomodoros_task_focus ON pomodoros(task_id, completed_at DESC)
+    WHERE completed AND mode = 'pomodoro';
+
+-- Función RPC para el historial de foco de una tarea o subtarea: sesiones de
+-- foco completadas antes de p_before, de la más reciente a la más antigua
+CREATE OR REPLACE FUNCTION get_focus_sessions(
+    p_task_id BIGINT DEFAULT NULL,
+    p_subtask_id BIGINT DEFAULT NULL,
+    p_before TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_limit INTEGER DEFAULT 50
+)
+RETURNS TABLE (
+    pomodoro_id BIGINT,
+    task_id BIGINT,
+    started_at TIMESTAMP WITH TIME ZONE,
+    completed_at TIMESTAMP WITH TIME ZONE,
+    duration INTEGER
+) AS $$
+BEGIN
+    IF p_subtask_id IS NOT NULL THEN
+        -- Pomodoros de la subtarea por idx_pomodoro_subtasks_subtask_pomodoro
+        RETURN QUERY
+        SELECT p.id, p.task_id, p.started_at, p.completed_at, p.duration
+        FROM pomodoro_subtasks ps
+        JOIN pomodoros p ON p.id = ps.pomodoro_id
+        WHERE ps.subtask_id = p_subtask_id
+          AND p.completed AND p.mode = 'pomodoro'
+          AND p.completed_at < COALESCE(p_before, 'infinity')
+        ORDER BY p.completed_at DESC
+        LIMIT p_limit;
+    ELSE
+        -- Recorrido del índice parcial idx_pomodoros_task_focus desde p_before
+        RETURN QUERY
+        SELECT p.id, p.task_id, p.started_at, p.completed_at, p.duration
+        FROM pomodoros p
+        WHERE p.task_id = p_task_id
+          AND p.completed AND p.mode = 'pomodoro'
+          AND p.completed_at < COALESCE(p_before, 'infinity')
+        ORDER BY p.completed_at DESC
+        LIMIT p_limit;
+    END IF;
+END;
+$$ language 'plpgsql' STABLE;
@@ -0,0 +1,58 @@
+-- Migración 006: conteos de subtareas en la tabla de tareas
+-- Columnas tasks.subtask_total y tasks.subtask_completed, mantenidas por un
+-- trigger en subtasks, para devolver "3/7 subtareas" sin leer las subtareas
+-- (GET /api/v1/tasks?include_subtasks=false, dashboard y estadísticas).
+-- El tiempo sumado de las subtareas ya está en tasks.time_spent.
+--
+-- Se ejecuta en una transacción: el trigger y el relleno se ven a la vez. El
+-- relleno bloquea las subtareas para que ninguna escritura concurrente quede
+-- fuera del conteo.
+
+BEGIN;
+
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS subtask_total INTEGER DEFAULT 0 NOT NULL;
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS subtask_completed INTEGER DEFAULT 0 NOT NULL;
+
+COMMENT ON COLUMN tasks.subtask_total IS 'Número de subtareas (mantenido por trigger)';
+COMMENT ON COLUMN tasks.subtask_completed IS 'Número de subtareas completadas (mantenido por trigger)';
+
+-- Función para mantener los conteos de subtareas de la tarea: suma o resta la
+-- fila cambiada (sin recorrer las demás subtareas)
+CREATE OR REPLACE FUNCTION update_task_subtask_counts()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE tasks
+        SET subtask_total = subtask_total - 1,
+            subtask_completed = subtask_completed - OLD.completed::INTEGER
+        WHERE id = OLD.task_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE tasks
+        SET subtask_total = subtask_total + 1,
+            subtask_completed = subtask_completed + NEW.completed::INTEGER
+        WHERE id = NEW.task_id;
+    END IF;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+LOCK TABLE subtasks IN SHARE MODE;
+
+DROP TRIGGER IF EXISTS update_task_counts_on_subtask_change ON subtasks;
+CREATE TRIGGER update_task_counts_on_subtask_change
+    AFTER INSERT OR UPDATE OF completed, task_id OR DELETE ON subtasks
+    FOR EACH ROW EXECUTE FUNCTION update_task_subtask_counts();
+
+-- Relleno con los conteos actuales
+UPDATE tasks
+SET subtask_total = counts.total,
+    subtask_completed = counts.completed
+FROM (
+    SELECT task_id, COUNT(*) AS total, COUNT(*) FILTER (WHERE completed) AS completed
+    FROM subtasks
+    GROUP BY task_id
+) AS counts
+WHERE tasks.id = counts.task_id;
+
+COMMIT;
@@ -0,0 +1,91 @@
+-- Migración 007: tasks.time_spent mantenido de forma incremental y conciliación
+-- El trigger de subtasks deja de volver a sumar todas las subtareas de la tarea
+-- en cada escritura: aplica la diferencia de la fila cambiada (también cuando
+-- una subtarea cambia de tarea). La RPC reconcile_task_totals recalcula los
+-- totales (time_spent y los conteos de la migración 006) por bloques de tareas
+-- y corrige las desviaciones. Requiere la migración 006.
+--
+-- time_spent deja de aceptarse en POST/PUT /api/v1/tasks: es siempre la suma
+-- de las subtareas. Tras aplicarla, ejecuta una conciliación completa
+-- (python -m app.services.task_totals_service) para corregir los valores
+-- escritos a mano.
+
+BEGIN;
+
+-- Función para mantener time_spent de la tarea (suma de sus subtareas) en la
+-- misma transacción que la escritura: aplica la diferencia de la fila cambiada
+-- en lugar de volver a sumar todas las subtareas
+CREATE OR REPLACE FUNCTION update_task_time_spent()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.task_id = NEW.task_id THEN
+        IF NEW.time_spent <> OLD.time_spent THEN
+            UPDATE tasks
+            SET time_spent = time_spent + NEW.time_spent - OLD.time_spent
+            WHERE id = NEW.task_id;
+        END IF;
+        RETURN NEW;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE tasks SET time_spent = time_spent - OLD.time_spent WHERE id = OLD.task_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE tasks SET time_spent = time_spent + NEW.time_spent WHERE id = NEW.task_id;
+    END IF;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+-- Trigger para actualizar time_spent cuando cambia time_spent de una subtarea o se mueve de tarea
+DROP TRIGGER IF EXISTS update_task_time_on_subtask_time_change ON subtasks;
+CREATE TRIGGER update_task_time_on_subtask_time_change
+    AFTER INSERT OR UPDATE OF time_spent, task_id OR DELETE ON subtasks
+    FOR EACH ROW EXECUTE FUNCTION update_task_time_spent();
+
+-- Función RPC para conciliar los totales de un bloque de tareas (id > p_after_id,
+-- como mucho p_limit): recalcula time_spent y los conteos desde las subtareas y
+-- corrige los que no coinciden. Bloquea solo las tareas del bloque mientras dura
+-- la llamada. Devuelve el último id del bloque, las tareas revisadas y las corregidas
+CREATE OR REPLACE FUNCTION reconcile_task_totals(p_after_id BIGINT DEFAULT 0, p_limit INTEGER DEFAULT 500)
+RETURNS TABLE (last_id BIGINT, checked INTEGER, repaired INTEGER) AS $$
+DECLARE
+    v_ids BIGINT[];
+    v_repaired INTEGER;
+BEGIN
+    SELECT array_agg(chunk.id ORDER BY chunk.id) INTO v_ids
+    FROM (
+        SELECT id FROM tasks WHERE id > p_after_id ORDER BY id LIMIT p_limit FOR UPDATE
+    ) AS chunk;
+    IF v_ids IS NULL THEN
+        RETURN QUERY SELECT NULL::BIGINT, 0, 0;
+        RETURN;
+    END IF;
+    
+    -- Nueva instantánea tras obtener los bloqueos: incluye las subtareas de
+    -- las escrituras que los tenían
+    WITH totals AS (
+        SELECT ids.id,
+               COALESCE(SUM(s.time_spent), 0)::INTEGER AS time_spent,
+               COUNT(s.id)::INTEGER AS subtask_total,
+               COUNT(s.id) FILTER (WHERE s.completed)::INTEGER AS subtask_completed
+        FROM unnest(v_ids) AS ids(id)
+        LEFT JOIN subtasks s ON s.task_id = ids.id
+        GROUP BY ids.id
+    )
+    UPDATE tasks
+    SET time_spent = totals.time_spent,
+        subtask_total = totals.subtask_total,
+        subtask_completed = totals.subtask_completed
+    FROM totals
+    WHERE tasks.id = totals.id
+      AND (tasks.time_spent, tasks.subtask_total, tasks.subtask_completed)
+          IS DISTINCT FROM (totals.time_spent, totals.subtask_total, totals.subtask_completed);
+    GET DIAGNOSTICS v_repaired = ROW_COUNT;
+    
+    RETURN QUERY SELECT v_ids[array_length(v_ids, 1)], array_length(v_ids, 1), v_repaired;
+END;
+$$ language 'plpgsql';
+
+COMMENT ON COLUMN tasks.time_spent IS 'Tiempo total gastado en segundos (suma de subtareas, mantenido por trigger)';
+
+COMMIT;
@@ -0,0 +1,58 @@
+-- Migración 008: complete_pomodoro idempotente
+-- Completar un pomodoro ya completado (reintento del cliente tras un timeout,
+-- o el registro sin conexión reenviado) volvía a sumar su duración a las
+-- subtareas. Ahora devuelve el pomodoro sin cambios, marcado con
+-- already_completed para que la API no vuelva a contar la sesión.
+-- Requiere la migración 004.
+
+-- Función RPC para completar un pomodoro en una sola llamada:
+-- suma la duración a sus subtareas y lo marca como completado de forma atómica.
+-- Devuelve el pomodoro con sus subtask_ids (de pomodoro_subtasks); si ya estaba
+-- completado no cambia nada y lo marca con already_completed
+CREATE OR REPLACE FUNCTION complete_pomodoro(p_pomodoro_id BIGINT, p_actual_duration INTEGER DEFAULT NULL)
+RETURNS SETOF jsonb AS $$
+DECLARE
+    v_pomodoro pomodoros%ROWTYPE;
+    v_duration INTEGER;
+BEGIN
+    SELECT * INTO v_pomodoro FROM pomodoros WHERE id = p_pomodoro_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN;
+    END IF;
+    
+    -- Completar dos veces (reintentos, registro sin conexión) no vuelve a sumar tiempo
+    IF v_pomodoro.completed THEN
+        RETURN NEXT to_jsonb(v_pomodoro) || jsonb_build_object(
+            'subtask_ids', COALESCE(
+                (SELECT jsonb_agg(subtask_id ORDER BY subtask_id) FROM pomodoro_subtasks WHERE pomodoro_id = p_pomodoro_id),
+                '[]'::jsonb
+            ),
+            'already_completed', TRUE
+        );
+        RETURN;
+    END IF;
+    
+    v_duration := COALESCE(NULLIF(p_actual_duration, 0), NULLIF(v_pomodoro.duration, 0), 1500);
+    
+    -- Solo los pomodoros (no los descansos) suman tiempo a las subtareas
+    IF v_pomodoro.mode = 'pomodoro' THEN
+        UPDATE subtasks
+        SET time_spent = subtasks.time_spent + v_duration
+        FROM pomodoro_subtasks
+        WHERE pomodoro_subtasks.pomodoro_id = p_pomodoro_id
+          AND subtasks.id = pomodoro_subtasks.subtask_id;
+    END IF;
+    
+    UPDATE pomodoros
+    SET completed = TRUE,
+        completed_at = NOW(),
+        duration = COALESCE(NULLIF(p_actual_duration, 0), duration)
+    WHERE id = p_pomodoro_id
+    RETURNING * INTO v_pomodoro;
+    
+    RETURN NEXT to_jsonb(v_pomodoro) || jsonb_build_object('subtask_ids', COALESCE(
+        (SELECT jsonb_agg(subtask_id ORDER BY subtask_id) FROM pomodoro_subtasks WHERE pomodoro_id = p_pomodoro_id),
+        '[]'::jsonb
+    ));
+END;
+$$ language 'plpgsql';
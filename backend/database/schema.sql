@@ -12,16 +12,19 @@ CREATE TABLE IF NOT EXISTS tasks (
     category VARCHAR(20) DEFAULT 'personal' NOT NULL CHECK (category IN ('personal', 'laboral', 'otro')),
     custom_category VARCHAR(100),
     time_spent INTEGER DEFAULT 0 NOT NULL, -- En segundos
+    subtask_total INTEGER DEFAULT 0 NOT NULL, -- Mantenido por trigger
+    subtask_completed INTEGER DEFAULT 0 NOT NULL, -- Mantenido por trigger
     user_id VARCHAR(255), -- Para multi-usuario (puede ser UUID de Supabase Auth)
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL
 );
 
--- Índices para tareas
-CREATE INDEX IF NOT EXISTS idx_tasks_user_id ON tasks(user_id);
+-- Índices para tareas (compuestos según filtro y orden de las consultas)
+CREATE INDEX IF NOT EXISTS idx_tasks_user_created ON tasks(user_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_tasks_user_updated ON tasks(user_id, updated_at);
 CREATE INDEX IF NOT EXISTS idx_tasks_category ON tasks(category);
-CREATE INDEX IF NOT EXISTS idx_tasks_completed ON tasks(completed);
 CREATE INDEX IF NOT EXISTS idx_tasks_created_at ON tasks(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_tasks_updated_at ON tasks(updated_at);
 
 -- Tabla de Subtareas
 CREATE TABLE IF NOT EXISTS subtasks (
@@ -35,8 +38,8 @@ CREATE TABLE IF NOT EXISTS subtasks (
 );
 
 -- Índices para subtareas
-CREATE INDEX IF NOT EXISTS idx_subtasks_task_id ON subtasks(task_id);
-CREATE INDEX IF NOT EXISTS idx_subtasks_completed ON subtasks(completed);
+CREATE INDEX IF NOT EXISTS idx_subtasks_task_created ON subtasks(task_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_subtasks_updated_at ON subtasks(updated_at);
 
 -- Tabla de Pomodoros
 CREATE TABLE IF NOT EXISTS pomodoros (
@@ -44,7 +47,6 @@ CREATE TABLE IF NOT EXISTS pomodoros (
     mode VARCHAR(20) DEFAULT 'pomodoro' NOT NULL CHECK (mode IN ('pomodoro', 'shortBreak', 'longBreak')),
     objective TEXT,
     task_id BIGINT REFERENCES tasks(id) ON DELETE SET NULL,
-    subtask_ids BIGINT[], -- Array de IDs de subtareas
     duration INTEGER DEFAULT 1500 NOT NULL, -- Duración en segundos (25 min por defecto)
     completed BOOLEAN DEFAULT FALSE NOT NULL,
     started_at TIMESTAMP WITH TIME ZONE,
@@ -54,12 +56,30 @@ CREATE TABLE IF NOT EXISTS pomodoros (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL
 );
 
--- Índices para pomodoros
-CREATE INDEX IF NOT EXISTS idx_pomodoros_user_id ON pomodoros(user_id);
-CREATE INDEX IF NOT EXISTS idx_pomodoros_completed ON pomodoros(completed);
-CREATE INDEX IF NOT EXISTS idx_pomodoros_mode ON pomodoros(mode);
+-- Índices para pomodoros (parciales para completados, foco y activos)
+CREATE INDEX IF NOT EXISTS idx_pomodoros_user_created ON pomodoros(user_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_pomodoros_user_updated ON pomodoros(user_id, updated_at);
 CREATE INDEX IF NOT EXISTS idx_pomodoros_task_id ON pomodoros(task_id);
+CREATE INDEX IF NOT EXISTS idx_pomodoros_task_completed ON pomodoros(task_id) WHERE completed;
+CREATE INDEX IF NOT EXISTS idx_pomodoros_task_focus ON pomodoros(task_id, completed_at DESC)
+    WHERE completed AND mode = 'pomodoro';
+CREATE INDEX IF NOT EXISTS idx_pomodoros_focus_completed ON pomodoros(user_id, completed_at)
+    WHERE completed AND mode = 'pomodoro';
+CREATE INDEX IF NOT EXISTS idx_pomodoros_active ON pomodoros(user_id, created_at DESC) WHERE NOT completed;
 CREATE INDEX IF NOT EXISTS idx_pomodoros_created_at ON pomodoros(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_pomodoros_updated_at ON pomodoros(updated_at);
+
+-- Tabla de relación pomodoro-subtarea (subtareas trabajadas en cada pomodoro)
+CREATE TABLE IF NOT EXISTS pomodoro_subtasks (
+    id BIGSERIAL PRIMARY KEY,
+    pomodoro_id BIGINT NOT NULL REFERENCES pomodoros(id) ON DELETE CASCADE,
+    subtask_id BIGINT NOT NULL REFERENCES subtasks(id) ON DELETE CASCADE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL
+);
+
+-- Índices para pomodoro_subtasks: subtareas de un pomodoro y pomodoros de una subtarea
+CREATE UNIQUE INDEX IF NOT EXISTS idx_pomodoro_subtasks_pomodoro_subtask ON pomodoro_subtasks(pomodoro_id, subtask_id);
+CREATE INDEX IF NOT EXISTS idx_pomodoro_subtasks_subtask_pomodoro ON pomodoro_subtasks(subtask_id, pomodoro_id);
 
 -- Tabla de Distracciones
 CREATE TABLE IF NOT EXISTS distractions (
@@ -68,12 +88,30 @@ CREATE TABLE IF NOT EXISTS distractions (
     had_distractions BOOLEAN NOT NULL,
     used_phone BOOLEAN NOT NULL,
     user_id VARCHAR(255), -- Para multi-usuario
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL
 );
 
 -- Índices para distracciones
-CREATE INDEX IF NOT EXISTS idx_distractions_pomodoro_id ON distractions(pomodoro_id);
-CREATE INDEX IF NOT EXISTS idx_distractions_user_id ON distractions(user_id);
+CREATE INDEX IF NOT EXISTS idx_distractions_pomodoro_created ON distractions(pomodoro_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_distractions_user_created ON distractions(user_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_distractions_user_updated ON distractions(user_id, updated_at);
+CREATE INDEX IF NOT EXISTS idx_distractions_user_distracted ON distractions(user_id) WHERE had_distractions;
+CREATE INDEX IF NOT EXISTS idx_distractions_user_phone ON distractions(user_id) WHERE used_phone;
+CREATE INDEX IF NOT EXISTS idx_distractions_updated_at ON distractions(updated_at);
+
+-- Tabla de registros eliminados (tombstones) para la sincronización incremental
+CREATE TABLE IF NOT EXISTS sync_tombstones (
+    id BIGSERIAL PRIMARY KEY,
+    table_name VARCHAR(50) NOT NULL CHECK (table_name IN ('tasks', 'subtasks', 'pomodoros', 'distractions')),
+    record_id BIGINT NOT NULL,
+    user_id VARCHAR(255), -- NULL en subtareas borradas en cascada con su tarea
+    deleted_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL
+);
+
+-- Índices para tombstones
+CREATE INDEX IF NOT EXISTS idx_sync_tombstones_deleted_at ON sync_tombstones(deleted_at);
+CREATE INDEX IF NOT EXISTS idx_sync_tombstones_user_deleted ON sync_tombstones(user_id, deleted_at);
 
 -- Función para actualizar updated_at automáticamente
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -94,26 +132,96 @@ CREATE TRIGGER update_subtasks_updated_at BEFORE UPDATE ON subtasks
 CREATE TRIGGER update_pomodoros_updated_at BEFORE UPDATE ON pomodoros
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
--- Función para actualizar time_spent de la tarea cuando se actualiza una subtarea
+CREATE TRIGGER update_distractions_updated_at BEFORE UPDATE ON distractions
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- Función para registrar un tombstone al borrar una fila sincronizable
+CREATE OR REPLACE FUNCTION record_sync_tombstone()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_user_id VARCHAR(255);
+BEGIN
+    -- Las subtareas no tienen user_id: se toma de su tarea (si aún existe)
+    IF TG_TABLE_NAME = 'subtasks' THEN
+        SELECT user_id INTO v_user_id FROM tasks WHERE id = OLD.task_id;
+    ELSE
+        v_user_id := OLD.user_id;
+    END IF;
+    
+    INSERT INTO sync_tombstones (table_name, record_id, user_id)
+    VALUES (TG_TABLE_NAME, OLD.id, v_user_id);
+    RETURN OLD;
+END;
+$$ language 'plpgsql';
+
+-- Triggers para registrar borrados
+CREATE TRIGGER record_tasks_tombstone AFTER DELETE ON tasks
+    FOR EACH ROW EXECUTE FUNCTION record_sync_tombstone();
+
+CREATE TRIGGER record_subtasks_tombstone AFTER DELETE ON subtasks
+    FOR EACH ROW EXECUTE FUNCTION record_sync_tombstone();
+
+CREATE TRIGGER record_pomodoros_tombstone AFTER DELETE ON pomodoros
+    FOR EACH ROW EXECUTE FUNCTION record_sync_tombstone();
+
+CREATE TRIGGER record_distractions_tombstone AFTER DELETE ON distractions
+    FOR EACH ROW EXECUTE FUNCTION record_sync_tombstone();
+
+-- Función para mantener time_spent de la tarea (suma de sus subtareas) en la
+-- misma transacción que la escritura: aplica la diferencia de la fila cambiada
+-- en lugar de volver a sumar todas las subtareas
 CREATE OR REPLACE FUNCTION update_task_time_spent()
 RETURNS TRIGGER AS $$
 BEGIN
-    UPDATE tasks
-    SET time_spent = (
-        SELECT COALESCE(SUM(time_spent), 0)
-        FROM subtasks
-        WHERE task_id = COALESCE(NEW.task_id, OLD.task_id)
-    )
-    WHERE id = COALESCE(NEW.task_id, OLD.task_id);
+    IF TG_OP = 'UPDATE' AND OLD.task_id = NEW.task_id THEN
+        IF NEW.time_spent <> OLD.time_spent THEN
+            UPDATE tasks
+            SET time_spent = time_spent + NEW.time_spent - OLD.time_spent
+            WHERE id = NEW.task_id;
+        END IF;
+        RETURN NEW;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE tasks SET time_spent = time_spent - OLD.time_spent WHERE id = OLD.task_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE tasks SET time_spent = time_spent + NEW.time_spent WHERE id = NEW.task_id;
+    END IF;
     RETURN NEW;
 END;
 $$ language 'plpgsql';
 
--- Trigger para actualizar time_spent cuando cambia time_spent de una subtarea
+-- Trigger para actualizar time_spent cuando cambia time_spent de una subtarea o se mueve de tarea
 CREATE TRIGGER update_task_time_on_subtask_time_change
-    AFTER INSERT OR UPDATE OF time_spent OR DELETE ON subtasks
+    AFTER INSERT OR UPDATE OF time_spent, task_id OR DELETE ON subtasks
     FOR EACH ROW EXECUTE FUNCTION update_task_time_spent();
 
+-- Función para mantener los conteos de subtareas de la tarea: suma o resta la
+-- fila cambiada (sin recorrer las demás subtareas)
+CREATE OR REPLACE FUNCTION update_task_subtask_counts()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE tasks
+        SET subtask_total = subtask_total - 1,
+            subtask_completed = subtask_completed - OLD.completed::INTEGER
+        WHERE id = OLD.task_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE tasks
+        SET subtask_total = subtask_total + 1,
+            subtask_completed = subtask_completed + NEW.completed::INTEGER
+        WHERE id = NEW.task_id;
+    END IF;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+-- Trigger para mantener los conteos cuando se crea, completa, mueve o elimina una subtarea
+CREATE TRIGGER update_task_counts_on_subtask_change
+    AFTER INSERT OR UPDATE OF completed, task_id OR DELETE ON subtasks
+    FOR EACH ROW EXECUTE FUNCTION update_task_subtask_counts();
+
 -- Función para marcar tarea como completada si todas las subtareas están completadas
 CREATE OR REPLACE FUNCTION check_task_completion()
 RETURNS TRIGGER AS $$
@@ -150,13 +258,153 @@ CREATE TRIGGER check_task_completion_on_subtask_change
     AFTER INSERT OR UPDATE OF completed OR DELETE ON subtasks
     FOR EACH ROW EXECUTE FUNCTION check_task_completion();
 
+-- Función RPC para completar un pomodoro en una sola llamada:
+-- suma la duración a sus subtareas y lo marca como completado de forma atómica.
+-- Devuelve el pomodoro con sus subtask_ids (de pomodoro_subtasks); si ya estaba
+-- completado no cambia nada y lo marca con already_completed
+CREATE OR REPLACE FUNCTION complete_pomodoro(p_pomodoro_id BIGINT, p_actual_duration INTEGER DEFAULT NULL)
+RETURNS SETOF jsonb AS $$
+DECLARE
+    v_pomodoro pomodoros%ROWTYPE;
+    v_duration INTEGER;
+BEGIN
+    SELECT * INTO v_pomodoro FROM pomodoros WHERE id = p_pomodoro_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN;
+    END IF;
+    
+    -- Completar dos veces (reintentos, registro sin conexión) no vuelve a sumar tiempo
+    IF v_pomodoro.completed THEN
+        RETURN NEXT to_jsonb(v_pomodoro) || jsonb_build_object(
+            'subtask_ids', COALESCE(
+                (SELECT jsonb_agg(subtask_id ORDER BY subtask_id) FROM pomodoro_subtasks WHERE pomodoro_id = p_pomodoro_id),
+                '[]'::jsonb
+            ),
+            'already_completed', TRUE
+        );
+        RETURN;
+    END IF;
+    
+    v_duration := COALESCE(NULLIF(p_actual_duration, 0), NULLIF(v_pomodoro.duration, 0), 1500);
+    
+    -- Solo los pomodoros (no los descansos) suman tiempo a las subtareas
+    IF v_pomodoro.mode = 'pomodoro' THEN
+        UPDATE subtasks
+        SET time_spent = subtasks.time_spent + v_duration
+        FROM pomodoro_subtasks
+        WHERE pomodoro_subtasks.pomodoro_id = p_pomodoro_id
+          AND subtasks.id = pomodoro_subtasks.subtask_id;
+    END IF;
+    
+    UPDATE pomodoros
+    SET completed = TRUE,
+        completed_at = NOW(),
+        duration = COALESCE(NULLIF(p_actual_duration, 0), duration)
+    WHERE id = p_pomodoro_id
+    RETURNING * INTO v_pomodoro;
+    
+    RETURN NEXT to_jsonb(v_pomodoro) || jsonb_build_object('subtask_ids', COALESCE(
+        (SELECT jsonb_agg(subtask_id ORDER BY subtask_id) FROM pomodoro_subtasks WHERE pomodoro_id = p_pomodoro_id),
+        '[]'::jsonb
+    ));
+END;
+$$ language 'plpgsql';
+
+-- Función RPC para el historial de foco de una tarea o subtarea: sesiones de
+-- foco completadas antes de p_before, de la más reciente a la más antigua
+CREATE OR REPLACE FUNCTION get_focus_sessions(
+    p_task_id BIGINT DEFAULT NULL,
+    p_subtask_id BIGINT DEFAULT NULL,
+    p_before TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_limit INTEGER DEFAULT 50
+)
+RETURNS TABLE (
+    pomodoro_id BIGINT,
+    task_id BIGINT,
+    started_at TIMESTAMP WITH TIME ZONE,
+    completed_at TIMESTAMP WITH TIME ZONE,
+    duration INTEGER
+) AS $$
+BEGIN
+    IF p_subtask_id IS NOT NULL THEN
+        -- Pomodoros de la subtarea por idx_pomodoro_subtasks_subtask_pomodoro
+        RETURN QUERY
+        SELECT p.id, p.task_id, p.started_at, p.completed_at, p.duration
+        FROM pomodoro_subtasks ps
+        JOIN pomodoros p ON p.id = ps.pomodoro_id
+        WHERE ps.subtask_id = p_subtask_id
+          AND p.completed AND p.mode = 'pomodoro'
+          AND p.completed_at < COALESCE(p_before, 'infinity')
+        ORDER BY p.completed_at DESC
+        LIMIT p_limit;
+    ELSE
+        -- Recorrido del índice parcial idx_pomodoros_task_focus desde p_before
+        RETURN QUERY
+        SELECT p.id, p.task_id, p.started_at, p.completed_at, p.duration
+        FROM pomodoros p
+        WHERE p.task_id = p_task_id
+          AND p.completed AND p.mode = 'pomodoro'
+          AND p.completed_at < COALESCE(p_before, 'infinity')
+        ORDER BY p.completed_at DESC
+        LIMIT p_limit;
+    END IF;
+END;
+$$ language 'plpgsql' STABLE;
+
+-- Función RPC para conciliar los totales de un bloque de tareas (id > p_after_id,
+-- como mucho p_limit): recalcula time_spent y los conteos desde las subtareas y
+-- corrige los que no coinciden. Bloquea solo las tareas del bloque mientras dura
+-- la llamada. Devuelve el último id del bloque, las tareas revisadas y las corregidas
+CREATE OR REPLACE FUNCTION reconcile_task_totals(p_after_id BIGINT DEFAULT 0, p_limit INTEGER DEFAULT 500)
+RETURNS TABLE (last_id BIGINT, checked INTEGER, repaired INTEGER) AS $$
+DECLARE
+    v_ids BIGINT[];
+    v_repaired INTEGER;
+BEGIN
+    SELECT array_agg(chunk.id ORDER BY chunk.id) INTO v_ids
+    FROM (
+        SELECT id FROM tasks WHERE id > p_after_id ORDER BY id LIMIT p_limit FOR UPDATE
+    ) AS chunk;
+    IF v_ids IS NULL THEN
+        RETURN QUERY SELECT NULL::BIGINT, 0, 0;
+        RETURN;
+    END IF;
+    
+    -- Nueva instantánea tras obtener los bloqueos: incluye las subtareas de
+    -- las escrituras que los tenían
+    WITH totals AS (
+        SELECT ids.id,
+               COALESCE(SUM(s.time_spent), 0)::INTEGER AS time_spent,
+               COUNT(s.id)::INTEGER AS subtask_total,
+               COUNT(s.id) FILTER (WHERE s.completed)::INTEGER AS subtask_completed
+        FROM unnest(v_ids) AS ids(id)
+        LEFT JOIN subtasks s ON s.task_id = ids.id
+        GROUP BY ids.id
+    )
+    UPDATE tasks
+    SET time_spent = totals.time_spent,
+        subtask_total = totals.subtask_total,
+        subtask_completed = totals.subtask_completed
+    FROM totals
+    WHERE tasks.id = totals.id
+      AND (tasks.time_spent, tasks.subtask_total, tasks.subtask_completed)
+          IS DISTINCT FROM (totals.time_spent, totals.subtask_total, totals.subtask_completed);
+    GET DIAGNOSTICS v_repaired = ROW_COUNT;
+    
+    RETURN QUERY SELECT v_ids[array_length(v_ids, 1)], array_length(v_ids, 1), v_repaired;
+END;
+$$ language 'plpgsql';
+
 -- Comentarios en las tablas (documentación)
 COMMENT ON TABLE tasks IS 'Tabla principal de tareas del usuario';
 COMMENT ON TABLE subtasks IS 'Subtareas asociadas a las tareas';
 COMMENT ON TABLE pomodoros IS 'Registro de sesiones de pomodoro completadas';
+COMMENT ON TABLE pomodoro_subtasks IS 'Subtareas trabajadas en cada pomodoro';
 COMMENT ON TABLE distractions IS 'Registro de distracciones durante pomodoros';
+COMMENT ON TABLE sync_tombstones IS 'Registros eliminados, para la sincronización incremental (GET /api/v1/sync)';
 
-COMMENT ON COLUMN tasks.time_spent IS 'Tiempo total gastado en segundos (suma de subtareas)';
+COMMENT ON COLUMN tasks.time_spent IS 'Tiempo total gastado en segundos (suma de subtareas, mantenido por trigger)';
+COMMENT ON COLUMN tasks.subtask_total IS 'Número de subtareas (mantenido por trigger)';
+COMMENT ON COLUMN tasks.subtask_completed IS 'Número de subtareas completadas (mantenido por trigger)';
 COMMENT ON COLUMN subtasks.time_spent IS 'Tiempo gastado en esta subtarea en segundos';
 COMMENT ON COLUMN pomodoros.duration IS 'Duración del pomodoro en segundos';
-COMMENT ON COLUMN pomodoros.subtask_ids IS 'Array de IDs de subtareas asociadas al pomodoro';
@@ -9,6 +9,36 @@ from typing import Generator
 from datetime import datetime
 from app.main import app
 from app.models.schemas import TaskCategory, PomodoroMode
+from app.database.memory_client import MemoryClient
+from tests.query_budget import QueryBudget, budget_from_marker
+from app.core.single_flight import single_flight
+from app.core.stale_cache import stale_cache
+from app.database.circuit_breaker import reset_breaker
+from app.database.concurrency_limit import reset_limiter
+from app.core.events import reset_event_bus
+from app.core.history_cache import history_cache
+from app.core.jobs import reset_job_runner
+from app.database.references import reference_cache
+from app.services.distraction_service import close_distraction_writer
+
+
+# Módulos que importan get_supabase y deben apuntar al cliente de prueba
+SUPABASE_TARGETS = [
+    'app.database.supabase_client.get_supabase',
+    'app.database.references.get_supabase',
+    'app.services.task_service.get_supabase',
+    'app.services.subtask_service.get_supabase',
+    'app.services.pomodoro_service.get_supabase',
+    'app.services.distraction_service.get_supabase',
+    'app.routers.statistics.get_supabase',
+    'app.services.dashboard_service.get_supabase',
+    'app.services.sync_service.get_supabase',
+    'app.services.offline_service.get_supabase',
+    'app.services.history_service.get_supabase',
+    'app.services.insights_service.get_supabase',
+    'app.services.report_service.get_supabase',
+    'app.services.task_totals_service.get_supabase',
+]
 
 
 @pytest.fixture
@@ -18,6 +48,30 @@ def client() -> Generator[TestClient, None, None]:
         yield test_client
 
 
+@pytest.fixture(autouse=True)
+def reset_resilience_state():
+    """Evitar que cachés, circuito, limitador y bus de eventos se compartan entre tests"""
+    single_flight.clear()
+    stale_cache.clear()
+    reset_breaker()
+    reset_limiter()
+    reset_event_bus()
+    history_cache.clear()
+    reference_cache.clear()
+    reset_job_runner()
+    close_distraction_writer()
+    yield
+    single_flight.clear()
+    stale_cache.clear()
+    reset_breaker()
+    reset_limiter()
+    reset_event_bus()
+    history_cache.clear()
+    reference_cache.clear()
+    reset_job_runner()
+    close_distraction_writer()
+
+
 @pytest.fixture(autouse=True)
 def mock_supabase(monkeypatch):
     """Mock del cliente Supabase - se aplica automáticamente a todos los tests"""
@@ -27,15 +81,37 @@ def mock_supabase(monkeypatch):
         return mock_client
     
     # Usar monkeypatch para asegurar que el mock se aplique antes de importar
-    monkeypatch.setattr('app.database.supabase_client.get_supabase', mock_get_supabase)
-    monkeypatch.setattr('app.services.task_service.get_supabase', mock_get_supabase)
-    monkeypatch.setattr('app.services.subtask_service.get_supabase', mock_get_supabase)
-    monkeypatch.setattr('app.services.pomodoro_service.get_supabase', mock_get_supabase)
-    monkeypatch.setattr('app.services.distraction_service.get_supabase', mock_get_supabase)
+    for target in SUPABASE_TARGETS:
+        monkeypatch.setattr(target, mock_get_supabase)
     
     yield mock_client
 
 
+@pytest.fixture
+def memory_supabase(mock_supabase, monkeypatch):
+    """
+    Backend en memoria fiel al contrato de Supabase (esquema, cascadas,
+    triggers) que registra cada llamada en ``memory_supabase.calls``.
+    Reemplaza al mock automático en los tests que lo solicitan.
+    """
+    memory_client = MemoryClient()
+    
+    for target in SUPABASE_TARGETS:
+        monkeypatch.setattr(target, lambda: memory_client)
+    
+    yield memory_client
+
+
+@pytest.fixture
+def query_budget(request, memory_supabase):
+    """
+    Presupuesto de consultas sobre el backend en memoria.
+    El máximo se declara con ``@pytest.mark.query_budget(n)`` o llamando
+    a la fixture: ``with query_budget(n): ...``
+    """
+    return QueryBudget(memory_supabase, budget_from_marker(request), request.node.name)
+
+
 @pytest.fixture
 def sample_task_data():
     """Datos de ejemplo para una tarea"""
@@ -0,0 +1,70 @@
+"""
+Presupuestos de consultas a Supabase para los tests
+
+Las regresiones de rendimiento de esta API suelen ser regresiones de round
+trips (N+1). ``QueryBudget`` cuenta las llamadas registradas por el backend
+en memoria dentro de un bloque y falla, mostrando la traza de llamadas, si se
+supera el máximo declarado.
+
+Uso con el marker (el máximo se toma del marker):
+
+    @pytest.mark.query_budget(2)
+    def test_listar_tareas(client, memory_supabase, query_budget):
+        ...  # preparar datos (no cuenta)
+        with query_budget:
+            client.get("/api/v1/tasks/")
+
+O con un máximo explícito: ``with query_budget(3): ...``
+"""
+
+from typing import List, Optional
+
+import pytest
+
+from app.database.memory_client import MemoryClient, RecordedCall
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Se superó el número máximo de consultas permitido"""
+
+
+class QueryBudget:
+    """Context manager que limita las consultas ejecutadas en un bloque"""
+
+    def __init__(self, client: MemoryClient, max_calls: Optional[int] = None, label: str = ""):
+        self.client = client
+        self.max_calls = max_calls
+        self.label = label
+        self.calls: List[RecordedCall] = []
+        self._start = 0
+
+    def __call__(self, max_calls: int, label: str = "") -> "QueryBudget":
+        """Crear un presupuesto con un máximo explícito"""
+        return QueryBudget(self.client, max_calls, label)
+
+    def __enter__(self) -> "QueryBudget":
+        if self.max_calls is None:
+            raise ValueError("Falta el máximo de consultas: usa @pytest.mark.query_budget(n) o query_budget(n)")
+        self._start = len(self.client.calls)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.calls = list(self.client.calls[self._start:])
+        if exc_type is None and len(self.calls) > self.max_calls:
+            raise QueryBudgetExceeded(self.report())
+        return False
+
+    def report(self) -> str:
+        """Traza legible de las consultas ejecutadas"""
+        title = f" ({self.label})" if self.label else ""
+        lines = [f"Presupuesto de consultas superado{title}: {len(self.calls)} > {self.max_calls}"]
+        lines += [f"  {n:3d}. {call}" for n, call in enumerate(self.calls, 1)]
+        return "\n".join(lines)
+
+
+def budget_from_marker(request: pytest.FixtureRequest) -> Optional[int]:
+    """Máximo de consultas declarado con ``@pytest.mark.query_budget(n)``"""
+    marker = request.node.get_closest_marker("query_budget")
+    if marker is None:
+        return None
+    return marker.args[0] if marker.args else marker.kwargs["max_calls"]
@@ -0,0 +1,90 @@
+"""
+Tests para el endpoint de lotes (POST /api/v1/batch)
+"""
+
+from app.config import settings
+
+
+def _batch(client, *operations):
+    response = client.post("/api/v1/batch/", json={"requests": list(operations)})
+    assert response.status_code == 200
+    return response.json()["responses"]
+
+
+class TestBatchRouter:
+    """Tests para el router de lotes"""
+
+    def test_initial_load_in_one_request(self, client, memory_supabase):
+        """La carga inicial del frontend cabe en un solo lote"""
+        client.post("/api/v1/tasks/", json={"title": "Tarea", "user_id": "u1"})
+
+        responses = _batch(
+            client,
+            {"id": "tasks", "path": "/api/v1/tasks/", "params": {"user_id": "u1"}},
+            {"id": "count", "path": "/api/v1/pomodoros/count", "params": {"user_id": "u1"}},
+            {"id": "stats", "path": "/api/v1/statistics/", "params": {"user_id": "u1"}},
+        )
+
+        assert [r["id"] for r in responses] == ["tasks", "count", "stats"]
+        assert [r["status"] for r in responses] == [200, 200, 200]
+        assert responses[0]["body"][0]["title"] == "Tarea"
+        assert responses[1]["body"] == {"count": 0}
+
+    def test_writes_applied_in_order(self, client, memory_supabase):
+        """Las escrituras se aplican en orden y las lecturas posteriores las ven"""
+        task = client.post("/api/v1/tasks/", json={"title": "Tarea"}).json()
+        first = client.post("/api/v1/subtasks/", json={"task_id": task["id"], "title": "A"}).json()
+        second = client.post("/api/v1/subtasks/", json={"task_id": task["id"], "title": "B"}).json()
+
+        responses = _batch(
+            client,
+            {"method": "PUT", "path": f"/api/v1/subtasks/{first['id']}", "body": {"completed": True}},
+            {"method": "PUT", "path": f"/api/v1/subtasks/{second['id']}", "body": {"completed": True}},
+            {"path": f"/api/v1/tasks/{task['id']}"},
+        )
+
+        assert [r["status"] for r in responses] == [200, 200, 200]
+        assert responses[2]["body"]["completed"] is True
+
+    def test_per_item_errors(self, client, memory_supabase):
+        """Cada operación tiene su propio estado; un error no afecta al resto"""
+        responses = _batch(
+            client,
+            {"path": "/api/v1/tasks/999"},
+            {"method": "POST", "path": "/api/v1/tasks/", "body": {"title": ""}},
+            {"path": "/api/v1/tasks/"},
+        )
+
+        assert [r["status"] for r in responses] == [404, 422, 200]
+        assert "no encontrada" in responses[0]["body"]["detail"]
+
+    def test_rejects_nested_batches_and_foreign_paths(self, client):
+        """No se admiten lotes anidados ni rutas fuera de la API"""
+        responses = _batch(
+            client,
+            {"method": "POST", "path": "/api/v1/batch/", "body": {"requests": []}},
+            {"path": "/metrics"},
+        )
+
+        assert [r["status"] for r in responses] == [400, 400]
+
+    def test_paths_without_trailing_slash(self, client, memory_supabase):
+        """Las rutas sin barra final (como las usa el frontend) funcionan igual"""
+        responses = _batch(client, {"method": "POST", "path": "/api/v1/tasks", "body": {"title": "Tarea"}})
+
+        assert responses[0]["status"] == 201
+        assert responses[0]["body"]["title"] == "Tarea"
+
+    def test_limit_on_batch_size(self, client, monkeypatch):
+        """Los lotes demasiado grandes se rechazan"""
+        monkeypatch.setattr(settings, "BATCH_MAX_REQUESTS", 2)
+
+        response = client.post("/api/v1/batch/", json={"requests": [{"path": "/api/v1/tasks/"}] * 3})
+
+        assert response.status_code == 400
+
+    def test_empty_batch_is_invalid(self, client):
+        """Un lote vacío no es válido"""
+        response = client.post("/api/v1/batch/", json={"requests": []})
+
+        assert response.status_code == 422
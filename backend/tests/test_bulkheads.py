@@ -0,0 +1,107 @@
+"""
+Tests para los pools de ejecución acotados (bulkheads)
+"""
+
+import asyncio
+import threading
+import pytest
+from fastapi import HTTPException
+from app.config import settings
+from app.core.bulkheads import Bulkhead, bulkhead, get_bulkhead, shutdown_bulkheads
+
+
+@pytest.fixture(autouse=True)
+def reset_bulkheads():
+    """Cada test parte de pools nuevos"""
+    shutdown_bulkheads()
+    yield
+    shutdown_bulkheads()
+
+
+class TestBulkhead:
+    """Tests para Bulkhead"""
+
+    def test_runs_in_pool_thread(self):
+        """La llamada se ejecuta fuera del hilo del event loop"""
+        pool = Bulkhead("test", max_workers=1, queue_depth=0)
+
+        result = asyncio.run(pool.run(threading.current_thread))
+
+        assert result.name.startswith("bulkhead-test")
+        pool.shutdown()
+
+    def test_rejects_when_saturated(self):
+        """Con hilos y cola llenos se rechaza con 503 sin esperar"""
+        pool = Bulkhead("test", max_workers=1, queue_depth=1)
+        release = threading.Event()
+
+        pool.submit(release.wait)
+        pool.submit(release.wait)
+        with pytest.raises(HTTPException) as exc_info:
+            pool.submit(release.wait)
+
+        assert exc_info.value.status_code == 503
+        assert exc_info.value.headers["Retry-After"] == "1"
+        assert pool.snapshot()["active"] == 1
+        assert pool.snapshot()["queued"] == 1
+
+        release.set()
+        pool.shutdown()
+
+        snapshot = pool.snapshot()
+        assert snapshot["rejected"] == 1
+        assert snapshot["completed"] == 2
+        assert snapshot["active"] == 0
+
+    def test_exceptions_propagate(self):
+        """Las excepciones del servicio llegan al endpoint"""
+        pool = Bulkhead("test", max_workers=1, queue_depth=0)
+
+        def fail():
+            raise HTTPException(status_code=404, detail="no existe")
+
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(pool.run(fail))
+
+        assert exc_info.value.status_code == 404
+        pool.shutdown()
+
+    def test_pools_are_sized_from_settings(self, monkeypatch):
+        """Los tamaños se leen de Settings"""
+        monkeypatch.setattr(settings, "BULKHEAD_ANALYTICS_WORKERS", 3)
+        monkeypatch.setattr(settings, "BULKHEAD_ANALYTICS_QUEUE", 5)
+
+        pool = get_bulkhead("analytics")
+
+        assert pool.max_workers == 3
+        assert pool.capacity == 8
+
+    def test_unknown_workload_is_rejected(self):
+        """Solo se admiten las clases de carga conocidas"""
+        with pytest.raises(ValueError):
+            bulkhead("otra")
+
+
+class TestBulkheadIsolation:
+    """Las lecturas pesadas no bloquean las escrituras del temporizador"""
+
+    def test_timer_writes_succeed_while_analytics_saturated(self, client, memory_supabase, monkeypatch):
+        """Con el pool de analítica saturado, /statistics da 503 y /pomodoros sigue respondiendo"""
+        monkeypatch.setattr(settings, "BULKHEAD_ANALYTICS_WORKERS", 1)
+        monkeypatch.setattr(settings, "BULKHEAD_ANALYTICS_QUEUE", 0)
+        monkeypatch.setattr(settings, "SINGLE_FLIGHT_ENABLED", False)
+        release = threading.Event()
+        get_bulkhead("analytics").submit(release.wait)
+
+        try:
+            statistics = client.get("/api/v1/statistics/")
+            pomodoro = client.post("/api/v1/pomodoros/", json={"mode": "pomodoro"})
+        finally:
+            release.set()
+
+        assert statistics.status_code == 503
+        assert pomodoro.status_code == 200
+
+        metrics = client.get("/metrics").json()["bulkheads"]
+        assert metrics["analytics"]["rejected"] == 1
+        assert metrics["timer"]["completed"] == 1
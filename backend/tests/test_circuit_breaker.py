@@ -0,0 +1,166 @@
+"""
+Tests para el circuit breaker y la respuesta con datos obsoletos
+"""
+
+import pytest
+from unittest.mock import MagicMock
+from postgrest.exceptions import APIError
+from app.config import settings
+from app.core.stale_cache import stale_cache
+from app.database import circuit_breaker
+from app.database.circuit_breaker import (
+    CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN, get_breaker
+)
+from app.database.memory_client import MemoryQuery
+from app.database.query_log import ObservedClient
+from tests.conftest import SUPABASE_TARGETS
+
+
+@pytest.fixture
+def observed_supabase(memory_supabase, monkeypatch):
+    """Backend en memoria detrás del cliente instrumentado (con circuito)"""
+    observed = ObservedClient(memory_supabase)
+    for target in SUPABASE_TARGETS:
+        monkeypatch.setattr(target, lambda: observed)
+    return observed
+
+
+@pytest.fixture
+def outage(monkeypatch):
+    """Simular una caída de red de Supabase"""
+    def fail(self):
+        raise ConnectionError("Supabase no responde")
+    monkeypatch.setattr(MemoryQuery, "execute", fail)
+
+
+class TestCircuitBreaker:
+    """Tests para CircuitBreaker"""
+
+    def test_opens_after_consecutive_failures(self):
+        """Se abre tras el umbral de fallos consecutivos y rechaza al instante"""
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+
+        for _ in range(3):
+            breaker.before_call()
+            breaker.record(success=False)
+
+        assert breaker.state == OPEN
+        with pytest.raises(CircuitOpenError) as exc_info:
+            breaker.before_call()
+        assert exc_info.value.status_code == 503
+        assert breaker.stats["rejected"] == 1
+
+    def test_success_resets_failure_count(self):
+        """Un éxito reinicia la cuenta de fallos"""
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+
+        breaker.record(success=False)
+        breaker.record(success=True)
+        breaker.record(success=False)
+
+        assert breaker.state == CLOSED
+
+    def test_half_open_allows_single_probe(self, monkeypatch):
+        """Pasado el timeout solo se admite una llamada de prueba"""
+        clock = [100.0]
+        monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: clock[0])
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+        breaker.record(success=False)
+
+        clock[0] += 11
+        breaker.before_call()
+        assert breaker.state == HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+        breaker.record(success=True)
+        assert breaker.state == CLOSED
+
+    def test_failed_probe_reopens(self, monkeypatch):
+        """Si la prueba falla el circuito vuelve a abrirse"""
+        clock = [100.0]
+        monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: clock[0])
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+        breaker.record(success=False)
+
+        clock[0] += 11
+        breaker.before_call()
+        breaker.record(success=False)
+
+        assert breaker.state == OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+    def test_api_errors_do_not_open_circuit(self):
+        """Los errores de PostgREST no cuentan como fallos"""
+        raw_client = MagicMock()
+        raw_client.table.return_value.insert.return_value.execute.side_effect = APIError({"code": "23503"})
+        client = ObservedClient(raw_client)
+
+        for _ in range(settings.CIRCUIT_FAILURE_THRESHOLD):
+            with pytest.raises(APIError):
+                client.table("subtasks").insert({}).execute()
+
+        assert get_breaker().state == CLOSED
+
+    @pytest.mark.parametrize("code", ["57014", "PGRST003", "08006", "503"])
+    def test_server_api_errors_open_circuit(self, code):
+        """Los APIError de timeout, conexión o 5xx sí cuentan como fallos"""
+        raw_client = MagicMock()
+        raw_client.table.return_value.select.return_value.execute.side_effect = APIError({"code": code})
+        client = ObservedClient(raw_client)
+
+        for _ in range(settings.CIRCUIT_FAILURE_THRESHOLD):
+            with pytest.raises(APIError):
+                client.table("tasks").select("*").execute()
+
+        assert get_breaker().state == OPEN
+
+
+class TestStaleFallback:
+    """Con Supabase caído las lecturas sirven la última respuesta correcta"""
+
+    def test_reads_served_stale_and_writes_fail_fast(self, client, observed_supabase, monkeypatch):
+        """Tras abrir el circuito, GET responde con datos obsoletos y POST con 503"""
+        monkeypatch.setattr(settings, "SINGLE_FLIGHT_ENABLED", False)
+        client.post("/api/v1/tasks/", json={"title": "Tarea", "user_id": "u1"})
+        fresh = client.get("/api/v1/tasks/", params={"user_id": "u1"})
+        assert "X-Cache" not in fresh.headers
+
+        def fail(self):
+            raise ConnectionError("Supabase no responde")
+        monkeypatch.setattr(MemoryQuery, "execute", fail)
+
+        for _ in range(settings.CIRCUIT_FAILURE_THRESHOLD):
+            client.get("/api/v1/tasks/", params={"user_id": "u1"})
+        assert get_breaker().state == OPEN
+
+        stale = client.get("/api/v1/tasks/", params={"user_id": "u1"})
+        assert stale.status_code == 200
+        assert stale.headers["X-Cache"] == "stale"
+        assert "Response is Stale" in stale.headers["Warning"]
+        assert stale.json() == fresh.json()
+
+        write = client.post("/api/v1/pomodoros/", json={"mode": "pomodoro"})
+        assert write.status_code == 503
+        assert "Retry-After" in write.headers
+
+    def test_read_without_cached_response_fails(self, client, observed_supabase, outage):
+        """Sin respuesta previa el error se propaga"""
+        response = client.get("/api/v1/pomodoros/count")
+
+        assert response.status_code == 500
+        assert stale_cache.stats["misses"] == 1
+
+    def test_client_errors_are_not_masked(self, client, observed_supabase):
+        """Los 404 no se sustituyen por datos obsoletos"""
+        response = client.get("/api/v1/tasks/999")
+
+        assert response.status_code == 404
+
+    def test_metrics_expose_breaker(self, client):
+        """/metrics expone el estado del circuito y de la caché"""
+        metrics = client.get("/metrics").json()
+
+        assert metrics["circuit_breaker"]["state"] == CLOSED
+        assert metrics["stale_cache"]["entries"] == 0
@@ -0,0 +1,141 @@
+"""
+Tests para el límite adaptativo de concurrencia hacia Supabase
+"""
+
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock
+from fastapi import HTTPException
+from app.config import settings
+from app.database.concurrency_limit import AdaptiveLimiter, get_limiter, reset_limiter
+from app.database.query_log import ObservedClient
+
+
+@pytest.fixture(autouse=True)
+def fresh_limiter():
+    """Cada test parte de un limitador nuevo"""
+    reset_limiter()
+    yield
+    reset_limiter()
+
+
+def _limiter(**overrides):
+    params = dict(initial=4, min_limit=1, max_limit=10, latency_target_ms=100,
+                  backoff=0.5, queue_timeout_ms=20, max_queue=1)
+    params.update(overrides)
+    return AdaptiveLimiter(**params)
+
+
+class TestAdaptiveLimiter:
+    """Tests para AdaptiveLimiter"""
+
+    def test_fast_calls_increase_limit(self):
+        """Las llamadas rápidas con el límite en uso lo hacen crecer"""
+        limiter = _limiter(initial=2)
+
+        for _ in range(10):
+            started = [limiter.acquire(), limiter.acquire()]
+            for started_at in started:
+                limiter.release(started_at, 5.0)
+
+        assert limiter.limit > 2
+
+    def test_slow_call_decreases_limit_once_per_window(self):
+        """Una ráfaga de llamadas lentas reduce el límite una sola vez"""
+        limiter = _limiter(initial=8)
+        started = [limiter.acquire() for _ in range(4)]
+
+        for started_at in started:
+            limiter.release(started_at, 500.0)
+
+        assert limiter.limit == 4
+        assert limiter.stats["decreases"] == 1
+
+    def test_network_errors_decrease_limit(self):
+        """Un fallo de red cuenta como sobrecarga aunque sea rápido"""
+        limiter = _limiter(initial=8)
+
+        limiter.release(limiter.acquire(), 1.0, dropped=True)
+
+        assert limiter.limit == 4
+
+    def test_limit_respects_bounds(self):
+        """El límite nunca baja del mínimo"""
+        limiter = _limiter(initial=2, min_limit=2)
+
+        for _ in range(5):
+            limiter.release(limiter.acquire(), 500.0)
+
+        assert limiter.limit == 2
+
+    def test_excess_calls_are_rejected_after_deadline(self):
+        """Por encima del límite se espera en cola y, al vencer el plazo, 503"""
+        limiter = _limiter(initial=1)
+        limiter.acquire()
+
+        start = time.monotonic()
+        with pytest.raises(HTTPException) as exc_info:
+            limiter.acquire()
+
+        assert exc_info.value.status_code == 503
+        assert time.monotonic() - start >= 0.015
+        assert limiter.stats["queue_timeouts"] == 1
+
+    def test_full_queue_rejects_immediately(self):
+        """Con la cola llena el rechazo es inmediato"""
+        limiter = _limiter(initial=1, max_queue=0)
+        limiter.acquire()
+
+        with pytest.raises(HTTPException):
+            limiter.acquire()
+
+        assert limiter.snapshot()["rejected"] == 1
+        assert limiter.snapshot()["queue_timeouts"] == 0
+
+    def test_queued_call_proceeds_when_slot_frees(self):
+        """Una llamada en cola entra en cuanto otra termina"""
+        limiter = _limiter(initial=1, queue_timeout_ms=1000)
+        first = limiter.acquire()
+
+        timer = threading.Timer(0.01, limiter.release, args=(first, 1.0))
+        timer.start()
+        limiter.acquire()
+        timer.join()
+
+        assert limiter.snapshot()["inflight"] == 1
+        assert limiter.stats["accepted"] == 2
+
+
+class TestLimiterIntegration:
+    """El limitador envuelve cada execute() del cliente instrumentado"""
+
+    def test_observed_query_releases_slot(self):
+        """Tras execute() el hueco queda libre, también si falla"""
+        raw_client = MagicMock()
+        raw_client.table.return_value.select.return_value.execute.side_effect = [
+            MagicMock(data=[]), ConnectionError("caída")
+        ]
+        client = ObservedClient(raw_client)
+
+        client.table("tasks").select("*").execute()
+        with pytest.raises(ConnectionError):
+            client.table("tasks").select("*").execute()
+
+        snapshot = get_limiter().snapshot()
+        assert snapshot["inflight"] == 0
+        assert snapshot["accepted"] == 2
+        assert snapshot["decreases"] == 1
+
+    def test_disabled_limiter(self, monkeypatch):
+        """Con ADAPTIVE_LIMIT_ENABLED=False no hay limitador"""
+        monkeypatch.setattr(settings, "ADAPTIVE_LIMIT_ENABLED", False)
+
+        assert get_limiter() is None
+
+    def test_metrics_expose_limit(self, client):
+        """/metrics expone el límite actual y los rechazos"""
+        metrics = client.get("/metrics").json()["concurrency_limit"]
+
+        assert metrics["limit"] == settings.ADAPTIVE_LIMIT_INITIAL
+        assert metrics["rejected"] == 0
@@ -0,0 +1,100 @@
+"""
+Tests para el endpoint del dashboard (GET /api/v1/dashboard)
+"""
+
+import pytest
+from datetime import datetime, timedelta, timezone
+
+
+def _seed(memory_supabase):
+    """Una tarea con dos subtareas (una completada), pomodoros de hoy y anteriores y uno activo"""
+    task = memory_supabase.table("tasks").insert({"title": "Tarea", "user_id": "u1"}).execute().data[0]
+    memory_supabase.table("subtasks").insert([
+        {"task_id": task["id"], "title": "A", "completed": True},
+        {"task_id": task["id"], "title": "B"},
+    ]).execute()
+
+    now = datetime.now(timezone.utc)
+    memory_supabase.table("pomodoros").insert([
+        {"task_id": task["id"], "user_id": "u1", "completed": True, "completed_at": now.isoformat()},
+        {"task_id": task["id"], "user_id": "u1", "completed": True,
+         "completed_at": (now - timedelta(days=2)).isoformat()},
+        {"task_id": task["id"], "user_id": "u1", "completed": True, "mode": "shortBreak",
+         "completed_at": now.isoformat()},
+    ]).execute()
+    active = memory_supabase.table("pomodoros").insert({
+        "task_id": task["id"], "user_id": "u1"
+    }).execute().data[0]
+    memory_supabase.table("distractions").insert({
+        "pomodoro_id": active["id"], "user_id": "u1", "had_distractions": True, "used_phone": False
+    }).execute()
+    return task, active
+
+
+class TestDashboardRouter:
+    """Tests para el router del dashboard"""
+
+    @pytest.mark.query_budget(7)
+    def test_full_dashboard(self, client, memory_supabase, query_budget):
+        """Todas las secciones en una petición, con un número fijo de consultas"""
+        task, active = _seed(memory_supabase)
+
+        with query_budget:
+            response = client.get("/api/v1/dashboard/", params={"user_id": "u1"})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["tasks"][0]["id"] == task["id"]
+        assert data["tasks"][0]["subtask_total"] == 2
+        assert data["tasks"][0]["subtask_completed"] == 1
+        assert "subtasks" not in data["tasks"][0]
+        assert data["today_pomodoros"] == 1
+        assert data["active_pomodoro"]["id"] == active["id"]
+        assert data["summary"]["total_pomodoros"] == 2
+        assert data["summary"]["distractions_count"] == 1
+        assert data["summary"]["phone_usage_count"] == 0
+
+    def test_sections_and_fields(self, client, memory_supabase):
+        """Solo se devuelven las secciones y campos pedidos"""
+        _seed(memory_supabase)
+
+        response = client.get("/api/v1/dashboard/", params={
+            "user_id": "u1",
+            "sections": "tasks,summary",
+            "fields": "tasks.id,tasks.title,summary.total_pomodoros",
+        })
+
+        assert response.status_code == 200
+        data = response.json()
+        assert set(data) == {"tasks", "summary"}
+        assert set(data["tasks"][0]) == {"id", "title"}
+        assert data["summary"] == {"total_pomodoros": 2}
+
+    def test_no_active_pomodoro(self, client, memory_supabase):
+        """Sin pomodoro activo la sección se devuelve como null"""
+        response = client.get("/api/v1/dashboard/", params={"sections": "active_pomodoro"})
+
+        assert response.status_code == 200
+        assert response.json() == {"active_pomodoro": None}
+
+    def test_today_start_from_client(self, client, memory_supabase):
+        """El inicio del día lo puede fijar el cliente (zona horaria local)"""
+        _seed(memory_supabase)
+        since = datetime.now(timezone.utc) - timedelta(days=3)
+
+        response = client.get("/api/v1/dashboard/", params={
+            "user_id": "u1", "sections": "today_pomodoros", "today_start": since.isoformat()
+        })
+
+        assert response.json() == {"today_pomodoros": 2}
+
+    @pytest.mark.parametrize("params", [
+        {"sections": "tasks,unknown"},
+        {"fields": "tasks"},
+        {"fields": "other.id"},
+    ])
+    def test_invalid_selection(self, client, params):
+        """Secciones o campos desconocidos devuelven 400"""
+        response = client.get("/api/v1/dashboard/", params=params)
+
+        assert response.status_code == 400
@@ -0,0 +1,206 @@
+"""
+Tests para los plazos por petición y la cancelación por desconexión
+"""
+
+import asyncio
+import time
+import pytest
+from unittest.mock import MagicMock
+from app.config import settings
+from app.core import deadlines
+from app.core.bulkheads import Bulkhead
+from app.core.deadlines import (
+    DeadlineExceeded, DeadlineMiddleware, RequestCancelled, RequestDeadline, budget_for,
+    check_deadline, shielded
+)
+from app.database.query_log import ObservedClient
+from app.models.schemas import PomodoroCreate
+from app.services.pomodoro_service import PomodoroService
+from tests.conftest import SUPABASE_TARGETS
+
+
+@pytest.fixture(autouse=True)
+def reset_stats():
+    """Contadores limpios en cada test"""
+    for name in deadlines.stats:
+        deadlines.stats[name] = 0
+
+
+@pytest.fixture
+def in_request():
+    """Ejecutar código con un plazo de petición activo"""
+    tokens = []
+
+    def enter(budget: float) -> RequestDeadline:
+        deadline = RequestDeadline(budget)
+        tokens.append(deadlines._current.set(deadline))
+        return deadline
+
+    yield enter
+    for token in reversed(tokens):
+        deadlines._current.reset(token)
+
+
+class TestRequestDeadline:
+    """Tests para RequestDeadline y la configuración por ruta"""
+
+    def test_budget_uses_longest_prefix(self, monkeypatch):
+        """Cada ruta toma el presupuesto del prefijo más específico"""
+        monkeypatch.setattr(settings, "REQUEST_DEADLINES", {"/api/v1": 8.0, "/api/v1/statistics": 2.0})
+        monkeypatch.setattr(settings, "REQUEST_DEADLINE_DEFAULT", 10.0)
+
+        assert budget_for("/api/v1/statistics/") == 2.0
+        assert budget_for("/api/v1/tasks/") == 8.0
+        assert budget_for("/health") == 10.0
+
+    def test_check_raises_when_expired_or_cancelled(self):
+        """Un plazo vencido da 504 y uno cancelado 499"""
+        with pytest.raises(DeadlineExceeded) as exc_info:
+            RequestDeadline(0).check()
+        assert exc_info.value.status_code == 504
+
+        deadline = RequestDeadline(10)
+        deadline.cancel()
+        with pytest.raises(RequestCancelled) as exc_info:
+            deadline.check()
+        assert exc_info.value.status_code == 499
+
+    def test_remaining_budget_becomes_call_timeout(self, in_request):
+        """La llamada a PostgREST recibe el tiempo restante como timeout"""
+        raw_client = MagicMock()
+        builder = raw_client.table.return_value.select.return_value
+        session = builder.session
+        builder.execute.side_effect = lambda: builder.session.request("GET", "/tasks")
+        in_request(5.0)
+
+        ObservedClient(raw_client).table("tasks").select("*").execute()
+
+        timeout = session.request.call_args.kwargs["timeout"]
+        assert 4.0 < timeout <= 5.0
+
+    def test_no_call_after_deadline(self, in_request):
+        """Con el plazo vencido la consulta no llega a ejecutarse"""
+        raw_client = MagicMock()
+        in_request(0)
+
+        with pytest.raises(DeadlineExceeded):
+            ObservedClient(raw_client).table("tasks").select("*").execute()
+
+        raw_client.table.return_value.select.return_value.execute.assert_not_called()
+
+    def test_queued_work_skipped_after_cancel(self, in_request):
+        """El trabajo en cola de un bulkhead no empieza si la petición se canceló"""
+        pool = Bulkhead("test", max_workers=1, queue_depth=1)
+        calls = []
+        in_request(10).cancel()
+
+        with pytest.raises(RequestCancelled):
+            asyncio.run(pool.run(calls.append, 1))
+
+        assert calls == []
+        pool.shutdown()
+
+    def test_cleanup_runs_after_deadline(self, in_request, memory_supabase, monkeypatch):
+        """Si el plazo vence entre el alta y las subtareas, el alta se deshace igualmente"""
+        observed = ObservedClient(memory_supabase)
+        for target in SUPABASE_TARGETS:
+            monkeypatch.setattr(target, lambda: observed)
+        task = memory_supabase.table("tasks").insert({"title": "Tarea", "user_id": "u1"}).execute().data[0]
+        subtask = memory_supabase.table("subtasks").insert({"task_id": task["id"], "title": "A"}).execute().data[0]
+        deadline = in_request(10.0)
+        set_links = PomodoroService.set_subtask_links
+
+        def expire_then_link(*args, **kwargs):
+            deadline.expires_at = time.monotonic()
+            return set_links(*args, **kwargs)
+
+        monkeypatch.setattr(PomodoroService, "set_subtask_links", expire_then_link)
+
+        with pytest.raises(DeadlineExceeded):
+            PomodoroService.create_pomodoro(PomodoroCreate(task_id=task["id"], user_id="u1",
+                                                           subtask_ids=[subtask["id"]]))
+
+        assert memory_supabase.table("pomodoros").select("id").execute().data == []
+
+    def test_shielded_skips_deadline(self, in_request):
+        """Dentro de shielded() no hay plazo que comprobar"""
+        in_request(0).cancel()
+
+        with shielded():
+            assert deadlines.current_deadline() is None
+            check_deadline()
+
+        with pytest.raises(RequestCancelled):
+            check_deadline()
+
+
+class TestDeadlineMiddleware:
+    """Tests del middleware de plazos"""
+
+    def test_slow_backend_returns_504_within_budget(self, client, memory_supabase, monkeypatch):
+        """Con Supabase lento /statistics responde 504 dentro de su presupuesto"""
+        observed = ObservedClient(memory_supabase)
+        for target in SUPABASE_TARGETS:
+            monkeypatch.setattr(target, lambda: observed)
+        monkeypatch.setattr(settings, "REQUEST_DEADLINES", {"/api/v1/statistics": 0.1})
+        memory_supabase.latency_ms = 1000
+
+        start = time.monotonic()
+        response = client.get("/api/v1/statistics/")
+
+        assert response.status_code == 504
+        assert time.monotonic() - start < 0.5
+
+    def test_deadline_exceeded_without_response(self, monkeypatch):
+        """Si la aplicación no responde a tiempo el middleware devuelve 504"""
+        monkeypatch.setattr(settings, "REQUEST_DEADLINE_DEFAULT", 0.05)
+
+        async def slow_app(scope, receive, send):
+            await asyncio.sleep(5)
+
+        status_codes = asyncio.run(_drive(DeadlineMiddleware(slow_app)))
+
+        assert status_codes == [504]
+        assert deadlines.stats["deadline_exceeded"] == 1
+
+    def test_client_disconnect_cancels_request(self, monkeypatch):
+        """Al desconectarse el cliente se cancela la petición"""
+        monkeypatch.setattr(settings, "REQUEST_DEADLINE_DEFAULT", 5.0)
+        observed = {}
+
+        async def slow_app(scope, receive, send):
+            observed["deadline"] = deadlines.current_deadline()
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                observed["cancelled"] = True
+                raise
+
+        status_codes = asyncio.run(_drive(DeadlineMiddleware(slow_app), disconnect_after=0.05))
+
+        assert status_codes == []
+        assert observed["cancelled"] is True
+        assert observed["deadline"].cancelled
+        assert deadlines.stats["cancelled"] == 1
+
+
+async def _drive(middleware, disconnect_after: float = None):
+    """Ejecutar el middleware con un cliente ASGI mínimo"""
+    sent = []
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        if disconnect_after is None:
+            await asyncio.sleep(60)
+        await asyncio.sleep(disconnect_after)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            sent.append(message["status"])
+
+    scope = {"type": "http", "method": "GET", "path": "/lento", "headers": []}
+    await middleware(scope, receive, send)
+    return sent
@@ -0,0 +1,187 @@
+"""
+Tests para el registro diferido de distracciones (escrituras por lotes)
+"""
+
+import json
+import pytest
+from fastapi import HTTPException
+
+from app.config import settings
+from app.core.write_behind import WriteBehindQueue
+from app.database.references import fetch_references
+from app.services.distraction_service import get_distraction_writer
+
+
+def _queue(flush, **overrides):
+    options = {"batch_size": 100, "interval": 60, "max_pending": 10, "max_retries": 2, "retry_backoff": 0}
+    options.update(overrides)
+    return WriteBehindQueue("test", flush, **options)
+
+
+class TestWriteBehindQueue:
+    """Tests de la cola de escritura diferida"""
+
+    def test_retries_are_bounded(self):
+        """Un lote se reintenta max_retries veces y después queda pendiente"""
+        attempts = []
+
+        def flaky(records):
+            attempts.append(len(records))
+            if len(attempts) < 3:
+                raise ConnectionError("caída")
+            return len(records)
+
+        queue = _queue(flaky)
+        queue.submit({"n": 1})
+        queue.submit({"n": 2})
+        queue.flush()
+        assert attempts == [2, 2, 2]
+        assert queue.snapshot()["written"] == 2
+
+        def broken(records):
+            raise ConnectionError("caída")
+
+        broken_queue = _queue(broken)
+        broken_queue.submit({"n": 1})
+        broken_queue.flush()
+        snapshot = broken_queue.snapshot()
+        assert (snapshot["failed"], snapshot["retries"], snapshot["pending"]) == (1, 2, 1)
+        queue.close()
+        broken_queue.close()
+
+    def test_failed_batch_is_retried_on_next_flush(self):
+        """Un lote fallido no se pierde: la siguiente escritura lo reintenta en orden"""
+        written, failing = [], [True]
+
+        def flush(records):
+            if failing[0]:
+                raise ConnectionError("caída")
+            written.extend(records)
+            return len(records)
+
+        queue = _queue(flush, max_retries=0)
+        queue.submit({"n": 1})
+        assert queue.flush() is False
+        queue.submit({"n": 2})
+
+        failing[0] = False
+        assert queue.flush() is True
+
+        assert written == [{"n": 1}, {"n": 2}]
+        assert queue.snapshot()["pending"] == 0
+        queue.close()
+
+    def test_failed_batch_survives_restart(self, tmp_path):
+        """Un lote que no se pudo escribir sigue sin confirmar en el WAL y se reencola al arrancar"""
+        wal = tmp_path / "distractions.wal"
+
+        def broken(records):
+            raise ConnectionError("caída")
+
+        queue = _queue(broken, max_retries=0, wal_path=str(wal))
+        queue.submit({"n": 1})
+        queue.submit({"n": 2})
+        queue.close()
+
+        written = []
+        restarted = _queue(lambda records: written.extend(records) or len(records), wal_path=str(wal))
+        assert restarted.snapshot()["replayed"] == 2
+        restarted.flush()
+
+        assert written == [{"n": 1}, {"n": 2}]
+        assert wal.read_text() == ""
+        restarted.close()
+
+    def test_full_queue_is_rejected(self):
+        """Con la cola llena se responde 503"""
+        queue = _queue(len, max_pending=1)
+        queue.submit({"n": 1})
+
+        with pytest.raises(HTTPException) as error:
+            queue.submit({"n": 2})
+
+        assert error.value.status_code == 503
+        queue.close()
+
+    def test_write_ahead_log_replays_unacknowledged_records(self, tmp_path):
+        """Al arrancar se reencolan los registros sin confirmar de la ejecución anterior"""
+        wal = tmp_path / "distractions.wal"
+        wal.write_text(
+            json.dumps({"seq": 1, "record": {"n": 1}}) + "\n"
+            + json.dumps({"seq": 2, "record": {"n": 2}}) + "\n"
+            + json.dumps({"ack": [1]}) + "\n"
+            + json.dumps({"seq": 3, "record": {"n": 3}}) + "\n"
+            + '{"seq": 4, "rec'
+        )
+        written = []
+
+        queue = _queue(lambda records: written.extend(records) or len(records), wal_path=str(wal))
+        assert queue.snapshot()["replayed"] == 2
+        queue.submit({"n": 5})
+        assert json.loads(wal.read_text().splitlines()[-1]) == {"seq": 4, "record": {"n": 5}}
+
+        queue.flush()
+
+        assert written == [{"n": 2}, {"n": 3}, {"n": 5}]
+        assert wal.read_text() == ""
+        queue.close()
+
+
+class TestDeferredDistractionsRouter:
+    """Tests para POST /api/v1/distractions/deferred"""
+
+    @pytest.fixture(autouse=True)
+    def manual_flush(self, monkeypatch):
+        """Los lotes solo se escriben al llamar a flush()"""
+        monkeypatch.setattr(settings, "DISTRACTION_FLUSH_INTERVAL", 60)
+
+    def test_records_are_written_in_one_batch(self, client, memory_supabase):
+        """Se responde 202 sin consultas y el lote se escribe con una consulta IN y un insert"""
+        pomodoros = memory_supabase.table("pomodoros").insert([{"user_id": "u1"}, {"user_id": "u1"}]).execute().data
+        # La comprobación al encolar usa la caché de referencias
+        fetch_references("pomodoros", [p["id"] for p in pomodoros])
+        memory_supabase.reset_calls()
+
+        for pomodoro in pomodoros + pomodoros[:1]:
+            response = client.post("/api/v1/distractions/deferred", json={
+                "pomodoro_id": pomodoro["id"], "user_id": "u1", "had_distractions": True, "used_phone": False
+            })
+            assert response.status_code == 202
+        assert response.json() == {"pending": 3}
+        assert memory_supabase.calls == []
+
+        get_distraction_writer().flush()
+
+        assert [c.table for c in memory_supabase.calls] == ["pomodoros", "distractions"]
+        rows = memory_supabase.table("distractions").select("*").execute().data
+        assert sorted(row["pomodoro_id"] for row in rows) == sorted(p["id"] for p in pomodoros + pomodoros[:1])
+        assert all(row["created_at"] for row in rows)
+
+    def test_invalid_references_are_rejected_when_enqueued(self, client, memory_supabase):
+        """Un pomodoro inexistente o de otro usuario se rechaza sin entrar en la cola"""
+        pomodoro = memory_supabase.table("pomodoros").insert({"user_id": "u1"}).execute().data[0]
+
+        missing = client.post("/api/v1/distractions/deferred", json={
+            "pomodoro_id": 999, "had_distractions": False, "used_phone": True
+        })
+        foreign = client.post("/api/v1/distractions/deferred", json={
+            "pomodoro_id": pomodoro["id"], "user_id": "u2", "had_distractions": False, "used_phone": True
+        })
+
+        assert (missing.status_code, foreign.status_code) == (404, 403)
+        assert get_distraction_writer().snapshot()["pending"] == 0
+
+    def test_records_of_deleted_pomodoros_are_dropped(self, client, memory_supabase):
+        """Si el pomodoro se borra antes de escribir el lote, solo se descarta su registro"""
+        pomodoros = memory_supabase.table("pomodoros").insert([{"user_id": "u1"}, {"user_id": "u1"}]).execute().data
+        for pomodoro in pomodoros:
+            client.post("/api/v1/distractions/deferred", json={
+                "pomodoro_id": pomodoro["id"], "had_distractions": False, "used_phone": True
+            })
+        memory_supabase.table("pomodoros").delete().eq("id", pomodoros[1]["id"]).execute()
+
+        writer = get_distraction_writer()
+        writer.flush()
+
+        assert len(memory_supabase.table("distractions").select("id").execute().data) == 1
+        assert writer.snapshot()["dropped"] == 1
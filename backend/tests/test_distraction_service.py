@@ -14,10 +14,10 @@ class TestDistractionService:
     
     def test_create_distraction_success(self, mock_supabase, sample_distraction_data, sample_pomodoro_data):
         """Test crear distracción exitosamente"""
-        # Mock para verificar que el pomodoro existe
+        # Mock para verificar que el pomodoro existe (consulta IN de id y user_id)
         pomodoro_response = MagicMock()
-        pomodoro_response.data = [sample_pomodoro_data]
-        mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value = pomodoro_response
+        pomodoro_response.data = [{"id": 1, "user_id": None}]
+        mock_supabase.table.return_value.select.return_value.in_.return_value.execute.return_value = pomodoro_response
         
         # Mock para insert
         insert_response = MagicMock()
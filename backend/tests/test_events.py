@@ -0,0 +1,189 @@
+"""
+Tests para el bus de eventos de cambio y su entrega a los clientes
+"""
+
+import asyncio
+import threading
+import pytest
+from app.core.events import ChangeEvent, EventBus, LocalBroker, get_event_bus, CREATE, UPDATE
+from app.core.single_flight import single_flight
+from app.routers.events import event_stream
+
+
+@pytest.fixture
+def workers():
+    """Dos buses conectados al mismo broker, como dos workers"""
+    broker = LocalBroker()
+    first, second = EventBus(broker), EventBus(broker)
+    yield first, second
+    first.close()
+    second.close()
+
+
+class TestEventBus:
+    """Tests para EventBus"""
+
+    def test_events_reach_other_workers_once(self, workers):
+        """Cada listener recibe el evento una sola vez, en su worker y en los demás"""
+        first, second = workers
+        seen = {"first": [], "second": []}
+        first.add_listener(lambda e: seen["first"].append(e.id))
+        second.add_listener(lambda e: seen["second"].append(e.id))
+
+        first.publish(ChangeEvent("tasks", CREATE, 1, "u1"))
+
+        assert seen == {"first": [1], "second": [1]}
+        assert second.stats["received"] == 1
+        assert first.stats["received"] == 0
+
+    def test_subscriptions_filter_by_user(self, workers):
+        """Un cliente recibe solo los eventos de su usuario; los de filas sin usuario, solo los de administración"""
+        first, second = workers
+
+        async def scenario():
+            subscription, admin = second.subscribe("u1"), second.subscribe()
+            publisher = threading.Thread(target=lambda: [
+                first.publish(ChangeEvent("tasks", UPDATE, 1, "u2")),
+                first.publish(ChangeEvent("tasks", UPDATE, 2, "u1")),
+                first.publish(ChangeEvent("tasks", UPDATE, 3, None)),
+            ])
+            publisher.start()
+            publisher.join()
+            received = [await subscription.get(timeout=1), await subscription.get(timeout=0.2)]
+            everything = [await admin.get(timeout=1) for _ in range(3)]
+            subscription.close()
+            admin.close()
+            return received, [e.id for e in everything]
+
+        received, everything = asyncio.run(scenario())
+
+        assert received[0].id == 2 and received[1] is None
+        assert everything == [1, 2, 3]
+
+    def test_overflow_flags_resync(self):
+        """Si la cola del cliente se llena se marca para resincronizar"""
+        bus = EventBus(max_queue=1)
+
+        async def scenario():
+            subscription = bus.subscribe("u1")
+            for i in range(3):
+                bus.publish(ChangeEvent("tasks", UPDATE, i, "u1"))
+            await asyncio.sleep(0)
+            return subscription.overflowed
+
+        assert asyncio.run(scenario()) is True
+
+    def test_remote_events_invalidate_single_flight(self, monkeypatch):
+        """Los cambios de otros workers invalidan la caché local del usuario"""
+        invalidated = []
+        monkeypatch.setattr(single_flight, "invalidate", invalidated.append)
+        bus = get_event_bus()
+
+        bus.publish(ChangeEvent("tasks", UPDATE, 1, "u1"))
+        bus.receive(ChangeEvent("tasks", UPDATE, 2, "u2", origin="otro-worker"))
+
+        assert invalidated == ["u2"]
+
+
+class TestServiceEvents:
+    """Los servicios publican un evento por escritura"""
+
+    def test_writes_publish_events(self, client, memory_supabase):
+        events = []
+        get_event_bus().add_listener(events.append)
+
+        task = client.post("/api/v1/tasks/", json={"title": "Tarea", "user_id": "u1"}).json()
+        subtask = client.post("/api/v1/subtasks/", json={"task_id": task["id"], "title": "A"}).json()
+        client.put(f"/api/v1/subtasks/{subtask['id']}", json={"completed": True})
+        client.delete(f"/api/v1/tasks/{task['id']}")
+
+        assert [(e.entity, e.action, e.user_id) for e in events] == [
+            ("tasks", "create", "u1"),
+            ("subtasks", "create", "u1"),
+            ("subtasks", "update", "u1"),
+            ("tasks", "delete", "u1"),
+        ]
+
+    def test_subtask_changes_stay_with_owner(self, client, memory_supabase):
+        """Los cambios de subtareas de u1 no llegan a los clientes de u2"""
+        task = client.post("/api/v1/tasks/", json={"title": "Tarea", "user_id": "u1"}).json()
+        subtask = client.post("/api/v1/subtasks/", json={"task_id": task["id"], "title": "A"}).json()
+
+        async def scenario():
+            other, owner = get_event_bus().subscribe("u2"), get_event_bus().subscribe("u1")
+            writer = threading.Thread(target=lambda: [
+                client.put(f"/api/v1/subtasks/{subtask['id']}", json={"completed": True}),
+                client.delete(f"/api/v1/subtasks/{subtask['id']}"),
+            ])
+            writer.start()
+            await asyncio.to_thread(writer.join)
+            received = [await owner.get(timeout=1), await owner.get(timeout=1)]
+            leaked = await other.get(timeout=0.2)
+            other.close()
+            owner.close()
+            return [(e.action, e.user_id) for e in received], leaked
+
+        received, leaked = asyncio.run(scenario())
+
+        assert received == [("update", "u1"), ("delete", "u1")]
+        assert leaked is None
+
+
+class TestEventDelivery:
+    """Tests para SSE y WebSocket"""
+
+    def test_websocket_receives_changes(self, client, memory_supabase):
+        with client.websocket_connect("/api/v1/events/ws?user_id=u1") as websocket:
+            task = client.post("/api/v1/tasks/", json={"title": "Tarea", "user_id": "u1"}).json()
+
+            message = websocket.receive_json()
+
+        assert message["type"] == "change"
+        assert (message["entity"], message["action"], message["id"]) == ("tasks", "create", task["id"])
+
+    def test_sse_stream_format(self):
+        """El stream SSE emite los eventos y keep-alives"""
+        bus = get_event_bus()
+
+        async def scenario():
+            subscription = bus.subscribe("u1")
+
+            async def connected():
+                return False
+
+            stream = event_stream(subscription, connected, keepalive=0.01)
+            chunks = [await stream.__anext__()]
+            chunks.append(await stream.__anext__())
+            bus.publish(ChangeEvent("pomodoros", UPDATE, 7, "u1"))
+            chunks.append(await stream.__anext__())
+            await stream.aclose()
+            return chunks
+
+        retry, keepalive, change = asyncio.run(scenario())
+
+        assert retry.startswith("retry:")
+        assert keepalive == ": keep-alive\n\n"
+        assert change.startswith("event: change\n")
+        assert '"id": 7' in change
+        assert bus.snapshot()["subscribers"] == 0
+
+    def test_sse_stream_ends_when_bus_closes(self):
+        """Al cerrarse el bus el stream SSE termina en lugar de seguir con keep-alives"""
+        bus = EventBus()
+
+        async def scenario():
+            subscription = bus.subscribe("u1")
+
+            async def connected():
+                return False
+
+            stream = event_stream(subscription, connected, keepalive=1)
+            chunks = [await stream.__anext__()]
+            bus.close()
+            chunks.extend([chunk async for chunk in stream])
+            return chunks, subscription.closed
+
+        chunks, closed = asyncio.run(asyncio.wait_for(scenario(), timeout=2))
+
+        assert len(chunks) == 1 and chunks[0].startswith("retry:")
+        assert closed is True
@@ -0,0 +1,156 @@
+"""
+Tests para las lecturas con cobertura (hedging)
+"""
+
+import itertools
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock
+from app.config import settings
+from app.database.hedging import Hedger, execute_hedged, get_hedger, reset_hedger
+from app.database.query_log import ObservedClient
+from app.models.schemas import TaskCreate
+from app.services.task_service import TaskService
+from tests.conftest import SUPABASE_TARGETS
+
+
+@pytest.fixture
+def hedger():
+    """Hedger que cubre a partir de 3 muestras, sin límite de tasa práctico"""
+    instance = Hedger(percentile=90, min_delay_ms=1, min_samples=3, max_rate=1.0, workers=4)
+    yield instance
+    instance.shutdown()
+
+
+def _query(delays):
+    """
+    Constructor de la consulta instrumentada cuya n-ésima ejecución tarda
+    ``delays[n]`` segundos
+    """
+    raw_client = MagicMock()
+    counter = itertools.count()
+    lock = threading.Lock()
+
+    def execute():
+        with lock:
+            n = next(counter)
+        time.sleep(delays[n] if n < len(delays) else 0)
+        return MagicMock(data=[{"id": 1, "execution": n}])
+
+    raw_client.table.return_value.select.return_value.eq.return_value.execute.side_effect = execute
+    return lambda: ObservedClient(raw_client).table("tasks").select("*").eq("id", 1)
+
+
+def _hedged(hedger, build):
+    return hedger.execute(build(), build)
+
+
+def _warm_up(hedger, samples=3):
+    for _ in range(samples):
+        hedger._observe("tasks SELECT eq(id)", 5.0)
+
+
+class TestHedger:
+    """Tests para Hedger"""
+
+    def test_no_hedge_without_enough_samples(self, hedger):
+        """Sin muestras suficientes no se lanzan duplicados"""
+        _hedged(hedger, _query([0.05]))
+
+        assert hedger.stats["hedged"] == 0
+        assert hedger.stats["requests"] == 1
+
+    def test_slow_primary_is_hedged_and_hedge_wins(self, hedger):
+        """Si la primaria tarda más del percentil, gana el duplicado rápido"""
+        _warm_up(hedger)
+
+        start = time.perf_counter()
+        result = _hedged(hedger, _query([0.5, 0.0]))
+        elapsed = time.perf_counter() - start
+
+        assert result.data[0]["execution"] == 1
+        assert elapsed < 0.4
+        assert hedger.stats["hedged"] == 1
+        assert hedger.stats["hedge_wins"] == 1
+
+    def test_fast_primary_is_not_hedged(self, hedger):
+        """Las respuestas dentro del percentil no se duplican"""
+        _warm_up(hedger)
+        hedger._latencies["tasks SELECT eq(id)"].extend([100.0] * 10)
+
+        _hedged(hedger, _query([0.0]))
+
+        assert hedger.stats["hedged"] == 0
+
+    def test_hedge_rate_is_capped(self):
+        """Con tasa máxima baja solo se cubre la primera lectura lenta"""
+        limited = Hedger(percentile=90, min_delay_ms=1, min_samples=3, max_rate=0.01, workers=4)
+        _warm_up(limited, samples=50)
+
+        for _ in range(3):
+            _hedged(limited, _query([0.05, 0.05]))
+
+        assert limited.stats["hedged"] == 1
+        assert limited.stats["rate_limited"] == 2
+        limited.shutdown()
+
+    def test_error_on_one_side_uses_the_other(self, hedger):
+        """Si la primaria falla tras lanzar el duplicado, se usa el duplicado"""
+        _warm_up(hedger)
+        raw_client = MagicMock()
+        calls = itertools.count()
+
+        def execute():
+            if next(calls) == 0:
+                time.sleep(0.05)
+                raise ConnectionError("caída")
+            return MagicMock(data=[{"id": 1}])
+
+        raw_client.table.return_value.select.return_value.eq.return_value.execute.side_effect = execute
+        build = lambda: ObservedClient(raw_client).table("tasks").select("*").eq("id", 1)
+
+        assert _hedged(hedger, build).data == [{"id": 1}]
+
+    def test_hedge_does_not_share_the_primary_builder(self, hedger, memory_supabase):
+        """El duplicado usa su propio builder: el timeout de cada intento no pisa al otro"""
+        _warm_up(hedger)
+        memory_supabase.table("tasks").insert({"title": "Tarea"}).execute()
+        memory_supabase.latency_ms = 50
+        observed = ObservedClient(memory_supabase)
+        builders = []
+
+        def build():
+            query = observed.table("tasks").select("*").eq("id", 1)
+            builders.append(query._builder)
+            return query
+
+        assert _hedged(hedger, build).data[0]["title"] == "Tarea"
+        assert hedger.stats["hedged"] == 1
+        assert len(builders) == 2 and builders[0] is not builders[1]
+
+
+class TestExecuteHedged:
+    """Tests para execute_hedged"""
+
+    def test_disabled_executes_directly(self):
+        """Con HEDGING_ENABLED=False la consulta se ejecuta sin pool"""
+        query = MagicMock()
+
+        execute_hedged(lambda: query)
+
+        query.execute.assert_called_once()
+
+    def test_services_use_hedging(self, monkeypatch, memory_supabase):
+        """get_task_by_id pasa por el hedger cuando está activado"""
+        observed = ObservedClient(memory_supabase)
+        for target in SUPABASE_TARGETS:
+            monkeypatch.setattr(target, lambda: observed)
+        monkeypatch.setattr(settings, "HEDGING_ENABLED", True)
+        try:
+            task = TaskService.create_task(TaskCreate(title="Tarea"))
+            TaskService.get_task_by_id(task.id)
+
+            assert get_hedger().stats["requests"] == 2
+        finally:
+            reset_hedger()
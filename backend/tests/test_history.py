@@ -0,0 +1,93 @@
+"""
+Tests para el historial de foco (GET /api/v1/tasks/{id}/history y /api/v1/subtasks/{id}/history)
+"""
+
+import pytest
+from datetime import datetime, timedelta, timezone
+
+START = datetime(2024, 3, 10, 8, 0, tzinfo=timezone.utc)
+
+
+def _seed(memory_supabase):
+    """Una tarea con dos subtareas y cinco sesiones de foco en tres días, más un descanso y uno activo"""
+    task = memory_supabase.table("tasks").insert({"title": "Tarea", "user_id": "u1"}).execute().data[0]
+    first, second = memory_supabase.table("subtasks").insert([
+        {"task_id": task["id"], "title": "A"},
+        {"task_id": task["id"], "title": "B"},
+    ]).execute().data
+
+    moments = [START, START + timedelta(hours=2), START + timedelta(days=1),
+               START + timedelta(days=2), START + timedelta(days=2, hours=1)]
+    sessions = memory_supabase.table("pomodoros").insert([
+        {"task_id": task["id"], "user_id": "u1", "completed": True, "duration": 1500,
+         "started_at": (moment - timedelta(minutes=25)).isoformat(), "completed_at": moment.isoformat()}
+        for moment in moments
+    ]).execute().data
+    memory_supabase.table("pomodoros").insert([
+        {"task_id": task["id"], "user_id": "u1", "completed": True, "mode": "shortBreak", "duration": 300,
+         "completed_at": START.isoformat()},
+        {"task_id": task["id"], "user_id": "u1"},
+    ]).execute()
+    memory_supabase.table("pomodoro_subtasks").insert(
+        [{"pomodoro_id": s["id"], "subtask_id": first["id"]} for s in sessions[:3]] +
+        [{"pomodoro_id": sessions[0]["id"], "subtask_id": second["id"]}]
+    ).execute()
+    return task, first, second, sessions
+
+
+class TestFocusHistory:
+    """Tests para los endpoints de historial"""
+
+    @pytest.mark.query_budget(2)
+    def test_task_history_groups_sessions_by_day(self, client, memory_supabase, query_budget):
+        """Sesiones de foco de la más reciente a la más antigua y tiempo por día"""
+        task, _, _, sessions = _seed(memory_supabase)
+
+        with query_budget:
+            response = client.get(f"/api/v1/tasks/{task['id']}/history")
+
+        assert response.status_code == 200
+        body = response.json()
+        assert [s["pomodoro_id"] for s in body["sessions"]] == [s["id"] for s in reversed(sessions)]
+        assert body["days"] == [
+            {"day": "2024-03-12", "sessions": 2, "focus_time": 3000},
+            {"day": "2024-03-11", "sessions": 1, "focus_time": 1500},
+            {"day": "2024-03-10", "sessions": 2, "focus_time": 3000},
+        ]
+        assert body["next_before"] is None
+
+    def test_task_history_paginates_with_cursor(self, client, memory_supabase):
+        """``next_before`` lleva a la página siguiente sin repetir sesiones"""
+        task, _, _, sessions = _seed(memory_supabase)
+
+        first = client.get(f"/api/v1/tasks/{task['id']}/history", params={"limit": 3}).json()
+        second = client.get(f"/api/v1/tasks/{task['id']}/history",
+                            params={"limit": 3, "before": first["next_before"]}).json()
+
+        seen = [s["pomodoro_id"] for s in first["sessions"] + second["sessions"]]
+        assert seen == [s["id"] for s in reversed(sessions)]
+        assert first["next_before"] is not None
+        assert second["next_before"] is None
+
+    def test_subtask_history_uses_links(self, client, memory_supabase):
+        """Solo las sesiones en las que se trabajó la subtarea"""
+        _, first, second, sessions = _seed(memory_supabase)
+
+        response = client.get(f"/api/v1/subtasks/{first['id']}/history")
+        other = client.get(f"/api/v1/subtasks/{second['id']}/history")
+
+        assert [s["pomodoro_id"] for s in response.json()["sessions"]] == [s["id"] for s in reversed(sessions[:3])]
+        assert other.json()["days"] == [{"day": "2024-03-10", "sessions": 1, "focus_time": 1500}]
+
+    def test_days_follow_client_offset(self, client, memory_supabase):
+        """Con ``utc_offset`` las sesiones se agrupan por el día local del cliente"""
+        task, _, _, _ = _seed(memory_supabase)
+
+        response = client.get(f"/api/v1/tasks/{task['id']}/history", params={"utc_offset": -600})
+
+        assert [d["day"] for d in response.json()["days"]] == ["2024-03-11", "2024-03-10", "2024-03-09"]
+
+    def test_unknown_task_returns_404(self, client, memory_supabase):
+        """El historial de una tarea inexistente es un 404"""
+        assert client.get("/api/v1/tasks/999/history").status_code == 404
+        assert client.get("/api/v1/subtasks/999/history").status_code == 404
@@ -0,0 +1,122 @@
+"""
+Tests para la caché del historial de foco por usuario
+"""
+
+import pytest
+from datetime import datetime, timezone
+
+from app.config import settings
+from app.core.events import ChangeEvent, UPDATE, get_event_bus
+from app.core.history_cache import HistoryCache, history_cache
+from app.services.insights_service import FocusHistory
+
+NOW = datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+
+
+def _sessions(ids):
+    return [{"id": i, "mode": "pomodoro", "task_id": None, "duration": 1500, "completed_at": NOW} for i in ids]
+
+
+class TestFocusHistory:
+    """Tests de las columnas crecientes"""
+
+    def test_appends_grow_and_skip_known_rows(self):
+        """Los añadidos reservan capacidad y no duplican filas ya cargadas"""
+        history = FocusHistory.from_rows(_sessions([1, 2]), [])
+        history.add_sessions(_sessions([2, 3]) + [{"id": 4, "completed_at": None}])
+
+        assert history.sessions == 3
+        assert history.duration.tolist() == [1500] * 3
+
+        view = history.view()
+        history.add_sessions(_sessions(range(10, 40)))
+        assert view.sessions == 3
+        assert history.sessions == 33
+
+
+class TestHistoryCache:
+    """Tests de la LRU por usuario"""
+
+    def test_evicts_least_recent_users_over_budget(self, monkeypatch):
+        """Al superar el presupuesto de bytes se expulsa el usuario usado hace más tiempo"""
+        cache = HistoryCache()
+        size = FocusHistory.from_rows(_sessions([1]), []).nbytes
+        monkeypatch.setattr(settings, "HISTORY_CACHE_MAX_BYTES", 2 * size)
+
+        for user_id in ("u1", "u2"):
+            cache.get(user_id, lambda: FocusHistory.from_rows(_sessions([1]), []))
+        cache.get("u1", lambda: pytest.fail("u1 debería estar en caché"))
+        cache.get("u3", lambda: FocusHistory.from_rows(_sessions([1]), []))
+
+        snapshot = cache.snapshot()
+        assert list(snapshot["per_user"]) == ["u3", "u1"]
+        assert snapshot["bytes"] == 2 * size
+        assert snapshot["evictions"] == 1
+
+    def test_load_racing_a_write_is_not_stored(self):
+        """Una carga durante la que hubo cambios puede no incluirlos: no se guarda"""
+        cache = HistoryCache()
+
+        def loader():
+            cache.update("u1", lambda history: pytest.fail("no hay entrada todavía"))
+            return FocusHistory()
+
+        cache.get("u1", loader)
+
+        assert cache.snapshot()["users"] == 0
+
+    def test_remote_events_invalidate(self):
+        """Los cambios de pomodoros de otros workers descartan el historial"""
+        history_cache.get("u1", FocusHistory)
+        history_cache.get("u2", FocusHistory)
+        bus = get_event_bus()
+
+        bus.receive(ChangeEvent("tasks", UPDATE, 1, "u1", origin="otro-worker"))
+        bus.receive(ChangeEvent("pomodoros", UPDATE, 2, "u2", origin="otro-worker"))
+
+        assert list(history_cache.snapshot()["per_user"]) == ["u1"]
+
+
+class TestInsightsCache:
+    """Las lecturas de usuarios en caché no consultan la base de datos"""
+
+    def test_writes_append_without_reloading(self, client, memory_supabase):
+        """Completar un pomodoro y registrar una distracción actualizan la caché"""
+        pomodoro = memory_supabase.table("pomodoros").insert({"user_id": "u1"}).execute().data[0]
+        assert client.get("/api/v1/statistics/insights", params={"user_id": "u1"}).json()["total_sessions"] == 0
+
+        client.post("/api/v1/pomodoros/complete", json={"pomodoro_id": pomodoro["id"], "actual_duration": 1200})
+        client.post("/api/v1/distractions/", json={
+            "pomodoro_id": pomodoro["id"], "user_id": "u1", "had_distractions": True, "used_phone": False
+        })
+        memory_supabase.reset_calls()
+
+        body = client.get("/api/v1/statistics/insights", params={"user_id": "u1"}).json()
+
+        assert memory_supabase.calls == []
+        assert body["total_sessions"] == 1
+        assert body["total_focus_time"] == 1200
+        assert sum(rate is not None for rate in body["distraction_rate_by_hour"]) == 1
+
+    def test_edits_reload(self, client, memory_supabase):
+        """Editar un pomodoro descarta el historial y la siguiente lectura recarga"""
+        pomodoro = memory_supabase.table("pomodoros").insert(
+            {"user_id": "u1", "completed": True, "duration": 1500, "completed_at": NOW}
+        ).execute().data[0]
+        client.get("/api/v1/statistics/insights", params={"user_id": "u1"})
+
+        client.put(f"/api/v1/pomodoros/{pomodoro['id']}", json={"mode": "shortBreak"})
+        memory_supabase.reset_calls()
+        body = client.get("/api/v1/statistics/insights", params={"user_id": "u1"}).json()
+
+        assert body["total_sessions"] == 0
+        assert {c.table for c in memory_supabase.calls} == {"pomodoros", "distractions"}
+
+    def test_metrics_report_memory_per_user(self, client, memory_supabase):
+        """/metrics informa de la memoria de cada usuario en caché"""
+        client.get("/api/v1/statistics/insights", params={"user_id": "u1"})
+
+        report = client.get("/metrics").json()["history_cache"]
+
+        assert report["users"] == 1
+        assert report["per_user"]["u1"] == report["bytes"]
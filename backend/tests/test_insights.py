@@ -0,0 +1,112 @@
+"""
+Tests para la analítica de foco vectorizada (GET /api/v1/statistics/insights)
+"""
+
+import numpy as np
+import pytest
+from datetime import datetime, timedelta, timezone
+
+from app.config import settings
+from app.services.insights_service import daily_streaks, hour_of_week, rate_by_hour
+
+DAY = 86400
+# Lunes 4 de marzo de 2024
+MONDAY = datetime(2024, 3, 4, tzinfo=timezone.utc)
+
+
+class TestVectorizedMetrics:
+    """Tests de las funciones vectorizadas"""
+
+    def test_daily_streaks(self):
+        """Racha más larga y racha actual (viva si el último día es hoy o ayer)"""
+        days = np.array([6, 0, 1, 2, 2, 5])
+
+        assert daily_streaks(days, today=7) == {"current": 2, "longest": 3}
+        assert daily_streaks(days, today=6) == {"current": 2, "longest": 3}
+        assert daily_streaks(days, today=8) == {"current": 0, "longest": 3}
+        assert daily_streaks(np.array([], dtype=np.int64), today=8) == {"current": 0, "longest": 0}
+
+    def test_hour_of_week_starts_on_monday(self):
+        """0 es el lunes a las 00:00 (hora local)"""
+        monday = int(MONDAY.timestamp())
+        moments = np.array([0, monday + 10 * 3600, monday + 6 * DAY + 23 * 3600])
+
+        assert hour_of_week(moments, 0).tolist() == [3 * 24, 10, 167]
+        # Con UTC-1 el lunes a las 00:30 UTC es domingo a las 23:30
+        assert hour_of_week(np.array([monday + 1800]), -60).tolist() == [167]
+
+    def test_rate_by_hour(self):
+        """Fracción por hora; None en horas sin registros"""
+        moments = np.array([3600, 3600 + 60, 3600 + 120, 5 * 3600])
+        flags = np.array([True, False, False, True])
+
+        rates = rate_by_hour(moments, flags, 0)
+
+        assert rates[1] == pytest.approx(0.3333)
+        assert rates[5] == 1.0
+        assert rates[0] is None
+
+
+def _seed(memory_supabase, user_id="u1"):
+    """Sesiones de foco tres días seguidos hasta hoy, una semana antes, un descanso y distracciones"""
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    moments = [now, now - timedelta(days=1), now - timedelta(days=2),
+               now - timedelta(days=7), now - timedelta(days=7, hours=1)]
+    pomodoros = memory_supabase.table("pomodoros").insert([
+        {"user_id": user_id, "completed": True, "duration": duration, "completed_at": moment.isoformat()}
+        for moment, duration in zip(moments, [1500, 1500, 1200, 1500, 900])
+    ] + [
+        {"user_id": user_id, "completed": True, "mode": "longBreak", "duration": 900, "completed_at": now.isoformat()},
+        {"user_id": user_id},
+        {"user_id": "otro", "completed": True, "completed_at": now.isoformat()},
+    ]).execute().data
+    memory_supabase.table("distractions").insert([
+        {"pomodoro_id": pomodoros[0]["id"], "user_id": user_id, "had_distractions": True, "used_phone": True},
+        {"pomodoro_id": pomodoros[1]["id"], "user_id": user_id, "had_distractions": False, "used_phone": False},
+    ]).execute()
+    return now
+
+
+class TestInsightsRouter:
+    """Tests para el endpoint de insights"""
+
+    @pytest.mark.query_budget(2)
+    def test_insights(self, client, memory_supabase, query_budget):
+        """Métricas del usuario con una consulta por tabla"""
+        now = _seed(memory_supabase)
+
+        with query_budget:
+            response = client.get("/api/v1/statistics/insights", params={"user_id": "u1"})
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["total_sessions"] == 5
+        assert body["total_focus_time"] == 6600
+        assert body["average_session"] == 1320.0
+        assert body["current_streak"] == 3
+        assert body["longest_streak"] == 3
+        assert len(body["heatmap"]) == 7 and all(len(row) == 24 for row in body["heatmap"])
+        assert body["heatmap"][now.weekday()][now.hour] == 1500 + 1500
+        assert sum(map(sum, body["heatmap"])) == 6600
+        assert body["distraction_rate_by_hour"][now.hour] == 0.5
+        assert body["phone_rate_by_hour"][now.hour] == 0.5
+
+    def test_history_is_loaded_in_pages(self, client, memory_supabase, monkeypatch):
+        """El historial se lee por páginas de INSIGHTS_PAGE_SIZE filas"""
+        _seed(memory_supabase)
+        monkeypatch.setattr(settings, "INSIGHTS_PAGE_SIZE", 2)
+        memory_supabase.reset_calls()
+
+        response = client.get("/api/v1/statistics/insights", params={"user_id": "u1"})
+
+        assert response.json()["total_sessions"] == 5
+        assert [c.table for c in memory_supabase.calls] == ["pomodoros"] * 4 + ["distractions"] * 2
+
+    def test_empty_history(self, client, memory_supabase):
+        """Sin historial todas las métricas son cero"""
+        body = client.get("/api/v1/statistics/insights", params={"user_id": "nadie"}).json()
+
+        assert body["total_sessions"] == 0
+        assert body["current_streak"] == 0
+        assert body["average_session"] == 0.0
+        assert body["distraction_rate_by_hour"] == [None] * 24
@@ -0,0 +1,195 @@
+"""
+Tests para el backend en memoria (MemoryClient)
+Verifican que respeta el contrato de Supabase/PostgREST y la semántica de schema.sql
+"""
+
+import time
+import pytest
+from postgrest.exceptions import APIError
+from app.database.memory_client import MemoryClient
+from app.models.schemas import (
+    TaskCreate, SubtaskCreate, SubtaskUpdate, PomodoroCreate, PomodoroComplete
+)
+from app.services.task_service import TaskService
+from app.services.subtask_service import SubtaskService
+from app.services.pomodoro_service import PomodoroService
+
+
+@pytest.fixture
+def db_client():
+    """Cliente en memoria aislado"""
+    return MemoryClient()
+
+
+def _task(client, **fields):
+    return client.table("tasks").insert({"title": "Tarea", **fields}).execute().data[0]
+
+
+class TestMemoryClientContract:
+    """Tests del query builder en memoria"""
+
+    def test_insert_applies_schema_defaults(self, db_client):
+        """Los valores por defecto se toman de schema.sql"""
+        row = _task(db_client)
+
+        assert row["id"] == 1
+        assert row["completed"] is False
+        assert row["category"] == "personal"
+        assert row["time_spent"] == 0
+        assert row["created_at"] and row["updated_at"]
+
+    def test_select_filters_order_limit_and_count(self, db_client):
+        """select con eq/ilike/order/limit y count exacto"""
+        for title in ["Leer libro", "Escribir informe", "Leer artículo"]:
+            _task(db_client, title=title, user_id="u1")
+        _task(db_client, title="Leer otro", user_id="u2")
+
+        result = (db_client.table("tasks").select("id, title", count="exact")
+                  .eq("user_id", "u1").ilike("title", "%leer%")
+                  .order("title", desc=True).limit(1).execute())
+
+        assert result.count == 2
+        assert result.data == [{"id": 1, "title": "Leer libro"}]
+
+    def test_check_and_not_null_constraints(self, db_client):
+        """Los CHECK y NOT NULL del esquema se validan"""
+        with pytest.raises(APIError) as exc_info:
+            _task(db_client, category="invalida")
+        assert exc_info.value.code == "23514"
+
+        with pytest.raises(APIError) as exc_info:
+            db_client.table("tasks").insert({"completed": True}).execute()
+        assert exc_info.value.code == "23502"
+
+    def test_unknown_column_is_rejected(self, db_client):
+        """Columnas inexistentes producen el mismo error que PostgREST"""
+        with pytest.raises(APIError) as exc_info:
+            _task(db_client, subtasks=[])
+        assert exc_info.value.code == "PGRST204"
+
+    def test_foreign_key_violation(self, db_client):
+        """No se puede insertar una subtarea de una tarea inexistente"""
+        with pytest.raises(APIError) as exc_info:
+            db_client.table("subtasks").insert({"task_id": 99, "title": "x"}).execute()
+        assert exc_info.value.code == "23503"
+
+    def test_delete_cascades_and_sets_null(self, db_client):
+        """ON DELETE CASCADE en subtareas y SET NULL en pomodoros"""
+        task = _task(db_client)
+        db_client.table("subtasks").insert({"task_id": task["id"], "title": "s"}).execute()
+        pomodoro = db_client.table("pomodoros").insert({"task_id": task["id"]}).execute().data[0]
+        db_client.table("distractions").insert({
+            "pomodoro_id": pomodoro["id"], "had_distractions": True, "used_phone": False
+        }).execute()
+
+        db_client.table("tasks").delete().eq("id", task["id"]).execute()
+
+        assert db_client.table("subtasks").select("*").execute().data == []
+        assert db_client.table("pomodoros").select("*").execute().data[0]["task_id"] is None
+
+        db_client.table("pomodoros").delete().eq("id", pomodoro["id"]).execute()
+        assert db_client.table("distractions").select("*").execute().data == []
+
+    def test_subtask_triggers_update_task(self, db_client):
+        """Los triggers mantienen time_spent y completed de la tarea"""
+        task = _task(db_client)
+        first = db_client.table("subtasks").insert({"task_id": task["id"], "title": "a", "time_spent": 100}).execute().data[0]
+        db_client.table("subtasks").insert({"task_id": task["id"], "title": "b", "time_spent": 50}).execute()
+
+        db_client.table("subtasks").update({"completed": True}).in_("task_id", [task["id"]]).execute()
+        db_client.table("subtasks").update({"time_spent": 200}).eq("id", first["id"]).execute()
+
+        stored = db_client.table("tasks").select("*").eq("id", task["id"]).execute().data[0]
+        assert stored["time_spent"] == 250
+        assert stored["completed"] is True
+        assert (stored["subtask_total"], stored["subtask_completed"]) == (2, 2)
+
+        other = _task(db_client)
+        db_client.table("subtasks").update({"task_id": other["id"]}).eq("id", first["id"]).execute()
+        db_client.table("subtasks").insert({"task_id": task["id"], "title": "c"}).execute()
+
+        counts = {row["id"]: (row["subtask_total"], row["subtask_completed"])
+                  for row in db_client.table("tasks").select("*").execute().data}
+        assert counts == {task["id"]: (2, 1), other["id"]: (1, 1)}
+
+    def test_update_refreshes_updated_at(self, db_client):
+        """El trigger de updated_at se aplica en cada UPDATE"""
+        task = _task(db_client, created_at="2024-01-01T10:00:00Z", updated_at="2024-01-01T10:00:00Z")
+
+        updated = db_client.table("tasks").update({"title": "Nuevo"}).eq("id", task["id"]).execute().data[0]
+
+        assert updated["updated_at"] > "2024-01-01T10:00:00+00:00"
+        assert updated["created_at"] == "2024-01-01T10:00:00+00:00"
+
+    def test_calls_are_recorded(self, db_client):
+        """Cada execute() queda registrado con sus filtros"""
+        _task(db_client, user_id="u1")
+        db_client.reset_calls()
+
+        db_client.table("tasks").select("*").eq("user_id", "u1").order("created_at", desc=True).execute()
+
+        assert len(db_client.calls) == 1
+        call = db_client.calls[0]
+        assert call.table == "tasks"
+        assert call.operation == "select"
+        assert call.filters == [("eq", "user_id", "u1")]
+        assert call.rows == 1
+        assert "order(created_at desc)" in str(call)
+
+    def test_indexed_lookup_uses_candidates(self, db_client):
+        """Los filtros eq sobre columnas indexadas usan el índice"""
+        _task(db_client, user_id="u1")
+        _task(db_client, user_id="u2")
+
+        assert db_client.db.candidate_ids("tasks", [("eq", "user_id", "u2")]) == {2}
+        assert db_client.db.candidate_ids("tasks", [("ilike", "title", None)]) is None
+
+
+class TestServicesOnMemoryBackend:
+    """Los servicios funcionan de extremo a extremo contra el backend en memoria"""
+
+    def test_task_lifecycle(self, memory_supabase):
+        """Crear tarea y subtareas, y leerlas con los servicios"""
+        task = TaskService.create_task(TaskCreate(title="Tarea", user_id="u1"))
+        SubtaskService.create_subtask(SubtaskCreate(task_id=task.id, title="Sub"))
+        SubtaskService.update_subtask(1, SubtaskUpdate(completed=True))
+
+        tasks = TaskService.get_all_tasks(user_id="u1")
+
+        assert len(tasks) == 1
+        assert tasks[0].completed is True
+        assert tasks[0].subtasks[0].completed is True
+
+    def test_complete_pomodoro_adds_time(self, memory_supabase):
+        """Completar un pomodoro suma la duración a sus subtareas y a la tarea"""
+        task = TaskService.create_task(TaskCreate(title="Tarea"))
+        subtask = SubtaskService.create_subtask(SubtaskCreate(task_id=task.id, title="Sub"))
+        pomodoro = PomodoroService.create_pomodoro(PomodoroCreate(task_id=task.id, subtask_ids=[subtask.id]))
+
+        completed = PomodoroService.complete_pomodoro(PomodoroComplete(pomodoro_id=pomodoro.id))
+
+        assert completed.completed is True
+        assert SubtaskService.get_subtask_by_id(subtask.id).time_spent == 1500
+        assert TaskService.get_task_by_id(task.id).time_spent == 1500
+
+    def test_router_against_memory_backend(self, client, memory_supabase):
+        """Los endpoints funcionan contra el backend en memoria"""
+        response = client.post("/api/v1/tasks/", json={"title": "Tarea", "user_id": "u1"})
+        assert response.status_code == 201
+
+        response = client.get("/api/v1/tasks/", params={"user_id": "u1"})
+        assert response.status_code == 200
+        assert [t["title"] for t in response.json()] == ["Tarea"]
+
+    def test_throughput_supports_load_testing(self, memory_supabase):
+        """El backend soporta miles de llamadas de servicio por segundo"""
+        task = TaskService.create_task(TaskCreate(title="Tarea"))
+        memory_supabase.record_calls = False
+
+        calls = 2000
+        start = time.perf_counter()
+        for _ in range(calls):
+            TaskService.get_task_by_id(task.id)
+        elapsed = time.perf_counter() - start
+
+        assert calls / elapsed > 1000
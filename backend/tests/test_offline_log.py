@@ -0,0 +1,196 @@
+"""
+Tests para el registro de operaciones sin conexión (POST /api/v1/sync/log)
+"""
+
+import time
+import pytest
+from datetime import datetime, timedelta, timezone
+from app.core import deadlines
+from app.core.deadlines import DeadlineExceeded, RequestDeadline
+from app.database.query_log import ObservedClient
+from app.models.schemas import OfflineLogRequest
+from app.services.offline_service import OfflineLogService, _LogApplier
+from tests.conftest import SUPABASE_TARGETS
+
+
+NOW = datetime.now(timezone.utc)
+
+
+def _op(action, entity, id, data=None, updated_at=None):
+    return {
+        "action": action, "entity": entity, "id": id, "data": data or {},
+        "updated_at": (updated_at or NOW).isoformat(),
+    }
+
+
+def _upload(client, *operations, user_id="u1"):
+    return client.post("/api/v1/sync/log", json={"user_id": user_id, "operations": list(operations)})
+
+
+class TestOfflineLog:
+    """Tests para la ingesta del registro de operaciones"""
+
+    @pytest.mark.query_budget(7)
+    def test_creates_with_client_ids_are_remapped(self, client, memory_supabase, query_budget):
+        """Las referencias a IDs del cliente se reasignan a los IDs del servidor"""
+        with query_budget:
+            response = _upload(
+                client,
+                _op("create", "task", "t1", {"title": "Sin conexión"}),
+                _op("create", "subtask", "s1", {"task_id": "t1", "title": "A"}),
+                _op("create", "pomodoro", "p1", {"task_id": "t1", "subtask_ids": ["s1"]}),
+                _op("complete", "pomodoro", "p1", {"actual_duration": 600}),
+                _op("create", "distraction", "d1", {"pomodoro_id": "p1", "had_distractions": True, "used_phone": False}),
+            )
+
+        assert response.status_code == 200
+        body = response.json()
+        assert set(body["id_map"]) == {"t1", "s1", "p1", "d1"}
+        assert [r["status"] for r in body["results"]] == ["applied"] * 5
+
+        task = client.get(f"/api/v1/tasks/{body['id_map']['t1']}").json()
+        assert task["user_id"] == "u1"
+        assert task["subtasks"][0]["time_spent"] == 600
+        pomodoro = client.get(f"/api/v1/pomodoros/{body['id_map']['p1']}").json()
+        assert pomodoro["completed"] is True
+        assert pomodoro["subtask_ids"] == [body["id_map"]["s1"]]
+
+    def test_last_writer_wins(self, client, memory_supabase):
+        """Un cambio del cliente anterior a la última escritura del servidor se descarta"""
+        task = client.post("/api/v1/tasks/", json={"title": "Servidor"}).json()
+        other = client.post("/api/v1/tasks/", json={"title": "Otra"}).json()
+        older = datetime.fromisoformat(task["updated_at"]) - timedelta(hours=1)
+        newer = datetime.fromisoformat(task["updated_at"]) + timedelta(seconds=1)
+
+        response = _upload(
+            client,
+            _op("update", "task", task["id"], {"title": "Cliente antiguo"}, updated_at=older),
+            _op("update", "task", other["id"], {"title": "Cliente nuevo"}, updated_at=newer),
+            _op("delete", "task", 999, updated_at=newer),
+        )
+
+        assert [r["status"] for r in response.json()["results"]] == ["conflict", "applied", "missing"]
+        assert client.get(f"/api/v1/tasks/{task['id']}").json()["title"] == "Servidor"
+        assert client.get(f"/api/v1/tasks/{other['id']}").json()["title"] == "Cliente nuevo"
+
+    def test_failure_rolls_back_the_whole_log(self, client, memory_supabase):
+        """Si una operación falla no queda aplicado ningún cambio"""
+        task = client.post("/api/v1/tasks/", json={"title": "Original"}).json()
+        later = datetime.fromisoformat(task["updated_at"]) + timedelta(seconds=1)
+
+        response = _upload(
+            client,
+            _op("update", "task", task["id"], {"title": "Cambiada"}, updated_at=later),
+            _op("create", "task", "t1", {"title": "Nueva"}),
+            _op("delete", "task", task["id"], updated_at=later),
+            _op("create", "subtask", "s1", {"task_id": 999, "title": "Huérfana"}),
+        )
+
+        assert response.status_code == 400
+        tasks = memory_supabase.table("tasks").select("title").execute().data
+        assert tasks == [{"title": "Original"}]
+
+    def test_rollback_restores_pomodoro_subtasks(self, client, memory_supabase):
+        """Al deshacer se restauran también las subtareas del pomodoro"""
+        task = client.post("/api/v1/tasks/", json={"title": "Tarea"}).json()
+        first, second = (client.post("/api/v1/subtasks/", json={"task_id": task["id"], "title": t}).json()
+                         for t in ("A", "B"))
+        pomodoro = client.post("/api/v1/pomodoros/", json={"task_id": task["id"], "subtask_ids": [first["id"]]}).json()
+        later = datetime.fromisoformat(pomodoro["updated_at"]) + timedelta(seconds=1)
+
+        response = _upload(
+            client,
+            _op("update", "pomodoro", pomodoro["id"], {"subtask_ids": [second["id"]]}, updated_at=later),
+            _op("create", "subtask", "s1", {"task_id": 999, "title": "Huérfana"}),
+        )
+
+        assert response.status_code == 400
+        assert client.get(f"/api/v1/pomodoros/{pomodoro['id']}").json()["subtask_ids"] == [first["id"]]
+
+    def test_rollback_ignores_expired_deadline(self, memory_supabase, monkeypatch):
+        """Si el plazo vence a mitad del registro lo aplicado se deshace igualmente"""
+        observed = ObservedClient(memory_supabase)
+        for target in SUPABASE_TARGETS:
+            monkeypatch.setattr(target, lambda: observed)
+        deadline = RequestDeadline(10.0)
+        token = deadlines._current.set(deadline)
+        create = _LogApplier.create
+
+        def expire_on_third(self, plan):
+            if plan.index == 3:
+                deadline.expires_at = time.monotonic()
+            return create(self, plan)
+
+        monkeypatch.setattr(_LogApplier, "create", expire_on_third)
+        log = OfflineLogRequest(user_id="u1", operations=[
+            _op("create", "task", f"t{i}", {"title": f"Tarea {i}"}) for i in range(5)
+        ])
+        try:
+            with pytest.raises(DeadlineExceeded):
+                OfflineLogService.apply_log(log)
+        finally:
+            deadlines._current.reset(token)
+
+        assert memory_supabase.table("tasks").select("id").execute().data == []
+
+    def test_failed_rollback_reports_what_stayed_applied(self, client, memory_supabase, monkeypatch):
+        """Si no se puede deshacer, 409 con las operaciones que siguen aplicadas y sus IDs"""
+        class FailingTaskDeletes:
+            def table(self, name):
+                query = memory_supabase.table(name)
+                if name == "tasks":
+                    query.delete = lambda: (_ for _ in ()).throw(ConnectionError("caída"))
+                return query
+
+            def __getattr__(self, name):
+                return getattr(memory_supabase, name)
+
+        monkeypatch.setattr("app.services.offline_service.get_supabase", FailingTaskDeletes)
+
+        response = _upload(
+            client,
+            _op("create", "task", "t1", {"title": "Nueva"}),
+            _op("create", "subtask", "s1", {"task_id": "t1", "title": "A"}),
+            _op("create", "subtask", "s2", {"task_id": 999, "title": "Huérfana"}),
+        )
+
+        assert response.status_code == 409
+        detail = response.json()["detail"]
+        task_id = memory_supabase.table("tasks").select("id").execute().data[0]["id"]
+        assert detail["applied"] == [0]
+        assert detail["id_map"] == {"t1": task_id}
+        assert memory_supabase.table("subtasks").select("id").execute().data == []
+
+    @pytest.mark.parametrize("operation", [
+        lambda ids: _op("update", "task", ids["task"], {"title": "Robada"}),
+        lambda ids: _op("delete", "subtask", ids["subtask"]),
+        lambda ids: _op("complete", "pomodoro", ids["pomodoro"], {"actual_duration": 60}),
+        lambda ids: _op("create", "subtask", "s1", {"task_id": ids["task"], "title": "Intrusa"}),
+    ])
+    def test_other_users_rows_are_rejected(self, client, memory_supabase, operation):
+        """Las filas de otro usuario no se modifican ni se referencian, tampoco las subtareas"""
+        task = client.post("/api/v1/tasks/", json={"title": "Ajena", "user_id": "u2"}).json()
+        subtask = client.post("/api/v1/subtasks/", json={"task_id": task["id"], "title": "A"}).json()
+        pomodoro = client.post("/api/v1/pomodoros/", json={"task_id": task["id"], "user_id": "u2"}).json()
+        ids = {"task": task["id"], "subtask": subtask["id"], "pomodoro": pomodoro["id"]}
+
+        response = _upload(client, _op("create", "task", "t0", {"title": "Propia"}), operation(ids))
+
+        assert response.status_code == 403
+        assert [t["title"] for t in memory_supabase.table("tasks").select("title").execute().data] == ["Ajena"]
+        assert len(memory_supabase.table("subtasks").select("id").execute().data) == 1
+        assert memory_supabase.table("pomodoros").select("completed").execute().data == [{"completed": False}]
+
+    @pytest.mark.parametrize("operation", [
+        _op("create", "subtask", "s1", {"task_id": "desconocida", "title": "A"}),
+        _op("update", "distraction", 1, {"used_phone": True}),
+        _op("create", "task", "t1", {"title": ""}),
+        _op("update", "task", "t9", {"title": "Antes de crearla"}),
+    ])
+    def test_invalid_log_is_rejected_before_writing(self, client, memory_supabase, operation):
+        """Los errores de validación se detectan antes de escribir nada"""
+        response = _upload(client, _op("create", "task", "t0", {"title": "Válida"}), operation)
+
+        assert response.status_code == 422
+        assert "Operación 1" in response.json()["detail"]
+        assert memory_supabase.table("tasks").select("id").execute().data == []
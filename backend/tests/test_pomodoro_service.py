@@ -106,35 +106,30 @@ class TestPomodoroService:
         
         assert result.objective == "Objetivo actualizado"
     
-    def test_complete_pomodoro_success(self, mock_supabase, sample_pomodoro_data, sample_subtask_data):
+    def test_complete_pomodoro_success(self, mock_supabase, sample_pomodoro_data):
         """Test completar pomodoro y actualizar tiempos"""
-        # Mock para get_pomodoro_by_id
-        pomodoro_response = MagicMock()
-        pomodoro_response.data = [sample_pomodoro_data]
-        
-        # Mock para obtener subtareas
-        subtask_response = MagicMock()
-        subtask_response.data = [sample_subtask_data]
-        
-        # Configurar mocks
-        calls = [pomodoro_response]
-        mock_supabase.table.return_value.select.return_value.eq.return_value.execute.side_effect = calls
-        
-        # Mock para actualizar subtareas (time_spent)
-        update_subtask_response = MagicMock()
-        updated_subtask = sample_subtask_data.copy()
-        updated_subtask["time_spent"] = 1500
-        update_subtask_response.data = [updated_subtask]
-        mock_supabase.table.return_value.update.return_value.eq.return_value.execute.return_value = update_subtask_response
-        
-        # Mock para actualizar pomodoro
+        # La RPC actualiza subtareas y pomodoro en una sola llamada
         updated_pomodoro = sample_pomodoro_data.copy()
         updated_pomodoro["completed"] = True
-        update_pomodoro_response = MagicMock()
-        update_pomodoro_response.data = [updated_pomodoro]
-        mock_supabase.table.return_value.update.return_value.eq.return_value.execute.return_value = update_pomodoro_response
+        rpc_response = MagicMock()
+        rpc_response.data = [updated_pomodoro]
+        mock_supabase.rpc.return_value.execute.return_value = rpc_response
         
         pomodoro_complete = PomodoroComplete(pomodoro_id=1)
         result = PomodoroService.complete_pomodoro(pomodoro_complete)
         
         assert result.completed is True
+        mock_supabase.rpc.assert_called_once_with(
+            "complete_pomodoro", {"p_pomodoro_id": 1, "p_actual_duration": None}
+        )
+    
+    def test_complete_pomodoro_not_found(self, mock_supabase):
+        """Test completar pomodoro inexistente"""
+        rpc_response = MagicMock()
+        rpc_response.data = []
+        mock_supabase.rpc.return_value.execute.return_value = rpc_response
+        
+        with pytest.raises(HTTPException) as exc_info:
+            PomodoroService.complete_pomodoro(PomodoroComplete(pomodoro_id=999))
+        
+        assert exc_info.value.status_code == status.HTTP_404_NOT_FOUND
@@ -13,10 +13,10 @@ from app.models.schemas import PomodoroCreate, PomodoroUpdate, PomodoroComplete,
 class TestPomodoroServiceUnit:
     """Tests unitarios aislados para PomodoroService"""
     
-    @patch('app.services.pomodoro_service.TaskService')
+    @patch('app.services.pomodoro_service.require_references')
     @patch('app.services.pomodoro_service.get_supabase')
-    def test_create_pomodoro_unit(self, mock_get_supabase, mock_task_service):
-        """Test unitario: crear pomodoro - mockea TaskService si hay task_id"""
+    def test_create_pomodoro_unit(self, mock_get_supabase, mock_require_references):
+        """Test unitario: crear pomodoro - mockea la comprobación de la tarea y las subtareas"""
         # Arrange
         mock_supabase = MagicMock()
         mock_get_supabase.return_value = mock_supabase
@@ -36,7 +36,6 @@ class TestPomodoroServiceUnit:
             "updated_at": "2024-01-01T10:00:00Z"
         }
         
-        mock_task_service.get_task_by_id.return_value = MagicMock(id=1)
         insert_response = MagicMock()
         insert_response.data = [sample_pomodoro_data]
         mock_supabase.table.return_value.insert.return_value.execute.return_value = insert_response
@@ -48,7 +47,7 @@ class TestPomodoroServiceUnit:
         
         # Assert
         assert result.mode == PomodoroMode.POMODORO
-        mock_task_service.get_task_by_id.assert_called_once_with(1)
+        mock_require_references.assert_called_once_with({"tasks": [1], "subtasks": []}, user_id=None)
     
     @patch('app.services.pomodoro_service.get_supabase')
     def test_create_pomodoro_without_task_id_unit(self, mock_get_supabase):
@@ -135,64 +134,37 @@ class TestPomodoroServiceUnit:
         
         assert exc_info.value.status_code == status.HTTP_404_NOT_FOUND
     
-    @patch.object(PomodoroService, 'get_pomodoro_by_id')
-    @patch('app.services.pomodoro_service.SubtaskService')
     @patch('app.services.pomodoro_service.get_supabase')
-    def test_complete_pomodoro_unit(self, mock_get_supabase, mock_subtask_service, mock_get_pomodoro):
-        """Test unitario: completar pomodoro - mockea todas las dependencias"""
+    def test_complete_pomodoro_unit(self, mock_get_supabase):
+        """Test unitario: completar pomodoro - una única llamada RPC"""
         # Arrange
         mock_supabase = MagicMock()
         mock_get_supabase.return_value = mock_supabase
         
-        # Mock para get_pomodoro_by_id
-        from app.models.schemas import PomodoroResponse
-        from datetime import datetime
-        pomodoro = PomodoroResponse(
-            id=1,
-            mode=PomodoroMode.POMODORO,
-            subtask_ids=[1, 2],
-            duration=1500,
-            completed=False,
-            created_at=datetime.now(),
-            updated_at=datetime.now()
-        )
-        mock_get_pomodoro.return_value = pomodoro
-        
-        # Mock para SubtaskService
-        from app.models.schemas import SubtaskResponse
-        mock_subtask = SubtaskResponse(
-            id=1,
-            task_id=1,
-            title="Subtarea",
-            completed=False,
-            time_spent=0,
-            created_at="2024-01-01T10:00:00Z",
-            updated_at="2024-01-01T10:00:00Z"
-        )
-        mock_subtask_service.get_subtask_by_id.return_value = mock_subtask
-        mock_subtask_service.update_subtask.return_value = mock_subtask
-        
-        # Mock para update del pomodoro
+        # Respuesta de la RPC complete_pomodoro
         updated_pomodoro_data = {
             "id": 1,
             "mode": "pomodoro",
+            "subtask_ids": [1, 2],
             "completed": True,
-            "duration": 1500,
+            "duration": 1200,
             "completed_at": "2024-01-01T11:00:00Z",
             "created_at": "2024-01-01T10:00:00Z",
             "updated_at": "2024-01-01T11:00:00Z"
         }
-        update_response = MagicMock()
-        update_response.data = [updated_pomodoro_data]
-        mock_supabase.table.return_value.update.return_value.eq.return_value.execute.return_value = update_response
+        rpc_response = MagicMock()
+        rpc_response.data = [updated_pomodoro_data]
+        mock_supabase.rpc.return_value.execute.return_value = rpc_response
         
-        pomodoro_complete = PomodoroComplete(pomodoro_id=1)
+        pomodoro_complete = PomodoroComplete(pomodoro_id=1, actual_duration=1200)
         
         # Act
         result = PomodoroService.complete_pomodoro(pomodoro_complete)
         
         # Assert
         assert result.completed is True
-        # Verificar que se llamó a actualizar cada subtarea
-        assert mock_subtask_service.get_subtask_by_id.call_count == 2
-        assert mock_subtask_service.update_subtask.call_count == 2
+        assert result.duration == 1200
+        mock_supabase.rpc.assert_called_once_with(
+            "complete_pomodoro", {"p_pomodoro_id": 1, "p_actual_duration": 1200}
+        )
+        mock_supabase.table.assert_not_called()
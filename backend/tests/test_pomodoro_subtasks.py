@@ -0,0 +1,96 @@
+"""
+Tests de la relación pomodoro-subtarea (tabla pomodoro_subtasks)
+La API sigue aceptando y devolviendo ``subtask_ids``
+"""
+
+import pytest
+from fastapi import HTTPException
+from app.models.schemas import PomodoroComplete, PomodoroCreate, PomodoroUpdate, SubtaskCreate, TaskCreate
+from app.services.pomodoro_service import PomodoroService
+from app.services.subtask_service import SubtaskService
+from app.services.task_service import TaskService
+
+
+def _task_with_subtasks(count=3):
+    task = TaskService.create_task(TaskCreate(title="Tarea", user_id="u1"))
+    subtasks = [SubtaskService.create_subtask(SubtaskCreate(task_id=task.id, title=f"Sub {i}")) for i in range(count)]
+    return task, [subtask.id for subtask in subtasks]
+
+
+def _links(memory_supabase, pomodoro_id):
+    rows = memory_supabase.table("pomodoro_subtasks").select("subtask_id").eq("pomodoro_id", pomodoro_id).execute().data
+    return sorted(row["subtask_id"] for row in rows)
+
+
+class TestPomodoroSubtasks:
+    """Los servicios leen y escriben subtask_ids en la tabla de relación"""
+
+    def test_create_writes_links(self, memory_supabase):
+        """Crear un pomodoro guarda una fila por subtarea (sin repetidas)"""
+        task, subtask_ids = _task_with_subtasks()
+
+        pomodoro = PomodoroService.create_pomodoro(
+            PomodoroCreate(task_id=task.id, subtask_ids=[subtask_ids[1], subtask_ids[0], subtask_ids[1]])
+        )
+
+        assert pomodoro.subtask_ids == [subtask_ids[1], subtask_ids[0]]
+        assert _links(memory_supabase, pomodoro.id) == sorted(subtask_ids[:2])
+        assert PomodoroService.get_pomodoro_by_id(pomodoro.id).subtask_ids == sorted(subtask_ids[:2])
+
+    def test_create_with_unknown_subtask_leaves_nothing(self, memory_supabase):
+        """Si una subtarea no existe no queda el pomodoro a medias"""
+        task, subtask_ids = _task_with_subtasks(1)
+
+        with pytest.raises(HTTPException):
+            PomodoroService.create_pomodoro(PomodoroCreate(task_id=task.id, subtask_ids=[subtask_ids[0], 999]))
+
+        assert memory_supabase.table("pomodoros").select("id").execute().data == []
+        assert memory_supabase.table("pomodoro_subtasks").select("id").execute().data == []
+
+    def test_update_replaces_only_changed_links(self, client, memory_supabase):
+        """Actualizar subtask_ids borra las que sobran e inserta las que faltan"""
+        task, subtask_ids = _task_with_subtasks()
+        pomodoro = PomodoroService.create_pomodoro(PomodoroCreate(task_id=task.id, subtask_ids=subtask_ids[:2]))
+        memory_supabase.reset_calls()
+
+        updated = PomodoroService.update_pomodoro(pomodoro.id, PomodoroUpdate(subtask_ids=subtask_ids[1:]))
+
+        assert updated.subtask_ids == subtask_ids[1:]
+        assert _links(memory_supabase, pomodoro.id) == subtask_ids[1:]
+        writes = [(c.table, c.operation) for c in memory_supabase.calls if c.operation != "select"]
+        assert writes == [("pomodoro_subtasks", "delete"), ("pomodoro_subtasks", "insert"), ("pomodoros", "update")]
+
+    def test_complete_adds_time_through_links(self, client, memory_supabase):
+        """Completar suma la duración a las subtareas enlazadas y devuelve sus IDs"""
+        task, subtask_ids = _task_with_subtasks()
+        pomodoro = PomodoroService.create_pomodoro(PomodoroCreate(task_id=task.id, subtask_ids=subtask_ids[:2]))
+
+        response = client.post("/api/v1/pomodoros/complete", json={"pomodoro_id": pomodoro.id})
+
+        assert response.json()["subtask_ids"] == subtask_ids[:2]
+        times = [SubtaskService.get_subtask_by_id(subtask_id).time_spent for subtask_id in subtask_ids]
+        assert times == [1500, 1500, 0]
+
+    def test_completing_twice_adds_time_once(self, client, memory_supabase):
+        """Un segundo complete (reintento) devuelve el pomodoro sin volver a sumar tiempo"""
+        task, subtask_ids = _task_with_subtasks(1)
+        pomodoro = PomodoroService.create_pomodoro(PomodoroCreate(user_id="u1", task_id=task.id, subtask_ids=subtask_ids))
+
+        first = client.post("/api/v1/pomodoros/complete", json={"pomodoro_id": pomodoro.id}).json()
+        second = client.post("/api/v1/pomodoros/complete", json={"pomodoro_id": pomodoro.id, "actual_duration": 60})
+
+        assert second.status_code == 200
+        assert second.json()["completed_at"] == first["completed_at"]
+        assert second.json()["duration"] == 1500
+        assert SubtaskService.get_subtask_by_id(subtask_ids[0]).time_spent == 1500
+        assert client.get("/api/v1/statistics/insights", params={"user_id": "u1"}).json()["total_sessions"] == 1
+
+    def test_deleting_subtask_removes_link(self, client, memory_supabase):
+        """Borrar una subtarea la quita de los pomodoros (ON DELETE CASCADE)"""
+        task, subtask_ids = _task_with_subtasks(2)
+        pomodoro = PomodoroService.create_pomodoro(PomodoroCreate(task_id=task.id, subtask_ids=subtask_ids))
+
+        SubtaskService.delete_subtask(subtask_ids[0])
+
+        response = client.get(f"/api/v1/pomodoros/{pomodoro.id}")
+        assert response.json()["subtask_ids"] == [subtask_ids[1]]
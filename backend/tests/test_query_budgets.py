@@ -0,0 +1,129 @@
+"""
+Presupuestos de consultas por endpoint
+Cada test declara cuántas llamadas a Supabase puede hacer un endpoint para una forma de datos dada
+"""
+
+import pytest
+from tests.query_budget import QueryBudgetExceeded
+
+
+def _seed_tasks(memory_supabase, count, subtasks_per_task=3, user_id="u1"):
+    """Crear tareas con subtareas directamente en el backend en memoria"""
+    tasks = memory_supabase.table("tasks").insert([
+        {"title": f"Tarea {i}", "user_id": user_id} for i in range(count)
+    ]).execute().data
+    memory_supabase.table("subtasks").insert([
+        {"task_id": task["id"], "title": f"Subtarea {j}"}
+        for task in tasks for j in range(subtasks_per_task)
+    ]).execute()
+    return tasks
+
+
+class TestTaskEndpointBudgets:
+    """Presupuestos para los endpoints de tareas"""
+
+    @pytest.mark.query_budget(2)
+    def test_list_tasks_with_100_tasks(self, client, memory_supabase, query_budget):
+        """GET /tasks/ con 100 tareas no hace una consulta por tarea"""
+        _seed_tasks(memory_supabase, 100)
+
+        with query_budget:
+            response = client.get("/api/v1/tasks/", params={"user_id": "u1"})
+
+        assert response.status_code == 200
+        assert len(response.json()) == 100
+        assert all(len(task["subtasks"]) == 3 for task in response.json())
+
+    @pytest.mark.query_budget(1)
+    def test_get_task_with_subtasks(self, client, memory_supabase, query_budget):
+        """GET /tasks/{id} trae la tarea y sus subtareas en una consulta"""
+        task = _seed_tasks(memory_supabase, 1, subtasks_per_task=10)[0]
+
+        with query_budget:
+            response = client.get(f"/api/v1/tasks/{task['id']}")
+
+        assert response.status_code == 200
+        assert len(response.json()["subtasks"]) == 10
+
+    @pytest.mark.query_budget(1)
+    def test_list_tasks_with_counts_only(self, client, memory_supabase, query_budget):
+        """GET /tasks/?include_subtasks=false devuelve los conteos sin leer subtareas"""
+        tasks = _seed_tasks(memory_supabase, 20)
+        subtask = memory_supabase.table("subtasks").select("id").eq("task_id", tasks[0]["id"]).execute().data[0]
+        memory_supabase.table("subtasks").update({"completed": True}).eq("id", subtask["id"]).execute()
+        memory_supabase.reset_calls()
+
+        with query_budget:
+            response = client.get("/api/v1/tasks/", params={"user_id": "u1", "include_subtasks": False})
+
+        assert response.status_code == 200
+        assert [c.table for c in memory_supabase.calls] == ["tasks"]
+        by_id = {task["id"]: task for task in response.json()}
+        assert all(task["subtasks"] == [] and task["subtask_total"] == 3 for task in by_id.values())
+        assert by_id[tasks[0]["id"]]["subtask_completed"] == 1
+
+    @pytest.mark.query_budget(2)
+    def test_create_subtask(self, client, memory_supabase, query_budget):
+        """POST /subtasks/ valida la tarea e inserta"""
+        task = _seed_tasks(memory_supabase, 1)[0]
+
+        with query_budget:
+            response = client.post("/api/v1/subtasks/", json={"task_id": task["id"], "title": "Nueva"})
+
+        assert response.status_code == 200
+
+
+class TestPomodoroEndpointBudgets:
+    """Presupuestos para los endpoints de pomodoros"""
+
+    @pytest.mark.query_budget(2)
+    def test_complete_pomodoro_with_5_subtasks(self, client, memory_supabase, query_budget):
+        """POST /pomodoros/complete no hace consultas por subtarea"""
+        task = _seed_tasks(memory_supabase, 1, subtasks_per_task=5)[0]
+        subtask_ids = [st["id"] for st in memory_supabase.table("subtasks").select("id").execute().data]
+        pomodoro = memory_supabase.table("pomodoros").insert({"task_id": task["id"]}).execute().data[0]
+        memory_supabase.table("pomodoro_subtasks").insert([
+            {"pomodoro_id": pomodoro["id"], "subtask_id": subtask_id} for subtask_id in subtask_ids
+        ]).execute()
+
+        with query_budget:
+            response = client.post("/api/v1/pomodoros/complete", json={"pomodoro_id": pomodoro["id"]})
+
+        assert response.status_code == 200
+        assert response.json()["completed"] is True
+        subtasks = memory_supabase.table("subtasks").select("time_spent").execute().data
+        assert all(st["time_spent"] == 1500 for st in subtasks)
+
+    @pytest.mark.query_budget(1)
+    def test_pomodoro_count(self, client, memory_supabase, query_budget):
+        """GET /pomodoros/count usa count exacto en una consulta"""
+        memory_supabase.table("pomodoros").insert([
+            {"completed": True, "user_id": "u1"} for _ in range(20)
+        ]).execute()
+
+        with query_budget:
+            response = client.get("/api/v1/pomodoros/count", params={"user_id": "u1"})
+
+        assert response.json() == {"count": 20}
+
+
+class TestQueryBudgetUtility:
+    """Tests de la utilidad de presupuestos"""
+
+    def test_exceeded_budget_reports_call_trace(self, client, memory_supabase, query_budget):
+        """Al superar el presupuesto se muestra la traza de llamadas"""
+        _seed_tasks(memory_supabase, 1)
+
+        with pytest.raises(QueryBudgetExceeded) as exc_info:
+            with query_budget(0, "listado"):
+                client.get("/api/v1/tasks/", params={"user_id": "u1"})
+
+        message = str(exc_info.value)
+        assert "1 > 0" in message
+        assert "tasks.select eq(user_id='u1')" in message
+
+    def test_budget_requires_maximum(self, memory_supabase, query_budget):
+        """Sin marker ni máximo explícito el presupuesto no es válido"""
+        with pytest.raises(ValueError):
+            with query_budget:
+                pass
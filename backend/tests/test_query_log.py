@@ -0,0 +1,111 @@
+"""
+Tests para la instrumentación de consultas a Supabase
+"""
+
+import json
+import logging
+import pytest
+from unittest.mock import MagicMock
+from app.config import settings
+from app.database.query_log import ObservedClient, query_stats
+
+
+@pytest.fixture(autouse=True)
+def reset_query_stats():
+    """Limpiar las estadísticas entre tests"""
+    query_stats.reset()
+    yield
+    query_stats.reset()
+
+
+class TestObservedClient:
+    """Tests para ObservedClient y ObservedQuery"""
+
+    def test_execute_returns_builder_result(self):
+        """El proxy devuelve el resultado del builder original"""
+        raw_client = MagicMock()
+        response = MagicMock()
+        response.data = [{"id": 1}]
+        raw_client.table.return_value.select.return_value.eq.return_value.execute.return_value = response
+
+        client = ObservedClient(raw_client)
+        result = client.table("tasks").select("*").eq("id", 1).execute()
+
+        assert result is response
+        raw_client.table.assert_called_once_with("tasks")
+
+    def test_fingerprint_excludes_values(self):
+        """La huella incluye columnas y operación, pero no valores"""
+        client = ObservedClient(MagicMock())
+        query = client.table("tasks").select("*").eq("user_id", "secret-user").ilike("title", "%foo%").order("created_at", desc=True)
+
+        assert query.fingerprint == "tasks SELECT eq(user_id) ilike(title) order(created_at)"
+        assert "secret-user" not in query.fingerprint
+
+    def test_stats_aggregate_by_fingerprint(self):
+        """Las ejecuciones se agregan por huella, con filas devueltas"""
+        raw_client = MagicMock()
+        response = MagicMock()
+        response.data = [{"id": 1}, {"id": 2}]
+        raw_client.table.return_value.select.return_value.eq.return_value.execute.return_value = response
+
+        client = ObservedClient(raw_client)
+        client.table("tasks").select("*").eq("id", 1).execute()
+        client.table("tasks").select("*").eq("id", 2).execute()
+
+        top = query_stats.top(5)
+        assert len(top) == 1
+        assert top[0]["fingerprint"] == "tasks SELECT eq(id)"
+        assert top[0]["calls"] == 2
+        assert top[0]["rows"] == 4
+
+    def test_slow_query_logged_as_json(self, monkeypatch, caplog):
+        """Las consultas sobre el umbral se registran como JSON estructurado"""
+        monkeypatch.setattr(settings, "SLOW_QUERY_THRESHOLD_MS", 0.0)
+        raw_client = MagicMock()
+        raw_client.table.return_value.select.return_value.eq.return_value.execute.return_value.data = []
+
+        client = ObservedClient(raw_client)
+        with caplog.at_level(logging.WARNING, logger="mypomodoro.queries"):
+            client.table("pomodoros").select("id").eq("completed", True).execute()
+
+        payload = json.loads(caplog.records[-1].getMessage())
+        assert payload["event"] == "slow_query"
+        assert payload["table"] == "pomodoros"
+        assert payload["operation"] == "select"
+        assert payload["filters"] == ["eq(completed)"]
+        assert payload["rows"] == 0
+        assert "duration_ms" in payload
+
+    def test_errors_are_recorded_and_reraised(self):
+        """Los errores se registran y se propagan"""
+        raw_client = MagicMock()
+        raw_client.table.return_value.delete.return_value.eq.return_value.execute.side_effect = RuntimeError("boom")
+
+        client = ObservedClient(raw_client)
+        with pytest.raises(RuntimeError):
+            client.table("tasks").delete().eq("id", 1).execute()
+
+        assert query_stats.top(1)[0]["fingerprint"] == "tasks DELETE eq(id)"
+
+    def test_top_orders_by_total_time(self):
+        """El resumen ordena las huellas por tiempo total"""
+        query_stats.record("a", 5.0, 1, False)
+        query_stats.record("b", 50.0, 1, False)
+        query_stats.record("a", 10.0, 1, False)
+
+        top = query_stats.top(1)
+        assert top[0]["fingerprint"] == "b"
+
+
+class TestMetricsEndpoint:
+    """Tests para el endpoint /metrics"""
+
+    def test_metrics_endpoint(self, client):
+        """GET /metrics expone las huellas de consultas"""
+        query_stats.record("tasks SELECT eq(id)", 3.0, 1, False)
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.json()["queries"][0]["fingerprint"] == "tasks SELECT eq(id)"
@@ -0,0 +1,101 @@
+"""
+Tests para la comprobación ligera de referencias (claves foráneas)
+"""
+
+from app.core.events import DELETE, ChangeEvent, get_event_bus
+from app.database.references import reference_cache
+
+
+def _seed(memory_supabase):
+    task = memory_supabase.table("tasks").insert({"title": "Tarea", "user_id": "u1"}).execute().data[0]
+    subtasks = memory_supabase.table("subtasks").insert([
+        {"task_id": task["id"], "title": "Uno"},
+        {"task_id": task["id"], "title": "Dos"},
+    ]).execute().data
+    memory_supabase.reset_calls()
+    return task, subtasks
+
+
+class TestReferences:
+    """Tests de las comprobaciones de existencia y propiedad"""
+
+    def test_pomodoro_checks_task_and_subtasks_in_one_query_each(self, client, memory_supabase):
+        """La tarea y las subtareas se comprueban con una consulta IN por tabla, sin leer filas completas"""
+        task, subtasks = _seed(memory_supabase)
+
+        response = client.post("/api/v1/pomodoros/", json={
+            "mode": "pomodoro", "user_id": "u1", "task_id": task["id"],
+            "subtask_ids": [s["id"] for s in subtasks]
+        })
+
+        assert response.status_code == 200
+        checks = [c for c in memory_supabase.calls if c.table in ("tasks", "subtasks")]
+        assert [c.table for c in checks] == ["tasks", "subtasks"]
+
+    def test_existing_references_are_cached(self, client, memory_supabase):
+        """Un segundo alta con la misma tarea no vuelve a consultarla"""
+        task, _ = _seed(memory_supabase)
+        client.post("/api/v1/subtasks/", json={"task_id": task["id"], "title": "Tres"})
+        memory_supabase.reset_calls()
+
+        response = client.post("/api/v1/subtasks/", json={"task_id": task["id"], "title": "Cuatro"})
+
+        assert response.status_code == 200
+        assert "tasks" not in [c.table for c in memory_supabase.calls]
+        assert reference_cache.snapshot()["hits"] == 1
+
+    def test_missing_subtask_and_foreign_task(self, client, memory_supabase):
+        """Subtarea inexistente (404) y tarea de otro usuario (403)"""
+        task, subtasks = _seed(memory_supabase)
+
+        missing = client.post("/api/v1/pomodoros/", json={
+            "mode": "pomodoro", "task_id": task["id"], "subtask_ids": [subtasks[0]["id"], 999]
+        })
+        foreign = client.post("/api/v1/pomodoros/", json={
+            "mode": "pomodoro", "user_id": "otro", "task_id": task["id"]
+        })
+
+        assert missing.status_code == 404
+        assert missing.json()["detail"] == "Subtarea con ID 999 no encontrada"
+        assert foreign.status_code == 403
+        assert memory_supabase.table("pomodoros").select("id").execute().data == []
+
+    def test_deleted_task_is_forgotten(self, client, memory_supabase):
+        """Un borrado (también de otro worker) saca la tarea y sus subtareas de la caché"""
+        task, subtasks = _seed(memory_supabase)
+        client.post("/api/v1/pomodoros/", json={
+            "mode": "pomodoro", "task_id": task["id"], "subtask_ids": [subtasks[0]["id"]]
+        })
+        assert reference_cache.snapshot()["entries"] == 2
+
+        get_event_bus().receive(ChangeEvent("tasks", DELETE, task["id"], "u1", origin="otro-worker"))
+
+        assert reference_cache.snapshot()["entries"] == 0
+
+    def test_subtasks_must_belong_to_the_pomodoro_task(self, client, memory_supabase):
+        """Subtareas de otra tarea (422) o de otro usuario (403) no se asocian al pomodoro"""
+        task, subtasks = _seed(memory_supabase)
+        other = memory_supabase.table("tasks").insert({"title": "Otra", "user_id": "u1"}).execute().data[0]
+        foreign = memory_supabase.table("tasks").insert({"title": "Ajena", "user_id": "u2"}).execute().data[0]
+        other_subtask, foreign_subtask = memory_supabase.table("subtasks").insert([
+            {"task_id": other["id"], "title": "De otra tarea"},
+            {"task_id": foreign["id"], "title": "De otro usuario"},
+        ]).execute().data
+
+        mismatched = client.post("/api/v1/pomodoros/", json={
+            "mode": "pomodoro", "user_id": "u1", "task_id": task["id"], "subtask_ids": [other_subtask["id"]]
+        })
+        stolen = client.post("/api/v1/pomodoros/", json={
+            "mode": "pomodoro", "user_id": "u1", "subtask_ids": [foreign_subtask["id"]]
+        })
+        pomodoro = client.post("/api/v1/pomodoros/", json={
+            "mode": "pomodoro", "user_id": "u1", "task_id": task["id"], "subtask_ids": [subtasks[0]["id"]]
+        }).json()
+        updated = client.put(f"/api/v1/pomodoros/{pomodoro['id']}", json={"subtask_ids": [foreign_subtask["id"]]})
+        moved = client.put(f"/api/v1/pomodoros/{pomodoro['id']}", json={"task_id": other["id"]})
+
+        assert mismatched.status_code == 422
+        assert stolen.status_code == 403
+        assert (updated.status_code, moved.status_code) == (422, 422)
+        links = memory_supabase.table("pomodoro_subtasks").select("subtask_id").execute().data
+        assert links == [{"subtask_id": subtasks[0]["id"]}]
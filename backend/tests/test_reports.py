@@ -0,0 +1,174 @@
+"""
+Tests para los informes en segundo plano (trabajos y /api/v1/reports)
+"""
+
+import threading
+import time
+import pytest
+from datetime import date, datetime, timezone
+from fastapi import HTTPException
+
+from app.core.jobs import DONE, FAILED, JobRunner
+from app.services.report_service import _add_month
+
+
+def _runner(**overrides):
+    options = {"workers": 1, "max_queued": 10, "result_ttl": 60, "max_retained": 10}
+    options.update(overrides)
+    return JobRunner(**options)
+
+
+def _wait(runner, job):
+    deadline = time.time() + 5
+    while not job.finished and time.time() < deadline:
+        time.sleep(0.01)
+    return job
+
+
+class TestJobRunner:
+    """Tests del ejecutor de trabajos"""
+
+    def test_deduplicates_and_reuses_results(self):
+        """Un trabajo igual en curso o recién terminado se reutiliza"""
+        runner = _runner()
+        release = threading.Event()
+        calls = []
+
+        def work(progress):
+            calls.append(1)
+            progress(0.5)
+            release.wait(5)
+            return {"ok": True}
+
+        first = runner.submit("clave", work)
+        assert runner.submit("clave", work) is first
+        release.set()
+        _wait(runner, first)
+
+        assert first.status == DONE and first.result == {"ok": True} and first.progress == 1.0
+        assert runner.submit("clave", work) is first
+        assert calls == [1]
+        assert runner.snapshot()["deduplicated"] == 2
+        runner.shutdown()
+
+    def test_invalidated_and_failed_jobs_are_not_reused(self):
+        """Tras un cambio del usuario o un fallo se genera un trabajo nuevo"""
+        runner = _runner()
+        done = _wait(runner, runner.submit("a", lambda progress: 1, scope="u1"))
+        runner.invalidate("u1")
+        assert runner.submit("a", lambda progress: 1, scope="u1") is not done
+
+        def fail(progress):
+            raise ValueError("sin datos")
+
+        failed = _wait(runner, runner.submit("b", fail))
+        assert failed.status == FAILED and failed.error == "sin datos"
+        assert runner.submit("b", fail) is not failed
+        runner.shutdown()
+
+    def test_full_queue_is_rejected(self):
+        """Con la cola llena se responde 503"""
+        runner = _runner(max_queued=1)
+        release = threading.Event()
+        runner.submit("a", lambda progress: release.wait(5))
+        while runner.snapshot()["running"] == 0:
+            time.sleep(0.01)
+        runner.submit("b", lambda progress: None)
+
+        with pytest.raises(HTTPException) as error:
+            runner.submit("c", lambda progress: None)
+
+        assert error.value.status_code == 503
+        release.set()
+        runner.shutdown()
+
+
+def _poll(client, report_id):
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        body = client.get(f"/api/v1/reports/{report_id}").json()
+        if body["status"] in ("done", "failed"):
+            return body
+        time.sleep(0.01)
+    pytest.fail("El informe no terminó")
+
+
+def _seed(memory_supabase):
+    task = memory_supabase.table("tasks").insert({"title": "Informe", "user_id": "u1"}).execute().data[0]
+    subtask = memory_supabase.table("subtasks").insert({"task_id": task["id"], "title": "Parte"}).execute().data[0]
+    pomodoros = memory_supabase.table("pomodoros").insert([
+        {"user_id": "u1", "task_id": task["id"], "completed": True, "duration": 1500,
+         "completed_at": datetime(2024, 3, 4, 10, tzinfo=timezone.utc).isoformat()},
+        {"user_id": "u1", "completed": True, "duration": 1200,
+         "completed_at": datetime(2024, 3, 5, 23, 30, tzinfo=timezone.utc).isoformat()},
+        {"user_id": "u1", "completed": True, "mode": "shortBreak", "duration": 300,
+         "completed_at": datetime(2024, 3, 5, 10, tzinfo=timezone.utc).isoformat()},
+        {"user_id": "u1", "completed": True, "duration": 1500,
+         "completed_at": datetime(2024, 3, 11, 10, tzinfo=timezone.utc).isoformat()},
+        {"user_id": "otro", "completed": True, "duration": 1500,
+         "completed_at": datetime(2024, 3, 4, 10, tzinfo=timezone.utc).isoformat()},
+    ]).execute().data
+    memory_supabase.table("pomodoro_subtasks").insert(
+        {"pomodoro_id": pomodoros[0]["id"], "subtask_id": subtask["id"]}
+    ).execute()
+    memory_supabase.table("distractions").insert(
+        {"pomodoro_id": pomodoros[0]["id"], "user_id": "u1", "had_distractions": True, "used_phone": False,
+         "created_at": datetime(2024, 3, 4, 10, tzinfo=timezone.utc).isoformat()}
+    ).execute()
+    return task, subtask
+
+
+class TestReportsRouter:
+    """Tests para los endpoints de informes"""
+
+    def test_weekly_report(self, client, memory_supabase):
+        """El informe semanal agrupa por día local y por tarea"""
+        task, _ = _seed(memory_supabase)
+
+        response = client.post("/api/v1/reports/", json={
+            "type": "weekly", "user_id": "u1", "start": "2024-03-04", "utc_offset": 60
+        })
+
+        assert response.status_code == 202
+        assert response.json()["end"] == "2024-03-11"
+        body = _poll(client, response.json()["id"])
+        result = body["result"]
+        assert body["status"] == "done" and body["progress"] == 1.0
+        assert result["total_sessions"] == 2
+        assert result["total_focus_time"] == 2700
+        # Las 23:30 UTC del día 5 son el día 6 con UTC+1
+        assert [day["day"] for day in result["days"]] == ["2024-03-04", "2024-03-06"]
+        assert result["tasks"][0] == {"task_id": task["id"], "title": "Informe", "sessions": 1, "focus_time": 1500}
+        assert result["distractions_count"] == 1
+
+    def test_export_and_invalidation(self, client, memory_supabase):
+        """La exportación incluye todos los modos; un cambio del usuario genera un informe nuevo"""
+        task, subtask = _seed(memory_supabase)
+        request = {"type": "export", "user_id": "u1", "start": "2024-03-01", "end": "2024-04-01"}
+
+        first = client.post("/api/v1/reports/", json=request).json()
+        sessions = _poll(client, first["id"])["result"]["sessions"]
+
+        assert len(sessions) == 4
+        assert sessions[0]["task_title"] == "Informe" and sessions[0]["subtask_ids"] == [subtask["id"]]
+        assert client.post("/api/v1/reports/", json=request).json()["id"] == first["id"]
+
+        client.put(f"/api/v1/tasks/{task['id']}", json={"title": "Renombrada"})
+        second = client.post("/api/v1/reports/", json=request).json()
+
+        assert second["id"] != first["id"]
+        assert _poll(client, second["id"])["result"]["sessions"][0]["task_title"] == "Renombrada"
+
+    def test_invalid_range_and_unknown_report(self, client, memory_supabase):
+        """Rango vacío (400) e informe inexistente (404)"""
+        response = client.post("/api/v1/reports/", json={
+            "type": "export", "start": "2024-03-01", "end": "2024-03-01"
+        })
+        assert response.status_code == 400
+
+        assert client.get("/api/v1/reports/desconocido").status_code == 404
+
+    def test_monthly_range(self):
+        """El informe mensual termina el mismo día del mes siguiente (o el último)"""
+        assert _add_month(date(2024, 1, 31)) == date(2024, 2, 29)
+        assert _add_month(date(2024, 12, 15)) == date(2025, 1, 15)
@@ -0,0 +1,213 @@
+"""
+Tests para la coalescencia de peticiones (single-flight)
+"""
+
+import asyncio
+import threading
+import pytest
+from app.config import settings
+from app.core.single_flight import SingleFlight, coalesce, single_flight
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+class TestSingleFlight:
+    """Tests para SingleFlight"""
+
+    def test_concurrent_identical_calls_share_execution(self):
+        """Las llamadas concurrentes con la misma clave comparten una ejecución"""
+        flight = SingleFlight()
+        executions = []
+
+        async def fetch():
+            executions.append(1)
+            await asyncio.sleep(0.01)
+            return {"total": 3}
+
+        async def scenario():
+            return await asyncio.gather(*[flight.do("k", "u1", fetch, ttl=0) for _ in range(5)])
+
+        results = _run(scenario())
+
+        assert len(executions) == 1
+        assert results == [{"total": 3}] * 5
+        assert flight.stats["coalesced"] == 4
+
+    def test_different_keys_do_not_share(self):
+        """Claves distintas se ejecutan por separado"""
+        flight = SingleFlight()
+        executions = []
+
+        async def fetch():
+            executions.append(1)
+            await asyncio.sleep(0.01)
+
+        async def scenario():
+            await asyncio.gather(flight.do("a", "u1", fetch, ttl=0), flight.do("b", "u1", fetch, ttl=0))
+
+        _run(scenario())
+        assert len(executions) == 2
+
+    def test_write_during_flight_starts_new_execution(self):
+        """Tras una escritura no se reutiliza una ejecución iniciada antes"""
+        flight = SingleFlight()
+
+        def fetch(value):
+            async def run():
+                await asyncio.sleep(0.01)
+                return value
+            return run
+
+        async def scenario():
+            first = asyncio.ensure_future(flight.do("k", "u1", fetch("antes"), ttl=10))
+            await asyncio.sleep(0)
+            flight.invalidate("u1")
+            second = await flight.do("k", "u1", fetch("después"), ttl=10)
+            return await first, second
+
+        assert _run(scenario()) == ("antes", "después")
+        assert flight.stats["executions"] == 2
+        # Solo se cachea el resultado posterior a la escritura
+        assert flight._cache[("k", "u1")][2] == "después"
+
+    def test_micro_cache_and_invalidation(self):
+        """El resultado se cachea durante el TTL y la escritura lo invalida"""
+        flight = SingleFlight()
+        executions = []
+
+        async def fetch():
+            executions.append(1)
+            return len(executions)
+
+        async def scenario():
+            a = await flight.do("k", "u1", fetch, ttl=10)
+            b = await flight.do("k", "u1", fetch, ttl=10)
+            flight.invalidate("u2")
+            c = await flight.do("k", "u1", fetch, ttl=10)
+            flight.invalidate("u1")
+            d = await flight.do("k", "u1", fetch, ttl=10)
+            return a, b, c, d
+
+        assert _run(scenario()) == (1, 1, 1, 2)
+        assert flight.stats["cache_hits"] == 2
+
+    def test_user_write_invalidates_unscoped_reads(self):
+        """Una escritura de un usuario invalida también las lecturas sin user_id"""
+        flight = SingleFlight()
+        executions = []
+
+        async def fetch():
+            executions.append(1)
+            return len(executions)
+
+        async def scenario():
+            await flight.do("k", None, fetch, ttl=10)
+            flight.invalidate("u1")
+            return await flight.do("k", None, fetch, ttl=10)
+
+        assert _run(scenario()) == 2
+
+    def test_errors_propagate_and_are_not_cached(self):
+        """Los errores llegan a todos los participantes y no se cachean"""
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        async def scenario():
+            return await asyncio.gather(*[flight.do("k", "u1", fail, ttl=10) for _ in range(3)],
+                                        return_exceptions=True)
+
+        results = _run(scenario())
+
+        assert all(isinstance(r, ValueError) for r in results)
+        assert flight._cache == {}
+        assert flight._inflight == {}
+
+    def test_invalidations_from_other_threads(self):
+        """Las invalidaciones desde otros hilos no se pierden ni rompen la caché del loop"""
+        flight = SingleFlight()
+
+        async def fetch():
+            return 1
+
+        async def scenario():
+            workers = [
+                threading.Thread(target=lambda: [flight.invalidate(f"u{i % 3}") for i in range(500)])
+                for _ in range(4)
+            ]
+            for worker in workers:
+                worker.start()
+            for i in range(500):
+                await flight.do(("k", i % 7), f"u{i % 3}", fetch, ttl=10)
+            for worker in workers:
+                worker.join()
+
+        _run(scenario())
+
+        assert flight.stats["invalidations"] == 2000
+        assert flight.generation("u0") == sum(1 for i in range(500) if i % 3 == 0) * 4
+        assert flight.generation(None) == 2000
+
+    def test_disabled_setting_bypasses_coalescing(self, monkeypatch):
+        """Con SINGLE_FLIGHT_ENABLED=False cada llamada se ejecuta"""
+        monkeypatch.setattr(settings, "SINGLE_FLIGHT_ENABLED", False)
+        executions = []
+
+        @coalesce("test")
+        def endpoint(user_id=None):
+            executions.append(user_id)
+            return user_id
+
+        async def scenario():
+            await endpoint(user_id="u1")
+            await endpoint(user_id="u1")
+
+        _run(scenario())
+        assert executions == ["u1", "u1"]
+
+
+class TestSingleFlightRouters:
+    """Los endpoints de lectura coalescen y las escrituras invalidan"""
+
+    def test_statistics_cached_until_write(self, client, memory_supabase):
+        """GET /statistics se sirve de la micro-caché hasta la siguiente escritura"""
+        client.post("/api/v1/tasks/", json={"title": "Tarea", "user_id": "u1"})
+
+        first = client.get("/api/v1/statistics/", params={"user_id": "u1"}).json()
+        memory_supabase.reset_calls()
+        second = client.get("/api/v1/statistics/", params={"user_id": "u1"}).json()
+
+        assert second == first
+        assert memory_supabase.calls == []
+
+        client.post("/api/v1/tasks/", json={"title": "Otra", "user_id": "u1"})
+        third = client.get("/api/v1/statistics/", params={"user_id": "u1"}).json()
+
+        assert len(third["tasks_stats"]) == 2
+        assert single_flight.stats["cache_hits"] == 1
+
+    def test_tasks_cache_is_per_user(self, client, memory_supabase):
+        """Una escritura de otro usuario no invalida la caché del primero"""
+        client.post("/api/v1/tasks/", json={"title": "Tarea", "user_id": "u1"})
+        client.get("/api/v1/tasks/", params={"user_id": "u1"})
+
+        client.post("/api/v1/tasks/", json={"title": "Ajena", "user_id": "u2"})
+        memory_supabase.reset_calls()
+        response = client.get("/api/v1/tasks/", params={"user_id": "u1"})
+
+        assert [t["title"] for t in response.json()] == ["Tarea"]
+        assert memory_supabase.calls == []
+
+    def test_subtask_write_invalidates_tasks(self, client, memory_supabase):
+        """Las escrituras sin user_id en la respuesta invalidan todos los ámbitos"""
+        task = client.post("/api/v1/tasks/", json={"title": "Tarea", "user_id": "u1"}).json()
+        client.get("/api/v1/tasks/", params={"user_id": "u1"})
+
+        client.post("/api/v1/subtasks/", json={"task_id": task["id"], "title": "Sub"})
+        response = client.get("/api/v1/tasks/", params={"user_id": "u1"})
+
+        assert len(response.json()[0]["subtasks"]) == 1
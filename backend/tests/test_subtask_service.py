@@ -15,15 +15,10 @@ class TestSubtaskService:
     
     def test_create_subtask_success(self, mock_supabase, sample_subtask_data, sample_task_data):
         """Test crear subtarea exitosamente"""
-        # Mock para verificar que la tarea existe (TaskService.get_task_by_id)
+        # Mock para verificar que la tarea existe (consulta IN de id y user_id)
         task_response = MagicMock()
-        task_response.data = [sample_task_data]
-        
-        subtasks_empty = MagicMock()
-        subtasks_empty.data = []
-        
-        mock_supabase.table.return_value.select.return_value.eq.return_value.execute.side_effect = [task_response, subtasks_empty]
-        mock_supabase.table.return_value.select.return_value.eq.return_value.order.return_value.execute.return_value = subtasks_empty
+        task_response.data = [{"id": sample_task_data["id"], "user_id": sample_task_data["user_id"]}]
+        mock_supabase.table.return_value.select.return_value.in_.return_value.execute.return_value = task_response
         
         # Mock para insert
         insert_response = MagicMock()
@@ -13,16 +13,16 @@ from app.models.schemas import SubtaskCreate, SubtaskUpdate, SubtaskResponse
 class TestSubtaskServiceUnit:
     """Tests unitarios aislados para SubtaskService"""
     
-    @patch('app.services.subtask_service.TaskService')
+    @patch('app.services.subtask_service.require_references')
     @patch('app.services.subtask_service.get_supabase')
-    def test_create_subtask_unit(self, mock_get_supabase, mock_task_service, sample_subtask_data):
-        """Test unitario: crear subtarea - mockea TaskService"""
+    def test_create_subtask_unit(self, mock_get_supabase, mock_require_references, sample_subtask_data):
+        """Test unitario: crear subtarea - mockea la comprobación de referencias"""
         # Arrange
         mock_supabase = MagicMock()
         mock_get_supabase.return_value = mock_supabase
         
-        # Mock para TaskService.get_task_by_id
-        mock_task_service.get_task_by_id.return_value = MagicMock(id=1)
+        # Mock para la comprobación de la tarea
+        mock_require_references.return_value = {"tasks": {1: {"id": 1, "user_id": None}}}
         
         # Mock para insert
         insert_response = MagicMock()
@@ -37,7 +37,7 @@ class TestSubtaskServiceUnit:
         # Assert
         assert result.id == 1
         assert result.title == "Subtarea de prueba"
-        mock_task_service.get_task_by_id.assert_called_once_with(1)
+        mock_require_references.assert_called_once_with({"tasks": [1]})
     
     @patch('app.services.subtask_service.get_supabase')
     def test_get_subtask_by_id_unit(self, mock_get_supabase, sample_subtask_data):
@@ -0,0 +1,133 @@
+"""
+Tests para la sincronización incremental (GET /api/v1/sync)
+"""
+
+import pytest
+from datetime import datetime, timedelta, timezone
+from app.config import settings
+
+
+@pytest.fixture(autouse=True)
+def no_watermark_lag(monkeypatch):
+    """Sin margen, la marca de agua es el instante de la consulta"""
+    monkeypatch.setattr(settings, "SYNC_WATERMARK_LAG_SECONDS", 0)
+
+
+def _sync(client, since=None, user_id="u1"):
+    params = {"user_id": user_id}
+    if since:
+        params["since"] = since
+    response = client.get("/api/v1/sync/", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+class TestSyncRouter:
+    """Tests para el router de sincronización"""
+
+    def test_full_snapshot_without_watermark(self, client, memory_supabase):
+        """Sin marca se devuelve todo lo del usuario"""
+        task = client.post("/api/v1/tasks/", json={"title": "Tarea", "user_id": "u1"}).json()
+        client.post("/api/v1/subtasks/", json={"task_id": task["id"], "title": "A"})
+        client.post("/api/v1/tasks/", json={"title": "Ajena", "user_id": "u2"})
+
+        data = _sync(client)
+
+        assert data["full"] is True
+        assert [t["title"] for t in data["tasks"]] == ["Tarea"]
+        assert [st["title"] for st in data["subtasks"]] == ["A"]
+        assert data["deleted"]["tasks"] == []
+
+    @pytest.mark.query_budget(6)
+    def test_only_changes_since_watermark(self, client, memory_supabase, query_budget):
+        """Con marca solo se devuelven los cambios posteriores, con un número fijo de consultas"""
+        for i in range(20):
+            client.post("/api/v1/tasks/", json={"title": f"Tarea {i}", "user_id": "u1"})
+        watermark = _sync(client)["watermark"]
+
+        changed = client.post("/api/v1/tasks/", json={"title": "Nueva", "user_id": "u1"}).json()
+        client.post("/api/v1/subtasks/", json={"task_id": changed["id"], "title": "A"})
+
+        with query_budget:
+            data = _sync(client, since=watermark)
+
+        assert data["full"] is False
+        # La subtarea recalcula time_spent de su tarea: sigue siendo una sola fila
+        assert [t["id"] for t in data["tasks"]] == [changed["id"]]
+        assert [st["title"] for st in data["subtasks"]] == ["A"]
+        assert data["watermark"] > watermark
+
+    def test_deletions_are_reported(self, client, memory_supabase):
+        """Los borrados llegan como tombstones, también los de subtareas en cascada"""
+        task = client.post("/api/v1/tasks/", json={"title": "Tarea", "user_id": "u1"}).json()
+        first = client.post("/api/v1/subtasks/", json={"task_id": task["id"], "title": "A"}).json()
+        client.post("/api/v1/subtasks/", json={"task_id": task["id"], "title": "B"})
+        watermark = _sync(client)["watermark"]
+
+        client.delete(f"/api/v1/subtasks/{first['id']}")
+        client.delete(f"/api/v1/tasks/{task['id']}")
+        data = _sync(client, since=watermark)
+
+        assert data["deleted"]["subtasks"] == [first["id"]]
+        assert data["deleted"]["tasks"] == [task["id"]]
+        tombstones = memory_supabase.table("sync_tombstones").select("*").eq("table_name", "subtasks").execute()
+        assert len(tombstones.data) == 2  # la de B, sin user_id, la cubre el borrado de su tarea
+
+    def test_other_users_changes_are_not_returned(self, client, memory_supabase):
+        """Las subtareas de tareas ajenas se filtran por su tarea"""
+        watermark = _sync(client)["watermark"]
+        other = client.post("/api/v1/tasks/", json={"title": "Ajena", "user_id": "u2"}).json()
+        client.post("/api/v1/subtasks/", json={"task_id": other["id"], "title": "X"})
+
+        data = _sync(client, since=watermark)
+
+        assert data["tasks"] == [] and data["subtasks"] == []
+
+    def test_expired_watermark_returns_full_snapshot(self, client, memory_supabase):
+        """Una marca anterior a la retención de tombstones fuerza una copia completa"""
+        client.post("/api/v1/tasks/", json={"title": "Tarea", "user_id": "u1"})
+        since = datetime.now(timezone.utc) - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS + 1)
+
+        data = _sync(client, since=since.isoformat())
+
+        assert data["full"] is True
+        assert len(data["tasks"]) == 1
+
+    def test_large_snapshot_is_paginated(self, client, memory_supabase, monkeypatch):
+        """La copia completa se lee por páginas y las subtareas ajenas se filtran con su tarea, sin listar sus IDs"""
+        monkeypatch.setattr(settings, "SYNC_PAGE_SIZE", 2)
+        tasks = memory_supabase.table("tasks").insert([
+            {"title": f"Tarea {i}", "user_id": "u1"} for i in range(5)
+        ]).execute().data
+        other = memory_supabase.table("tasks").insert({"title": "Ajena", "user_id": "u2"}).execute().data[0]
+        memory_supabase.table("subtasks").insert([
+            {"task_id": task["id"], "title": f"{task['id']}-{j}"} for task in tasks + [other] for j in range(3)
+        ]).execute()
+        memory_supabase.reset_calls()
+
+        data = _sync(client)
+
+        assert sorted(t["id"] for t in data["tasks"]) == [t["id"] for t in tasks]
+        assert len(data["subtasks"]) == 15 and all("tasks" not in st for st in data["subtasks"])
+        subtask_reads = [c for c in memory_supabase.calls if c.table == "subtasks"]
+        assert len(subtask_reads) == 8
+        assert all(("eq", "tasks.user_id", "u1") in c.filters for c in subtask_reads)
+        assert len([c for c in memory_supabase.calls if c.table == "tasks"]) == 3
+        assert all(c.rows <= 2 for c in memory_supabase.calls)
+
+    def test_tombstones_are_paginated(self, client, memory_supabase, monkeypatch):
+        """Los tombstones se leen por páginas de (deleted_at, id), también con muchos empates"""
+        monkeypatch.setattr(settings, "SYNC_PAGE_SIZE", 2)
+        watermark = _sync(client)["watermark"]
+        later = (datetime.fromisoformat(watermark) + timedelta(seconds=1)).isoformat()
+        memory_supabase.table("sync_tombstones").insert(
+            [{"table_name": "tasks", "record_id": i, "user_id": "u1", "deleted_at": later} for i in range(5)]
+            + [{"table_name": "tasks", "record_id": 9, "user_id": "u1", "deleted_at": watermark}]
+            + [{"table_name": "tasks", "record_id": 99, "user_id": "u2", "deleted_at": later}]
+        ).execute()
+        memory_supabase.reset_calls()
+
+        data = _sync(client, since=watermark)
+
+        assert data["deleted"]["tasks"] == [9, 0, 1, 2, 3, 4]
+        assert all(c.rows <= 2 for c in memory_supabase.calls)
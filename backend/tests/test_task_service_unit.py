@@ -88,7 +88,7 @@ class TestTaskServiceUnit:
         assert result.id == 1
         assert result.title == "Tarea de prueba"
         # Verificar que se llamó a las tablas correctas
-        assert mock_supabase.table.call_count == 2  # tasks y subtasks
+        assert mock_supabase.table.call_count == 1  # tasks con subtareas embebidas
     
     @patch('app.services.task_service.get_supabase')
     def test_get_task_by_id_not_found_unit(self, mock_get_supabase):
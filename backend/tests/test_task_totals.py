@@ -0,0 +1,92 @@
+"""
+Tests para los totales de las tareas mantenidos en la base de datos y su conciliación
+"""
+
+import time
+
+from app.services.task_totals_service import TaskTotalsService, submit_reconciliation
+
+
+def _seed(memory_supabase, count=5):
+    tasks = memory_supabase.table("tasks").insert([
+        {"title": f"Tarea {i}", "user_id": "u1"} for i in range(count)
+    ]).execute().data
+    memory_supabase.table("subtasks").insert([
+        {"task_id": task["id"], "title": f"Subtarea {j}", "time_spent": 100, "completed": j == 0}
+        for task in tasks for j in range(2)
+    ]).execute()
+    return tasks
+
+
+def _totals(memory_supabase, task_id):
+    row = memory_supabase.table("tasks").select("*").eq("id", task_id).execute().data[0]
+    return row["time_spent"], row["subtask_total"], row["subtask_completed"]
+
+
+class TestTaskTotals:
+    """Tests de time_spent mantenido en el servidor"""
+
+    def test_complete_pomodoro_updates_task_time(self, client, memory_supabase):
+        """Completar un pomodoro suma su duración a la tarea en la misma llamada"""
+        task = _seed(memory_supabase, 1)[0]
+        subtask = memory_supabase.table("subtasks").select("id").eq("task_id", task["id"]).execute().data[0]
+        pomodoro = client.post("/api/v1/pomodoros/", json={
+            "mode": "pomodoro", "task_id": task["id"], "subtask_ids": [subtask["id"]]
+        }).json()
+
+        client.post("/api/v1/pomodoros/complete", json={"pomodoro_id": pomodoro["id"], "actual_duration": 1200})
+
+        assert client.get(f"/api/v1/tasks/{task['id']}").json()["time_spent"] == 1400
+
+    def test_time_follows_moved_and_deleted_subtasks(self, client, memory_supabase):
+        """Mover o borrar una subtarea ajusta las dos tareas sin recalcular desde cero"""
+        first, second = _seed(memory_supabase, 2)
+        moved = memory_supabase.table("subtasks").select("id").eq("task_id", first["id"]).execute().data[0]
+
+        memory_supabase.table("subtasks").update({"task_id": second["id"]}).eq("id", moved["id"]).execute()
+        assert _totals(memory_supabase, first["id"]) == (100, 1, 0)
+        assert _totals(memory_supabase, second["id"]) == (300, 3, 2)
+
+        client.delete(f"/api/v1/subtasks/{moved['id']}")
+        assert _totals(memory_supabase, second["id"]) == (200, 2, 1)
+
+    def test_time_spent_is_not_writable(self, client, memory_supabase):
+        """time_spent de la tarea no se acepta en la API: siempre es la suma de sus subtareas"""
+        task = _seed(memory_supabase, 1)[0]
+
+        response = client.put(f"/api/v1/tasks/{task['id']}", json={"title": "Nueva", "time_spent": 9999})
+
+        assert response.status_code == 200
+        assert response.json()["time_spent"] == 200
+
+
+class TestReconciliation:
+    """Tests de la conciliación por bloques"""
+
+    def test_repairs_drift_in_chunks(self, memory_supabase):
+        """Se recorren todas las tareas por bloques y solo se corrigen las desviadas"""
+        tasks = _seed(memory_supabase)
+        memory_supabase.table("tasks").update({"time_spent": 0}).eq("id", tasks[1]["id"]).execute()
+        memory_supabase.table("tasks").update({"subtask_total": 7}).eq("id", tasks[4]["id"]).execute()
+        memory_supabase.reset_calls()
+
+        summary = TaskTotalsService.reconcile(chunk_size=2)
+
+        assert (summary["checked"], summary["repaired"], summary["chunks"]) == (5, 2, 3)
+        assert [c.operation for c in memory_supabase.calls] == ["rpc"] * 3
+        assert _totals(memory_supabase, tasks[1]["id"]) == (200, 2, 1)
+        assert _totals(memory_supabase, tasks[4]["id"]) == (200, 2, 1)
+        assert TaskTotalsService.reconcile(chunk_size=2)["repaired"] == 0
+
+    def test_runs_as_background_job(self, memory_supabase):
+        """La conciliación se encola como trabajo; una pasada terminada no se reutiliza"""
+        tasks = _seed(memory_supabase, 2)
+        memory_supabase.table("tasks").update({"time_spent": 5}).eq("id", tasks[0]["id"]).execute()
+
+        job = submit_reconciliation()
+        deadline = time.time() + 5
+        while not job.finished and time.time() < deadline:
+            time.sleep(0.01)
+
+        assert job.result["repaired"] == 1
+        assert submit_reconciliation() is not job
@@ -69,6 +69,8 @@ export const tasksAPI = {
     const userId = params.userId || getUserId();
     queryParams.append('user_id', userId);
     if (params.search) queryParams.append('search', params.search);
+    // Solo subtask_total/subtask_completed, sin la lista de subtareas
+    if (params.includeSubtasks === false) queryParams.append('include_subtasks', 'false');
     
     const queryString = queryParams.toString();
     return request(`/api/v1/tasks${queryString ? `?${queryString}` : ''}`);
@@ -81,6 +83,18 @@ export const tasksAPI = {
     return request(`/api/v1/tasks/${taskId}`);
   },
 
+  /**
+   * Historial de foco (sesiones y tiempo por día), paginado con el cursor next_before
+   */
+  getHistory: async (taskId, { before = null, limit = 50 } = {}) => {
+    const queryParams = new URLSearchParams({
+      limit,
+      utc_offset: -new Date().getTimezoneOffset(),
+    });
+    if (before) queryParams.append('before', before);
+    return request(`/api/v1/tasks/${taskId}/history?${queryParams.toString()}`);
+  },
+
   /**
    * Crear una nueva tarea
    */
@@ -135,6 +149,18 @@ export const subtasksAPI = {
     return request(`/api/v1/subtasks/${subtaskId}`);
   },
 
+  /**
+   * Historial de foco (sesiones y tiempo por día), paginado con el cursor next_before
+   */
+  getHistory: async (subtaskId, { before = null, limit = 50 } = {}) => {
+    const queryParams = new URLSearchParams({
+      limit,
+      utc_offset: -new Date().getTimezoneOffset(),
+    });
+    if (before) queryParams.append('before', before);
+    return request(`/api/v1/subtasks/${subtaskId}/history?${queryParams.toString()}`);
+  },
+
   /**
    * Crear una nueva subtarea
    */
@@ -287,6 +313,21 @@ export const distractionsAPI = {
       body: dataWithUserId,
     });
   },
+
+  /**
+   * Registrar una distracción sin esperar a la escritura (202, se guarda en lote)
+   * @returns {Promise<{pending: number}>}
+   */
+  createDeferred: async (distractionData) => {
+    const dataWithUserId = {
+      ...distractionData,
+      user_id: distractionData.user_id || getUserId()
+    };
+    return request('/api/v1/distractions/deferred', {
+      method: 'POST',
+      body: dataWithUserId,
+    });
+  },
 };
 
 /**
@@ -304,4 +345,141 @@ export const statisticsAPI = {
     const queryString = queryParams.toString();
     return request(`/api/v1/statistics${queryString ? `?${queryString}` : ''}`);
   },
+
+  /**
+   * Obtener rachas, mapa de calor semanal y tasas de distracción por hora
+   */
+  getInsights: async (params = {}) => {
+    const queryParams = new URLSearchParams({
+      user_id: params.userId || getUserId(),
+      utc_offset: -new Date().getTimezoneOffset(),
+    });
+    return request(`/api/v1/statistics/insights?${queryParams.toString()}`);
+  },
+};
+
+/**
+ * API del Dashboard: datos de la pantalla principal en una sola petición
+ */
+export const dashboardAPI = {
+  /**
+   * Obtener el dashboard
+   * @param {Object} params - { userId?, sections?: string[], fields?: string[] }
+   * @returns {Promise<{tasks?, today_pomodoros?, active_pomodoro?, summary?}>}
+   */
+  get: async (params = {}) => {
+    const queryParams = new URLSearchParams();
+    const userId = params.userId || getUserId();
+    queryParams.append('user_id', userId);
+    if (params.sections?.length) queryParams.append('sections', params.sections.join(','));
+    if (params.fields?.length) queryParams.append('fields', params.fields.join(','));
+    // Inicio del día local del usuario para contar los pomodoros de hoy
+    const todayStart = new Date();
+    todayStart.setHours(0, 0, 0, 0);
+    queryParams.append('today_start', todayStart.toISOString());
+
+    return request(`/api/v1/dashboard/?${queryParams.toString()}`);
+  },
+};
+
+/**
+ * API de Informes: se generan en segundo plano y se consultan hasta que terminan
+ */
+export const reportsAPI = {
+  /**
+   * Encolar un informe
+   * @param {Object} report - { type: 'weekly'|'monthly'|'export', start: 'YYYY-MM-DD', end?, userId? }
+   * @returns {Promise<{id, status, progress}>}
+   */
+  create: async (report) => {
+    const { userId, ...data } = report;
+    return request('/api/v1/reports/', {
+      method: 'POST',
+      body: {
+        ...data,
+        user_id: userId || getUserId(),
+        utc_offset: -new Date().getTimezoneOffset(),
+      },
+    });
+  },
+
+  /**
+   * Obtener el estado de un informe (con `result` cuando `status` es 'done')
+   * @param {string} reportId - ID devuelto por create
+   * @returns {Promise<{id, type, status, progress, result?, error?}>}
+   */
+  get: async (reportId) => {
+    return request(`/api/v1/reports/${reportId}`);
+  },
+};
+
+/**
+ * API de Sincronización: cambios desde la última marca de agua
+ */
+export const syncAPI = {
+  /**
+   * Obtener los cambios desde `since` (copia completa si no se indica)
+   * @param {string|null} since - Marca de agua devuelta por la sincronización anterior
+   * @returns {Promise<{watermark, full, tasks, subtasks, pomodoros, distractions, deleted}>}
+   */
+  getChanges: async (since = null, params = {}) => {
+    const queryParams = new URLSearchParams();
+    const userId = params.userId || getUserId();
+    queryParams.append('user_id', userId);
+    if (since) queryParams.append('since', since);
+
+    return request(`/api/v1/sync/?${queryParams.toString()}`);
+  },
+
+  /**
+   * Subir el registro de operaciones hechas sin conexión
+   * @param {Array<{action, entity, id, data, updated_at}>} operations - En orden
+   * @returns {Promise<{id_map: Object<string, number>, results: Array<{index, status, id}>}>}
+   */
+  uploadLog: async (operations, params = {}) => {
+    const userId = params.userId || getUserId();
+    return request('/api/v1/sync/log', {
+      method: 'POST',
+      body: { user_id: userId, operations },
+    });
+  },
+};
+
+/**
+ * API de Eventos: cambios hechos desde otros dispositivos en tiempo real (SSE)
+ */
+export const eventsAPI = {
+  /**
+   * Suscribirse a los cambios del usuario
+   * @param {Function} onChange - Recibe { entity, action, id, user_id, task_id, at }
+   * @param {Function} onResync - Se llama si se perdieron eventos (sincronizar con syncAPI)
+   * @returns {Function} Función para cancelar la suscripción
+   */
+  subscribe: (onChange, onResync = () => {}, params = {}) => {
+    const userId = params.userId || getUserId();
+    const endpoint = `/api/v1/events/?user_id=${encodeURIComponent(userId)}`;
+    const source = new EventSource(API_URL ? `${API_URL}${endpoint}` : endpoint);
+
+    source.addEventListener('change', (message) => onChange(JSON.parse(message.data)));
+    source.addEventListener('resync', () => onResync());
+    return () => source.close();
+  },
+};
+
+/**
+ * API de Lotes: varias peticiones en una sola llamada HTTP
+ */
+export const batchAPI = {
+  /**
+   * Ejecutar un lote de peticiones
+   * @param {Array<{id?: string, method?: string, path: string, params?: object, body?: object}>} requests
+   * @returns {Promise<Array<{id: string, status: number, body: any}>>} Resultados en el mismo orden
+   */
+  execute: async (requests) => {
+    const result = await request('/api/v1/batch/', {
+      method: 'POST',
+      body: { requests },
+    });
+    return result.responses;
+  },
 };
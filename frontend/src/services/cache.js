@@ -6,6 +6,8 @@
 const TASKS_CACHE_KEY = 'pomodoro_tasks_cache';
 const POMODORO_COUNT_CACHE_KEY = 'pomodoro_count_cache';
 const CURRENT_POMODORO_CACHE_KEY = 'current_pomodoro_cache';
+const SYNC_WATERMARK_CACHE_KEY = 'sync_watermark_cache';
+const OFFLINE_LOG_CACHE_KEY = 'offline_log_cache';
 
 /**
  * Guardar tareas en caché local
@@ -79,6 +81,126 @@ export function getCurrentPomodoroFromCache() {
   }
 }
 
+/**
+ * Guardar la marca de agua de la última sincronización
+ */
+export function saveSyncWatermark(watermark) {
+  try {
+    localStorage.setItem(SYNC_WATERMARK_CACHE_KEY, watermark);
+  } catch (error) {
+    console.error('Error guardando marca de sincronización:', error);
+  }
+}
+
+/**
+ * Obtener la marca de agua de la última sincronización (null si nunca se sincronizó)
+ */
+export function getSyncWatermark() {
+  try {
+    return localStorage.getItem(SYNC_WATERMARK_CACHE_KEY);
+  } catch (error) {
+    console.error('Error obteniendo marca de sincronización:', error);
+    return null;
+  }
+}
+
+const toCachedSubtask = (row) => ({
+  id: row.id,
+  title: row.title,
+  completed: row.completed,
+  timeSpent: row.time_spent,
+});
+
+/**
+ * Aplicar a las tareas en caché la respuesta de GET /api/v1/sync
+ * (upserts idempotentes y borrados) y guardar la nueva marca de agua.
+ * Con delta.full se reemplaza la copia local.
+ * @returns {Array} Tareas actualizadas
+ */
+export function applySyncDelta(delta) {
+  const tasks = new Map(
+    (delta.full ? [] : getTasksFromCache()).map((task) => [task.id, task])
+  );
+
+  for (const row of delta.tasks) {
+    const existing = tasks.get(row.id);
+    tasks.set(row.id, {
+      id: row.id,
+      title: row.title,
+      completed: row.completed,
+      category: row.category,
+      customCategory: row.custom_category || '',
+      subtasks: existing ? existing.subtasks : [],
+      timeSpent: row.time_spent,
+    });
+  }
+
+  // Al borrar una tarea desaparecen también sus subtareas
+  for (const id of delta.deleted.tasks) tasks.delete(id);
+
+  const deletedSubtasks = new Set(delta.deleted.subtasks);
+  for (const task of tasks.values()) {
+    task.subtasks = task.subtasks.filter((st) => !deletedSubtasks.has(st.id));
+  }
+
+  for (const row of delta.subtasks) {
+    const task = tasks.get(row.task_id);
+    if (!task) continue;
+    const subtask = toCachedSubtask(row);
+    const index = task.subtasks.findIndex((st) => st.id === row.id);
+    if (index >= 0) {
+      task.subtasks[index] = subtask;
+    } else {
+      task.subtasks.push(subtask);
+    }
+  }
+
+  const result = [...tasks.values()];
+  saveTasksToCache(result);
+  saveSyncWatermark(delta.watermark);
+  return result;
+}
+
+/**
+ * Registrar una operación hecha sin sesión para subirla al reconectar
+ * (POST /api/v1/sync/log). En las creaciones, `id` es el ID local.
+ * @param {'create'|'update'|'complete'|'delete'} action
+ * @param {'task'|'subtask'|'pomodoro'|'distraction'} entity
+ */
+export function appendOfflineOperation(action, entity, id, data = {}) {
+  try {
+    const log = getOfflineOperations();
+    log.push({ action, entity, id, data, updated_at: new Date().toISOString() });
+    localStorage.setItem(OFFLINE_LOG_CACHE_KEY, JSON.stringify(log));
+  } catch (error) {
+    console.error('Error guardando operación sin conexión:', error);
+  }
+}
+
+/**
+ * Obtener las operaciones pendientes de subir, en orden
+ */
+export function getOfflineOperations() {
+  try {
+    const cached = localStorage.getItem(OFFLINE_LOG_CACHE_KEY);
+    return cached ? JSON.parse(cached) : [];
+  } catch (error) {
+    console.error('Error obteniendo operaciones sin conexión:', error);
+    return [];
+  }
+}
+
+/**
+ * Vaciar el registro de operaciones (tras subirlo)
+ */
+export function clearOfflineOperations() {
+  try {
+    localStorage.removeItem(OFFLINE_LOG_CACHE_KEY);
+  } catch (error) {
+    console.error('Error limpiando operaciones sin conexión:', error);
+  }
+}
+
 /**
  * Limpiar todo el caché
  */
@@ -87,6 +209,8 @@ export function clearCache() {
     localStorage.removeItem(TASKS_CACHE_KEY);
     localStorage.removeItem(POMODORO_COUNT_CACHE_KEY);
     localStorage.removeItem(CURRENT_POMODORO_CACHE_KEY);
+    localStorage.removeItem(SYNC_WATERMARK_CACHE_KEY);
+    localStorage.removeItem(OFFLINE_LOG_CACHE_KEY);
   } catch (error) {
     console.error('Error limpiando caché:', error);
   }